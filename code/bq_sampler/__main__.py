@@ -5,17 +5,26 @@ Utility to locally test policies and sample requests.
 """
 # pylint: enable=line-too-long
 import io
+import json
 import os
 import pathlib
 import pprint
+import time
 from typing import Generator, Optional, Tuple, Union
 
 import attrs
 import click
 
-from bq_sampler.entity import policy as policy_, table
+from bq_sampler.entity import command, policy as policy_, table
 from bq_sampler.gcp import bq
-from bq_sampler import process_request, sampler_bucket, sampler_query
+from bq_sampler import (
+    command_parser,
+    const,
+    local_engine,
+    process_request,
+    sampler_bucket,
+    sampler_query,
+)
 
 
 @click.group(help='Use this to test your policies and requests.')
@@ -357,5 +366,53 @@ def random_sample_table(  # pylint: disable=unused-argument
     )
 
 
+@cli.command(
+    help='Runs the whole sampling in-process, i.e., without Pub/Sub between the stages. '
+    'It is configured with the same environment variables as the Cloud Function, '
+    'but the Pub/Sub topics.'
+)
+@click.option(
+    '--command-file',
+    '-c',
+    required=False,
+    type=click.File('r'),
+    help='Path to a JSON command to start from, as it would be sent to Pub/Sub, '
+    'e.g.: {"type": "SAMPLE_POLICY_PREFIX", "prefix": "my-project/my-dataset"}. '
+    f'Default is {command.CommandType.START.value}.',
+)
+@click.option(
+    '--max-workers',
+    '-w',
+    default=const.LOCAL_ENGINE_DEFAULT_MAX_WORKERS,
+    required=False,
+    type=int,
+    help='How many commands to process concurrently.',
+)
+@click.option(
+    '--retry/--no-retry',
+    default=True,
+    help='If a failed command is retried, like it is in the Cloud Function.',
+)
+def run(command_file: Optional[io.TextIOWrapper], max_workers: int, retry: bool) -> None:
+    """
+    In-process execution of all commands.
+
+    :param command_file:
+    :param max_workers:
+    :param retry:
+    :return:
+    """
+    value = (
+        json.load(command_file)
+        if command_file is not None
+        else {command.CommandBase.type.__name__: command.CommandType.START.value}
+    )
+    start = time.monotonic()
+    cmd = command_parser.to_command(value, int(time.time()))
+    click.echo(f'Running <{cmd}> with <{max_workers}> workers')
+    amount = local_engine.LocalEngine(max_workers=max_workers, with_retry=retry).run(cmd)
+    click.echo(f'Processed <{amount}> commands in <{time.monotonic() - start:.1f}> seconds')
+
+
 if __name__ == '__main__':
     cli()
@@ -10,7 +10,9 @@ from bq_sampler import const, logger
 _LOGGER = logger.get(__name__)
 
 
-def to_command(value: Dict[str, Any], timestamp: int) -> command.CommandBase:
+def to_command(  # pylint: disable=too-many-branches
+    value: Dict[str, Any], timestamp: int
+) -> command.CommandBase:
     """
     Converts a dictionary to the corresponding
         :py:class:`command.CommandBase` subclass.
@@ -41,6 +43,8 @@ def to_command(value: Dict[str, Any], timestamp: int) -> command.CommandBase:
     value[command.CommandBase.timestamp.__name__] = timestamp
     if req_type == command.CommandType.START:
         result = command.CommandStart.from_dict(value)
+    elif req_type == command.CommandType.SAMPLE_POLICY_PROJECT:
+        result = command.CommandSamplePolicyProject.from_dict(value)
     elif req_type == command.CommandType.SAMPLE_POLICY_PREFIX:
         result = command.CommandSamplePolicyPrefix.from_dict(value)
     elif req_type == command.CommandType.SAMPLE_START:
@@ -51,11 +55,39 @@ def to_command(value: Dict[str, Any], timestamp: int) -> command.CommandBase:
         result = command.CommandTransferRunDone.from_dict(value)
     elif req_type == command.CommandType.REMOVE_DATASET:
         result = command.CommandRemoveDataset.from_dict(value)
+    elif req_type == command.CommandType.CLEANUP_DATASET:
+        result = command.CommandCleanupDataset.from_dict(value)
+    elif req_type == command.CommandType.TRANSFER_WATCHDOG:
+        result = command.CommandTransferWatchdog.from_dict(value)
+    elif req_type == command.CommandType.RUN_COMPLETE:
+        result = command.CommandRunComplete.from_dict(value)
+    elif req_type == command.CommandType.COMMAND_BATCH:
+        result = _to_command_batch(value, timestamp)
     else:
         raise ValueError(f'Command type <{req_type}> is not supported. Argument: <{value}>')
     return result
 
 
+def _to_command_batch(value: Dict[str, Any], timestamp: int) -> command.CommandBatch:
+    """
+    Each sub-command gets the same `timestamp` as if it was sent on its own.
+    """
+    commands = value.get(command.CommandBatch.commands.__name__)
+    if not isinstance(commands, list):
+        raise ValueError(
+            f'Command batch must have a {list.__name__} of commands. '
+            f'Got: <{commands}>({type(commands)})'
+        )
+    return command.CommandBatch.from_dict(
+        {
+            **value,
+            command.CommandBatch.commands.__name__: [
+                to_command(item, timestamp) for item in commands
+            ],
+        }
+    )
+
+
 def _validate_command_dict_and_get_request_type(value: Dict[str, Any]) -> command.CommandType:
     if not isinstance(value, dict):
         raise TypeError(f'Expecting a {dict.__name__} as argument. Got: <{value}>({type(value)})')
@@ -8,7 +8,7 @@ Default values for creating an attributes class. To be used as::
     class MyAttrs: pass
 """
 import re
-from typing import Dict
+from typing import Dict, Tuple
 
 import bq_sampler
 
@@ -33,6 +33,43 @@ ATTRS_DEFAULTS: Dict[str, bool] = dict(
 ###################
 
 GS_PREFIX_DELIM: str = '/'
+STAGED_SAMPLES_PREFIX: str = 'staged_samples'
+"""
+Prefix, in the state bucket, to keep track of the samples landed in shared staging datasets.
+"""
+STAGED_SAMPLES_TRANSFER_CLAIM_EXT: str = '.transfer'
+EXTRACT_LOAD_PREFIX: str = 'extracted_samples'
+"""
+Prefix, in the extract bucket, for the staging tables extracted to be loaded into another location.
+"""
+EXTRACT_LOAD_OBJECT_WILDCARD: str = '*.avro'
+TRACKED_TRANSFERS_PREFIX: str = 'tracked_transfers'
+"""
+Prefix, in the state bucket, to keep track of the transfer configs and runs triggered here.
+"""
+SAMPLE_STARTS_PREFIX: str = 'sample_starts'
+"""
+Prefix, in the state bucket, to record the sample commands started, and done, per run.
+"""
+SAMPLE_START_CLAIM_DEFAULT_TIMEOUT_SEC: int = 60 * 60
+"""
+Default time, in seconds, after which a started sample, not yet done, is considered abandoned,
+    e.g., the instance processing it was shut down, and can be started again.
+"""
+RUN_LEDGER_PREFIX: str = 'run_ledger'
+"""
+Prefix, in the state bucket, to account for the tables planned, started, done, and failed per run.
+"""
+CURRENT_RUN_CACHE_TTL_SEC: int = 60
+"""
+How long, in seconds, the current run is cached before reading it again from the state bucket.
+I.e., the commands of a superseded run may still be processed up to this long.
+"""
+SAMPLE_START_RECORD_RETENTION_SEC: int = 7 * 24 * 60 * 60
+"""
+How long, in seconds, the sample records are kept. It matches the Pub/Sub maximum retention,
+    i.e., no duplicate delivery is expected after it.
+"""
 
 ##########################
 #  Samples and Policies  #
@@ -60,16 +97,86 @@ DEFAULT_CREATE_TABLE_LABELS: Dict[str, str] = {
 Default GCP resource label to be applied table created here.
 """
 
+BQ_CLEANUP_DEFAULT_MAX_WORKERS: int = 10
+"""
+Default amount of concurrent BigQuery API calls when cleaning up sample resources.
+"""
+
+BQ_EXTRACT_LOAD_MAX_BYTES: int = 128 * 1024 * 1024
+"""
+Staging tables up to this size are moved across locations with an extract and a load job,
+    instead of a transfer run.
+"""
+
+BQ_SORTED_SAMPLE_COST_FACTOR: float = 2.0
+"""
+How much more expensive a sorted sample is, compared to reading the whole source table,
+    since the whole table is also sorted. Only used to rank samples by their cost.
+"""
+
 #############
 #  Command  #
 #############
 
 REQUEST_TYPE_START = 'START'
+REQUEST_TYPE_SAMPLE_POLICY_PROJECT = 'SAMPLE_POLICY_PROJECT'
 REQUEST_TYPE_SAMPLE_POLICY_PREFIX = 'SAMPLE_POLICY_PREFIX'
 REQUEST_TYPE_SAMPLE_START = 'SAMPLE_START'
 REQUEST_TYPE_SAMPLE_DONE = 'SAMPLE_DONE'
 REQUEST_TYPE_TRANSFER_RUN_DONE = 'TRANSFER_RUN_DONE'
 REQUEST_TYPE_REMOVE_DATASET = 'REMOVE_DATASET'
+REQUEST_TYPE_CLEANUP_DATASET = 'CLEANUP_DATASET'
+REQUEST_TYPE_TRANSFER_WATCHDOG = 'TRANSFER_WATCHDOG'
+REQUEST_TYPE_COMMAND_BATCH = 'COMMAND_BATCH'
+REQUEST_TYPE_RUN_COMPLETE = 'RUN_COMPLETE'
+PUBSUB_ATTR_TYPE: str = 'type'
+PUBSUB_ATTR_RUN_TIMESTAMP: str = 'run_timestamp'
+PUBSUB_ATTR_SOURCE_LOCATION: str = 'source_location'
+"""
+Pub/Sub message attributes names, to route commands with subscription filters.
+"""
+PUBSUB_BATCH_DEFAULT_MAX_MESSAGES: int = 500
+"""
+Default amount of commands batched in a single Pub/Sub publish request when fanning out.
+"""
+PUBSUB_BATCH_DEFAULT_MAX_LATENCY_SEC: float = 0.05
+"""
+Default time, in seconds, a fanned out command waits for its Pub/Sub batch to fill up.
+"""
+COMMAND_BATCH_DEFAULT_MAX_SIZE: int = 1
+"""
+Default maximum amount of sub-commands in a command batch, i.e., no batching.
+"""
+COMMAND_BATCH_DEFAULT_MAX_ROWS: int = 1_000_000
+"""
+Default maximum sum of estimated sampled rows in a command batch.
+A sample above it is sent on its own.
+"""
+COMMAND_BATCH_DEFAULT_MAX_WORKERS: int = 5
+"""
+Default amount of sub-commands, in a command batch, processed concurrently.
+"""
+SAMPLE_POLICY_PREFIX_DEADLINE_RESERVE_RATIO: float = 0.25
+"""
+Share of the policy prefix deadline reserved for the work after loading the policies,
+    i.e., publishing the sample commands and planning the prefix in the run ledger.
+"""
+SAMPLE_START_DEFAULT_MAX_DELAY_SEC: int = 10 * 60
+"""
+Default maximum time, in seconds, a sample command is scheduled ahead of being published.
+It must be well within the command subscription message retention,
+    otherwise a command not due yet expires before being processed.
+The samples scheduled later are handed over to a delayed policy prefix command.
+"""
+SAMPLE_POLICY_PREFIX_MAX_ATTEMPTS: int = 3
+"""
+Maximum amount of times the tables of a policy prefix are attempted,
+    i.e., the failed ones are published again in a narrowed command up to this amount.
+"""
+LOCAL_ENGINE_DEFAULT_MAX_WORKERS: int = 10
+"""
+Default amount of commands processed concurrently when running in-process.
+"""
 
 
 ##################
@@ -88,6 +195,24 @@ TRANSFER_RUN_NAME_ATTR: str = 'name'
 TRANSFER_RUN_DATA_SOURCE_ID_ATTR: str = 'dataSourceId'
 TRANSFER_RUN_STATE_ATTR: str = 'state'
 TRANSFER_RUN_STATE_SUCCEEDED_VALUE: str = 'SUCCEEDED'
+TRANSFER_RUN_STATE_FAILED_VALUES: Tuple[str] = ('FAILED', 'CANCELLED')
+TRANSFER_RUN_ERROR_STATUS_ATTR: str = 'errorStatus'
+TRANSFER_RUN_ERROR_STATUS_CODE_ATTR: str = 'code'
+TRANSFER_RUN_NON_RETRYABLE_ERROR_CODES: Tuple[int] = (3, 5, 7)
+"""
+`gRPC codes`_ for which re-triggering a failed transfer run does not help, i.e.:
+`INVALID_ARGUMENT`, `NOT_FOUND`, and `PERMISSION_DENIED`.
+
+.. _gRPC codes: https://grpc.github.io/grpc/core/md_doc_statuscodes.html
+"""
+TRANSFER_RUN_DEFAULT_TIMEOUT_SEC: int = 60 * 60
+"""
+Default time, in seconds, to wait for a transfer run notification before checking on the run.
+"""
+TRANSFER_RUN_DEFAULT_MAX_ATTEMPTS: int = 3
+"""
+Default amount of times a transfer run is waited for (or re-triggered) before giving up on it.
+"""
 # params
 TRANSFER_RUN_PARAMS_ATTR: str = 'params'
 TRANSFER_RUN_PARAMS_SOURCE_DATASET_ID_ATTR: str = 'source_dataset_id'
@@ -101,6 +226,24 @@ TRANSFER_CONFIG_RESOURCE_NAME_RE: re.Pattern = re.compile(
 )
 # transfer config
 TRANSFER_CONFIG_DISPLAY_NAME_PREFIX: str = f'{bq_sampler.__name__}_triggered_WILL_BE_REMOVED_'
+TRANSFER_CONFIG_PERSISTENT_DISPLAY_NAME_PREFIX: str = f'{bq_sampler.__name__}_persistent_'
+"""
+Display name prefix for the long-lived transfer configs, reused across runs.
+"""
 TRANSFER_CONFIG_UPDATE_MASK_NOTIFICATION_PUBSUB_TOPIC: str = 'notification_pubsub_topic'
 # temp dataset
 TRANSFER_TEMP_DATASET_NAME_PREFIX: str = f'{bq_sampler.__name__}_created_WILL_BE_REMOVED_'
+TRANSFER_PERSISTENT_DATASET_NAME_PREFIX: str = f'{bq_sampler.__name__}_staging_'
+"""
+Name prefix for the staging datasets kept across runs, one per target table,
+    whose transfer config is reused.
+"""
+TRANSFER_TEMP_DATASET_DEFAULT_TABLE_EXPIRATION_MS: int = 24 * 60 * 60 * 1000
+"""
+Default table expiration, in milliseconds, for the staging datasets.
+Orphan staging tables (e.g., lost transfer notification) are removed by BigQuery itself.
+"""
+TRANSFER_TEMP_DATASET_EXPIRES_AT_LABEL: str = 'expires_at'
+"""
+Label, with the UTC epoch in seconds, of when the staging dataset content expires.
+"""
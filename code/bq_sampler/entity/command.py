@@ -2,7 +2,7 @@
 """
 DTOs to encode a command coming from the Cloud Function.
 """
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import attrs
 
@@ -16,21 +16,31 @@ class CommandType(attrs_defaults.EnumWithFromStrIgnoreCase):
     """
 
     START = const.REQUEST_TYPE_START
+    SAMPLE_POLICY_PROJECT = const.REQUEST_TYPE_SAMPLE_POLICY_PROJECT
     SAMPLE_POLICY_PREFIX = const.REQUEST_TYPE_SAMPLE_POLICY_PREFIX
     SAMPLE_START = const.REQUEST_TYPE_SAMPLE_START
     SAMPLE_DONE = const.REQUEST_TYPE_SAMPLE_DONE
     TRANSFER_RUN_DONE = const.REQUEST_TYPE_TRANSFER_RUN_DONE
     REMOVE_DATASET = const.REQUEST_TYPE_REMOVE_DATASET
+    CLEANUP_DATASET = const.REQUEST_TYPE_CLEANUP_DATASET
+    TRANSFER_WATCHDOG = const.REQUEST_TYPE_TRANSFER_WATCHDOG
+    COMMAND_BATCH = const.REQUEST_TYPE_COMMAND_BATCH
+    RUN_COMPLETE = const.REQUEST_TYPE_RUN_COMPLETE
 
 
 @attrs.define(**const.ATTRS_DEFAULTS)
 class CommandBase(attrs_defaults.HasFromDict):  # pylint: disable=too-few-public-methods
     """
     Common command DTO with mandatory fields.
+    The `timestamp` is when the command was sent,
+        the `run_timestamp` is the one of the :py:class:`CommandStart` it comes from, if any.
     """
 
     type: str = attrs.field(validator=attrs.validators.instance_of(str))
     timestamp: int = attrs.field(validator=attrs.validators.gt(0))
+    run_timestamp: int = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.gt(0))
+    )
 
     @type.validator
     def _is_type_valid(  # pylint: disable=no-self-use
@@ -51,19 +61,60 @@ class CommandStart(CommandBase):  # pylint: disable=too-few-public-methods
     """
 
 
+@attrs.define(**const.ATTRS_DEFAULTS)
+class CommandSamplePolicyProject(CommandBase):  # pylint: disable=too-few-public-methods
+    """
+    A signal to indicate that a specific GCS policy bucket project prefix will be processed,
+        i.e., a :py:class:`CommandSamplePolicyPrefix` is issued for each of its datasets.
+    """
+
+    prefix: str = attrs.field(validator=attrs.validators.instance_of(str))
+
+
 @attrs.define(**const.ATTRS_DEFAULTS)
 class CommandSamplePolicyPrefix(CommandBase):  # pylint: disable=too-few-public-methods
     """
     A signal to indicate that a specific GCS policy bucket prefix will be processed.
+    With `table_ids` only these tables in the prefix are processed,
+        e.g., to retry the ones that failed in a previous attempt.
+    With `start_offset` it is a shard of the prefix, i.e., only the policy objects named
+        from `start_offset` (inclusive) up to `end_offset` (exclusive) are processed.
+        Without `end_offset` the shard goes up to the end of the prefix.
+    With `not_before_timestamp` it is not processed before it (UTC epoch in seconds),
+        e.g., to issue sample commands that would be scheduled too far ahead otherwise.
     """
 
     prefix: str = attrs.field(validator=attrs.validators.instance_of(str))
+    table_ids: List[str] = attrs.field(
+        default=None,
+        validator=attrs.validators.optional(
+            attrs.validators.deep_iterable(
+                member_validator=attrs.validators.instance_of(str),
+                iterable_validator=attrs.validators.instance_of(list),
+            )
+        ),
+    )
+    attempts: int = attrs.field(default=1, validator=attrs.validators.gt(0))
+    start_offset: str = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.instance_of(str))
+    )
+    end_offset: str = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.instance_of(str))
+    )
+    not_before_timestamp: int = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.gt(0))
+    )
 
 
 @attrs.define(**const.ATTRS_DEFAULTS)
 class CommandSampleStart(CommandBase):  # pylint: disable=too-few-public-methods
     """
     To issue the sampling of a specific table.
+    Cross-location samples with a `staging_dataset_id` share it with other
+        `staging_table_count - 1` samples, to be transferred together.
+    Without `staging_table_count` the staging dataset is persistent (not shared),
+        and the sample is transferred on its own, reusing the transfer config.
+    With `not_before_timestamp` the sampling does not start before it (UTC epoch in seconds).
     """
 
     sample_request: table.TableSample = attrs.field(
@@ -72,6 +123,15 @@ class CommandSampleStart(CommandBase):  # pylint: disable=too-few-public-methods
     target_table: table.TableReference = attrs.field(
         validator=attrs.validators.instance_of(table.TableReference)
     )
+    staging_dataset_id: str = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.instance_of(str))
+    )
+    staging_table_count: int = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.gt(0))
+    )
+    not_before_timestamp: int = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.gt(0))
+    )
 
 
 @attrs.define(**const.ATTRS_DEFAULTS)
@@ -86,6 +146,12 @@ class CommandSampleDone(CommandSampleStart):  # pylint: disable=too-few-public-m
     amount_inserted: int = attrs.field(
         default=None, validator=attrs.validators.optional(attrs.validators.ge(0))
     )
+    total_bytes_billed: int = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.ge(0))
+    )
+    slot_ms: int = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.ge(0))
+    )
 
 
 @attrs.define(**const.ATTRS_DEFAULTS)
@@ -106,3 +172,85 @@ class CommandRemoveDataset(CommandBase):  # pylint: disable=too-few-public-metho
 
     project_id: str = attrs.field(validator=attrs.validators.instance_of(str))
     dataset_id: str = attrs.field(validator=attrs.validators.instance_of(str))
+
+
+@attrs.define(**const.ATTRS_DEFAULTS)
+class CommandCleanupDataset(CommandBase):  # pylint: disable=too-few-public-methods
+    """
+    To request the clean up of sample resources left behind by previous runs,
+        i.e., the sample tables in a specific BigQuery dataset and/or a stale transfer config.
+    Tables in `keep_table_ids` are planned to be sampled again, therefore kept.
+        Without it, the planned tables are read from the policy bucket once it is processed.
+    """
+
+    project_id: str = attrs.field(validator=attrs.validators.instance_of(str))
+    dataset_id: str = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.instance_of(str))
+    )
+    transfer_config_name: str = attrs.field(
+        default=None, validator=attrs.validators.optional(attrs.validators.instance_of(str))
+    )
+    keep_table_ids: List[str] = attrs.field(
+        default=None,
+        validator=attrs.validators.optional(
+            attrs.validators.deep_iterable(
+                member_validator=attrs.validators.instance_of(str),
+                iterable_validator=attrs.validators.instance_of(list),
+            )
+        ),
+    )
+
+
+@attrs.define(**const.ATTRS_DEFAULTS)
+class CommandTransferWatchdog(CommandBase):  # pylint: disable=too-few-public-methods
+    """
+    To check on the tracked transfer runs whose done notification is overdue.
+    Meant to be sent periodically, e.g., by Cloud Scheduler.
+    """
+
+
+@attrs.define(**const.ATTRS_DEFAULTS)
+class CommandBatch(CommandBase):  # pylint: disable=too-few-public-methods
+    """
+    To process several commands in a single invocation.
+    Each sub-command is processed, and its failure reported, on its own.
+    """
+
+    commands: List[CommandBase] = attrs.field(
+        validator=attrs.validators.deep_iterable(
+            member_validator=attrs.validators.instance_of(CommandBase),
+            iterable_validator=attrs.validators.instance_of(list),
+        )
+    )
+
+    @commands.validator
+    def _is_commands_valid(  # pylint: disable=no-self-use
+        self, attribute: attrs.Attribute, value: Any
+    ) -> None:
+        for item in value:
+            if isinstance(item, CommandBatch):
+                raise ValueError(
+                    f'Attribute <{attribute.name}> cannot contain another '
+                    f'{CommandBatch.__name__}, got: <{item}>'
+                )
+
+
+@attrs.define(**const.ATTRS_DEFAULTS)
+class CommandRunComplete(CommandBase):
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """
+    A signal to indicate that all tables in a run have been either sampled or failed.
+    It summarizes the run, the durations are in seconds.
+    The `shed` commands were dropped because the run was superseded.
+    """
+
+    planned: int = attrs.field(validator=attrs.validators.ge(0))
+    started: int = attrs.field(validator=attrs.validators.ge(0))
+    done: int = attrs.field(validator=attrs.validators.ge(0))
+    failed: int = attrs.field(validator=attrs.validators.ge(0))
+    total_bytes_billed: int = attrs.field(validator=attrs.validators.ge(0))
+    slot_ms: int = attrs.field(validator=attrs.validators.ge(0))
+    total_sample_duration: int = attrs.field(validator=attrs.validators.ge(0))
+    max_sample_duration: int = attrs.field(validator=attrs.validators.ge(0))
+    duration: int = attrs.field(validator=attrs.validators.ge(0))
+    shed: int = attrs.field(default=0, validator=attrs.validators.ge(0))
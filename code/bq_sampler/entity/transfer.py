@@ -0,0 +1,31 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+"""
+DTOs to keep track of the BigQuery transfer runs triggered to move samples across locations.
+"""
+
+import attrs
+
+from bq_sampler import const
+from bq_sampler.entity import attrs_defaults
+
+
+@attrs.define(**const.ATTRS_DEFAULTS)
+class TrackedTransfer(attrs_defaults.HasFromJsonString):  # pylint: disable=too-few-public-methods
+    """
+    A transfer config, its latest run, and the staging dataset it transfers, e.g.::
+        value = TrackedTransfer(
+            transfer_config_name='projects/123/locations/europe-west3/transferConfigs/456',
+            run_name='projects/123/locations/europe-west3/transferConfigs/456/runs/789',
+            source_project_id='my-target-project',
+            source_dataset_id='bq_sampler_created_WILL_BE_REMOVED_dataset_us_uuid',
+            triggered_timestamp=1667000000,
+            attempts=1,
+        )
+    """
+
+    transfer_config_name: str = attrs.field(validator=attrs.validators.instance_of(str))
+    run_name: str = attrs.field(validator=attrs.validators.instance_of(str))
+    source_project_id: str = attrs.field(validator=attrs.validators.instance_of(str))
+    source_dataset_id: str = attrs.field(validator=attrs.validators.instance_of(str))
+    triggered_timestamp: int = attrs.field(validator=attrs.validators.gt(0))
+    attempts: int = attrs.field(default=1, validator=attrs.validators.gt(0))
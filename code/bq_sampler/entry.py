@@ -10,7 +10,7 @@ import calendar
 import os
 from typing import Any, Dict, Optional
 
-from bq_sampler import command_parser, logger, process_request
+from bq_sampler import command_parser, logger, process_request, sampler_schedule
 from bq_sampler.gcp import pubsub
 from bq_sampler.entity import command
 
@@ -45,6 +45,10 @@ def handler(  # pylint: disable=unused-argument
     # logic
     try:
         response = _handler(event, context)
+    except sampler_schedule.SampleNotDueError as err:
+        # failing the delivery lets Pub/Sub deliver it again with the subscription backoff
+        _LOGGER.info('Rejecting event <%s>. Reason: %s', event, err)
+        raise
     except Exception as err:  # pylint: disable=broad-except
         response = (
             f'Could not process event: <{event}>, '
@@ -4,21 +4,30 @@ Exposes all functionality related to BigQuery.
 """
 
 from bq_sampler.gcp.bq._bq_base import (
+    clone_table,
     create_table,
     get_dataset,
     drop_table,
+    extract_table,
+    list_all_datasets,
     list_all_tables_with_filter,
+    list_transfer_config_by_display_name_prefix,
+    load_table,
     query_job,
     remove_dataset,
     remove_transfer_config,
+    start_transfer_config_run,
     table,
+    transfer_run,
+    validate_max_workers,
 )
 from bq_sampler.gcp.bq._bq_helper import (
     bigquery_valid_string,
+    clean_up_dataset_by_labels,
     cross_location_copy,
-    drop_all_tables_by_labels,
+    job_stats,
+    JobStats,
+    num_bytes,
     query_job_result,
-    remove_all_empty_datasets_by_labels,
-    remove_all_transfer_config_by_display_name_prefix,
     row_count,
 )
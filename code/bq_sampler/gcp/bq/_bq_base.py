@@ -1,4 +1,5 @@
 # vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=too-many-lines
 # pylint: disable=line-too-long
 """
 Reads an object from `Cloud Big Query`_ using `Python client`_.
@@ -7,7 +8,19 @@ Reads an object from `Cloud Big Query`_ using `Python client`_.
 .. _Python client: https://googleapis.dev/python/bigquery/latest/index.html
 """
 # pylint: enable=line-too-long
-from typing import Any, Callable, Dict, Generator, Mapping, Optional, Sequence, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import cachetools
 
@@ -22,6 +35,10 @@ _LOGGER = logger.get(__name__)
 
 _QUERY_JOB_DONE_STATE: str = "DONE"
 _QUERY_JOB_BUSY_WAIT_SLEEP_TIME_IN_SECONDS: int = 15
+_REPLACE_WITH_CLONE_QUERY_TMPL: str = 'CREATE OR REPLACE TABLE `{target}` CLONE `{source}`'
+"""
+The `CREATE TABLE CLONE` statement replaces an existing table in a single step.
+"""
 
 
 class _SimpleTableSpec:  # pylint: disable=too-few-public-methods
@@ -143,6 +160,7 @@ def query_job(
     job_config: Optional[bigquery.QueryJobConfig] = None,
     project_id: Optional[str] = None,
     location: Optional[str] = None,
+    destination_table_fqn_id: Optional[str] = None,
 ) -> bigquery.job.query.QueryJob:
     """
     :py:class:`bigquery.job.query.QueryJob` are Async by nature, see `docs`_.
@@ -151,6 +169,8 @@ def query_job(
     :param job_config:
     :param location:
     :param project_id:
+    :param destination_table_fqn_id: if given, the query results overwrite
+        the content of this table (`WRITE_TRUNCATE`), keeping its metadata, e.g., labels.
     :return:
 
     .. _docs: https://googleapis.dev/python/bigquery/latest/reference.html#job
@@ -162,12 +182,26 @@ def query_job(
     query = _stripped_str_arg('query', query)
     project_id = _stripped_str_arg('project_id', project_id, True)
     location = _stripped_str_arg('location', location, True)
+    if destination_table_fqn_id is not None:
+        job_config = _write_truncate_job_config(
+            _SimpleTableSpec(destination_table_fqn_id), job_config
+        )
     # logic
     result = _query_job(query, job_config, project_id, location)
     _LOGGER.debug('Query job <%s>.', result)
     return result
 
 
+def _write_truncate_job_config(
+    table_spec: _SimpleTableSpec, job_config: Optional[bigquery.QueryJobConfig] = None
+) -> bigquery.QueryJobConfig:
+    if job_config is None:
+        job_config = bigquery.QueryJobConfig()
+    job_config.destination = table_spec.table_id_only
+    job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+    return job_config
+
+
 def _query_job(
     query: str,
     job_config: Optional[bigquery.QueryJobConfig] = None,
@@ -187,13 +221,16 @@ def _query_job(
     return result
 
 
-def create_table(
+def create_table(  # pylint: disable=too-many-arguments
     *,
     table_fqn_id: str,
     schema: Sequence[Union[bigquery.schema.SchemaField, Mapping[str, Any]]],
     labels: Optional[Dict[str, str]] = None,
     drop_table_before: Optional[bool] = True,
+    expiration_ms: Optional[int] = None,
+    dataset_default_table_expiration_ms: Optional[int] = None,
 ) -> None:
+    # pylint: disable=line-too-long
     """
     Using the full-qualified ID creates a table.
 
@@ -201,19 +238,61 @@ def create_table(
     :param schema:
     :param labels:
     :param drop_table_before:
+    :param expiration_ms: if given, the table `expires`_ this amount of milliseconds from now.
+    :param dataset_default_table_expiration_ms: if given, sets the dataset
+        `default_table_expiration_ms`_, so all tables created in it expire server-side.
     :return:
+
+    .. _expires: https://cloud.google.com/python/docs/reference/bigquery/latest/google.cloud.bigquery.table.Table#google_cloud_bigquery_table_Table_expires
+    .. _default_table_expiration_ms: https://cloud.google.com/python/docs/reference/bigquery/latest/google.cloud.bigquery.dataset.Dataset#google_cloud_bigquery_dataset_Dataset_default_table_expiration_ms
     """
+    # pylint: enable=line-too-long
     # validate input
     table_spec = _SimpleTableSpec(table_fqn_id)
     labels = _validate_table_labels(labels)
     _validate_schema(schema)
+    expires = _expires_from_ms(expiration_ms)
+    dataset_default_table_expiration_ms = _validate_expiration_ms(
+        dataset_default_table_expiration_ms
+    )
     # logic
-    _LOGGER.debug('Creating table <%s> with labels: <%s>', table_fqn_id, labels)
-    dataset = _create_dataset(table_spec, labels, exists_ok=True)
+    _LOGGER.debug(
+        'Creating table <%s> with labels: <%s> and expiration: <%s>',
+        table_fqn_id,
+        labels,
+        expires,
+    )
+    dataset = _create_dataset(
+        table_spec,
+        labels,
+        exists_ok=True,
+        default_table_expiration_ms=dataset_default_table_expiration_ms,
+    )
     if drop_table_before:
         drop_table(table_fqn_id=table_fqn_id, not_found_ok=True)
-    _create_table(dataset, table_spec, schema, labels, exists_ok=True)
-    _LOGGER.debug('Created table <%s> with labels: <%s>', table_fqn_id, labels)
+    _create_table(dataset, table_spec, schema, labels, exists_ok=True, expires=expires)
+    _LOGGER.debug(
+        'Created table <%s> with labels: <%s> and expiration: <%s>',
+        table_fqn_id,
+        labels,
+        expires,
+    )
+
+
+def _validate_expiration_ms(value: Optional[int] = None) -> Optional[int]:
+    if value is not None and (not isinstance(value, int) or value <= 0):
+        raise ValueError(
+            'Expiration must be a positive int (milliseconds) or None. '
+            f'Got: <{value}>({type(value)})'
+        )
+    return value
+
+
+def _expires_from_ms(value: Optional[int] = None) -> Optional[datetime]:
+    result = None
+    if _validate_expiration_ms(value) is not None:
+        result = datetime.now(timezone.utc) + timedelta(milliseconds=value)
+    return result
 
 
 def _validate_table_labels(value: Optional[Dict[str, str]] = None) -> str:
@@ -225,7 +304,7 @@ def _validate_table_labels(value: Optional[Dict[str, str]] = None) -> str:
 
 
 def _validate_schema(
-    schema: Sequence[Union[bigquery.schema.SchemaField, Mapping[str, Any]]]
+    schema: Sequence[Union[bigquery.schema.SchemaField, Mapping[str, Any]]],
 ) -> None:
     if schema is None:
         raise ValueError('Table schema cannot be None')
@@ -235,13 +314,15 @@ def _create_dataset(
     table_spec: _SimpleTableSpec,
     labels: Dict[str, str],
     exists_ok: Optional[bool] = True,
+    default_table_expiration_ms: Optional[int] = None,
 ) -> bigquery.Dataset:
     _LOGGER.debug(
-        'Creating dataset <%s.%s>@<%s> with labels: <%s>',
+        'Creating dataset <%s.%s>@<%s> with labels: <%s> and default table expiration: <%s>',
         table_spec.project_id,
         table_spec.dataset_id,
         table_spec.location,
         labels,
+        default_table_expiration_ms,
     )
     # Dataset obj
     try:
@@ -263,12 +344,14 @@ def _create_dataset(
         raise ValueError(
             f'Could not create dataset for <{result.dataset_id}>. Error: {err}'
         ) from err
-    # Add labels
+    # Add labels (and expiration)
+    fields = ['labels']
     try:
         result.labels = labels
-        result = _client(table_spec.project_id, table_spec.location).update_dataset(
-            result, ['labels']
-        )
+        if default_table_expiration_ms is not None:
+            result.default_table_expiration_ms = default_table_expiration_ms
+            fields.append('default_table_expiration_ms')
+        result = _client(table_spec.project_id, table_spec.location).update_dataset(result, fields)
     except Exception as err:  # pylint: disable=broad-except
         raise ValueError(
             f'Could not set labels for dataset <{result.dataset_id}> '
@@ -283,15 +366,19 @@ def _create_table(  # pylint: disable=too-many-arguments
     table_spec: _SimpleTableSpec,
     schema: Sequence[Union[bigquery.schema.SchemaField, Mapping[str, Any]]],
     labels: Dict[str, str],
+    *,
     exists_ok: Optional[bool] = True,
+    expires: Optional[datetime] = None,
 ) -> bigquery.Table:
     _LOGGER.debug(
-        'Creating table <%s> in dataset <%s> and project <%s> exists_ok <%s> with labels: <%s>',
+        'Creating table <%s> in dataset <%s> and project <%s> exists_ok <%s> '
+        'with labels: <%s> and expiration: <%s>',
         table_spec.table_id,
         dataset.dataset_id,
         dataset.project,
         exists_ok,
         labels,
+        expires,
     )
     # Table obj
     try:
@@ -309,13 +396,16 @@ def _create_table(  # pylint: disable=too-many-arguments
         )
     except Exception as err:  # pylint: disable=broad-except
         raise ValueError(f'Could not create table for <{result.table_id}>. Error: {err}') from err
-    # Add labels and schema
+    # Add labels, schema (and expiration)
+    fields = ['labels', 'schema']
     result.labels = labels
     result.schema = schema
+    if expires is not None:
+        # an existing table, that is kept, gets its expiration pushed forward
+        result.expires = expires
+        fields.append('expires')
     try:
-        result = _client(dataset.project, table_spec.location).update_table(
-            result, ['labels', 'schema']
-        )
+        result = _client(dataset.project, table_spec.location).update_table(result, fields)
     except Exception as err:  # pylint: disable=broad-except
         raise ValueError(
             f'Could not set labels for table <{result.table_id}> '
@@ -325,6 +415,195 @@ def _create_table(  # pylint: disable=too-many-arguments
     return result
 
 
+def clone_table(
+    *,
+    source_table_fqn_id: str,
+    target_table_fqn_id: str,
+    labels: Optional[Dict[str, str]] = None,
+    replace: Optional[bool] = True,
+    expiration_ms: Optional[int] = None,
+) -> None:
+    # pylint: disable=line-too-long
+    """
+    Creates the target table as a `table clone`_ of the source table.
+    A clone is metadata only, therefore it is created almost instantly
+        and storage is only billed for the data that diverges from the source.
+    Both tables must be in the same location.
+
+    :param source_table_fqn_id: in the format `<PROJECT_ID>.<DATASET_ID>.<TABLE_ID>[@<LOCATION>]`.
+    :param target_table_fqn_id: in the format `<PROJECT_ID>.<DATASET_ID>.<TABLE_ID>[@<LOCATION>]`.
+    :param labels:
+    :param replace: an existing target table is replaced by the clone in a single step,
+        i.e., it is never missing. Only if it cannot be replaced this way,
+        it is dropped before being cloned, see :py:func:`_replace_with_clone`.
+    :param expiration_ms: see :py:func:`create_table`.
+    :return:
+
+    .. _table clone: https://cloud.google.com/bigquery/docs/table-clones-intro
+    """
+    # pylint: enable=line-too-long
+    # validate input
+    source_spec = _SimpleTableSpec(source_table_fqn_id)
+    target_spec = _SimpleTableSpec(target_table_fqn_id)
+    if source_spec.location != target_spec.location:
+        raise ValueError(
+            f'Source <{source_table_fqn_id}> and target <{target_table_fqn_id}> tables '
+            'must be in the same location to be cloned'
+        )
+    labels = _validate_table_labels(labels)
+    expires = _expires_from_ms(expiration_ms)
+    # logic
+    _LOGGER.debug(
+        'Cloning table <%s> into <%s> with labels: <%s>',
+        source_table_fqn_id,
+        target_table_fqn_id,
+        labels,
+    )
+    _create_dataset(target_spec, labels, exists_ok=True)
+    if replace:
+        _replace_with_clone(source_spec, target_spec)
+    else:
+        _clone_table(source_spec, target_spec)
+    _set_table_labels(target_spec, labels, expires)
+    _LOGGER.info(
+        'Cloned table <%s> into <%s> with labels: <%s>',
+        source_table_fqn_id,
+        target_table_fqn_id,
+        labels,
+    )
+
+
+def _replace_with_clone(source_spec: _SimpleTableSpec, target_spec: _SimpleTableSpec) -> None:
+    query = _REPLACE_WITH_CLONE_QUERY_TMPL.format(
+        target=target_spec.table_id_only, source=source_spec.table_id_only
+    )
+    try:
+        _query_job(query, project_id=target_spec.project_id, location=target_spec.location).result()
+    except Exception as err:  # pylint: disable=broad-except
+        _LOGGER.warning(
+            'Could not replace table <%s> with a clone of <%s>. '
+            'Dropping it before cloning instead. Error: %s',
+            target_spec,
+            source_spec,
+            err,
+        )
+        drop_table(table_fqn_id=target_spec.table_fqn_id, not_found_ok=True)
+        _clone_table(source_spec, target_spec)
+
+
+def _clone_table(source_spec: _SimpleTableSpec, target_spec: _SimpleTableSpec) -> None:
+    job_config = bigquery.CopyJobConfig(operation_type=bigquery.job.OperationType.CLONE)
+    try:
+        job = _client(target_spec.project_id, target_spec.location).copy_table(
+            source_spec.table_id_only, target_spec.table_id_only, job_config=job_config
+        )
+        job.result()
+    except Exception as err:  # pylint: disable=broad-except
+        raise RuntimeError(
+            f'Could not clone table <{source_spec}> into <{target_spec}>. Error: {err}'
+        ) from err
+
+
+def _set_table_labels(
+    table_spec: _SimpleTableSpec, labels: Dict[str, str], expires: Optional[datetime] = None
+) -> bigquery.Table:
+    client = _client(table_spec.project_id, table_spec.location)
+    fields = ['labels']
+    try:
+        result = client.get_table(table_spec.table_id_only)
+        result.labels = labels
+        if expires is not None:
+            result.expires = expires
+            fields.append('expires')
+        result = client.update_table(result, fields)
+    except Exception as err:  # pylint: disable=broad-except
+        raise ValueError(
+            f'Could not set labels for table <{table_spec}> '
+            f'with content: <{labels}>. '
+            f'Error: {err}'
+        ) from err
+    return result
+
+
+_EXTRACT_LOAD_FORMAT: str = bigquery.DestinationFormat.AVRO
+_EXTRACT_LOAD_COMPRESSION: str = bigquery.Compression.SNAPPY
+
+
+def extract_table(*, table_fqn_id: str, destination_uri: str) -> None:
+    # pylint: disable=line-too-long
+    """
+    Exports the table content into Cloud Storage as `Avro`_, compressed with `SNAPPY`,
+        and waits for the `extract job`_ to finish.
+    The bucket must be colocated with the table dataset (or in a compatible multi-region).
+
+    :param table_fqn_id: in the format `<PROJECT_ID>.<DATASET_ID>.<TABLE_ID>[@<LOCATION>]`.
+    :param destination_uri: something like `gs://bucket/path/*.avro`.
+    :return:
+
+    .. _Avro: https://cloud.google.com/bigquery/docs/exporting-data#avro_export_details
+    .. _extract job: https://cloud.google.com/python/docs/reference/bigquery/latest/google.cloud.bigquery.client.Client#google_cloud_bigquery_client_Client_extract_table
+    """
+    # pylint: enable=line-too-long
+    # validate input
+    table_spec = _SimpleTableSpec(table_fqn_id)
+    destination_uri = _stripped_str_arg('destination_uri', destination_uri)
+    # logic
+    _LOGGER.debug('Extracting table <%s> into <%s>', table_fqn_id, destination_uri)
+    job_config = bigquery.ExtractJobConfig(
+        destination_format=_EXTRACT_LOAD_FORMAT,
+        compression=_EXTRACT_LOAD_COMPRESSION,
+        use_avro_logical_types=True,
+    )
+    try:
+        job = _client(table_spec.project_id, table_spec.location).extract_table(
+            table_spec.table_id_only, destination_uri, job_config=job_config
+        )
+        job.result()
+    except Exception as err:  # pylint: disable=broad-except
+        raise RuntimeError(
+            f'Could not extract table <{table_spec}> into <{destination_uri}>. Error: {err}'
+        ) from err
+    _LOGGER.info('Extracted table <%s> into <%s>', table_fqn_id, destination_uri)
+
+
+def load_table(*, source_uri: str, table_fqn_id: str) -> None:
+    # pylint: disable=line-too-long
+    """
+    Loads the `Avro`_ content, as exported by :py:func:`extract_table`,
+        into the table, overwriting its content (`WRITE_TRUNCATE`),
+        and waits for the `load job`_ to finish.
+    The bucket must be colocated with the table dataset (or in a compatible multi-region).
+
+    :param source_uri: something like `gs://bucket/path/*.avro`.
+    :param table_fqn_id: in the format `<PROJECT_ID>.<DATASET_ID>.<TABLE_ID>[@<LOCATION>]`.
+    :return:
+
+    .. _Avro: https://cloud.google.com/bigquery/docs/loading-data-cloud-storage-avro
+    .. _load job: https://cloud.google.com/python/docs/reference/bigquery/latest/google.cloud.bigquery.client.Client#google_cloud_bigquery_client_Client_load_table_from_uri
+    """
+    # pylint: enable=line-too-long
+    # validate input
+    source_uri = _stripped_str_arg('source_uri', source_uri)
+    table_spec = _SimpleTableSpec(table_fqn_id)
+    # logic
+    _LOGGER.debug('Loading <%s> into table <%s>', source_uri, table_fqn_id)
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.AVRO,
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+        use_avro_logical_types=True,
+    )
+    try:
+        job = _client(table_spec.project_id, table_spec.location).load_table_from_uri(
+            source_uri, table_spec.table_id_only, job_config=job_config
+        )
+        job.result()
+    except Exception as err:  # pylint: disable=broad-except
+        raise RuntimeError(
+            f'Could not load <{source_uri}> into table <{table_spec}>. Error: {err}'
+        ) from err
+    _LOGGER.info('Loaded <%s> into table <%s>', source_uri, table_fqn_id)
+
+
 def drop_table(*, table_fqn_id: str, not_found_ok: Optional[bool] = True) -> None:
     """
     Will drop the specified table.
@@ -380,6 +659,20 @@ def list_all_tables_with_filter(
         yield table_fqn_id
 
 
+def validate_max_workers(value: Optional[int] = None) -> int:
+    """
+    Returns the :py:obj:`const.BQ_CLEANUP_DEFAULT_MAX_WORKERS` if ``value`` is :py:obj:`None`.
+
+    :param value: maximum amount of concurrent workers.
+    :return:
+    """
+    if value is None:
+        value = const.BQ_CLEANUP_DEFAULT_MAX_WORKERS
+    if not isinstance(value, int) or value <= 0:
+        raise ValueError(f'Max workers must be a positive {int.__name__}. Got: <{value}>')
+    return value
+
+
 def _list_all_tables_with_filter(
     project_id: str,
     filter_fn: Callable[[bigquery.table.TableListItem], bool],
@@ -387,27 +680,105 @@ def _list_all_tables_with_filter(
     _LOGGER.debug('Listing all tables in project <%s> with filter function', project_id)
     try:
         for ds_list_item in _list_all_datasets(project_id):
-            table_location = _extract_location_from_ds_list_item(ds_list_item)
-            for t_list_item in _list_all_tables_in_dataset(ds_list_item):
-                if filter_fn(t_list_item):
-                    yield _table_fqn_from_table_ref(t_list_item, table_location)
+            table_fqn_id_lst, _ = _list_all_tables_in_dataset_with_filter(ds_list_item, filter_fn)
+            for table_fqn_id in table_fqn_id_lst:
+                yield table_fqn_id
     except Exception as err:  # pylint: disable=broad-except
         raise ValueError(
             f'Could not list all datasets in project <{project_id}>. Error: {err}'
         ) from err
 
 
-def _list_all_datasets(project_id: str) -> page_iterator.Iterator:
+def list_all_tables_in_dataset_with_filter(
+    *,
+    project_id: str,
+    dataset_id: str,
+    filter_fn: Optional[Callable[[bigquery.table.TableListItem], bool]] = None,
+) -> Tuple[List[str], int]:
+    """
+    Lists all tables in a single dataset matching `filter_fn`, if given.
+
+    :param project_id:
+    :param dataset_id:
+    :param filter_fn:
+    :return: the matching tables and the total amount of tables in the dataset.
+    """
+    # validate input
+    _LOGGER.debug(
+        'Listing tables with filter in dataset <%s> in project <%s>', dataset_id, project_id
+    )
+    project_id = _stripped_str_arg('project_id', project_id)
+    dataset_id = _stripped_str_arg('dataset_id', dataset_id)
+    if not callable(filter_fn):
+        filter_fn = _FALLBACK_FILTER_FN
+    # logic
+    try:
+        result = _list_all_tables_in_dataset_with_filter(
+            bigquery.DatasetReference(project=project_id, dataset_id=dataset_id), filter_fn
+        )
+    except Exception as err:  # pylint: disable=broad-except
+        raise ValueError(
+            f'Could not list tables in dataset <{dataset_id}> in project <{project_id}>. '
+            f'Error: {err}'
+        ) from err
+    return result
+
+
+def _list_all_tables_in_dataset_with_filter(
+    ds_list_item: Union[bigquery.DatasetReference, bigquery.dataset.DatasetListItem],
+    filter_fn: Callable[[bigquery.table.TableListItem], bool],
+) -> Tuple[List[str], int]:
+    result = []
+    total_tables = 0
+    table_location = _extract_location_from_ds_list_item(ds_list_item)
+    for t_list_item in _list_all_tables_in_dataset(ds_list_item):
+        total_tables += 1
+        if filter_fn(t_list_item):
+            result.append(_table_fqn_from_table_ref(t_list_item, table_location))
+    return result, total_tables
+
+
+def list_all_datasets(
+    *, project_id: str, labels: Optional[Dict[str, str]] = None
+) -> Generator[bigquery.dataset.DatasetListItem, None, None]:
+    """
+    Lists all datasets in the project, restricted to those with `labels`, if given.
+
+    :param project_id:
+    :param labels:
+    :return:
+    """
+    _LOGGER.debug('Listing datasets in project <%s> with labels <%s>', project_id, labels)
+    # validate input
+    project_id = _stripped_str_arg('project_id', project_id, True)
+    # logic
+    try:
+        for dataset_item in _list_all_datasets(project_id, labels):
+            yield dataset_item
+    except Exception as err:  # pylint: disable=broad-except
+        raise ValueError(
+            f'Could not list datasets in project <{project_id}> with labels <{labels}>. '
+            f'Error: {err}'
+        ) from err
+
+
+def _list_all_datasets(
+    project_id: str, labels: Optional[Dict[str, str]] = None
+) -> page_iterator.Iterator:
     # pylint: disable=line-too-long
     """
     Page iterator over :py:class:`bigquery.dataset.DatasetListItem` (`documentation`_)
+    If `labels` are given, the datasets are filtered by the API (see `filter`_).
 
     .. _documentation: https://cloud.google.com/python/docs/reference/bigquery/latest/google.cloud.bigquery.dataset.DatasetListItem
+    .. _filter: https://cloud.google.com/bigquery/docs/reference/rest/v2/datasets/list#query-parameters
     """
     # pylint: enable=line-too-long
-    _LOGGER.debug('Listing all datasets in project <%s>', project_id)
+    _LOGGER.debug('Listing all datasets in project <%s> with labels <%s>', project_id, labels)
     try:
-        result = _client(project_id).list_datasets(project=project_id, include_all=True)
+        result = _client(project_id).list_datasets(
+            project=project_id, include_all=True, filter=_dataset_labels_filter(labels)
+        )
     except Exception as err:  # pylint: disable=broad-except
         raise ValueError(
             f'Could not list all datasets in project <{project_id}>. Error: {err}'
@@ -415,6 +786,23 @@ def _list_all_datasets(project_id: str) -> page_iterator.Iterator:
     return result
 
 
+def _dataset_labels_filter(labels: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """
+    Builds the `datasets.list`_ filter, e.g.::
+        labels = {'sample_table': 'true', 'other': None}
+        result = 'labels.sample_table:true labels.other'
+
+    .. _datasets.list: https://cloud.google.com/bigquery/docs/reference/rest/v2/datasets/list
+    """
+    result = None
+    if labels:
+        result = ' '.join(
+            f'labels.{key}:{val}' if val is not None else f'labels.{key}'
+            for key, val in labels.items()
+        )
+    return result
+
+
 def _list_all_tables_in_dataset(
     dataset_ref: Union[bigquery.DatasetReference, bigquery.dataset.DatasetListItem],
 ) -> page_iterator.Iterator:
@@ -483,45 +871,32 @@ def get_dataset(project_id: str, dataset_id: str) -> bigquery.Dataset:
     return result
 
 
-def remove_empty_datasets(
-    *,
-    project_id: str,
-    filter_fn: Optional[Callable[[bigquery.dataset.DatasetListItem], bool]] = None,
-) -> None:
+def has_models_or_routines(project_id: str, dataset_id: str) -> bool:
     """
-    Removes an empty dataset according to filtering function `filter_fn`, if present.
+    Whether the dataset holds anything else than tables,
+        i.e., models or routines, which a table listing does not show.
 
     :param project_id:
-    :param filter_fn:
+    :param dataset_id:
     :return:
     """
-    _LOGGER.debug('Removing empty datasets with filter in project <%s>', project_id)
-    # validation
-    project_id = _stripped_str_arg('project_id', project_id, True)
-    if not callable(filter_fn):
-        filter_fn = _FALLBACK_FILTER_FN
+    # validate input
+    project_id = _stripped_str_arg('project_id', project_id)
+    dataset_id = _stripped_str_arg('dataset_id', dataset_id)
     # logic
-    errors = []
-    for dataset_item in _list_all_datasets(project_id):
-        if filter_fn(dataset_item):
-            try:
-                if _is_dataset_empty(dataset_item):
-                    remove_dataset(
-                        project_id=dataset_item.project,
-                        dataset_id=dataset_item.dataset_id,
-                        delete_contents=False,
-                        not_found_ok=True,
-                    )
-            except Exception as err:  # pylint: disable=broad-except
-                msg = f'Could remove {dataset_item.full_dataset_id}. Error: {err}'
-                _LOGGER.error(msg)
-                errors.append(err)
-    if errors:
-        raise RuntimeError(f'Could not remove dataset(s). Errors: {errors}') from errors[-1]
-
-
-def _is_dataset_empty(dataset_ref: bigquery.DatasetReference) -> bool:
-    return next(_list_all_tables_in_dataset(dataset_ref), None) is None
+    dataset_ref = bigquery.DatasetReference(project=project_id, dataset_id=dataset_id)
+    client = _client(project_id)
+    try:
+        result = (
+            next(iter(client.list_models(dataset_ref, max_results=1)), None) is not None
+            or next(iter(client.list_routines(dataset_ref, max_results=1)), None) is not None
+        )
+    except Exception as err:  # pylint: disable=broad-except
+        raise RuntimeError(
+            f'Could not list models and routines in dataset <{dataset_id}> '
+            f'in project <{project_id}>. Error: {err}'
+        ) from err
+    return result
 
 
 def remove_dataset(
@@ -604,6 +979,7 @@ def dataset_transfer_config_run(
     target_table_fqn_id: str,
     notification_pubsub_topic: Optional[str] = None,
     transfer_config_display_name_prefix: Optional[str] = None,
+    reuse_transfer_config: Optional[bool] = False,
 ) -> Sequence[bigquery_datatransfer.TransferRun]:
     # pylint: disable=line-too-long
     """
@@ -611,11 +987,17 @@ def dataset_transfer_config_run(
     * `create_transfer_config`_;
     * `start_manual_transfer_runs`_.
 
+    If `reuse_transfer_config` is :py:obj:`True`, there is a single (long-lived) transfer config
+        per source and target datasets, which is created only if it does not exist yet.
+    It is then only triggered and never removed here.
+
     :param source_table_fqn_id:
     :param target_table_fqn_id:
     :param notification_pubsub_topic:
     :param transfer_config_display_name_prefix: if :py:obj:`None`
-      uses :py:data:`const.TRANSFER_CONFIG_DISPLAY_NAME_PREFIX`.
+      uses :py:data:`const.TRANSFER_CONFIG_DISPLAY_NAME_PREFIX`,
+      or :py:data:`const.TRANSFER_CONFIG_PERSISTENT_DISPLAY_NAME_PREFIX` if reusing it.
+    :param reuse_transfer_config:
     :return:
 
     .. _DataTransferServiceClient: https://cloud.google.com/python/docs/reference/bigquerydatatransfer/latest/google.cloud.bigquery_datatransfer_v1.services.data_transfer_service.DataTransferServiceClient
@@ -635,12 +1017,50 @@ def dataset_transfer_config_run(
     notification_pubsub_topic = _stripped_str_arg(
         'pubsub_transfer_done_topic', notification_pubsub_topic, True
     )
-    # create transfer config
     client = _data_transfer_client(tgt_tbl.project_id)
+    if reuse_transfer_config:
+        result = _reused_transfer_config_run(
+            client,
+            source_table=src_tbl,
+            target_table=tgt_tbl,
+            notification_pubsub_topic=notification_pubsub_topic,
+            transfer_config_display_name_prefix=transfer_config_display_name_prefix,
+        )
+    else:
+        transfer_config_name = _create_transfer_config(
+            client,
+            source_table=src_tbl,
+            target_table=tgt_tbl,
+            notification_pubsub_topic=notification_pubsub_topic,
+            transfer_config_display_name=_transfer_config_display_name(
+                tgt_tbl, transfer_config_display_name_prefix
+            ),
+        )
+        # manually trigger the transfer run
+        result = _start_manual_transfer_runs(client, transfer_config_name)
+    return result
+
+
+def _transfer_config_display_name(
+    target_table: _SimpleTableSpec, transfer_config_display_name_prefix: Optional[str] = None
+) -> str:
+    if transfer_config_display_name_prefix is None:
+        transfer_config_display_name_prefix = const.TRANSFER_CONFIG_DISPLAY_NAME_PREFIX
+    return f'{transfer_config_display_name_prefix}{target_table}'
+
+
+def _create_transfer_config(
+    client: bigquery_datatransfer.DataTransferServiceClient,
+    *,
+    source_table: _SimpleTableSpec,
+    target_table: _SimpleTableSpec,
+    notification_pubsub_topic: Optional[str] = None,
+    transfer_config_display_name: str,
+) -> str:
     create_transfer_config_request = _create_transfer_config_request(
-        source_table=src_tbl,
-        target_table=tgt_tbl,
-        transfer_config_display_name_prefix=transfer_config_display_name_prefix,
+        source_table=source_table,
+        target_table=target_table,
+        transfer_config_display_name=transfer_config_display_name,
     )
     try:
         transfer_config: bigquery_datatransfer.TransferConfig = client.create_transfer_config(
@@ -669,19 +1089,132 @@ def dataset_transfer_config_run(
     _LOGGER.info(
         'Created BigQuery %s from <%s> to <%s>. Transfer name: %s',
         bigquery_datatransfer.TransferConfig.__name__,
-        src_tbl,
-        tgt_tbl,
+        source_table,
+        target_table,
         transfer_config.name,
     )
-    # manually trigger the transfer run
-    transfer_run_request = _create_transfer_run_request(name=transfer_config.name)
+    return transfer_config.name
+
+
+def _reused_transfer_config_run(
+    client: bigquery_datatransfer.DataTransferServiceClient,
+    *,
+    source_table: _SimpleTableSpec,
+    target_table: _SimpleTableSpec,
+    notification_pubsub_topic: Optional[str] = None,
+    transfer_config_display_name_prefix: Optional[str] = None,
+) -> Sequence[bigquery_datatransfer.TransferRun]:
+    """
+    The existing transfer configs are listed once (per instance) and cached,
+        so reusing a transfer config usually costs a single call to trigger it.
+    Creating or failing to trigger one invalidates the cached listing.
+    """
+    if transfer_config_display_name_prefix is None:
+        transfer_config_display_name_prefix = const.TRANSFER_CONFIG_PERSISTENT_DISPLAY_NAME_PREFIX
+    display_name = (
+        f'{transfer_config_display_name_prefix}'
+        f'{source_table.project_id}.{source_table.dataset_id}'
+        f'_{target_table.project_id}.{target_table.dataset_id}'
+    )
+    transfer_config_names = _reusable_transfer_config_names(
+        target_table.project_id, target_table.location, transfer_config_display_name_prefix
+    )
+    transfer_config_name = transfer_config_names.get(display_name)
+    if transfer_config_name is None:
+        transfer_config_name = _settle_created_transfer_config(
+            _create_transfer_config(
+                client,
+                source_table=source_table,
+                target_table=target_table,
+                notification_pubsub_topic=notification_pubsub_topic,
+                transfer_config_display_name=display_name,
+            ),
+            target_table=target_table,
+            display_name=display_name,
+            prefix=transfer_config_display_name_prefix,
+        )
+    else:
+        _LOGGER.debug('Reusing transfer config <%s> named <%s>', transfer_config_name, display_name)
+    try:
+        result = _start_manual_transfer_runs(client, transfer_config_name)
+    except Exception as err:  # pylint: disable=broad-except
+        # e.g., it was removed in the meantime, it is created again in the next attempt
+        _REUSABLE_TRANSFER_CONFIG_NAMES_CACHE.clear()
+        raise RuntimeError(
+            f'Could not trigger reused transfer config <{transfer_config_name}>. Error: {err}'
+        ) from err
+    return result
+
+
+def _settle_created_transfer_config(
+    transfer_config_name: str, *, target_table: _SimpleTableSpec, display_name: str, prefix: str
+) -> str:
+    """
+    Concurrent instances can create transfer configs with the same display name,
+        since the API does not prevent it.
+    They all settle on the one listed first, see :py:func:`_listed_transfer_config_names`,
+        and the one just created is removed if it is not that one.
+    """
+    _REUSABLE_TRANSFER_CONFIG_NAMES_CACHE.clear()
+    result = _reusable_transfer_config_names(
+        target_table.project_id, target_table.location, prefix
+    ).get(display_name, transfer_config_name)
+    if result != transfer_config_name:
+        _LOGGER.warning(
+            'Transfer config <%s> named <%s> was created concurrently with <%s>, removing it',
+            transfer_config_name,
+            display_name,
+            result,
+        )
+        try:
+            remove_transfer_config(transfer_config_name)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error(
+                'Could not remove duplicate transfer config <%s>. Error: %s',
+                transfer_config_name,
+                err,
+            )
+    return result
+
+
+def _reusable_transfer_config_names(project_id: str, location: str, prefix: str) -> Dict[str, str]:
+    """
+    A copy, so the cached listing is only changed by listing again.
+    """
+    return dict(_listed_transfer_config_names(project_id, location, prefix))
+
+
+_REUSABLE_TRANSFER_CONFIG_NAMES_CACHE: cachetools.LRUCache = cachetools.LRUCache(maxsize=5)
+
+
+@cachetools.cached(cache=_REUSABLE_TRANSFER_CONFIG_NAMES_CACHE)
+def _listed_transfer_config_names(project_id: str, location: str, prefix: str) -> Dict[str, str]:
+    """
+    Among transfer configs with the same display name, the one with the lowest name is used,
+        so all instances agree on it.
+    """
+    result = {}
+    for transfer_config in sorted(
+        list_transfer_config_by_display_name_prefix(
+            project_id=project_id, location=location, prefix=prefix
+        ),
+        key=lambda transfer_config: transfer_config.name,
+    ):
+        result.setdefault(transfer_config.display_name, transfer_config.name)
+    return result
+
+
+def _start_manual_transfer_runs(
+    client: bigquery_datatransfer.DataTransferServiceClient, name: str
+) -> Sequence[bigquery_datatransfer.TransferRun]:
+    transfer_run_request = _create_transfer_run_request(name=name)
     try:
         run_response: bigquery_datatransfer.StartManualTransferRunsResponse = (
             client.start_manual_transfer_runs(request=transfer_run_request)
         )
     except Exception as err:  # pylint: disable=broad-except
         raise RuntimeError(
-            f'Could not manually start run {transfer_config.name} '
+            f'Could not manually start run {name} '
             f'with request <{transfer_run_request}> '
             f'Error: {err}'
         ) from err
@@ -689,10 +1222,61 @@ def dataset_transfer_config_run(
     _LOGGER.info(
         'Triggered %s: %s with runs: [%s]',
         bigquery_datatransfer.TransferConfig.__name__,
-        transfer_config.name,
+        name,
         ', '.join([run.name for run in result]),
     )
-    # return the runs
+    return result
+
+
+def start_transfer_config_run(name: str) -> Sequence[bigquery_datatransfer.TransferRun]:
+    """
+    Manually triggers a new run for an existing transfer config,
+        e.g., to retry a failed run.
+
+    :param name: transfer config name, i.e.,
+        `projects/<PROJECT_ID>/locations/<LOCATION>/transferConfigs/<CONFIG_ID>`.
+    :return:
+    """
+    name = _stripped_str_arg('name', name)
+    project_id, _ = _project_location_from_transfer_config_name(name)
+    return _start_manual_transfer_runs(_data_transfer_client(project_id), name)
+
+
+def _project_location_from_transfer_config_name(name: str) -> Tuple[str, str]:
+    name_match = const.TRANSFER_CONFIG_RESOURCE_NAME_RE.match(name)
+    if not name_match:
+        raise ValueError(
+            f'Transfer config name <{name}> '
+            f'does not match rule in <{const.TRANSFER_CONFIG_RESOURCE_NAME_RE}>'
+        )
+    return name_match.group(1), name_match.group(2)
+
+
+def transfer_run(name: str) -> bigquery_datatransfer.TransferRun:
+    """
+    Retrieves a transfer run by name, to check on its state.
+
+    :param name: transfer run name, i.e.,
+        `projects/<PROJECT_ID>/locations/<LOCATION>/transferConfigs/<CONFIG_ID>/runs/<RUN_ID>`.
+    :return:
+    """
+    _LOGGER.debug('Retrieving transfer run <%s>', name)
+    # validated input
+    name = _stripped_str_arg('name', name)
+    name_match = const.TRANSFER_CONFIG_FROM_RUN_NAME_RE.match(name)
+    if not name_match:
+        raise ValueError(
+            f'Transfer run name <{name}> '
+            f'does not match rule in <{const.TRANSFER_CONFIG_FROM_RUN_NAME_RE}>'
+        )
+    # logic
+    project_id, _ = _project_location_from_transfer_config_name(name_match.group(1))
+    request = bigquery_datatransfer.GetTransferRunRequest(name=name)
+    client = _data_transfer_client(project_id)
+    try:
+        result = client.get_transfer_run(request=request)
+    except Exception as err:  # pylint: disable=broad-except
+        raise RuntimeError(f'Could not retrieve transfer run {name}. Error: {err}') from err
     return result
 
 
@@ -725,7 +1309,7 @@ def _create_transfer_config_request(
     *,
     source_table: _SimpleTableSpec,
     target_table: _SimpleTableSpec,
-    transfer_config_display_name_prefix: Optional[str] = None,
+    transfer_config_display_name: str,
 ) -> bigquery_datatransfer.CreateTransferConfigRequest:
     # pylint: disable=line-too-long
     """
@@ -747,10 +1331,8 @@ def _create_transfer_config_request(
     .. documentation: https://cloud.google.com/python/docs/reference/bigquerydatatransfer/latest/google.cloud.bigquery_datatransfer_v1.types.CreateTransferConfigRequest
     """
     # pylint: enable=line-too-long
-    if transfer_config_display_name_prefix is None:
-        transfer_config_display_name_prefix = const.TRANSFER_CONFIG_DISPLAY_NAME_PREFIX
     transfer_config = _transfer_config(
-        transfer_config_display_name=f'{transfer_config_display_name_prefix}{target_table}',
+        transfer_config_display_name=transfer_config_display_name,
         source_project_id=source_table.project_id,
         source_dataset_id=source_table.dataset_id,
         target_dataset_id=target_table.dataset_id,
@@ -899,14 +1481,8 @@ def remove_transfer_config(name: str) -> None:
     _LOGGER.debug('Removing transfer config <%s>', name)
     # validated input
     name = _stripped_str_arg('name', name)
-    name_match = const.TRANSFER_CONFIG_RESOURCE_NAME_RE.match(name)
-    if not name_match:
-        raise ValueError(
-            f'Transfer config name <{name}> '
-            f'does not match rule in <{const.TRANSFER_CONFIG_RESOURCE_NAME_RE}>'
-        )
+    project_id, _ = _project_location_from_transfer_config_name(name)
     # logic
-    project_id = name_match.group(1)
     request = bigquery_datatransfer.DeleteTransferConfigRequest(name=name)
     client = _data_transfer_client(project_id)
     try:
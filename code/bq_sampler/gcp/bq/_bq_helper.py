@@ -7,8 +7,12 @@ Reads an object from `Cloud Big Query`_ using `Python client`_.
 .. _Python client: https://googleapis.dev/python/bigquery/latest/index.html
 """
 # pylint: enable=line-too-long
+from concurrent import futures
+import contextlib
+from datetime import datetime
 import re
-from typing import Callable, Dict, Generator, Optional, Sequence
+import threading
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Sequence
 
 import cachetools
 
@@ -21,6 +25,8 @@ _LOGGER = logger.get(__name__)
 
 _ROW_COUNT_FOR_VIEW_QUERY_TMPL: str = 'SELECT COUNT(*) FROM `%s`'
 
+_JOB_STATS: threading.local = threading.local()
+
 
 @cachetools.cached(cache=cachetools.LRUCache(maxsize=100_000))
 def row_count(*, table_fqn_id: str) -> int:
@@ -44,6 +50,22 @@ def row_count(*, table_fqn_id: str) -> int:
     return result
 
 
+@cachetools.cached(cache=cachetools.LRUCache(maxsize=100_000))
+def num_bytes(*, table_fqn_id: str) -> int:
+    """
+    Table size (in bytes) for the argument, zero for views.
+
+    **NOTE**: This call is cached, for the same reason as :py:func:`row_count`.
+
+    :param table_fqn_id: in the format `<PROJECT_ID>.<DATASET_ID>.<TABLE_ID>[@<LOCATION>]`.
+    :return:
+    """
+    _LOGGER.debug('Reading table size in bytes from <%s>', table_fqn_id)
+    result = _bq_base.table(table_fqn_id=table_fqn_id).num_bytes or 0
+    _LOGGER.debug('Table <%s> has %d bytes', table_fqn_id, result)
+    return result
+
+
 def _row_count_by_count(table: bigquery.Table) -> int:
     _LOGGER.info('Computing num of rows for table <%s> using SQL', table.full_table_id)
     query_result: bigquery.table.RowIterator = query_job_result(
@@ -61,6 +83,7 @@ def query_job_result(
     job_config: Optional[bigquery.QueryJobConfig] = None,
     project_id: Optional[str] = None,
     location: Optional[str] = None,
+    destination_table_fqn_id: Optional[str] = None,
 ) -> bigquery.table.RowIterator:
     """
     Forces the py:class:`bigquery.job.query.QueryJob` to get the results
@@ -70,13 +93,18 @@ def query_job_result(
     :param job_config:
     :param project_id:
     :param location:
+    :param destination_table_fqn_id: see :py:func:`_bq_base.query_job`.
     :return:
     """
     _LOGGER.debug(
         'Issuing query job results for query <%s> in project <%s>@<%s>', query, project_id, location
     )
     job = _bq_base.query_job(
-        query=query, job_config=job_config, project_id=project_id, location=location
+        query=query,
+        job_config=job_config,
+        project_id=project_id,
+        location=location,
+        destination_table_fqn_id=destination_table_fqn_id,
     )
     try:
         result = job.result()
@@ -94,10 +122,66 @@ def query_job_result(
         job.total_bytes_billed,
         job.slot_millis,
     )
+    stats = getattr(_JOB_STATS, 'value', None)
+    if stats is not None:
+        stats.add(job)
     _LOGGER.debug('Query Job <%s> results: <%s>', job, result)
     return result
 
 
+class JobStats:
+    """
+    Accumulated stats of query jobs, see :py:func:`job_stats`.
+    """
+
+    def __init__(self):
+        self.total_bytes_billed = 0
+        self.slot_ms = 0
+
+    def add(self, job: bigquery.job.query.QueryJob) -> None:
+        """
+        Adds the stats from `job`.
+
+        :param job:
+        :return:
+        """
+        self.total_bytes_billed += job.total_bytes_billed or 0
+        self.slot_ms += job.slot_millis or 0
+
+    def merge(self, other: 'JobStats') -> None:
+        """
+        Adds the stats accumulated in `other`.
+
+        :param other:
+        :return:
+        """
+        self.total_bytes_billed += other.total_bytes_billed
+        self.slot_ms += other.slot_ms
+
+
+@contextlib.contextmanager
+def job_stats() -> Generator[JobStats, None, None]:
+    """
+    Accumulates the stats of the query jobs, see :py:func:`query_job_result`,
+        issued by the current thread within the `with` block, e.g.::
+        with job_stats() as stats:
+            query_job_result(query='SELECT 1')
+        print(stats.total_bytes_billed)
+
+    :return:
+    """
+    previous = getattr(_JOB_STATS, 'value', None)
+    result = JobStats()
+    _JOB_STATS.value = result
+    try:
+        yield result
+    finally:
+        _JOB_STATS.value = previous
+        if previous is not None:
+            # nested blocks are accounted for in the outer ones too
+            previous.merge(result)
+
+
 def _query_from_job_to_log_str(query_job_: bigquery.job.query.QueryJob) -> str:
     """
     Two reasons for this:
@@ -113,23 +197,92 @@ def _query_from_job_to_log_str(query_job_: bigquery.job.query.QueryJob) -> str:
     return f'{query_str} -> {query_param_str}'
 
 
-def drop_all_tables_by_labels(*, project_id: str, labels: Optional[Dict[str, str]] = None) -> None:
+def clean_up_dataset_by_labels(  # pylint: disable=too-many-arguments
+    *,
+    project_id: str,
+    dataset_id: str,
+    labels: Optional[Dict[str, str]] = None,
+    created_before: Optional[datetime] = None,
+    keep_table_ids: Optional[Iterable[str]] = None,
+    max_workers: Optional[int] = None,
+) -> None:
     """
-    Will list all tables and remove all that matches the label criteria.
+    Drops the tables in a single dataset that match the label criteria.
+    The dataset itself is removed if all its tables match the label criteria,
+        or if it is empty, and it holds no models or routines.
+    Otherwise, only the matching tables are dropped, one by one.
+    If `created_before` is given, only tables and datasets created before it are removed,
+        leaving alone anything created after the clean up has been issued.
+    If `keep_table_ids` is given, the dataset is never removed, even if empty,
+        only its matching tables not in `keep_table_ids` are dropped.
 
     :param project_id:
+    :param dataset_id:
     :param labels:
+    :param created_before:
+    :param keep_table_ids:
+    :param max_workers: if :py:obj:`None`
+      uses :py:data:`const.BQ_CLEANUP_DEFAULT_MAX_WORKERS`.
     :return:
     """
     # validate input
-    _LOGGER.debug('Dropping all tables in project <%s> with labels <%s>', project_id, labels)
+    _LOGGER.debug(
+        'Cleaning up dataset <%s> in project <%s> with labels <%s> created before <%s>',
+        dataset_id,
+        project_id,
+        labels,
+        created_before,
+    )
     labels = _validate_table_labels(labels)
+    max_workers = _bq_base.validate_max_workers(max_workers)
     # logic
-    filter_fn = _has_table_labels_fn(labels)
-    _drop_all_tables_in_iter(
-        _bq_base.list_all_tables_with_filter(project_id=project_id, filter_fn=filter_fn)
+    keep_table_ids = set(keep_table_ids or [])
+    has_labels_fn = _has_table_labels_fn(labels)
+
+    def filter_fn(table_list_item: bigquery.table.TableListItem) -> bool:
+        return (
+            table_list_item.table_id not in keep_table_ids
+            and has_labels_fn(table_list_item)
+            and _is_created_before(table_list_item.created, created_before)
+        )
+
+    table_fqn_id_lst, total_tables = _bq_base.list_all_tables_in_dataset_with_filter(
+        project_id=project_id, dataset_id=dataset_id, filter_fn=filter_fn
     )
-    _LOGGER.debug('Dropped all tables in project <%s> with labels <%s>', project_id, labels)
+    if keep_table_ids:
+        if table_fqn_id_lst:
+            _drop_all_tables_in_iter(table_fqn_id_lst, max_workers)
+    elif total_tables == 0:
+        dataset = _bq_base.get_dataset(project_id, dataset_id)
+        if _is_created_before(dataset.created, created_before):
+            _bq_base.remove_dataset(
+                project_id=project_id,
+                dataset_id=dataset_id,
+                delete_contents=False,
+                not_found_ok=True,
+            )
+    elif len(table_fqn_id_lst) == total_tables and not _bq_base.has_models_or_routines(
+        project_id, dataset_id
+    ):
+        _bq_base.remove_dataset(
+            project_id=project_id,
+            dataset_id=dataset_id,
+            delete_contents=True,
+            not_found_ok=True,
+        )
+    elif table_fqn_id_lst:
+        _drop_all_tables_in_iter(table_fqn_id_lst, max_workers)
+    _LOGGER.debug(
+        'Cleaned up dataset <%s> in project <%s> with labels <%s> created before <%s>',
+        dataset_id,
+        project_id,
+        labels,
+        created_before,
+    )
+
+
+def _is_created_before(created: Optional[datetime], created_before: Optional[datetime]) -> bool:
+    return created_before is None or (created is not None and created < created_before)
 
 
 def _validate_table_labels(labels: Optional[Dict[str, str]] = None) -> Dict[str, str]:
@@ -150,38 +303,37 @@ def _has_table_labels_fn(labels: Dict[str, str]) -> Callable[[bigquery.table.Tab
     return result_fn
 
 
-def _drop_all_tables_in_iter(tables_to_drop_gen: Generator[str, None, None]) -> None:
-    error_msgs = []
-    last_error = None
-    for table_fqn_id in tables_to_drop_gen:
-        try:
-            _bq_base.drop_table(table_fqn_id=table_fqn_id)
-        except Exception as err:  # pylint: disable=broad-except
-            error_msgs.append(f'Cloud not drop table <{table_fqn_id}>. Error: {err}')
-            last_error = err
-    if last_error is not None:
-        raise RuntimeError('+++'.join(error_msgs)) from last_error
+def _drop_all_tables_in_iter(
+    tables_to_drop_gen: Generator[str, None, None], max_workers: Optional[int] = 1
+) -> None:
+    _run_concurrently_and_raise(
+        lambda table_fqn_id: _bq_base.drop_table(table_fqn_id=table_fqn_id),
+        tables_to_drop_gen,
+        max_workers,
+        'Cloud not drop table',
+    )
 
 
-def remove_all_empty_datasets_by_labels(
-    *, project_id: str, labels: Optional[Dict[str, str]] = None
+def _run_concurrently_and_raise(
+    fn: Callable[[Any], None], args: Iterable[Any], max_workers: int, error_msg_prefix: str
 ) -> None:
     """
-    Will list all datasets and remove all that matches the label criteria and are empty.
-
-    :param project_id:
-    :param labels:
-    :return:
+    Calls `fn` for each item in `args` using a bounded thread pool.
+    All calls are executed, even if some fail,
+        and the errors are aggregated into a single :py:class:`RuntimeError`.
     """
-    # validate input
-    _LOGGER.debug(
-        'Dropping all datasets empty in project <%s> with labels <%s>', project_id, labels
-    )
-    labels = _validate_table_labels(labels)
-    # logic
-    filter_fn = _has_table_labels_fn(labels)
-    _bq_base.remove_empty_datasets(project_id=project_id, filter_fn=filter_fn)
-    _LOGGER.debug('Dropped all datasets empty in project <%s> with labels <%s>', project_id, labels)
+    error_msgs: List[str] = []
+    last_error = None
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fn_futures = {executor.submit(fn, arg): arg for arg in args}
+        for fn_future in futures.as_completed(fn_futures):
+            try:
+                fn_future.result()
+            except Exception as err:  # pylint: disable=broad-except
+                error_msgs.append(f'{error_msg_prefix} <{fn_futures.get(fn_future)}>. Error: {err}')
+                last_error = err
+    if last_error is not None:
+        raise RuntimeError('+++'.join(error_msgs)) from last_error
 
 
 def cross_location_copy(
@@ -190,6 +342,7 @@ def cross_location_copy(
     target_table_fqn_id: str,
     notification_pubsub_topic: Optional[str] = None,
     transfer_config_display_name_prefix: Optional[str] = None,
+    reuse_transfer_config: Optional[bool] = False,
 ) -> Sequence[bigquery_datatransfer.TransferRun]:
     """
     Forces the py:class:`bigquery.job.query.QueryJob` to get the results
@@ -200,6 +353,7 @@ def cross_location_copy(
     :param notification_pubsub_topic:
     :param transfer_config_display_name_prefix: if :py:obj:`None`
       uses :py:data:`const.TRANSFER_CONFIG_DISPLAY_NAME_PREFIX`.
+    :param reuse_transfer_config: see :py:func:`_bq_base.dataset_transfer_config_run`.
     :return:
     """
     _LOGGER.debug(
@@ -214,6 +368,7 @@ def cross_location_copy(
             target_table_fqn_id=target_table_fqn_id,
             notification_pubsub_topic=notification_pubsub_topic,
             transfer_config_display_name_prefix=transfer_config_display_name_prefix,
+            reuse_transfer_config=reuse_transfer_config,
         )
     except Exception as err:  # pylint: disable=broad-except
         raise RuntimeError(
@@ -225,24 +380,6 @@ def cross_location_copy(
     return result
 
 
-def remove_all_transfer_config_by_display_name_prefix(
-    *, project_id: str, location: str, prefix: Optional[str] = None
-) -> None:
-    """
-    Gets all :py:class:`bigquery_datatransfer.TransferConfig` in `project_id`
-      and whose display name starts with `prefix` and remove them.
-
-    :param project_id:
-    :param location:
-    :param prefix: if :py:obj:`None` uses :py:data:`const.TRANSFER_CONFIG_DISPLAY_NAME_PREFIX`.
-    :return:
-    """
-    for t_config in _bq_base.list_transfer_config_by_display_name_prefix(
-        project_id=project_id, location=location, prefix=prefix
-    ):
-        _bq_base.remove_transfer_config(t_config.name)
-
-
 def bigquery_valid_string(
     value: str,
 ) -> str:
@@ -9,11 +9,11 @@ Reads an object from `Cloud Storage`_.
 import logging
 
 import re
-from typing import Any, Callable, Dict, Generator, Optional, Tuple
+from typing import Any, Callable, Dict, Generator, Optional, Tuple, Union
 
 import cachetools
 
-from google.api_core import page_iterator
+from google.api_core import exceptions, page_iterator
 from google.cloud import storage
 
 from bq_sampler import const, logger
@@ -32,6 +32,14 @@ class CloudStorageListError(Exception):
     """To code all GCS list errors"""
 
 
+class CloudStorageUploadError(Exception):
+    """To code all GCS upload errors"""
+
+
+class CloudStorageDeleteError(Exception):
+    """To code all GCS delete errors"""
+
+
 def bucket_path_from_uri(value: str) -> Tuple[str, str]:
     """
     Converts a URI string into its bucket and path components.
@@ -85,6 +93,156 @@ def read_object(bucket_name: str, path: str, warn_read_failure: Optional[bool] =
     return result
 
 
+def read_object_and_generation(bucket_name: str, path: str) -> Tuple[Optional[bytes], int]:
+    """
+    Same as :py:func:`read_object` but also returns the object generation,
+        to be given to :py:func:`write_object` as `if_generation_match`,
+        so the object is only overwritten if it did not change since it was read.
+
+    :param bucket_name: Bucket name
+    :param path: Path to the object to read from (**WITHOUT** leading `/`)
+    :return: the content and generation, or :py:obj:`None` and `0` if it does not exist.
+    """
+    # cleaning leading '/' from path
+    path = path.lstrip('/')
+    # removing '/' affixes from bucket name
+    bucket_name = bucket_name.strip('/')
+    # logic
+    gcs_uri = f'gs://{bucket_name}/{path}'
+    _LOGGER.debug('Reading <%s> with its generation', gcs_uri)
+    try:
+        blob = _bucket(bucket_name).get_blob(path)
+        # if it changes before the download, writing with this generation fails, as it should
+        result = (blob.download_as_bytes(), blob.generation) if blob is not None else (None, 0)
+    except Exception as err:
+        raise CloudStorageDownloadError(
+            f'Could not download content from <{gcs_uri}>. Error: {err}'
+        ) from err
+    return result
+
+
+def write_object(
+    bucket_name: str,
+    path: str,
+    content: Optional[Union[str, bytes]] = '',
+    if_absent: Optional[bool] = False,
+    if_generation_match: Optional[int] = None,
+) -> bool:
+    # pylint: disable=line-too-long
+    """
+    Writes the content into a blob.
+    If `if_absent` is :py:obj:`True` the object is only created if it does not exist,
+        using the `generation precondition`_ `if_generation_match=0`,
+        i.e., among concurrent writers exactly one succeeds.
+    If `if_generation_match` is given, the object is only written if it is still
+        at that generation, see :py:func:`read_object_and_generation`.
+
+    :param bucket_name: Bucket name
+    :param path: Path to the object to write to (**WITHOUT** leading `/`)
+    :param content:
+    :param if_absent:
+    :param if_generation_match:
+    :return: :py:obj:`False` if the precondition failed,
+        i.e., `if_absent` and the object already exists,
+        or it is not at `if_generation_match` anymore, :py:obj:`True` otherwise.
+
+    .. _generation precondition: https://cloud.google.com/storage/docs/request-preconditions#special-case
+    """
+    # pylint: enable=line-too-long
+    # cleaning leading '/' from path
+    path = path.lstrip('/')
+    # removing '/' affixes from bucket name
+    bucket_name = bucket_name.strip('/')
+    # logic
+    gcs_uri = f'gs://{bucket_name}/{path}'
+    _LOGGER.debug('Writing <%s> with if absent <%s>', gcs_uri, if_absent)
+    result = True
+    try:
+        blob = _client().bucket(bucket_name).blob(path)
+        blob.upload_from_string(
+            content, if_generation_match=0 if if_absent else if_generation_match
+        )
+        _LOGGER.debug('Wrote <%s>', gcs_uri)
+    except exceptions.PreconditionFailed:
+        result = False
+        _LOGGER.debug('Object <%s> changed or already exists, not overwriting it', gcs_uri)
+    except Exception as err:
+        raise CloudStorageUploadError(
+            f'Could not upload content to <{gcs_uri}>. Error: {err}'
+        ) from err
+    return result
+
+
+def delete_objects(bucket_name: str, prefix: str) -> int:
+    """
+    Deletes all objects whose path starts with `prefix`.
+
+    :param bucket_name: Bucket name
+    :param prefix: Objects path prefix (**WITHOUT** leading `/`)
+    :return: amount of objects deleted
+    """
+    prefix = prefix.lstrip('/')
+    bucket_name = bucket_name.strip('/')
+    gcs_uri = f'gs://{bucket_name}/{prefix}'
+    _LOGGER.debug('Deleting all objects in <%s>', gcs_uri)
+    result = 0
+    try:
+        for blob in _client().list_blobs(bucket_name, prefix=prefix):
+            blob.delete()
+            result += 1
+    except Exception as err:
+        raise CloudStorageDeleteError(
+            f'Could not delete objects in <{gcs_uri}>. Deleted so far: {result}. Error: {err}'
+        ) from err
+    _LOGGER.debug('Deleted <%s> objects in <%s>', result, gcs_uri)
+    return result
+
+
+def delete_object(bucket_name: str, path: str) -> bool:
+    """
+    Deletes the object, if it exists.
+
+    :param bucket_name: Bucket name
+    :param path: Path to the object to delete (**WITHOUT** leading `/`)
+    :return: if the object existed.
+    """
+    path = path.lstrip('/')
+    bucket_name = bucket_name.strip('/')
+    gcs_uri = f'gs://{bucket_name}/{path}'
+    _LOGGER.debug('Deleting <%s>', gcs_uri)
+    result = True
+    try:
+        _client().bucket(bucket_name).blob(path).delete()
+    except exceptions.NotFound:
+        result = False
+    except Exception as err:
+        raise CloudStorageDeleteError(f'Could not delete <{gcs_uri}>. Error: {err}') from err
+    return result
+
+
+def delete_objects_before(bucket_name: str, prefix: str, timestamp: int) -> int:
+    """
+    Deletes all objects in the sub-prefixes of `prefix` named after a UTC epoch before `timestamp`,
+        i.e., objects like `<prefix>/<TIMESTAMP>/...`.
+    Sub-prefixes not named after a UTC epoch are left untouched.
+
+    :param bucket_name: Bucket name
+    :param prefix: Parent prefix (**WITHOUT** leading or trailing `/`)
+    :param timestamp: UTC epoch in seconds.
+    :return: amount of objects deleted
+    """
+    result = 0
+    prefix = prefix + '/'
+
+    def is_before_fn(value: str) -> bool:
+        value_timestamp = value[len(prefix) :].strip('/')
+        return value_timestamp.isdigit() and int(value_timestamp) < timestamp
+
+    for before_prefix in list(list_prefixes(bucket_name, prefix=prefix, filter_fn=is_before_fn)):
+        result += delete_objects(bucket_name, before_prefix)
+    return result
+
+
 @cachetools.cached(cache=cachetools.LRUCache(maxsize=1))
 def _client() -> storage.Client:
     return storage.Client()
@@ -98,6 +256,7 @@ def list_prefixes(
     bucket_name: str,
     prefix: Optional[str] = None,
     filter_fn: Optional[Callable[[str], bool]] = None,
+    recursive: Optional[bool] = True,
 ) -> Generator[str, None, None]:
     # pylint: disable=line-too-long
     """
@@ -132,9 +291,17 @@ def list_prefixes(
             "folder_g/",
         ]
 
+        result = list_prefixes("my_bucket", recursive=False)
+        result = [
+            "folder_a/",
+            "folder_c/",
+            "folder_g/",
+        ]
+
     :param bucket_name:
     :param prefix: if given, list from this value. Default: py:obj:`None`.
     :param filter_fn:
+    :param recursive: if :py:obj:`False` only the prefixes right under `prefix` are listed.
     :return:
     """
     # pylint: enable=line-too-long
@@ -145,7 +312,7 @@ def list_prefixes(
     if filter_fn is None:
         filter_fn = _accept_all_list_objects
     # logic
-    for item in _list_prefixes_ok(bucket_name, prefix, filter_fn):
+    for item in _list_prefixes_ok(bucket_name, prefix, filter_fn, recursive):
         yield item
 
 
@@ -166,6 +333,7 @@ def _list_prefixes_ok(
     bucket_name: str,
     prefix: Optional[str] = None,
     filter_fn: Optional[Callable[[str], bool]] = None,
+    recursive: Optional[bool] = True,
 ) -> Generator[str, None, None]:
     # logic
     for item in _get_gcs_prefixes_http_iterator(bucket_name, prefix):
@@ -179,8 +347,9 @@ def _list_prefixes_ok(
                 f'Stopping list now. Error: <{err}>'
             ) from err
         # recursion
-        for sub_item in _list_prefixes_ok(bucket_name, item, filter_fn):
-            yield sub_item
+        if recursive:
+            for sub_item in _list_prefixes_ok(bucket_name, item, filter_fn):
+                yield sub_item
 
 
 def _get_gcs_prefixes_http_iterator(bucket_name: str, prefix: str) -> page_iterator.HTTPIterator:
@@ -215,6 +384,8 @@ def list_objects(
     bucket_name: str,
     filter_fn: Optional[Callable[[str], bool]] = None,
     prefix: Optional[str] = None,
+    start_offset: Optional[str] = None,
+    end_offset: Optional[str] = None,
 ) -> Generator[str, None, None]:
     # pylint: disable=line-too-long
     """
@@ -254,13 +425,15 @@ def list_objects(
     :param bucket_name:
     :param filter_fn:
     :param prefix: limits the search by prefix
+    :param start_offset: only objects named lexicographically equal or after it.
+    :param end_offset: only objects named lexicographically before it.
     :return:
     """
     # pylint: enable=line-too-long
     # if no filter, accept all
     if filter_fn is None:
         filter_fn = _accept_all_list_objects
-    for obj_path in _list_blob_names(bucket_name, prefix):
+    for obj_path in _list_blob_names(bucket_name, prefix, start_offset, end_offset):
         try:
             if filter_fn(obj_path):
                 yield obj_path
@@ -271,6 +444,13 @@ def list_objects(
             ) from err
 
 
-def _list_blob_names(bucket_name: str, prefix: Optional[str] = None) -> Generator[str, None, None]:
-    for blob in _client().list_blobs(bucket_name, prefix=prefix):
+def _list_blob_names(
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    start_offset: Optional[str] = None,
+    end_offset: Optional[str] = None,
+) -> Generator[str, None, None]:
+    for blob in _client().list_blobs(
+        bucket_name, prefix=prefix, start_offset=start_offset, end_offset=end_offset
+    ):
         yield blob.name
@@ -3,11 +3,18 @@
 Manages PubSub boilerplate. How to parse the data and publish it.
 * https://cloud.google.com/pubsub/docs/push
 * https://cloud.google.com/pubsub/docs/publisher
+
+The data is either plain JSON or, if published with `compact`, in the compact encoding::
+    <COMPACT_ENCODING_MAGIC><VERSION (1 byte)><ENCODED JSON>
+
+Where version `1` is the JSON, without whitespace, compressed with `zlib`.
+Both are parsed by :py:func:`parse_json_data`.
 """
 import base64
 from concurrent import futures
 import json
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
+import zlib
 
 import cachetools
 
@@ -18,17 +25,28 @@ from bq_sampler import logger
 
 _LOGGER = logger.get(__name__)
 
+COMPACT_ENCODING_MAGIC: bytes = b'\x00bqs'
+"""
+Never the start of a JSON document, i.e., tells the compact encoding apart from plain JSON.
+"""
+COMPACT_ENCODING_VERSION: int = 1
+
 
 def parse_json_data(value: Union[str, bytes]) -> Any:
     """
-    Parses a Pub/Sub base64 JSON coded :py:class:`str`.
+    Parses a Pub/Sub base64 JSON coded :py:class:`str`,
+        either plain or in the compact encoding, see :py:func:`decode_data`.
 
     :param value: the raw payload from Pub/Sub.
     :return:
     """
     # parse PubSub payload
+    if not isinstance(value, (bytes, str)):
+        raise TypeError(
+            f'Event data is not a {str.__name__} or {bytes.__name__}. Got: <{value}>({type(value)})'
+        )
     try:
-        result = json.loads(parse_str_data(value))
+        result = decode_data(base64.b64decode(value))
     except Exception as err:
         raise RuntimeError(
             f'Could not parse PubSub JSON data. Raw data: <{value}>. Error: {err}'
@@ -36,6 +54,24 @@ def parse_json_data(value: Union[str, bytes]) -> Any:
     return result
 
 
+def decode_data(value: bytes) -> Any:
+    """
+    Decodes the data as published, i.e., before Pub/Sub base64 encodes it.
+
+    :param value: either plain JSON or in the compact encoding.
+    :return:
+    """
+    if not value.startswith(COMPACT_ENCODING_MAGIC):
+        return json.loads(value)
+    version = value[len(COMPACT_ENCODING_MAGIC)]
+    if version != COMPACT_ENCODING_VERSION:
+        raise ValueError(
+            f'Compact encoding version <{version}> is not supported. '
+            f'Supported: <{COMPACT_ENCODING_VERSION}>'
+        )
+    return json.loads(zlib.decompress(value[len(COMPACT_ENCODING_MAGIC) + 1 :]))
+
+
 def parse_str_data(value: Union[str, bytes]) -> str:
     """
     Parses a Pub/Sub base64 coded :py:class:`str`.
@@ -57,14 +93,160 @@ def parse_str_data(value: Union[str, bytes]) -> str:
     return result
 
 
-def publish(value: Dict[str, Any], topic_path: str) -> None:
+class PubSubBatchPublishError(Exception):
+    """
+    To code all Pub/Sub batch publish errors.
+    The values that could not be published, and their errors, are in `failed`.
+    """
+
+    def __init__(self, msg: str, failed: List[Tuple[Dict[str, Any], Exception]]):
+        super().__init__(msg)
+        self.failed = failed
+
+
+class BatchPublisher:
+    """
+    Publishes into Pub/Sub topics without waiting for each message,
+        the client batches the messages according to the given settings.
+    All publications are waited for, once, in :py:meth:`wait`, e.g.::
+        with BatchPublisher(max_messages=1000) as publisher:
+            for value in values:
+                publisher.publish(value, topic_path)
+    """
+
+    def __init__(
+        self,
+        *,
+        max_messages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_latency_sec: Optional[float] = None,
+        enable_message_ordering: Optional[bool] = False,
+        compact: Optional[bool] = False,
+    ):
+        self._batch_settings = _batch_settings(
+            max_messages=max_messages, max_bytes=max_bytes, max_latency_sec=max_latency_sec
+        )
+        self._enable_message_ordering = bool(enable_message_ordering)
+        self._compact = bool(compact)
+        self._published: List[Tuple[Dict[str, Any], futures.Future, str, Optional[str]]] = []
+
+    def __enter__(self) -> 'BatchPublisher':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        if exc_type is None:
+            self.wait()
+        else:
+            # do not hide the original error, but the queued messages still need to go out
+            try:
+                self.wait()
+            except PubSubBatchPublishError as err:
+                _LOGGER.error('%s', err)
+        return False
+
+    @property
+    def _client(self) -> pubsub_v1.PublisherClient:
+        # only created once there is something to publish
+        return _client(self._batch_settings, self._enable_message_ordering)
+
+    def publish(
+        self,
+        value: Dict[str, Any],
+        topic_path: str,
+        attributes: Optional[Dict[str, str]] = None,
+        ordering_key: Optional[str] = None,
+    ) -> None:
+        """
+        Queues the argument, as a JSON string (or in the compact encoding if `compact`),
+            to be published to a Pub/Sub topic.
+
+        :param value:
+        :param topic_path:
+        :param attributes: message attributes, see :py:func:`publish`.
+        :param ordering_key: requires `enable_message_ordering`,
+            messages with the same key are delivered in order, one at a time.
+        :return:
+        """
+        data = _encode_data(value, topic_path, self._compact)
+        attributes = _validate_attributes(attributes)
+        _LOGGER.debug(
+            'Queuing data <%s> with attributes <%s> and ordering key <%s> into topic <%s>',
+            value,
+            attributes,
+            ordering_key,
+            topic_path,
+        )
+        kwargs = dict(ordering_key=ordering_key) if ordering_key else {}
+        self._published.append(
+            (
+                value,
+                self._client.publish(topic_path, data, **kwargs, **attributes),
+                topic_path,
+                ordering_key,
+            )
+        )
+
+    def wait(self) -> int:
+        """
+        Waits for all queued publications.
+
+        :return: how many values were published.
+        :raises PubSubBatchPublishError: if any value could not be published.
+        """
+        published, self._published = self._published, []
+        futures.wait([item[1] for item in published], return_when=futures.ALL_COMPLETED)
+        failed = []
+        for value, future, topic_path, ordering_key in published:
+            error = future.exception()
+            if error is not None:
+                failed.append((value, error))
+                if ordering_key:
+                    # otherwise the client refuses any further message with the same key
+                    self._client.resume_publish(topic_path, ordering_key)
+        _LOGGER.debug(
+            'Published <%s> out of <%s> values', len(published) - len(failed), len(published)
+        )
+        if failed:
+            raise PubSubBatchPublishError(
+                f'Could not publish <{len(failed)}> out of <{len(published)}> values. '
+                f'Error(s): {[str(error) for _, error in failed]}',
+                failed,
+            )
+        return len(published)
+
+
+def publish(
+    value: Dict[str, Any],
+    topic_path: str,
+    attributes: Optional[Dict[str, str]] = None,
+    compact: Optional[bool] = False,
+) -> None:
     """
     Converts argument to a string to be published to a Pub/Sub topic.
+    The `attributes` are not part of the payload,
+        i.e., subscriptions can `filter`_ on them without parsing it.
+
+    .. _filter: https://cloud.google.com/pubsub/docs/subscription-message-filter
 
     :param value:
     :param topic_path:
+    :param attributes: message attributes, all values must be :py:class:`str`.
+    :param compact: if the compact encoding is used instead of plain JSON,
+        all subscribers must parse it with :py:func:`parse_json_data`.
     :return:
     """
+    data = _encode_data(value, topic_path, compact)
+    attributes = _validate_attributes(attributes)
+    # logic
+    _LOGGER.debug(
+        'Publishing data <%s> with attributes <%s> into topic <%s>', value, attributes, topic_path
+    )
+    publish_future = _client().publish(topic_path, data, **attributes)
+    futures.wait([publish_future], return_when=futures.ALL_COMPLETED)
+    _LOGGER.debug('Published data <%s> into topic <%s>', value, topic_path)
+
+
+def _encode_data(value: Dict[str, Any], topic_path: str, compact: Optional[bool] = False) -> bytes:
     # validate input
     if not isinstance(value, dict):
         raise TypeError(f'Value must be a {dict.__name__}. Got <{value}>({type(value)})')
@@ -72,20 +254,55 @@ def publish(value: Dict[str, Any], topic_path: str) -> None:
         raise TypeError(
             f'Topic path must be a non-empty string. Got <{topic_path}>({type(topic_path)})'
         )
-    # logic
-    _LOGGER.debug('Publishing data <%s> into topic <%s>', value, topic_path)
+    if compact:
+        json_bytes = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        return (
+            COMPACT_ENCODING_MAGIC
+            + bytes([COMPACT_ENCODING_VERSION])
+            + zlib.compress(json_bytes, zlib.Z_BEST_SPEED)
+        )
     json_str = json.dumps(value)
-    data = json_str.encode('utf-8')
-    publish_future = _client().publish(topic_path, data)
-    futures.wait([publish_future], return_when=futures.ALL_COMPLETED)
-    _LOGGER.debug('Published data <%s> into topic <%s>', value, topic_path)
+    return json_str.encode('utf-8')
+
+
+def _validate_attributes(value: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    if value is None:
+        value = {}
+    if not isinstance(value, dict) or not all(
+        isinstance(key, str) and isinstance(val, str) for key, val in value.items()
+    ):
+        raise TypeError(
+            f'Attributes must be a {dict.__name__} of {str.__name__} to {str.__name__}. '
+            f'Got <{value}>({type(value)})'
+        )
+    return value
+
+
+def _batch_settings(
+    *,
+    max_messages: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    max_latency_sec: Optional[float] = None,
+) -> types.BatchSettings:
+    # anything not given keeps the client default
+    kwargs = dict(max_messages=max_messages, max_bytes=max_bytes, max_latency=max_latency_sec)
+    return types.BatchSettings(**{key: val for key, val in kwargs.items() if val is not None})
 
 
-@cachetools.cached(cache=cachetools.LRUCache(maxsize=1))
-def _client() -> pubsub_v1.PublisherClient:
+@cachetools.cached(cache=cachetools.LRUCache(maxsize=4))
+def _client(
+    batch_settings: Optional[types.BatchSettings] = None,
+    enable_message_ordering: Optional[bool] = False,
+) -> pubsub_v1.PublisherClient:
     flow_control = types.PublishFlowControl(
         limit_exceeded_behavior=types.LimitExceededBehavior.BLOCK
     )
+    kwargs = {}
+    if batch_settings is not None:
+        kwargs['batch_settings'] = batch_settings
     return pubsub_v1.PublisherClient(
-        publisher_options=types.PublisherOptions(flow_control=flow_control)
+        publisher_options=types.PublisherOptions(
+            flow_control=flow_control, enable_message_ordering=enable_message_ordering
+        ),
+        **kwargs,
     )
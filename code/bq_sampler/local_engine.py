@@ -0,0 +1,110 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+"""
+Runs the whole command pipeline in-process, i.e., without Pub/Sub between the stages.
+Every command issued while processing, see :py:func:`process_request.set_dispatcher`,
+    goes into an in-memory queue and is processed by a thread pool.
+A sample command delivered before it is due, see :py:func:`sampler_schedule.check_due`,
+    is held back and queued again once due.
+
+**NOTE**: BigQuery transfer runs still notify their Pub/Sub topic when done,
+    i.e., cross-location samples moved by a transfer run are not landed in-process.
+"""
+from concurrent import futures
+import heapq
+import queue
+import time
+from typing import List, Optional, Tuple
+
+from bq_sampler import const, logger, process_request, sampler_schedule
+from bq_sampler.entity import command
+
+_LOGGER = logger.get(__name__)
+
+
+class LocalEngine:
+    """
+    Processes a command, and all commands it issues, until there is nothing left, e.g.::
+        engine = LocalEngine(max_workers=20)
+        engine.run(command.CommandStart(type=command.CommandType.START.value, timestamp=17))
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: Optional[int] = const.LOCAL_ENGINE_DEFAULT_MAX_WORKERS,
+        with_retry: Optional[bool] = True,
+    ):
+        self._max_workers = max_workers
+        self._with_retry = with_retry
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    def dispatch(self, value: command.CommandBase) -> None:
+        """
+        Queues `value` to be processed, see :py:func:`process_request.set_dispatcher`.
+
+        :param value:
+        :return:
+        """
+        self._queue.put(value)
+
+    def run(self, value: command.CommandBase) -> int:
+        """
+        Processes `value`, and all commands issued from it, concurrently.
+        It only returns once all of them were processed.
+
+        :param value:
+        :return: how many commands were processed.
+        :raises RuntimeError: if any command could not be processed.
+        """
+        result = 0
+        errors: List[str] = []
+        # (due timestamp, command ID, command) of the commands delivered before they were due
+        not_due: List[Tuple[float, int, command.CommandBase]] = []
+        process_request.set_dispatcher(self.dispatch)
+        try:
+            self.dispatch(value)
+            with futures.ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                pending = {}
+                while True:
+                    while not_due and not_due[0][0] <= time.time():
+                        self.dispatch(heapq.heappop(not_due)[2])
+                    # a command issues all its commands before it is done
+                    while not self._queue.empty():
+                        cmd = self._queue.get()
+                        future = executor.submit(
+                            process_request.process, cmd, with_retry=self._with_retry
+                        )
+                        pending[future] = cmd
+                    if not pending and not not_due:
+                        break
+                    timeout = max(0.0, not_due[0][0] - time.time()) if not_due else None
+                    done = set()
+                    if pending:
+                        done, _ = futures.wait(
+                            pending, timeout=timeout, return_when=futures.FIRST_COMPLETED
+                        )
+                    else:
+                        # nothing in flight, only commands not due yet
+                        time.sleep(timeout)
+                    for future in done:
+                        cmd = pending.pop(future)
+                        try:
+                            future.result()
+                        except sampler_schedule.SampleNotDueError:
+                            wait_sec = sampler_schedule.seconds_until_due(cmd)
+                            heapq.heappush(not_due, (time.time() + wait_sec, id(cmd), cmd))
+                            continue
+                        except Exception as err:  # pylint: disable=broad-except
+                            errors.append(str(err))
+                        result += 1
+        finally:
+            process_request.set_dispatcher(None)
+        _LOGGER.info(
+            'Processed <%s> commands, out of which <%s> failed, from <%s>',
+            result,
+            len(errors),
+            value,
+        )
+        if errors:
+            raise RuntimeError(f'Failed command {value} with error(s): {errors}')
+        return result
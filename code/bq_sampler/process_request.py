@@ -1,17 +1,30 @@
 # vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=too-many-lines
 """
 Processes a request coming from Cloud Function.
 """
+from concurrent import futures
+from datetime import datetime, timezone
 import logging
 import os
 import time
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import cachetools
 import tenacity
 
-from bq_sampler.entity import command, table, policy
-from bq_sampler import const, logger, sampler_bucket, sampler_query
+from bq_sampler.entity import command, table, policy, transfer
+from bq_sampler import (
+    const,
+    logger,
+    sampler_bucket,
+    sampler_idempotency,
+    sampler_ledger,
+    sampler_query,
+    sampler_schedule,
+    sampler_staging,
+    sampler_transfer,
+)
 from bq_sampler.gcp import bq, gcs, pubsub
 
 _LOGGER = logger.get(__name__)
@@ -25,18 +38,65 @@ _GCS_POLICY_BUCKET_ENV_VAR: str = 'POLICY_BUCKET_NAME'  # my-policy-bucket
 _GCS_DEFAULT_POLICY_OBJECT_PATH_ENV_VAR: str = 'DEFAULT_POLICY_OBJECT_PATH'  # default_policy.json
 _DEFAULT_GCS_DEFAULT_POLICY_OBJECT_PATH: str = 'default_policy.json'
 _GCS_REQUEST_BUCKET_ENV_VAR: str = 'REQUEST_BUCKET_NAME'  # my-request-bucket
+_GCS_STATE_BUCKET_ENV_VAR: str = 'STATE_BUCKET_NAME'  # my-state-bucket
+_GCS_EXTRACT_BUCKET_ENV_VAR: str = 'EXTRACT_BUCKET_NAME'  # my-multi-region-extract-bucket
 _PUBSUB_CMD_TOPIC_ENV_VAR: str = 'CMD_TOPIC_NAME'  # projects/py-project-12345/topics/cmd-topic-name
 _PUBSUB_ERROR_TOPIC_ENV_VAR: str = (
     'ERROR_TOPIC_NAME'  # projects/py-project-12345/topics/error-topic-name
 )
 _SAMPLING_LOCK_OBJECT_PATH_ENV_VAR: str = 'SAMPLING_LOCK_OBJECT_PATH'  # block-sampling
 _DEFAULT_SAMPLING_LOCK_OBJECT_PATH: str = 'block-sampling'
+_CLEANUP_MAX_WORKERS_ENV_VAR: str = 'CLEANUP_MAX_WORKERS'  # 10
+_SAMPLE_TABLE_EXPIRATION_MS_ENV_VAR: str = 'SAMPLE_TABLE_EXPIRATION_MS'  # 604800000 (7 days)
+_STAGING_TABLE_EXPIRATION_MS_ENV_VAR: str = 'STAGING_TABLE_EXPIRATION_MS'  # 86400000 (1 day)
+_TRANSFER_RUN_TIMEOUT_SEC_ENV_VAR: str = 'TRANSFER_RUN_TIMEOUT_SEC'  # 3600 (1 hour)
+_TRANSFER_RUN_MAX_ATTEMPTS_ENV_VAR: str = 'TRANSFER_RUN_MAX_ATTEMPTS'  # 3
+_PERSISTENT_TRANSFER_CONFIGS_ENV_VAR: str = 'PERSISTENT_TRANSFER_CONFIGS'  # true
+_PUBSUB_BATCH_MAX_MESSAGES_ENV_VAR: str = 'PUBSUB_BATCH_MAX_MESSAGES'  # 500
+_PUBSUB_BATCH_MAX_BYTES_ENV_VAR: str = 'PUBSUB_BATCH_MAX_BYTES'  # 1000000
+_PUBSUB_BATCH_MAX_LATENCY_SEC_ENV_VAR: str = 'PUBSUB_BATCH_MAX_LATENCY_SEC'  # 0.05
+_PUBSUB_COMPACT_ENCODING_ENV_VAR: str = 'PUBSUB_COMPACT_ENCODING'  # true
+_COMMAND_BATCH_MAX_SIZE_ENV_VAR: str = 'COMMAND_BATCH_MAX_SIZE'  # 20
+_COMMAND_BATCH_MAX_ROWS_ENV_VAR: str = 'COMMAND_BATCH_MAX_ROWS'  # 1000000
+_COMMAND_BATCH_MAX_WORKERS_ENV_VAR: str = 'COMMAND_BATCH_MAX_WORKERS'  # 5
+_SAMPLE_START_CLAIM_TIMEOUT_SEC_ENV_VAR: str = 'SAMPLE_START_CLAIM_TIMEOUT_SEC'  # 3600 (1 hour)
+_SAMPLE_START_JOBS_PER_SEC_ENV_VAR: str = 'SAMPLE_START_JOBS_PER_SEC'  # 10
+_SAMPLE_START_MAX_IN_FLIGHT_ENV_VAR: str = 'SAMPLE_START_MAX_IN_FLIGHT'  # 50
+_SAMPLE_START_MAX_DELAY_SEC_ENV_VAR: str = 'SAMPLE_START_MAX_DELAY_SEC'  # 600 (10 minutes)
+_SAMPLE_POLICY_PREFIX_SHARD_SIZE_ENV_VAR: str = 'SAMPLE_POLICY_PREFIX_SHARD_SIZE'  # 1000
+_SAMPLE_POLICY_PREFIX_DEADLINE_SEC_ENV_VAR: str = 'SAMPLE_POLICY_PREFIX_DEADLINE_SEC'  # 480
+
+_SHEDDABLE_COMMAND_TYPES: Tuple[str] = (
+    command.CommandType.SAMPLE_POLICY_PROJECT.value,
+    command.CommandType.SAMPLE_POLICY_PREFIX.value,
+    command.CommandType.SAMPLE_START.value,
+    command.CommandType.CLEANUP_DATASET.value,
+)
+"""
+Commands dropped if their run was superseded, see :py:func:`_shed_if_superseded`.
+A superseded clean up keeps the tables planned by its own run, not the current one.
+The others either do no sampling or account for, and clean up after, sampling already done.
+"""
 
 _PUBSUB_ERROR_CMD_ENTRY: str = 'command'
 _PUBSUB_ERROR_MSG_ENTRY: str = 'error'
 
+_DISPATCHER: Optional[Callable[[command.CommandBase], None]] = None
+"""
+If set, receives all commands issued here instead of the Pub/Sub command topic,
+    see :py:func:`set_dispatcher`.
+"""
+
 
-class _GeneralConfig:  # pylint: disable=too-many-instance-attributes
+class StagedSampleTransferError(Exception):
+    """To code a staged sample that was sampled but whose transfer could not be triggered"""
+
+
+class SamplePolicyPrefixError(Exception):
+    """To code a policy prefix with tables given up on, it must not be retried as a whole"""
+
+
+class _GeneralConfig:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     def __init__(self):
         self._target_location = os.environ.get(_BQ_TARGET_LOCATION_ENV_VAR)
         self._target_project_id = os.environ.get(_BQ_TARGET_PROJECT_ID_ENV_VAR)
@@ -45,12 +105,110 @@ class _GeneralConfig:  # pylint: disable=too-many-instance-attributes
             _GCS_DEFAULT_POLICY_OBJECT_PATH_ENV_VAR, _DEFAULT_GCS_DEFAULT_POLICY_OBJECT_PATH
         )
         self._request_bucket = os.environ.get(_GCS_REQUEST_BUCKET_ENV_VAR)
+        # empty means no shared staging datasets, i.e., one transfer per cross-location sample,
+        # and no tracking of transfer runs, i.e., relying on their done notification alone
+        self._state_bucket = os.environ.get(_GCS_STATE_BUCKET_ENV_VAR)
+        # empty means cross-location samples are always moved with a transfer run
+        self._extract_bucket = os.environ.get(_GCS_EXTRACT_BUCKET_ENV_VAR)
         self._pubsub_request = os.environ.get(_PUBSUB_CMD_TOPIC_ENV_VAR)
         self._pubsub_error = os.environ.get(_PUBSUB_ERROR_TOPIC_ENV_VAR)
         self._pubsub_bq_notification = os.environ.get(_BQ_TRANSFER_NOTIFICATION_TOPIC_ENV_VAR)
         self._sampling_lock_path = os.environ.get(
             _SAMPLING_LOCK_OBJECT_PATH_ENV_VAR, _DEFAULT_SAMPLING_LOCK_OBJECT_PATH
         )
+        self._cleanup_max_workers = _cleanup_max_workers_from_env()
+        # empty means the sample tables never expire
+        self._sample_expiration_ms = (
+            int(os.environ.get(_SAMPLE_TABLE_EXPIRATION_MS_ENV_VAR))
+            if os.environ.get(_SAMPLE_TABLE_EXPIRATION_MS_ENV_VAR)
+            else None
+        )
+        self._staging_expiration_ms = int(
+            os.environ.get(
+                _STAGING_TABLE_EXPIRATION_MS_ENV_VAR,
+                const.TRANSFER_TEMP_DATASET_DEFAULT_TABLE_EXPIRATION_MS,
+            )
+        )
+        self._transfer_run_timeout_sec = int(
+            os.environ.get(
+                _TRANSFER_RUN_TIMEOUT_SEC_ENV_VAR, const.TRANSFER_RUN_DEFAULT_TIMEOUT_SEC
+            )
+        )
+        self._transfer_run_max_attempts = int(
+            os.environ.get(
+                _TRANSFER_RUN_MAX_ATTEMPTS_ENV_VAR, const.TRANSFER_RUN_DEFAULT_MAX_ATTEMPTS
+            )
+        )
+        # empty means a transfer config is created, and removed, for every transfer
+        self._persistent_transfer_configs = (
+            os.environ.get(_PERSISTENT_TRANSFER_CONFIGS_ENV_VAR, '').strip().lower() == 'true'
+        )
+        self._pubsub_batch_max_messages = int(
+            os.environ.get(
+                _PUBSUB_BATCH_MAX_MESSAGES_ENV_VAR, const.PUBSUB_BATCH_DEFAULT_MAX_MESSAGES
+            )
+        )
+        # empty means the Pub/Sub client default
+        self._pubsub_batch_max_bytes = (
+            int(os.environ.get(_PUBSUB_BATCH_MAX_BYTES_ENV_VAR))
+            if os.environ.get(_PUBSUB_BATCH_MAX_BYTES_ENV_VAR)
+            else None
+        )
+        self._pubsub_batch_max_latency_sec = float(
+            os.environ.get(
+                _PUBSUB_BATCH_MAX_LATENCY_SEC_ENV_VAR, const.PUBSUB_BATCH_DEFAULT_MAX_LATENCY_SEC
+            )
+        )
+        # empty means commands are published as plain JSON
+        self._pubsub_compact_encoding = (
+            os.environ.get(_PUBSUB_COMPACT_ENCODING_ENV_VAR, '').strip().lower() == 'true'
+        )
+        self._command_batch_max_size = int(
+            os.environ.get(_COMMAND_BATCH_MAX_SIZE_ENV_VAR, const.COMMAND_BATCH_DEFAULT_MAX_SIZE)
+        )
+        self._command_batch_max_rows = int(
+            os.environ.get(_COMMAND_BATCH_MAX_ROWS_ENV_VAR, const.COMMAND_BATCH_DEFAULT_MAX_ROWS)
+        )
+        self._command_batch_max_workers = int(
+            os.environ.get(
+                _COMMAND_BATCH_MAX_WORKERS_ENV_VAR, const.COMMAND_BATCH_DEFAULT_MAX_WORKERS
+            )
+        )
+        self._sample_start_claim_timeout_sec = int(
+            os.environ.get(
+                _SAMPLE_START_CLAIM_TIMEOUT_SEC_ENV_VAR,
+                const.SAMPLE_START_CLAIM_DEFAULT_TIMEOUT_SEC,
+            )
+        )
+        # empty means all sample commands are due right away
+        self._sample_start_jobs_per_sec = (
+            float(os.environ.get(_SAMPLE_START_JOBS_PER_SEC_ENV_VAR))
+            if os.environ.get(_SAMPLE_START_JOBS_PER_SEC_ENV_VAR)
+            else None
+        )
+        # empty means no ordering keys, i.e., no limit on sample commands in flight
+        self._sample_start_max_in_flight = (
+            int(os.environ.get(_SAMPLE_START_MAX_IN_FLIGHT_ENV_VAR))
+            if os.environ.get(_SAMPLE_START_MAX_IN_FLIGHT_ENV_VAR)
+            else None
+        )
+        self._sample_start_max_delay_sec = int(
+            os.environ.get(
+                _SAMPLE_START_MAX_DELAY_SEC_ENV_VAR, const.SAMPLE_START_DEFAULT_MAX_DELAY_SEC
+            )
+        )
+        # empty means a policy prefix is never split into shards
+        self._sample_policy_prefix_shard_size = (
+            int(os.environ.get(_SAMPLE_POLICY_PREFIX_SHARD_SIZE_ENV_VAR))
+            if os.environ.get(_SAMPLE_POLICY_PREFIX_SHARD_SIZE_ENV_VAR)
+            else None
+        )
+        # empty means a policy prefix is processed in a single go, however long it takes
+        self._sample_policy_prefix_deadline_sec = (
+            int(os.environ.get(_SAMPLE_POLICY_PREFIX_DEADLINE_SEC_ENV_VAR))
+            if os.environ.get(_SAMPLE_POLICY_PREFIX_DEADLINE_SEC_ENV_VAR)
+            else None
+        )
 
     @property
     def target_location(self) -> str:  # pylint: disable=missing-function-docstring
@@ -72,6 +230,14 @@ class _GeneralConfig:  # pylint: disable=too-many-instance-attributes
     def request_bucket(self) -> str:  # pylint: disable=missing-function-docstring
         return self._request_bucket
 
+    @property
+    def state_bucket(self) -> Optional[str]:  # pylint: disable=missing-function-docstring
+        return self._state_bucket
+
+    @property
+    def extract_bucket(self) -> Optional[str]:  # pylint: disable=missing-function-docstring
+        return self._extract_bucket
+
     @property
     def pubsub_request(self) -> str:  # pylint: disable=missing-function-docstring
         return self._pubsub_request
@@ -88,6 +254,124 @@ class _GeneralConfig:  # pylint: disable=too-many-instance-attributes
     def sampling_lock_path(self) -> str:  # pylint: disable=missing-function-docstring
         return self._sampling_lock_path
 
+    @property
+    def cleanup_max_workers(self) -> int:  # pylint: disable=missing-function-docstring
+        return self._cleanup_max_workers
+
+    @property
+    def sample_expiration_ms(self) -> Optional[int]:  # pylint: disable=missing-function-docstring
+        return self._sample_expiration_ms
+
+    @property
+    def staging_expiration_ms(self) -> int:  # pylint: disable=missing-function-docstring
+        return self._staging_expiration_ms
+
+    @property
+    def transfer_run_timeout_sec(self) -> int:  # pylint: disable=missing-function-docstring
+        return self._transfer_run_timeout_sec
+
+    @property
+    def transfer_run_max_attempts(self) -> int:  # pylint: disable=missing-function-docstring
+        return self._transfer_run_max_attempts
+
+    @property
+    def persistent_transfer_configs(self) -> bool:  # pylint: disable=missing-function-docstring
+        return self._persistent_transfer_configs
+
+    @property
+    def pubsub_batch_max_messages(self) -> int:  # pylint: disable=missing-function-docstring
+        return self._pubsub_batch_max_messages
+
+    @property
+    def pubsub_batch_max_bytes(self) -> Optional[int]:  # pylint: disable=missing-function-docstring
+        return self._pubsub_batch_max_bytes
+
+    @property
+    def pubsub_batch_max_latency_sec(  # pylint: disable=missing-function-docstring
+        self,
+    ) -> float:
+        return self._pubsub_batch_max_latency_sec
+
+    @property
+    def pubsub_compact_encoding(self) -> bool:  # pylint: disable=missing-function-docstring
+        return self._pubsub_compact_encoding
+
+    @property
+    def command_batch_max_size(self) -> int:  # pylint: disable=missing-function-docstring
+        return self._command_batch_max_size
+
+    @property
+    def command_batch_max_rows(self) -> int:  # pylint: disable=missing-function-docstring
+        return self._command_batch_max_rows
+
+    @property
+    def command_batch_max_workers(self) -> int:  # pylint: disable=missing-function-docstring
+        return self._command_batch_max_workers
+
+    @property
+    def sample_start_claim_timeout_sec(  # pylint: disable=missing-function-docstring
+        self,
+    ) -> int:
+        return self._sample_start_claim_timeout_sec
+
+    @property
+    def sample_start_jobs_per_sec(  # pylint: disable=missing-function-docstring
+        self,
+    ) -> Optional[float]:
+        return self._sample_start_jobs_per_sec
+
+    @property
+    def sample_start_max_in_flight(  # pylint: disable=missing-function-docstring
+        self,
+    ) -> Optional[int]:
+        return self._sample_start_max_in_flight
+
+    @property
+    def sample_start_max_delay_sec(  # pylint: disable=missing-function-docstring
+        self,
+    ) -> int:
+        return self._sample_start_max_delay_sec
+
+    @property
+    def sample_policy_prefix_shard_size(  # pylint: disable=missing-function-docstring
+        self,
+    ) -> Optional[int]:
+        return self._sample_policy_prefix_shard_size
+
+    @property
+    def sample_policy_prefix_deadline_sec(  # pylint: disable=missing-function-docstring
+        self,
+    ) -> Optional[int]:
+        return self._sample_policy_prefix_deadline_sec
+
+
+def _cleanup_max_workers_from_env() -> int:
+    value = os.environ.get(_CLEANUP_MAX_WORKERS_ENV_VAR)
+    try:
+        result = bq.validate_max_workers(int(value) if value else None)
+    except ValueError as err:
+        raise ValueError(
+            f'Environment variable <{_CLEANUP_MAX_WORKERS_ENV_VAR}> must be a positive integer, '
+            f'if set. Got: <{value}>. Error: {err}'
+        ) from err
+    return result
+
+
+def set_dispatcher(value: Optional[Callable[[command.CommandBase], None]] = None) -> None:
+    """
+    Routes the commands issued while processing, e.g., the
+        :py:class:`command.CommandSampleStart` for each table,
+        to `value` instead of the Pub/Sub command topic.
+    It allows processing the commands in-process, see :py:mod:`local_engine`.
+    Errors are then not sent to the Pub/Sub error topic,
+        they are only raised by :py:func:`process`.
+
+    :param value: :py:obj:`None` restores the Pub/Sub command topic.
+    :return:
+    """
+    global _DISPATCHER  # pylint: disable=global-statement
+    _DISPATCHER = value
+
 
 def process(value: command.CommandBase, *, with_retry: Optional[bool] = True) -> str:
     """
@@ -96,7 +380,15 @@ def process(value: command.CommandBase, *, with_retry: Optional[bool] = True) ->
     :param value:
     :param with_retry:
     :return:
+    :raises sampler_schedule.SampleNotDueError: if `value` must be delivered again later,
+        see :py:func:`sampler_schedule.check_due`.
     """
+    # a superseded command is dropped right away, instead of delivered again until due
+    if _shed_if_superseded(value):
+        return 'OK'
+    sampler_schedule.check_due(value)
+    if value.type == command.CommandType.COMMAND_BATCH.value:
+        return _process_command_batch(value, with_retry=with_retry)
     _LOGGER.info('Processing command <%s> with retry to <%s>', value, with_retry)
     try:
         if with_retry:
@@ -105,19 +397,96 @@ def process(value: command.CommandBase, *, with_retry: Optional[bool] = True) ->
             _process(value)
         _LOGGER.info('Processed command <%s>', value)
     except Exception as err:  # pylint: disable=broad-except
+        _land_failed_staged_sample(value, err)
+        _fail_in_run_ledger(value, str(err))
         error_data = {
             _PUBSUB_ERROR_CMD_ENTRY: value.as_dict(),
             _PUBSUB_ERROR_MSG_ENTRY: str(err),
         }
-        pubsub.publish(error_data, _general_config().pubsub_error)
-        _LOGGER.error('Sent error to %s. Message: %s', _general_config().pubsub_error, error_data)
+        if _DISPATCHER is None:
+            pubsub.publish(error_data, _general_config().pubsub_error, _pubsub_attributes(value))
+            _LOGGER.error(
+                'Sent error to %s. Message: %s', _general_config().pubsub_error, error_data
+            )
         raise RuntimeError(f'Could not process command: <{value}>. Error: {err}') from err
     return 'OK'
 
 
+def _shed_if_superseded(value: command.CommandBase) -> bool:
+    """
+    A command from a run older than the current one, see :py:func:`sampler_ledger.current_run`,
+        is dropped, without any BigQuery work, and accounted for in its run ledger.
+    A dropped sample command might complete its run, see :py:func:`sampler_ledger.complete`.
+    A command batch is dropped if all its commands are, they all come from the same run.
+    Without a state bucket, or failing to read the current run, nothing is dropped.
+
+    :return: if the command was dropped.
+    """
+    if value.type == command.CommandType.COMMAND_BATCH.value:
+        # each command is accounted for, therefore no short-circuit
+        shed = [_shed_if_superseded(cmd) for cmd in value.commands]
+        return all(shed)
+    bucket_name = _general_config().state_bucket
+    if not bucket_name or not value.run_timestamp or value.type not in _SHEDDABLE_COMMAND_TYPES:
+        return False
+    try:
+        current_run_timestamp = _current_run_timestamp(bucket_name)
+    except Exception as err:  # pylint: disable=broad-except
+        _LOGGER.error('Could not read the current run. Error: %s', err)
+        return False
+    result = current_run_timestamp is not None and value.run_timestamp < current_run_timestamp
+    if result:
+        _LOGGER.warning(
+            'Dropping command <%s> from run <%s>, superseded by run <%s>',
+            value,
+            value.run_timestamp,
+            current_run_timestamp,
+        )
+        _update_run_ledger(
+            value.run_timestamp,
+            sampler_ledger.shed,
+            check_complete=value.type == command.CommandType.SAMPLE_START.value,
+            value=value,
+        )
+    return result
+
+
+@cachetools.cached(cache=cachetools.TTLCache(maxsize=1, ttl=const.CURRENT_RUN_CACHE_TTL_SEC))
+def _current_run_timestamp(bucket_name: str) -> Optional[int]:
+    return sampler_ledger.current_run(bucket_name=bucket_name)
+
+
+def _process_command_batch(value: command.CommandBatch, *, with_retry: bool) -> str:
+    """
+    Processes each sub-command, concurrently, as if it was sent on its own.
+    I.e., each one is retried, and its failure reported, individually.
+    """
+    _LOGGER.info('Processing <%s> commands in batch <%s>', len(value.commands), value)
+    errors = []
+    max_workers = max(1, min(len(value.commands), _general_config().command_batch_max_workers))
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_cmd = {
+            executor.submit(process, cmd, with_retry=with_retry): cmd for cmd in value.commands
+        }
+        for future in futures.as_completed(future_to_cmd):
+            try:
+                future.result()
+            except Exception as err:  # pylint: disable=broad-except
+                errors.append(str(err))
+    _LOGGER.info(
+        'Processed <%s> out of <%s> commands in batch <%s>',
+        len(value.commands) - len(errors),
+        len(value.commands),
+        value,
+    )
+    if errors:
+        raise RuntimeError(f'Failed command {value} with error(s): {errors}')
+    return 'OK'
+
+
 @tenacity.retry(
     reraise=True,
-    retry=tenacity.retry_if_not_exception_type(ValueError),
+    retry=tenacity.retry_if_not_exception_type((ValueError, SamplePolicyPrefixError)),
     wait=tenacity.wait_exponential(multiplier=1, min=4, max=10),
     stop=tenacity.stop_after_attempt(3),
     before_sleep=tenacity.before_sleep_log(_LOGGER, logging.INFO),
@@ -129,6 +498,8 @@ def _process_with_retry(value: command.CommandBase) -> None:
 def _process(value: command.CommandBase) -> None:
     if value.type == command.CommandType.START.value:
         _process_start(value)
+    elif value.type == command.CommandType.SAMPLE_POLICY_PROJECT.value:
+        _process_sample_policy_project(value)
     elif value.type == command.CommandType.SAMPLE_POLICY_PREFIX.value:
         _process_sample_policy_prefix(value)
     elif value.type == command.CommandType.SAMPLE_START.value:
@@ -139,6 +510,12 @@ def _process(value: command.CommandBase) -> None:
         _process_transfer_run_done(value)
     elif value.type == command.CommandType.REMOVE_DATASET.value:
         _process_remove_dataset(value)
+    elif value.type == command.CommandType.CLEANUP_DATASET.value:
+        _process_cleanup_dataset(value)
+    elif value.type == command.CommandType.TRANSFER_WATCHDOG.value:
+        _process_transfer_watchdog(value)
+    elif value.type == command.CommandType.RUN_COMPLETE.value:
+        _process_run_complete(value)
     else:
         raise ValueError(f'Command type <{value.type}> cannot be processed')
 
@@ -150,6 +527,8 @@ def _process_start(value: command.CommandStart) -> None:
         and issue a sampling request for all targeted tables.
     It will also generate a :py:class:`command.CommandSampleStart` for each one'
         and send it out into the Pub/Sub topic.
+    The policy bucket is listed in a tree-shaped fan-out, i.e.,
+        it only issues a :py:class:`command.CommandSamplePolicyProject` per project prefix.
 
     :param value:
     :return:
@@ -168,38 +547,295 @@ def _process_start(value: command.CommandStart) -> None:
 
 
 def _process_start_ok(value: command.CommandStart) -> None:
-    _clean_up_project_before_start(
-        project_id=_general_config().target_project_id, location=_general_config().target_location
+    _set_current_run(value)
+    _remove_stale_sample_records(value)
+    with _batch_publisher() as publisher:
+        _publish_clean_up_cmds(
+            value,
+            project_id=_general_config().target_project_id,
+            location=_general_config().target_location,
+            publisher=publisher,
+        )
+
+        # each project lists its own datasets, see _process_sample_policy_project
+        prefixes = list(
+            gcs.list_prefixes(bucket_name=_general_config().policy_bucket, recursive=False)
+        )
+        # before any project is issued, so the run cannot be seen as complete too early
+        _update_run_ledger(
+            value.timestamp,
+            sampler_ledger.plan_run,
+            check_complete=not prefixes,
+            project_amount=len(prefixes),
+        )
+        for prefix in prefixes:
+            _LOGGER.debug('Sending request for project prefix: %s', prefix)
+            # create sample for project prefix request event
+            sample_policy_project_req = _create_sample_policy_project_cmd(value, prefix)
+            # send request out
+            _publish_cmd_to_pubsub(sample_policy_project_req, publisher)
+
+
+def _set_current_run(value: command.CommandStart) -> None:
+    """
+    From now on, the commands of previous runs are dropped, see :py:func:`_shed_if_superseded`.
+    Failing to set it does not prevent the sampling.
+    """
+    if _general_config().state_bucket:
+        try:
+            sampler_ledger.set_current_run(
+                bucket_name=_general_config().state_bucket, run_timestamp=value.timestamp
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error('Could not set run <%s> as the current one. Error: %s', value, err)
+
+
+def _remove_stale_sample_records(value: command.CommandStart) -> None:
+    """
+    Sample records older than the Pub/Sub retention cannot match a duplicate delivery anymore.
+    Failing to remove them does not prevent the sampling.
+    """
+    if _general_config().state_bucket:
+        try:
+            sampler_idempotency.remove_before(
+                bucket_name=_general_config().state_bucket,
+                timestamp=value.timestamp - const.SAMPLE_START_RECORD_RETENTION_SEC,
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error('Could not remove stale sample records. Error: %s', err)
+        try:
+            sampler_ledger.remove_before(
+                bucket_name=_general_config().state_bucket,
+                timestamp=value.timestamp - const.SAMPLE_START_RECORD_RETENTION_SEC,
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error('Could not remove stale run ledgers. Error: %s', err)
+
+
+def _update_run_ledger(
+    run_timestamp: Optional[int],
+    update_fn: Callable[..., None],
+    *,
+    check_complete: Optional[bool] = True,
+    **kwargs,
+) -> None:
+    """
+    Accounts for the run progress in the state bucket, see :py:mod:`sampler_ledger`,
+        and publishes the :py:class:`command.CommandRunComplete` if it completed the run.
+    Commands without a run timestamp, e.g., sent before it existed, are not accounted for.
+    Failing to account for it does not prevent the sampling.
+    """
+    bucket_name = _general_config().state_bucket
+    if not bucket_name or not run_timestamp:
+        return
+    try:
+        update_fn(bucket_name=bucket_name, run_timestamp=run_timestamp, **kwargs)
+        if check_complete:
+            run_complete = sampler_ledger.complete(
+                bucket_name=bucket_name, run_timestamp=run_timestamp
+            )
+            if run_complete is not None:
+                _publish_cmd_to_pubsub(run_complete)
+    except Exception as err:  # pylint: disable=broad-except
+        _LOGGER.error(
+            'Could not update run <%s> ledger with <%s>. Error: %s',
+            run_timestamp,
+            update_fn.__name__,
+            err,
+        )
+
+
+def _fail_in_run_ledger(value: command.CommandBase, error: str) -> None:
+    if value.type == command.CommandType.SAMPLE_START.value:
+        _update_run_ledger(
+            value.run_timestamp,
+            sampler_ledger.fail,
+            table_reference=value.sample_request.table_reference,
+            error=error,
+        )
+
+
+def _run_timestamp(value: command.CommandBase) -> int:
+    """
+    The timestamp of the :py:class:`command.CommandStart` the command comes from.
+    The `timestamp` itself is overwritten each time the command is sent.
+    """
+    return value.run_timestamp or value.timestamp
+
+
+def _batch_publisher() -> pubsub.BatchPublisher:
+    """
+    To fan out commands without waiting for each one to be published.
+    """
+    return pubsub.BatchPublisher(
+        max_messages=_general_config().pubsub_batch_max_messages,
+        max_bytes=_general_config().pubsub_batch_max_bytes,
+        max_latency_sec=_general_config().pubsub_batch_max_latency_sec,
+        enable_message_ordering=bool(_general_config().sample_start_max_in_flight),
+        compact=_general_config().pubsub_compact_encoding,
     )
 
-    def prefix_filter_fn(full_path: str) -> bool:
-        return len(full_path.strip(const.GS_PREFIX_DELIM).split(const.GS_PREFIX_DELIM)) == 2
 
-    for prefix in gcs.list_prefixes(
-        bucket_name=_general_config().policy_bucket, filter_fn=prefix_filter_fn
+def _publish_clean_up_cmds(
+    value: command.CommandStart,
+    *,
+    project_id: str,
+    location: str,
+    publisher: Optional[pubsub.BatchPublisher] = None,
+) -> None:
+    """
+    Instead of cleaning up inline, issues a :py:class:`command.CommandCleanupDataset`
+        for each sample dataset and stale transfer config,
+        so the clean up is spread across instances.
+    Tables planned to be sampled, according to the policy bucket, are kept,
+        since the sampling overwrites their content, see :py:func:`_process_cleanup_dataset`.
+    Persistent transfer configs, and their staging datasets, are meant to be kept,
+        therefore there is no sweep for them.
+    Only resources created before this run started are removed,
+        see :py:func:`_process_cleanup_dataset`,
+        therefore the clean up cannot race with the sampling,
+        regardless of when the commands are processed.
+    """
+    _LOGGER.debug('Issuing clean up commands for project <%s>', project_id)
+    timing_report: Dict[str, float] = {}
+    errors = []
+    amount = 0
+    for resource_name, cleanup_kwargs_iter in _cleanup_kwargs_iters(
+        project_id=project_id, location=location
     ):
-        _LOGGER.debug('Sending request for prefix: %s', prefix)
-        # create sample for prefix request event
-        sample_policy_prefix_req = _create_sample_policy_prefix_cmd(value, prefix)
-        # send request out
-        _publish_cmd_to_pubsub(sample_policy_prefix_req)
+        phase_start = time.monotonic()
+        try:
+            for cleanup_kwargs in cleanup_kwargs_iter:
+                _publish_cmd_to_pubsub(
+                    _create_cleanup_dataset_cmd(value, project_id, **cleanup_kwargs), publisher
+                )
+                amount += 1
+        except Exception as err:  # pylint: disable=broad-except
+            msg = f'Could not issue clean up for {resource_name}. Error: {err}'
+            errors.append(msg)
+            _LOGGER.error(msg)
+        timing_report[resource_name] = round(time.monotonic() - phase_start, 3)
+    _LOGGER.info(
+        'Issued <%s> clean up commands for project <%s>, report (in seconds): %s',
+        amount,
+        project_id,
+        timing_report,
+    )
+    if errors:
+        raise RuntimeError(f'Could not clean up project <{project_id}>. Error(s): {errors}')
 
 
-def _clean_up_project_before_start(project_id: str, location: str) -> None:
-    _LOGGER.debug('Cleaning up before start targeting project <%s>', project_id)
-    sampler_query.drop_all_sample_tables(project_id=project_id)
-    sampler_query.remove_all_empty_sample_datasets(project_id=project_id)
-    sampler_query.remove_all_transfer_config(project_id=project_id, location=location)
-    _LOGGER.info('Project <%s> cleaned up for start', project_id)
+def _cleanup_kwargs_iters(
+    *, project_id: str, location: str
+) -> List[Tuple[str, Iterable[Dict[str, Any]]]]:
+    """
+    The lazy arguments, by resource name, for each
+        :py:class:`command.CommandCleanupDataset` to be issued,
+        see :py:func:`_publish_clean_up_cmds`.
 
+    :param project_id:
+    :param location:
+    :return:
+    """
+    is_persistent = _general_config().persistent_transfer_configs
+    result = [
+        (
+            'sample datasets',
+            (
+                dict(dataset_id=dataset_id)
+                for dataset_id in sampler_query.list_all_sample_datasets(project_id=project_id)
+                if not (is_persistent and sampler_query.is_persistent_staging_dataset(dataset_id))
+            ),
+        ),
+    ]
+    if not is_persistent:
+        result.append(
+            (
+                'transfer configs',
+                (
+                    dict(transfer_config_name=name)
+                    for name in sampler_query.list_all_transfer_config_names(
+                        project_id=project_id, location=location
+                    )
+                ),
+            )
+        )
+    return result
 
-def _create_sample_policy_prefix_cmd(
+
+def _create_cleanup_dataset_cmd(
+    value: command.CommandBase,
+    project_id: str,
+    dataset_id: Optional[str] = None,
+    transfer_config_name: Optional[str] = None,
+    keep_table_ids: Optional[List[str]] = None,
+) -> command.CommandCleanupDataset:
+    # pylint: disable=line-too-long
+    kwargs = {
+        command.CommandCleanupDataset.type.__name__: command.CommandType.CLEANUP_DATASET.value,
+        command.CommandCleanupDataset.timestamp.__name__: value.timestamp,
+        command.CommandCleanupDataset.run_timestamp.__name__: _run_timestamp(value),
+        command.CommandCleanupDataset.project_id.__name__: project_id,
+        command.CommandCleanupDataset.dataset_id.__name__: dataset_id,
+        command.CommandCleanupDataset.transfer_config_name.__name__: transfer_config_name,
+        command.CommandCleanupDataset.keep_table_ids.__name__: keep_table_ids,
+    }
+    # pylint: enable=line-too-long
+    return command.CommandCleanupDataset(**kwargs)
+
+
+def _create_sample_policy_project_cmd(
     value: command.CommandStart, prefix: str
+) -> command.CommandSamplePolicyProject:
+    # pylint: disable=line-too-long
+    kwargs = {
+        command.CommandSamplePolicyProject.type.__name__: command.CommandType.SAMPLE_POLICY_PROJECT.value,
+        command.CommandSamplePolicyProject.timestamp.__name__: value.timestamp,
+        command.CommandSamplePolicyProject.run_timestamp.__name__: _run_timestamp(value),
+        command.CommandSamplePolicyProject.prefix.__name__: prefix,
+    }
+    # pylint: enable=line-too-long
+    return command.CommandSamplePolicyProject(**kwargs)
+
+
+def _process_sample_policy_project(value: command.CommandSamplePolicyProject) -> None:
+    """
+    Will list all dataset prefixes in the policy bucket under the project prefix in `cmd`.
+    For each one will issue the corresponding :py:class:`command.CommandSamplePolicyPrefix`.
+
+    :param value:
+    :return:
+    """
+    _LOGGER.info('Issuing sample policy prefix commands for <%s>', value)
+    prefixes = list(
+        gcs.list_prefixes(
+            bucket_name=_general_config().policy_bucket, prefix=value.prefix, recursive=False
+        )
+    )
+    with _batch_publisher() as publisher:
+        for prefix in prefixes:
+            _LOGGER.debug('Sending request for prefix: %s', prefix)
+            # create sample for prefix request event
+            sample_policy_prefix_req = _create_sample_policy_prefix_cmd(value, prefix)
+            # send request out
+            _publish_cmd_to_pubsub(sample_policy_prefix_req, publisher)
+    # only once all its prefixes were issued
+    _update_run_ledger(
+        value.run_timestamp,
+        sampler_ledger.plan_project,
+        project_prefix=value.prefix,
+        prefixes=prefixes,
+    )
+
+
+def _create_sample_policy_prefix_cmd(
+    value: command.CommandSamplePolicyProject, prefix: str
 ) -> command.CommandSamplePolicyPrefix:
     # pylint: disable=line-too-long
     kwargs = {
         command.CommandSamplePolicyPrefix.type.__name__: command.CommandType.SAMPLE_POLICY_PREFIX.value,
         command.CommandSamplePolicyPrefix.timestamp.__name__: value.timestamp,
+        command.CommandSamplePolicyPrefix.run_timestamp.__name__: _run_timestamp(value),
         command.CommandSamplePolicyPrefix.prefix.__name__: prefix,
     }
     # pylint: enable=line-too-long
@@ -211,50 +847,433 @@ def _process_sample_policy_prefix(value: command.CommandSamplePolicyPrefix) -> N
     Will list all policies in the policy bucket but restricted to the given prefix in `cmd`.
     For each policy will issue the corresponding :py:class:`command.CommandSampleStart`.
 
+    Failures are handled per table, see :py:func:`_retry_failed_tables`,
+        so the tables already issued are not issued again.
+
+    A prefix with more than `sample_policy_prefix_shard_size` policies
+        is split into shards instead, see :py:func:`_publish_sample_policy_shard_cmds`.
+
+    Past `sample_policy_prefix_deadline_sec`, less the time reserved to issue the commands,
+        see :py:func:`_sample_policy_prefix_deadline_timestamp`,
+        the remaining policies are handed over to a continuation command,
+        see :py:func:`_publish_continuation_cmd`.
+
     :param value:
     :return:
     """
     _LOGGER.info('Issuing sample command <%s>', value)
-    _process_sample_policy_prefix_ok(value)
+    if not _publish_sample_policy_shard_cmds(value):
+        _process_sample_policy_prefix_ok(value)
+
+
+def _publish_sample_policy_shard_cmds(value: command.CommandSamplePolicyPrefix) -> bool:
+    """
+    Issues a :py:class:`command.CommandSamplePolicyPrefix` per shard of the prefix,
+        see :py:func:`sampler_bucket.policy_shards`, each processed on its own.
+    Shards and narrowed commands are never split again.
+
+    :return: if the prefix was split into shards.
+    """
+    max_shard_size = _general_config().sample_policy_prefix_shard_size
+    if not max_shard_size or value.start_offset is not None or value.table_ids is not None:
+        return False
+    shards = sampler_bucket.policy_shards(
+        bucket_name=_general_config().policy_bucket,
+        prefix=value.prefix,
+        max_shard_size=max_shard_size,
+    )
+    if not shards:
+        return False
+    with _batch_publisher() as publisher:
+        for start_offset, end_offset in shards:
+            _publish_cmd_to_pubsub(
+                value.clone(start_offset=start_offset, end_offset=end_offset), publisher
+            )
+    # only once all its shards were issued
+    _update_run_ledger(
+        value.run_timestamp,
+        sampler_ledger.plan_shards,
+        prefix=value.prefix,
+        shards=[start_offset for start_offset, _ in shards],
+    )
+    return True
 
 
 def _process_sample_policy_prefix_ok(value: command.CommandSamplePolicyPrefix) -> None:
     _LOGGER.debug(
-        'Retrieving all policies from bucket <%s> and prefix <%s>',
+        'Retrieving policies for tables <%s> from bucket <%s> and prefix <%s>',
+        value.table_ids,
         _general_config().policy_bucket,
         value.prefix,
     )
-    errors = []
-    for table_policy in sampler_bucket.all_policies(
+    deadline_timestamp = _sample_policy_prefix_deadline_timestamp()
+    continuation = None
+    errors_by_table: Dict[str, Exception] = {}
+    table_samples = []
+    cost_by_table = {}
+    table_refs = {}
+    for table_ref, load_policy_fn in sampler_bucket.all_policy_loaders(
         bucket_name=_general_config().policy_bucket,
         default_policy_object_path=_general_config().default_policy_path,
         prefix=value.prefix,
+        table_ids=value.table_ids,
+        start_offset=value.start_offset,
+        end_offset=value.end_offset,
     ):
-        _LOGGER.info(
-            'Retrieving request, if existent, for table <%s> from bucket <%s> and prefix <%s>',
-            table_policy,
-            _general_config().request_bucket,
-            value.prefix,
+        # at least one table per command, otherwise it would never get to the end
+        if table_refs and deadline_timestamp is not None and time.time() > deadline_timestamp:
+            continuation = _publish_continuation_cmd(value, table_ref)
+            break
+        table_refs[table_ref.table_id] = table_ref
+        try:
+            table_policy, table_sample = _table_sample_with_retry(load_policy_fn)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error(
+                'Could not create sample request for table <%s>. Error: %s', table_ref, err
+            )
+            errors_by_table[table_ref.table_id] = err
+            continue
+        table_samples.append((table_policy, table_sample))
+        # within the deadline, it costs a BigQuery request per table
+        cost_by_table[table_sample.table_reference.table_fqn_id()] = _estimated_sample_cost(
+            table_sample
+        )
+    # create sample request events
+    errors_by_table.update(
+        _publish_sample_start_cmds(
+            value,
+            _create_all_sample_start_cmds(value, _longest_first(table_samples, cost_by_table)),
+        )
+    )
+    errors = _retry_failed_tables(value, errors_by_table, table_refs)
+    if value.table_ids is None:
+        # only once all its tables were issued, or failed
+        _update_run_ledger(
+            value.run_timestamp,
+            sampler_ledger.plan_prefix,
+            # a shard is planned under its own name, see _publish_sample_policy_shard_cmds
+            prefix=value.start_offset or value.prefix,
+            table_references=list(table_refs.values()),
+            continuation=continuation,
+        )
+    if errors:
+        # not retried as a whole, it would issue the tables already issued again
+        raise SamplePolicyPrefixError(f'Failed command {value} with error(s): {errors}')
+
+
+def _sample_policy_prefix_deadline_timestamp() -> Optional[float]:
+    """
+    The policies are only loaded until this deadline, the remaining time is reserved
+        for the work afterwards, see :py:data:`const.SAMPLE_POLICY_PREFIX_DEADLINE_RESERVE_RATIO`.
+    """
+    deadline_sec = _general_config().sample_policy_prefix_deadline_sec
+    result = None
+    if deadline_sec:
+        result = time.time() + deadline_sec * (
+            1 - const.SAMPLE_POLICY_PREFIX_DEADLINE_RESERVE_RATIO
         )
+    return result
+
+
+def _publish_continuation_cmd(
+    value: command.CommandSamplePolicyPrefix, table_reference: table.TableReference
+) -> str:
+    """
+    Hands the policies from `table_reference` onwards over to a new command,
+        i.e., the same command but starting at the `table_reference` policy object.
+    It is published before any sample command is issued, so if it fails,
+        the whole command can be retried without issuing any table twice.
+
+    :return: the continuation `start_offset`.
+    """
+    result = sampler_bucket.table_policy_object_path(table_reference)
+    continuation_cmd = value.clone(start_offset=result)
+    _publish_cmd_to_pubsub(continuation_cmd)
+    _LOGGER.warning(
+        'Deadline reached for <%s>, published continuation <%s>', value, continuation_cmd
+    )
+    return result
+
+
+@tenacity.retry(
+    reraise=True,
+    retry=tenacity.retry_if_not_exception_type(ValueError),
+    wait=tenacity.wait_exponential(multiplier=1, min=1, max=4),
+    stop=tenacity.stop_after_attempt(3),
+    before_sleep=tenacity.before_sleep_log(_LOGGER, logging.INFO),
+)
+def _table_sample_with_retry(
+    load_policy_fn: Callable[[], policy.TablePolicy],
+) -> Tuple[policy.TablePolicy, table.TableSample]:
+    table_policy = load_policy_fn()
+    _LOGGER.info(
+        'Retrieving request, if existent, for table <%s> from bucket <%s>',
+        table_policy,
+        _general_config().request_bucket,
+    )
+    table_sample = sampler_bucket.sample_request_from_policy(
+        bucket_name=_general_config().request_bucket,
+        table_policy=table_policy,
+    )
+    # compliance enforcement
+    return table_policy, _compliant_sample_request(table_policy, table_sample)
+
+
+def _retry_failed_tables(
+    value: command.CommandSamplePolicyPrefix,
+    errors_by_table: Dict[str, Exception],
+    table_refs: Dict[str, table.TableReference],
+) -> List[str]:
+    """
+    Tables that failed with a transient error, i.e., not a :py:class:`ValueError`,
+        are published again in a narrowed command, with only them,
+        up to :py:data:`const.SAMPLE_POLICY_PREFIX_MAX_ATTEMPTS` attempts.
+    The others are given up on.
+
+    :return: error messages, one per table given up on.
+    """
+    result = []
+    retry_table_ids = sorted(
+        table_id
+        for table_id, err in errors_by_table.items()
+        if not isinstance(err, ValueError)
+        and value.attempts < const.SAMPLE_POLICY_PREFIX_MAX_ATTEMPTS
+    )
+    if retry_table_ids:
+        retry_cmd = value.clone(table_ids=retry_table_ids, attempts=value.attempts + 1)
         try:
-            table_sample = sampler_bucket.sample_request_from_policy(
-                bucket_name=_general_config().request_bucket,
-                table_policy=table_policy,
+            _publish_cmd_to_pubsub(retry_cmd)
+            _LOGGER.warning('Published retry <%s> for tables <%s>', retry_cmd, retry_table_ids)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error('Could not publish retry <%s>. Error: %s', retry_cmd, err)
+            retry_table_ids = []
+    for table_id, err in errors_by_table.items():
+        if table_id not in retry_table_ids:
+            msg = f'Ignoring sampling for table {table_refs.get(table_id)} due to error: {err}'
+            result.append(msg)
+            _LOGGER.error(msg)
+            _update_run_ledger(
+                value.run_timestamp,
+                sampler_ledger.fail,
+                # a narrowed command has no prefix to plan, see _process_sample_policy_prefix_ok
+                check_complete=value.table_ids is not None,
+                table_reference=table_refs.get(table_id),
+                error=msg,
             )
-            # compliance enforcement
-            table_sample = _compliant_sample_request(table_policy, table_sample)
-            # create sample request event
-            start_sample_req = _create_sample_start_cmd(
-                value, table_policy, table_sample, _general_config().target_location
+    return result
+
+
+def _longest_first(
+    table_samples: List[Tuple[policy.TablePolicy, table.TableSample]],
+    cost_by_table: Dict[str, float],
+) -> List[Tuple[policy.TablePolicy, table.TableSample]]:
+    """
+    Sorts the samples by their estimated cost, the most expensive first,
+        see :py:func:`_estimated_sample_cost`.
+    This way the run takes about as long as its most expensive sample,
+        instead of starting it last.
+
+    :param table_samples:
+    :param cost_by_table: the estimated cost by source table fully qualified ID.
+    :return:
+    """
+    # sorting is stable, i.e., samples with the same cost keep their listing order
+    return sorted(
+        table_samples,
+        key=lambda item: cost_by_table.get(item[1].table_reference.table_fqn_id(), 0),
+        reverse=True,
+    )
+
+
+def _estimated_sample_cost(table_sample: table.TableSample) -> float:
+    """
+    See :py:func:`sampler_query.estimated_sample_cost`.
+    A sample whose cost cannot be estimated goes last, i.e., it costs zero.
+    """
+    try:
+        result = sampler_query.estimated_sample_cost(table_sample)
+    except Exception as err:  # pylint: disable=broad-except
+        _LOGGER.warning('Could not estimate the cost of sample <%s>. Error: %s', table_sample, err)
+        result = 0
+    return result
+
+
+def _publish_sample_start_cmds(
+    value: command.CommandSamplePolicyPrefix, values: List[command.CommandSampleStart]
+) -> Dict[str, Exception]:
+    """
+    Publishes all commands in a batch, waiting only once for all of them.
+    Small samples are grouped into a :py:class:`command.CommandBatch`,
+        see :py:func:`_group_sample_start_cmds`.
+    Each group is scheduled within the job quotas budget, see :py:mod:`sampler_schedule`.
+    The groups scheduled past `sample_start_max_delay_sec` are handed over to
+        a delayed command, see :py:func:`_publish_delayed_cmd`.
+    The samples whose command could not be published are landed as failed.
+
+    :return: the error by source table ID, for each sample not published.
+    """
+    result = {}
+    publisher = _batch_publisher()
+    published = []
+    failed = []
+    start_timestamp = int(time.time())
+    within, after = _schedule_sample_start_cmds(values, start_timestamp=start_timestamp)
+    if after:
+        try:
+            _publish_delayed_cmd(
+                value,
+                after,
+                not_before_timestamp=start_timestamp + _general_config().sample_start_max_delay_sec,
             )
+        except Exception as err:  # pylint: disable=broad-except
+            failed.extend((group, err) for group in after)
+    for group in within:
+        try:
             # send request out
-            _publish_cmd_to_pubsub(start_sample_req)
+            batch_cmd = group[0] if len(group) == 1 else _create_command_batch_cmd(value, group)
+            published.append((group, _publish_cmd_to_pubsub(batch_cmd, publisher)))
         except Exception as err:  # pylint: disable=broad-except
-            msg = f'Ignoring sampling for policy {table_policy} due to error: {err}'
-            errors.append(msg)
-            _LOGGER.error(msg)
-    if errors:
-        raise RuntimeError(f'Failed command {value} with error(s): {errors}')
+            failed.append((group, err))
+    try:
+        publisher.wait()
+    except pubsub.PubSubBatchPublishError as err:
+        errors_by_data = {id(data): error for data, error in err.failed}
+        failed.extend(
+            (group, errors_by_data.get(id(data)))
+            for group, data in published
+            if id(data) in errors_by_data
+        )
+    for group, err in failed:
+        for start_sample_req in group:
+            _land_failed_staged_sample(start_sample_req)
+            table_ref = start_sample_req.sample_request.table_reference
+            _LOGGER.error(
+                'Could not publish sample command for table <%s>. Error: %s', table_ref, err
+            )
+            result[table_ref.table_id] = err
+    return result
+
+
+def _schedule_sample_start_cmds(
+    values: List[command.CommandSampleStart], *, start_timestamp: int
+) -> Tuple[List[List[command.CommandSampleStart]], List[List[command.CommandSampleStart]]]:
+    """
+    Groups and schedules the commands, see :py:func:`_group_sample_start_cmds`
+        and :py:func:`sampler_schedule.schedule`.
+
+    :return: the groups to issue right away and the ones scheduled too far ahead,
+        see :py:func:`sampler_schedule.split_at_horizon`.
+    """
+    return _keep_shared_staging_together(
+        *sampler_schedule.split_at_horizon(
+            sampler_schedule.schedule(
+                _group_sample_start_cmds(values),
+                start_timestamp=start_timestamp,
+                jobs_per_sec=_general_config().sample_start_jobs_per_sec,
+            ),
+            start_timestamp=start_timestamp,
+            max_delay_sec=_general_config().sample_start_max_delay_sec,
+        )
+    )
+
+
+def _keep_shared_staging_together(
+    within: List[List[command.CommandSampleStart]],
+    after: List[List[command.CommandSampleStart]],
+) -> Tuple[List[List[command.CommandSampleStart]], List[List[command.CommandSampleStart]]]:
+    """
+    The samples sharing a staging dataset, see :py:func:`_shared_staging_kwargs_by_table`,
+        are all issued at once, otherwise the ones issued later get another staging dataset,
+        and the first ones would never be transferred.
+    If it leaves nothing to be issued right away, everything is, so the prefix still progresses.
+
+    :return: the groups to issue right away and the ones to issue later on.
+    """
+    after = list(after)
+    moved = True
+    while moved:
+        later_staging_ids = {
+            cmd.staging_dataset_id for group in after for cmd in group if cmd.staging_table_count
+        }
+        moved = False
+        remaining = []
+        for group in within:
+            if any(cmd.staging_dataset_id in later_staging_ids for cmd in group):
+                after.append(group)
+                moved = True
+            else:
+                remaining.append(group)
+        within = remaining
+    if not within:
+        _LOGGER.warning(
+            'All <%s> groups share staging datasets with groups scheduled too far ahead, '
+            'issuing them all right away',
+            len(after),
+        )
+        within, after = after, []
+    return within, after
+
+
+def _publish_delayed_cmd(
+    value: command.CommandSamplePolicyPrefix,
+    groups: List[List[command.CommandSampleStart]],
+    *,
+    not_before_timestamp: int,
+) -> None:
+    """
+    Hands the tables in `groups` over to a new command,
+        i.e., the same command but narrowed to these tables and only due at `not_before_timestamp`.
+    Their sample commands are created, and scheduled, again once it is processed.
+    """
+    table_ids = sorted(
+        cmd.sample_request.table_reference.table_id for group in groups for cmd in group
+    )
+    delayed_cmd = value.clone(table_ids=table_ids, not_before_timestamp=not_before_timestamp)
+    _publish_cmd_to_pubsub(delayed_cmd)
+    _LOGGER.info('Delayed <%s> tables of <%s> to <%s>', len(table_ids), value, delayed_cmd)
+
+
+def _group_sample_start_cmds(
+    values: List[command.CommandSampleStart],
+) -> List[List[command.CommandSampleStart]]:
+    """
+    Groups consecutive commands, up to `command_batch_max_size` commands
+        and `command_batch_max_rows` estimated sampled rows per group.
+    A sample estimated above `command_batch_max_rows` is left on its own.
+    """
+    result = []
+    max_size = _general_config().command_batch_max_size
+    max_rows = _general_config().command_batch_max_rows
+    group = []
+    group_rows = 0
+    for start_sample_req in values:
+        rows = _estimated_sample_rows(start_sample_req)
+        if group and (len(group) >= max_size or group_rows + rows > max_rows):
+            result.append(group)
+            group = []
+            group_rows = 0
+        group.append(start_sample_req)
+        group_rows += rows
+    if group:
+        result.append(group)
+    return result
+
+
+def _estimated_sample_rows(value: command.CommandSampleStart) -> int:
+    # compliant samples always have a count, see policy.TablePolicy.compliant_sample()
+    return value.sample_request.sample.size.count or 0
+
+
+def _create_command_batch_cmd(
+    value: command.CommandBase, commands: List[command.CommandBase]
+) -> command.CommandBatch:
+    kwargs = {
+        command.CommandBatch.type.__name__: command.CommandType.COMMAND_BATCH.value,
+        command.CommandBatch.timestamp.__name__: value.timestamp,
+        command.CommandBatch.run_timestamp.__name__: _run_timestamp(value),
+        command.CommandBatch.commands.__name__: commands,
+    }
+    return command.CommandBatch(**kwargs)
 
 
 @cachetools.cached(cache=cachetools.LRUCache(maxsize=1))
@@ -269,30 +1288,178 @@ def _compliant_sample_request(
     return table_policy.compliant_sample(table_sample, row_count)
 
 
-def _create_sample_start_cmd(
+def _create_all_sample_start_cmds(
+    value: command.CommandSamplePolicyPrefix,
+    table_samples: List[Tuple[policy.TablePolicy, table.TableSample]],
+) -> List[command.CommandSampleStart]:
+    target_location = _general_config().target_location
+    source_tables = [table_policy.table_reference for table_policy, _ in table_samples]
+    staging_kwargs_by_table = {
+        **_persistent_staging_kwargs_by_table(source_tables, target_location),
+        # sharing a staging dataset takes precedence
+        **_shared_staging_kwargs_by_table(value, source_tables, target_location),
+    }
+    return [
+        _create_sample_start_cmd(
+            value,
+            table_policy,
+            table_sample,
+            target_location=target_location,
+            **staging_kwargs_by_table.get(table_policy.table_reference.table_fqn_id(), {}),
+        )
+        for table_policy, table_sample in table_samples
+    ]
+
+
+def _shared_staging_kwargs_by_table(
+    value: command.CommandSamplePolicyPrefix,
+    source_tables: List[table.TableReference],
+    target_location: str,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Cross-location samples from the same location into the same target dataset
+        share a staging dataset, so they are all transferred at once.
+    It requires a state bucket to keep track of which samples have landed.
+    A retried `value` gets the same staging datasets, so no group is left behind.
+
+    :return: the staging arguments for :py:func:`_create_sample_start_cmd`
+        by source table full-qualified ID.
+    """
+    result = {}
+    if _general_config().state_bucket:
+        table_fqn_ids_by_pair: Dict[Tuple[str, str], List[str]] = {}
+        for source_table in source_tables:
+            if source_table.location != target_location:
+                table_fqn_ids_by_pair.setdefault(
+                    (source_table.location, source_table.dataset_id), []
+                ).append(source_table.table_fqn_id())
+        for (source_location, dataset_id), table_fqn_ids in table_fqn_ids_by_pair.items():
+            # a single sample does not gain anything from sharing
+            if len(table_fqn_ids) > 1:
+                staging_kwargs = dict(
+                    staging_dataset_id=sampler_query.shared_staging_dataset_id(
+                        source_location=source_location,
+                        target_dataset_id=dataset_id,
+                        run_timestamp=_run_timestamp(value),
+                        source_table_fqn_ids=table_fqn_ids,
+                    ),
+                    staging_table_count=len(table_fqn_ids),
+                )
+                result.update({table_fqn_id: staging_kwargs for table_fqn_id in table_fqn_ids})
+    return result
+
+
+def _persistent_staging_kwargs_by_table(
+    source_tables: List[table.TableReference], target_location: str
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Cross-location samples are staged in a dataset that is kept across runs,
+        so its transfer config is reused, instead of created and removed on every run.
+
+    :return: the staging arguments for :py:func:`_create_sample_start_cmd`
+        by source table full-qualified ID.
+    """
+    result = {}
+    if _general_config().persistent_transfer_configs:
+        for source_table in source_tables:
+            if source_table.location != target_location:
+                result[source_table.table_fqn_id()] = dict(
+                    staging_dataset_id=sampler_query.persistent_staging_dataset_id(
+                        source_table_ref=source_table,
+                        target_table_ref=source_table.clone(
+                            project_id=_general_config().target_project_id,
+                            location=target_location,
+                        ),
+                    )
+                )
+    return result
+
+
+def _create_sample_start_cmd(  # pylint: disable=too-many-arguments
     value: command.CommandSamplePolicyPrefix,
     table_policy: policy.TablePolicy,
     table_sample: table.TableSample,
+    *,
     target_location: Optional[str] = None,
+    staging_dataset_id: Optional[str] = None,
+    staging_table_count: Optional[int] = None,
 ) -> command.CommandSampleStart:
     source_table = table_policy.table_reference
     kwargs = {
         command.CommandSampleStart.type.__name__: command.CommandType.SAMPLE_START.value,
         command.CommandSampleStart.timestamp.__name__: value.timestamp,
+        command.CommandSampleStart.run_timestamp.__name__: _run_timestamp(value),
         command.CommandSampleStart.sample_request.__name__: table_sample,
         command.CommandSampleStart.target_table.__name__: source_table.clone(
             project_id=_general_config().target_project_id,
             location=target_location,
         ),
+        command.CommandSampleStart.staging_dataset_id.__name__: staging_dataset_id,
+        command.CommandSampleStart.staging_table_count.__name__: staging_table_count,
     }
     return command.CommandSampleStart(**kwargs)
 
 
-def _publish_cmd_to_pubsub(value: command.CommandBase) -> None:
+def _publish_cmd_to_pubsub(
+    value: command.CommandBase, publisher: Optional[pubsub.BatchPublisher] = None
+) -> Dict[str, Any]:
+    """
+    With a `publisher` the command is only queued, see :py:meth:`pubsub.BatchPublisher.wait`,
+        and sample commands get an ordering key, see :py:func:`_pubsub_ordering_key`.
+    With a dispatcher, see :py:func:`set_dispatcher`, the command is handed to it instead.
+    With `pubsub_compact_encoding` it is published in the compact encoding,
+        see :py:func:`pubsub.parse_json_data`.
+
+    :return: the published data.
+    """
+    data = value.as_dict()
+    if _DISPATCHER is not None:
+        _LOGGER.debug('Dispatching event request <%s>', value)
+        _DISPATCHER(value)
+        return data
     topic = _general_config().pubsub_request
     _LOGGER.debug('Sending event request <%s> to topic <%s>', value, topic)
-    data = value.as_dict()
-    pubsub.publish(data, topic)
+    attributes = _pubsub_attributes(value)
+    if publisher is not None:
+        publisher.publish(data, topic, attributes, _pubsub_ordering_key(value))
+    else:
+        pubsub.publish(data, topic, attributes, compact=_general_config().pubsub_compact_encoding)
+    return data
+
+
+def _pubsub_attributes(value: command.CommandBase) -> Dict[str, str]:
+    """
+    So subscriptions can filter on the command, e.g.::
+        attributes.type = "SAMPLE_START"
+    The `source_location` is only present if the command samples tables from a single location.
+    """
+    result = {
+        const.PUBSUB_ATTR_TYPE: value.type,
+        const.PUBSUB_ATTR_RUN_TIMESTAMP: str(_run_timestamp(value)),
+    }
+    source_locations = {
+        cmd.sample_request.table_reference.location
+        for cmd in (value.commands if isinstance(value, command.CommandBatch) else [value])
+        if isinstance(cmd, command.CommandSampleStart)
+    }
+    if len(source_locations) == 1 and None not in source_locations:
+        result[const.PUBSUB_ATTR_SOURCE_LOCATION] = source_locations.pop()
+    return result
+
+
+def _pubsub_ordering_key(value: command.CommandBase) -> Optional[str]:
+    """
+    Sample commands are spread over `sample_start_max_in_flight` lanes,
+        see :py:func:`sampler_schedule.ordering_key`.
+    A command batch goes into the lane of its first command.
+    """
+    first = value.commands[0] if isinstance(value, command.CommandBatch) else value
+    result = None
+    if first.type == command.CommandType.SAMPLE_START.value:
+        result = sampler_schedule.ordering_key(
+            first, max_in_flight=_general_config().sample_start_max_in_flight
+        )
+    return result
 
 
 def _process_sample_start(value: command.CommandSampleStart) -> None:
@@ -301,10 +1468,57 @@ def _process_sample_start(value: command.CommandSampleStart) -> None:
     When finished, will push a Pub/Sub message containing the
         :py:class:`command.CommandSampleDone` request.
 
+    With a state bucket, duplicate deliveries are detected, see :py:func:`_sample_once`.
+    It is only processed once due, see :py:func:`process`.
+
     :param value:
     :return:
     """
     _LOGGER.info('Issuing sample command <%s>', value)
+    _update_run_ledger(
+        value.run_timestamp,
+        sampler_ledger.start,
+        check_complete=False,
+        table_reference=value.sample_request.table_reference,
+    )
+    if _general_config().state_bucket:
+        sample_done = _sample_once(value)
+    else:
+        sample_done = _sample(value)
+    if sample_done is not None:
+        _publish_cmd_to_pubsub(sample_done)
+
+
+def _sample_once(value: command.CommandSampleStart) -> Optional[command.CommandSampleDone]:
+    """
+    A duplicate of a sample already done gets the recorded :py:class:`command.CommandSampleDone`
+        instead of sampling again.
+    A duplicate of a sample in progress is dropped.
+
+    :return: :py:obj:`None` if dropped.
+    """
+    bucket_name = _general_config().state_bucket
+    try:
+        result = sampler_idempotency.claim(
+            bucket_name=bucket_name,
+            value=value,
+            timeout_sec=_general_config().sample_start_claim_timeout_sec,
+        )
+    except sampler_idempotency.SampleInProgressError as err:
+        _LOGGER.warning('Dropping duplicate sample command <%s>. Error: %s', value, err)
+        return None
+    if result is None:
+        try:
+            result = _sample(value)
+        except Exception:
+            # so a retry, or a redelivery, can claim it again
+            sampler_idempotency.release(bucket_name=bucket_name, value=value)
+            raise
+        sampler_idempotency.done(bucket_name=bucket_name, value=value, sample_done=result)
+    return result
+
+
+def _sample(value: command.CommandSampleStart) -> command.CommandSampleDone:
     start_timestamp = int(time.time())
     error_message = ''
     sample_type = table.SortType.from_str(value.sample_request.sample.spec.type)
@@ -313,45 +1527,139 @@ def _process_sample_start(value: command.CommandSampleStart) -> None:
         target_table_ref=value.target_table,
         amount=value.sample_request.sample.size.count,
         notification_pubsub_topic=_general_config().pubsub_bq_notification,
-        recreate_table=True,
+        # an existing target is kept, and overwritten, so it is never missing
+        recreate_table=False,
+        table_expiration_ms=_general_config().sample_expiration_ms,
+        staging_table_expiration_ms=_general_config().staging_expiration_ms,
+        staging_dataset_id=value.staging_dataset_id,
+        extract_bucket_name=_general_config().extract_bucket,
+        transfer_tracker_bucket_name=_general_config().state_bucket,
     )
-    if sample_type == table.SortType.RANDOM:
-        amount_inserted = sampler_query.create_table_with_random_sample(**kwargs)
-    elif sample_type == table.SortType.SORTED:
-        kwargs.update(
-            dict(
-                column=value.sample_request.sample.spec.properties.by,
-                order=value.sample_request.sample.spec.properties.direction,
+    # the run ledger accounts for the BigQuery costs of each sample
+    with bq.job_stats() as stats:
+        if sample_type == table.SortType.RANDOM:
+            amount_inserted = sampler_query.create_table_with_random_sample(**kwargs)
+        elif sample_type == table.SortType.SORTED:
+            kwargs.update(
+                dict(
+                    column=value.sample_request.sample.spec.properties.by,
+                    order=value.sample_request.sample.spec.properties.direction,
+                )
             )
-        )
-        # pylint: disable=missing-kwoa
-        amount_inserted = sampler_query.create_table_with_sorted_sample(**kwargs)
-        # pylint: enable=missing-kwoa
-    else:
-        raise ValueError(f'Cannot process sample request of type <{sample_type}> in <{value}>')
+            # pylint: disable=missing-kwoa
+            amount_inserted = sampler_query.create_table_with_sorted_sample(**kwargs)
+            # pylint: enable=missing-kwoa
+        else:
+            raise ValueError(f'Cannot process sample request of type <{sample_type}> in <{value}>')
+        _land_staged_sample(value)
     end_timestamp = int(time.time())
-    sample_done = _create_sample_done_cmd(
-        value, start_timestamp, end_timestamp, error_message, amount_inserted
+    return _create_sample_done_cmd(
+        value,
+        start_timestamp=start_timestamp,
+        end_timestamp=end_timestamp,
+        error_message=error_message,
+        amount_inserted=amount_inserted,
+        stats=stats,
     )
-    pubsub.publish(sample_done.as_dict(), _general_config().pubsub_request)
 
 
-def _create_sample_done_cmd(
+def _land_staged_sample(value: command.CommandSampleStart) -> None:
+    """
+    If the sample was staged in a shared staging dataset, registers that it has landed.
+    The last one to land triggers the transfer of the whole staging dataset.
+    A sample staged in a persistent (not shared) staging dataset is transferred right away.
+    """
+    if not value.staging_dataset_id:
+        return
+    if value.staging_table_count is None:
+        try:
+            sampler_query.transfer_staging_dataset(
+                source_table_ref=value.sample_request.table_reference,
+                target_table_ref=value.target_table,
+                staging_dataset_id=value.staging_dataset_id,
+                notification_pubsub_topic=_general_config().pubsub_bq_notification,
+                transfer_tracker_bucket_name=_general_config().state_bucket,
+                extract_bucket_name=_general_config().extract_bucket,
+                persistent_transfer_config=True,
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            raise StagedSampleTransferError(
+                f'Could not transfer staging dataset <{value.staging_dataset_id}>. Error: {err}'
+            ) from err
+    elif sampler_staging.land_sample_and_claim_transfer(
+        bucket_name=_general_config().state_bucket,
+        staging_dataset_id=value.staging_dataset_id,
+        table_id=value.target_table.table_id,
+        expected_amount=value.staging_table_count,
+    ):
+        try:
+            sampler_query.transfer_staging_dataset(
+                source_table_ref=value.sample_request.table_reference,
+                target_table_ref=value.target_table,
+                staging_dataset_id=value.staging_dataset_id,
+                notification_pubsub_topic=_general_config().pubsub_bq_notification,
+                transfer_tracker_bucket_name=_general_config().state_bucket,
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            # let a retry claim it again
+            sampler_staging.release_transfer(
+                bucket_name=_general_config().state_bucket,
+                staging_dataset_id=value.staging_dataset_id,
+            )
+            raise StagedSampleTransferError(
+                f'Could not transfer staging dataset <{value.staging_dataset_id}>. Error: {err}'
+            ) from err
+
+
+def _land_failed_staged_sample(
+    value: command.CommandBase, error: Optional[Exception] = None
+) -> None:
+    """
+    A sample, staged in a shared staging dataset, that failed must still land,
+        otherwise the transfer for the other samples would never be triggered.
+    Its staging table is dropped, so it does not overwrite the target table.
+    If only the transfer failed, see :py:class:`StagedSampleTransferError`,
+        the staging table is complete, therefore kept, and only the transfer is retried.
+    """
+    if value.type == command.CommandType.SAMPLE_START.value and value.staging_dataset_id:
+        try:
+            if isinstance(error, StagedSampleTransferError):
+                _land_staged_sample(value)
+                return
+            sampler_query.drop_staged_table(
+                source_table_ref=value.sample_request.table_reference,
+                target_table_ref=value.target_table,
+                staging_dataset_id=value.staging_dataset_id,
+            )
+            if value.staging_table_count is not None:
+                _land_staged_sample(value)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error('Could not land failed staged sample <%s>. Error: %s', value, err)
+
+
+def _create_sample_done_cmd(  # pylint: disable=too-many-arguments
     value: command.CommandSampleStart,
+    *,
     start_timestamp: int,
     end_timestamp: int,
     error_message: str,
     amount_inserted: Optional[int] = None,
+    stats: Optional[bq.JobStats] = None,
 ) -> command.CommandSampleDone:
     kwargs = {
         command.CommandSampleDone.type.__name__: command.CommandType.SAMPLE_DONE.value,
         command.CommandSampleDone.timestamp.__name__: value.timestamp,
+        command.CommandSampleDone.run_timestamp.__name__: value.run_timestamp,
         command.CommandSampleDone.sample_request.__name__: value.sample_request,
         command.CommandSampleDone.target_table.__name__: value.target_table,
         command.CommandSampleDone.start_timestamp.__name__: start_timestamp,
         command.CommandSampleDone.end_timestamp.__name__: end_timestamp,
         command.CommandSampleDone.error_message.__name__: error_message,
         command.CommandSampleDone.amount_inserted.__name__: amount_inserted,
+        command.CommandSampleDone.total_bytes_billed.__name__: (
+            stats.total_bytes_billed if stats is not None else None
+        ),
+        command.CommandSampleDone.slot_ms.__name__: stats.slot_ms if stats is not None else None,
     }
     return command.CommandSampleDone(**kwargs)
 
@@ -391,18 +1699,117 @@ def _process_transfer_run_done(value: command.CommandTransferRunDone) -> None:
     """
     # pylint: enable=line-too-long
     _LOGGER.info('Processing transfer run completion <%s>', value)
+    project_id, dataset_id = _extract_source_dataset_from_transfer_run_payload(value.payload)
     # validate state
     state = value.payload.get(const.TRANSFER_RUN_STATE_ATTR)
-    if state != const.TRANSFER_RUN_STATE_SUCCEEDED_VALUE:
-        raise RuntimeError(
-            f'Transfer Run did not succeeded (state <{state}>), therefore not removing'
-        )
+    if state == const.TRANSFER_RUN_STATE_SUCCEEDED_VALUE:
+        _finish_transfer(value.name, project_id, dataset_id, value.timestamp)
+    else:
+        tracked_transfer = None
+        if _general_config().state_bucket:
+            tracked_transfer = sampler_transfer.tracked(
+                bucket_name=_general_config().state_bucket, transfer_config_name=value.name
+            )
+        if tracked_transfer is None:
+            raise RuntimeError(
+                f'Transfer Run did not succeeded (state <{state}>), therefore not removing'
+            )
+        if tracked_transfer.run_name == value.payload.get(const.TRANSFER_RUN_NAME_ATTR):
+            _retry_failed_transfer(
+                tracked_transfer, _error_code_from_transfer_run_payload(value.payload)
+            )
+        else:
+            _LOGGER.info(
+                'Ignoring failed run <%s>, it has already been re-triggered as <%s>',
+                value.payload.get(const.TRANSFER_RUN_NAME_ATTR),
+                tracked_transfer.run_name,
+            )
+
+
+def _finish_transfer(
+    transfer_config_name: str,
+    project_id: str,
+    dataset_id: str,
+    timestamp: int,
+    remove_persistent: Optional[bool] = False,
+) -> None:
+    """
+    Removes the transfer config, its tracking, and the staging dataset.
+    A persistent staging dataset, and its transfer config, are kept to be reused,
+        unless `remove_persistent` is :py:obj:`True`.
+    """
+    is_removable = remove_persistent or not sampler_query.is_persistent_staging_dataset(dataset_id)
     # remove transfer config
-    bq.remove_transfer_config(value.name)
+    if is_removable:
+        bq.remove_transfer_config(transfer_config_name)
+    if _general_config().state_bucket:
+        sampler_staging.remove_staging_dataset_state(
+            bucket_name=_general_config().state_bucket, staging_dataset_id=dataset_id
+        )
+        sampler_transfer.untrack(
+            bucket_name=_general_config().state_bucket, transfer_config_name=transfer_config_name
+        )
     # send remove dataset command
-    project_id, dataset_id = _extract_source_dataset_from_transfer_run_payload(value.payload)
-    remove_dataset = _create_remove_dataset_cmd(project_id, dataset_id, value.timestamp)
-    pubsub.publish(remove_dataset.as_dict(), _general_config().pubsub_request)
+    if is_removable:
+        remove_dataset = _create_remove_dataset_cmd(project_id, dataset_id, timestamp)
+        _publish_cmd_to_pubsub(remove_dataset)
+
+
+def _error_code_from_transfer_run_payload(payload: Dict[str, Any]) -> Optional[int]:
+    result = None
+    error_status = payload.get(const.TRANSFER_RUN_ERROR_STATUS_ATTR)
+    if isinstance(error_status, dict):
+        result = error_status.get(const.TRANSFER_RUN_ERROR_STATUS_CODE_ATTR)
+    return result
+
+
+def _retry_failed_transfer(value: transfer.TrackedTransfer, error_code: Optional[int]) -> None:
+    """
+    Re-triggers the failed transfer run, unless the error is not retryable
+        or it has been attempted too many times already.
+    """
+    if (
+        error_code in const.TRANSFER_RUN_NON_RETRYABLE_ERROR_CODES
+        or value.attempts >= _general_config().transfer_run_max_attempts
+    ):
+        _give_up_transfer(
+            value, f'failed with error code <{error_code}> after <{value.attempts}> attempt(s)'
+        )
+    else:
+        runs = bq.start_transfer_config_run(value.transfer_config_name)
+        sampler_transfer.track(
+            bucket_name=_general_config().state_bucket,
+            value=value.clone(
+                run_name=runs[0].name,
+                triggered_timestamp=int(time.time()),
+                attempts=value.attempts + 1,
+            ),
+        )
+        _LOGGER.warning(
+            'Transfer run <%s> failed with error code <%s>. Re-triggered as <%s>',
+            value.run_name,
+            error_code,
+            runs[0].name,
+        )
+
+
+def _give_up_transfer(value: transfer.TrackedTransfer, reason: str) -> None:
+    """
+    Removes the transfer config, and the staging dataset,
+        so they do not linger, and reports the samples as not transferred.
+    """
+    _finish_transfer(
+        value.transfer_config_name,
+        value.source_project_id,
+        value.source_dataset_id,
+        int(time.time()),
+        remove_persistent=True,
+    )
+    raise RuntimeError(
+        f'Gave up on transfer <{value.transfer_config_name}>, it {reason}. '
+        f'The samples staged in <{value.source_project_id}.{value.source_dataset_id}> '
+        'were not transferred'
+    )
 
 
 def _extract_source_dataset_from_transfer_run_payload(payload: Dict[str, Any]) -> Tuple[str, str]:
@@ -471,15 +1878,126 @@ def _process_remove_dataset(value: command.CommandRemoveDataset) -> None:
     )
 
 
+def _process_cleanup_dataset(value: command.CommandCleanupDataset) -> None:
+    """
+    Removes the sample tables, created before the run the command belongs to started,
+        in the given dataset and/or the given stale transfer config.
+    Without `keep_table_ids`, the tables planned to be sampled into the dataset are kept,
+        see :py:func:`sampler_bucket.dataset_policy_table_ids`.
+        This way only the policies for the dataset are listed, not the whole policy bucket.
+
+    :param value:
+    :return:
+    """
+    _LOGGER.info('Cleaning up <%s>', value)
+    if value.dataset_id:
+        keep_table_ids = value.keep_table_ids
+        if keep_table_ids is None:
+            keep_table_ids = sampler_bucket.dataset_policy_table_ids(
+                bucket_name=_general_config().policy_bucket, dataset_id=value.dataset_id
+            )
+        sampler_query.clean_up_sample_dataset(
+            project_id=value.project_id,
+            dataset_id=value.dataset_id,
+            created_before=datetime.fromtimestamp(_run_timestamp(value), tz=timezone.utc),
+            keep_table_ids=keep_table_ids,
+            max_workers=_general_config().cleanup_max_workers,
+        )
+    if value.transfer_config_name:
+        bq.remove_transfer_config(value.transfer_config_name)
+
+
+def _process_transfer_watchdog(value: command.CommandTransferWatchdog) -> None:
+    """
+    Checks on the tracked transfer runs whose done notification is overdue:
+    * succeeded (i.e., the notification was lost): the transfer is finished as if notified;
+    * failed: the run is re-triggered, see :py:func:`_retry_failed_transfer`;
+    * still pending or running: it is waited for another timeout.
+    A transfer is given up after too many attempts, so the completion time is bounded.
+
+    :param value:
+    :return:
+    """
+    _LOGGER.info('Checking on overdue transfer runs <%s>', value)
+    if not _general_config().state_bucket:
+        _LOGGER.warning('There is no state bucket, therefore no tracked transfer runs to check')
+        return
+    errors = []
+    amount = 0
+    for tracked_transfer in sampler_transfer.overdue(
+        bucket_name=_general_config().state_bucket,
+        timeout_sec=_general_config().transfer_run_timeout_sec,
+        now_timestamp=int(time.time()),
+    ):
+        amount += 1
+        try:
+            _check_overdue_transfer(tracked_transfer)
+        except Exception as err:  # pylint: disable=broad-except
+            msg = f'Could not check on overdue transfer {tracked_transfer}. Error: {err}'
+            errors.append(msg)
+            _LOGGER.error(msg)
+    _LOGGER.info('Checked on <%s> overdue transfer runs', amount)
+    if errors:
+        raise RuntimeError(f'Failed command {value} with error(s): {errors}')
+
+
+def _check_overdue_transfer(value: transfer.TrackedTransfer) -> None:
+    run = bq.transfer_run(value.run_name)
+    state = run.state.name
+    if state == const.TRANSFER_RUN_STATE_SUCCEEDED_VALUE:
+        _LOGGER.warning('Transfer run <%s> succeeded but its notification is overdue', run.name)
+        _finish_transfer(
+            value.transfer_config_name,
+            value.source_project_id,
+            value.source_dataset_id,
+            int(time.time()),
+        )
+    elif state in const.TRANSFER_RUN_STATE_FAILED_VALUES:
+        _retry_failed_transfer(value, run.error_status.code)
+    elif value.attempts < _general_config().transfer_run_max_attempts:
+        _LOGGER.warning('Transfer run <%s> is overdue in state <%s>. Waiting', run.name, state)
+        sampler_transfer.track(
+            bucket_name=_general_config().state_bucket,
+            value=value.clone(triggered_timestamp=int(time.time()), attempts=value.attempts + 1),
+        )
+    else:
+        _give_up_transfer(value, f'is still <{state}> after <{value.attempts}> timeout(s)')
+
+
 def _process_sample_done(value: command.CommandSampleDone) -> None:
     """
     Collect the signal that a given sampling request has finished, logging it.
     If there is any error message, pushes the message into the error Pub/Sub topic.
+    With a state bucket, it is accounted for in the run ledger, see :py:mod:`sampler_ledger`.
 
     :param value:
     :return:
     """
     _LOGGER.info('Completed sample for command <%s>', value)
+    _update_run_ledger(value.run_timestamp, sampler_ledger.done, sample_done=value)
+
+
+def _process_run_complete(value: command.CommandRunComplete) -> None:
+    """
+    Collect the signal that all tables in a run were sampled, or failed, logging its summary.
+
+    :param value:
+    :return:
+    """
+    _LOGGER.info(
+        'Run <%s> completed in <%s> seconds with <%s> out of <%s> tables sampled, '
+        '<%s> failed, <%s> commands dropped, <%s> bytes billed, and <%s> slot milliseconds. '
+        'Summary: <%s>',
+        value.run_timestamp,
+        value.duration,
+        value.done,
+        value.planned,
+        value.failed,
+        value.shed,
+        value.total_bytes_billed,
+        value.slot_ms,
+        value,
+    )
 
 
 if __name__ == '__main__':
@@ -9,8 +9,10 @@ List all project IDs that should be sampled. It assumes the following structure
                           table that overwrites the default, if valid.
 
 """
+import functools
 import logging
-from typing import Any, Callable, Generator, Optional, Tuple
+import math
+from typing import Any, Callable, Generator, List, Optional, Tuple
 
 import cachetools
 
@@ -133,15 +135,171 @@ def _retrieve_all_with_table_reference(
         yield convert_fn(table_reference, obj_path)
 
 
-def _list_all_table_references_obj_path(
+def all_policy_loaders(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    default_policy_object_path: str,
+    *,
+    prefix: Optional[str] = None,
+    table_ids: Optional[List[str]] = None,
+    start_offset: Optional[str] = None,
+    end_offset: Optional[str] = None,
+) -> Generator[Tuple[table.TableReference, Callable[[], policy.TablePolicy]], None, None]:
+    """
+    Same as :py:func:`all_policies`, but each policy is only read,
+        and its dataset location resolved, when its loader is called.
+    This way a failure only affects its own table, which can be retried on its own.
+
+    :param bucket_name:
+    :param default_policy_object_path:
+    :param prefix: limits the search by prefix
+    :param table_ids: if given, only these tables are listed.
+    :param start_offset: if given, only policy objects named equal or after it are listed.
+    :param end_offset: if given, only policy objects named before it are listed.
+    :return: the table reference, without location, and the loader for its policy.
+    """
+    default_policy = _default_policy(bucket_name, default_policy_object_path)
+    for project_id, dataset_id, table_id, obj_path in _list_all_table_ids_obj_path(
+        bucket_name, prefix, start_offset, end_offset
+    ):
+        if table_ids is None or table_id in table_ids:
+            table_reference = table.TableReference(
+                project_id=project_id, dataset_id=dataset_id, table_id=table_id
+            )
+            yield table_reference, functools.partial(
+                _load_table_policy, bucket_name, default_policy, table_reference, obj_path
+            )
+
+
+def _load_table_policy(
+    bucket_name: str,
+    default_policy: policy.Policy,
+    table_reference: table.TableReference,
+    obj_path: str,
+) -> policy.TablePolicy:
+    return policy.TablePolicy(
+        table_reference=table_reference.clone(
+            location=_resolve_dataset_location(
+                table_reference.project_id, table_reference.dataset_id
+            )
+        ),
+        policy=_overwritten_policy_from_gcs(bucket_name, obj_path, default_policy),
+    )
+
+
+def all_policy_table_ids(
     bucket_name: str, prefix: Optional[str] = None
-) -> Generator[Tuple[table.TableReference, str], None, None]:
+) -> Generator[Tuple[str, str, str], None, None]:
+    """
+    Lists the project, dataset, and table IDs of all table policies.
+    Differently from :py:func:`all_policies` it only lists the objects,
+        i.e., it neither reads the policies nor resolves the dataset locations.
+
+    :param bucket_name:
+    :param prefix: limits the search by prefix
+    :return:
+    """
+    for project_id, dataset_id, table_id, _ in _list_all_table_ids_obj_path(bucket_name, prefix):
+        yield project_id, dataset_id, table_id
+
+
+def dataset_policy_table_ids(*, bucket_name: str, dataset_id: str) -> List[str]:
+    """
+    Lists the IDs of the tables with a policy in a dataset with the given ID, in any project,
+        i.e., the tables to be sampled into the target dataset with the same ID.
+    Only the project prefixes, and the dataset policies in each, are listed,
+        not the whole bucket, see :py:func:`all_policy_table_ids`.
+
+    :param bucket_name:
+    :param dataset_id:
+    :return:
+    """
+    result = []
+    for project_prefix in gcs.list_prefixes(bucket_name=bucket_name, recursive=False):
+        result.extend(
+            table_id
+            for _, _, table_id in all_policy_table_ids(
+                bucket_name, prefix=f'{project_prefix}{dataset_id}{const.GS_PREFIX_DELIM}'
+            )
+        )
+    return result
+
+
+def policy_shards(
+    bucket_name: str, prefix: str, max_shard_size: int
+) -> List[Tuple[str, Optional[str]]]:
+    """
+    Splits the policy objects under `prefix` into shards of, at most, `max_shard_size` objects.
+    The shard size is adjusted to the amount of policy objects found,
+        so all shards are about the same size, e.g.,
+        `2,001` objects with `max_shard_size=1,000` gives 3 shards of `667` objects.
+    It only lists the objects, i.e., it neither reads the policies nor resolves
+        the dataset locations.
+
+    :param bucket_name:
+    :param prefix: limits the search by prefix
+    :param max_shard_size:
+    :return: the `start_offset` (inclusive) and `end_offset` (exclusive, :py:obj:`None` for the
+        last shard) of each shard, to be given to :py:func:`all_policy_loaders`.
+        Empty if all objects fit in a single shard.
+    """
+    obj_paths = sorted(
+        obj_path for *_, obj_path in _list_all_table_ids_obj_path(bucket_name, prefix)
+    )
+    if len(obj_paths) <= max_shard_size:
+        return []
+    shard_amount = math.ceil(len(obj_paths) / max_shard_size)
+    shard_size = math.ceil(len(obj_paths) / shard_amount)
+    result = [
+        (obj_paths[ndx], obj_paths[ndx + shard_size] if ndx + shard_size < len(obj_paths) else None)
+        for ndx in range(0, len(obj_paths), shard_size)
+    ]
+    _LOGGER.info(
+        'Split <%s> policy objects under prefix <%s> in bucket <%s> into <%s> shards',
+        len(obj_paths),
+        prefix,
+        bucket_name,
+        len(result),
+    )
+    return result
+
+
+def table_policy_object_path(table_reference: table.TableReference) -> str:
+    """
+    The policy object path, in the policy bucket, for the table.
+
+    :param table_reference:
+    :return:
+    """
+    return const.GS_PREFIX_DELIM.join(
+        [
+            table_reference.project_id,
+            table_reference.dataset_id,
+            table_reference.table_id + const.JSON_EXT,
+        ]
+    )
+
+
+def _list_all_table_ids_obj_path(
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    start_offset: Optional[str] = None,
+    end_offset: Optional[str] = None,
+) -> Generator[Tuple[str, str, str, str], None, None]:
     def filter_fn(value: str) -> bool:
         return value.endswith(const.JSON_EXT) and len(value.split('/')) == 3
 
-    for obj_path in gcs.list_objects(bucket_name, filter_fn, prefix):
+    for obj_path in gcs.list_objects(bucket_name, filter_fn, prefix, start_offset, end_offset):
         project_id, dataset_id, table_id_file = obj_path.split('/')
         table_id = table_id_file[: -len(const.JSON_EXT)]
+        yield project_id, dataset_id, table_id, obj_path
+
+
+def _list_all_table_references_obj_path(
+    bucket_name: str, prefix: Optional[str] = None
+) -> Generator[Tuple[table.TableReference, str], None, None]:
+    for project_id, dataset_id, table_id, obj_path in _list_all_table_ids_obj_path(
+        bucket_name, prefix
+    ):
         # resolve location
         ds_location = _resolve_dataset_location(project_id, dataset_id)
         table_reference = table.TableReference(
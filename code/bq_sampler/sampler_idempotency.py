@@ -0,0 +1,163 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+"""
+Records which sample commands were started, and done, so a duplicate delivery
+    (Pub/Sub is at-least-once) does not run the same sampling again.
+A record is keyed on the command run timestamp, source table, and target table.
+It assumes the following structure in the GCS state bucket::
+  /
+    <SAMPLE_STARTS_PREFIX>/
+      <RUN_TIMESTAMP>/
+        <SOURCE_TABLE>_<TARGET_TABLE> - claim timestamp and claimant while started,
+            the :py:class:`command.CommandSampleDone` JSON once done
+
+"""
+import json
+import os
+import socket
+import threading
+import time
+from typing import Optional, Tuple
+
+from bq_sampler import const, logger
+from bq_sampler.entity import command
+from bq_sampler.gcp import gcs
+
+_LOGGER = logger.get(__name__)
+
+
+class SampleInProgressError(Exception):
+    """To code a sample command that is already being processed elsewhere"""
+
+
+def claim(
+    *, bucket_name: str, value: command.CommandSampleStart, timeout_sec: int
+) -> Optional[command.CommandSampleDone]:
+    """
+    Claims the sampling in `value`, exclusively, among concurrent deliveries.
+    A claim older than `timeout_sec` is considered abandoned and is taken over.
+    A claim by the same claimant, i.e., a retry in the same thread, is resumed right away.
+    Taking over only succeeds if nobody else changed the claim since it was read.
+
+    :param bucket_name:
+    :param value:
+    :param timeout_sec:
+    :return: :py:obj:`None` if claimed, i.e., the caller must do the sampling,
+        or the recorded :py:class:`command.CommandSampleDone` if it was already done.
+    :raises SampleInProgressError: if another delivery has claimed it.
+    """
+    path = _record_path(value)
+    now_timestamp = int(time.time())
+    record = f'{now_timestamp}{_CLAIM_RECORD_SEP}{_claimant()}'
+    result = None
+    if not gcs.write_object(bucket_name, path, record, if_absent=True):
+        content, generation = gcs.read_object_and_generation(bucket_name, path)
+        result = _sample_done_from_record(content)
+        if result is None:
+            claim_timestamp, claimant = _claim_from_record(content)
+            if claimant == _claimant():
+                _LOGGER.info('Resuming own claim on sample <%s> since <%s>', value, claim_timestamp)
+            elif claim_timestamp is not None and claim_timestamp + timeout_sec >= now_timestamp:
+                raise SampleInProgressError(
+                    f'Sample <{value}> was started at <{claim_timestamp}> by <{claimant}> '
+                    'and is not done yet'
+                )
+            else:
+                _LOGGER.warning(
+                    'Taking over sample <%s> abandoned by <%s> since <%s>. Record: <gs://%s/%s>',
+                    value,
+                    claimant,
+                    claim_timestamp,
+                    bucket_name,
+                    path,
+                )
+            if not gcs.write_object(bucket_name, path, record, if_generation_match=generation):
+                raise SampleInProgressError(
+                    f'Sample <{value}> was claimed concurrently while taking it over'
+                )
+        else:
+            _LOGGER.info('Sample <%s> was already done with <%s>', value, result)
+    return result
+
+
+def release(*, bucket_name: str, value: command.CommandSampleStart) -> None:
+    """
+    Gives back a claim from :py:func:`claim`, e.g., because the sampling failed,
+        so a retry can claim it again.
+
+    :param bucket_name:
+    :param value:
+    :return:
+    """
+    gcs.delete_objects(bucket_name, _record_path(value))
+
+
+def done(
+    *, bucket_name: str, value: command.CommandSampleStart, sample_done: command.CommandSampleDone
+) -> None:
+    """
+    Records the sampling in `value` as done, so duplicates re-emit `sample_done`.
+
+    :param bucket_name:
+    :param value:
+    :param sample_done:
+    :return:
+    """
+    gcs.write_object(bucket_name, _record_path(value), json.dumps(sample_done.as_dict()))
+
+
+def remove_before(*, bucket_name: str, timestamp: int) -> int:
+    """
+    Removes all records from runs before `timestamp`.
+
+    :param bucket_name:
+    :param timestamp: UTC epoch in seconds.
+    :return: how many objects were removed.
+    """
+    result = gcs.delete_objects_before(bucket_name, const.SAMPLE_STARTS_PREFIX, timestamp)
+    _LOGGER.debug(
+        'Removed <%s> sample records before <%s> in bucket <%s>', result, timestamp, bucket_name
+    )
+    return result
+
+
+def _sample_done_from_record(content: Optional[bytes]) -> Optional[command.CommandSampleDone]:
+    result = None
+    try:
+        value = json.loads(content) if content else None
+    except json.JSONDecodeError:
+        value = None
+    if isinstance(value, dict):
+        result = command.CommandSampleDone.from_dict(value)
+    return result
+
+
+_CLAIM_RECORD_SEP: str = ' '
+
+
+def _claimant() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def _claim_from_record(content: Optional[bytes]) -> Tuple[Optional[int], Optional[str]]:
+    claim_timestamp, claimant = None, None
+    if content:
+        claim_timestamp_str, _, claimant = (
+            content.decode('utf-8').strip().partition(_CLAIM_RECORD_SEP)
+        )
+        try:
+            claim_timestamp = int(claim_timestamp_str)
+        except ValueError as err:
+            _LOGGER.warning('Could not parse claim timestamp from <%s>. Error: %s', content, err)
+    return claim_timestamp, claimant or None
+
+
+def _record_path(value: command.CommandSampleStart) -> str:
+    return const.GS_PREFIX_DELIM.join(
+        [
+            const.SAMPLE_STARTS_PREFIX,
+            # the timestamp is overwritten each time the command is sent
+            str(value.run_timestamp or value.timestamp),
+            f'{value.sample_request.table_reference.table_fqn_id()}'
+            f'_{value.target_table.table_fqn_id()}',
+        ]
+    )
@@ -0,0 +1,415 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+"""
+Accounts for the tables sampled in a run, keyed on the run timestamp,
+    i.e., the timestamp of the :py:class:`command.CommandStart` it comes from.
+Once all tables are either done or failed, the run is complete, see :py:func:`complete`.
+The latest run is kept as the current one, see :py:func:`set_current_run`,
+    so commands from superseded runs can be dropped, see :py:func:`shed`.
+It assumes the following structure in the GCS state bucket::
+  /
+    <RUN_LEDGER_PREFIX>/
+      current_run - the latest run timestamp
+      <RUN_TIMESTAMP>/
+        projects - amount of policy project prefixes issued for the run
+        projects_planned/
+          <PROJECT_PREFIX> - one (empty) object per project whose policy prefixes are all issued
+        prefixes/
+          <PREFIX> - one (empty) object per policy prefix issued
+          <SHARD> - one (empty) object per policy prefix shard, or continuation, issued,
+                    named after its first object
+        prefixes_planned/
+          <PREFIX> - one object per policy prefix whose tables, or shards, are all planned,
+                     with the JSON list of its tables to be sampled
+          <SHARD> - one object per policy prefix shard whose tables are all planned,
+                    with the JSON list of its tables to be sampled
+        started/
+          <SOURCE_TABLE> - one (empty) object per table whose sampling started
+        pending/
+          <SOURCE_TABLE> - one (empty) object per table whose sampling started
+                           but is neither done nor failed yet
+        done/
+          <SOURCE_TABLE> - the :py:class:`command.CommandSampleDone` JSON
+        failed/
+          <SOURCE_TABLE> - the error message
+        shed/
+          <SOURCE_TABLE> - one (empty) object per sample command dropped because the run
+                           was superseded, it is accounted for as neither done nor failed
+          <COMMAND> - one (empty) object per any other command dropped for the same reason
+        complete - the :py:class:`command.CommandRunComplete` JSON, once complete
+"""
+import hashlib
+import json
+from typing import Iterable, Optional, Set
+
+from bq_sampler import const, logger
+from bq_sampler.entity import command, table
+from bq_sampler.gcp import gcs
+
+_LOGGER = logger.get(__name__)
+
+_PROJECTS: str = 'projects'
+_PROJECTS_PLANNED: str = 'projects_planned'
+_PREFIXES: str = 'prefixes'
+_PREFIXES_PLANNED: str = 'prefixes_planned'
+_STARTED: str = 'started'
+_PENDING: str = 'pending'
+_DONE: str = 'done'
+_FAILED: str = 'failed'
+_COMPLETE: str = 'complete'
+_SHED: str = 'shed'
+_CURRENT_RUN: str = 'current_run'
+
+
+def plan_run(*, bucket_name: str, run_timestamp: int, project_amount: int) -> None:
+    """
+    Registers how many policy project prefixes were issued for the run.
+
+    :param bucket_name:
+    :param run_timestamp:
+    :param project_amount:
+    :return:
+    """
+    gcs.write_object(bucket_name, _path(run_timestamp, _PROJECTS), str(project_amount))
+
+
+def plan_project(
+    *, bucket_name: str, run_timestamp: int, project_prefix: str, prefixes: Iterable[str]
+) -> None:
+    """
+    Registers all policy prefixes issued for the project prefix.
+    It must be called once all policy prefix commands for the project were issued.
+
+    :param bucket_name:
+    :param run_timestamp:
+    :param project_prefix:
+    :param prefixes:
+    :return:
+    """
+    for prefix in prefixes:
+        gcs.write_object(
+            bucket_name, _path(run_timestamp, _PREFIXES, prefix.strip(const.GS_PREFIX_DELIM))
+        )
+    gcs.write_object(
+        bucket_name,
+        _path(run_timestamp, _PROJECTS_PLANNED, project_prefix.strip(const.GS_PREFIX_DELIM)),
+    )
+
+
+def plan_shards(
+    *, bucket_name: str, run_timestamp: int, prefix: str, shards: Iterable[str]
+) -> None:
+    """
+    Registers all shards issued for the policy prefix, instead of its tables.
+    It must be called once all shard commands for the prefix were issued.
+
+    :param bucket_name:
+    :param run_timestamp:
+    :param prefix:
+    :param shards: the shards names, each planned with :py:func:`plan_prefix`.
+    :return:
+    """
+    for shard in shards:
+        gcs.write_object(
+            bucket_name, _path(run_timestamp, _PREFIXES, shard.strip(const.GS_PREFIX_DELIM))
+        )
+    gcs.write_object(
+        bucket_name, _path(run_timestamp, _PREFIXES_PLANNED, prefix.strip(const.GS_PREFIX_DELIM))
+    )
+
+
+def plan_prefix(
+    *,
+    bucket_name: str,
+    run_timestamp: int,
+    prefix: str,
+    table_references: Iterable[table.TableReference],
+    continuation: Optional[str] = None,
+) -> None:
+    """
+    Registers all tables to be sampled for the policy prefix.
+    It must be called once all sample commands for the prefix were issued.
+
+    :param bucket_name:
+    :param run_timestamp:
+    :param prefix: the policy prefix, or the shard name, see :py:func:`plan_shards`.
+    :param table_references: source tables.
+    :param continuation: if given, the remaining tables are planned by a continuation,
+        registered as a shard with this name.
+    :return:
+    """
+    if continuation is not None:
+        gcs.write_object(
+            bucket_name,
+            _path(run_timestamp, _PREFIXES, continuation.strip(const.GS_PREFIX_DELIM)),
+        )
+    # a single manifest per prefix, instead of an object per table
+    gcs.write_object(
+        bucket_name,
+        _path(run_timestamp, _PREFIXES_PLANNED, prefix.strip(const.GS_PREFIX_DELIM)),
+        json.dumps([_name(table_reference) for table_reference in table_references]),
+    )
+
+
+def start(*, bucket_name: str, run_timestamp: int, table_reference: table.TableReference) -> None:
+    """
+    Registers that the sampling of the source table started.
+    It is pending until it is done or failed, see :py:func:`complete`.
+
+    :param bucket_name:
+    :param run_timestamp:
+    :param table_reference:
+    :return:
+    """
+    name = _name(table_reference)
+    gcs.write_object(bucket_name, _path(run_timestamp, _STARTED, name))
+    gcs.write_object(bucket_name, _path(run_timestamp, _PENDING, name))
+    # e.g., a duplicate delivery started after the sample was done
+    if any(
+        gcs.read_object(bucket_name, _path(run_timestamp, kind, name), warn_read_failure=False)
+        is not None
+        for kind in [_DONE, _FAILED]
+    ):
+        gcs.delete_object(bucket_name, _path(run_timestamp, _PENDING, name))
+
+
+def done(*, bucket_name: str, run_timestamp: int, sample_done: command.CommandSampleDone) -> None:
+    """
+    Registers that the sampling is done.
+
+    :param bucket_name:
+    :param run_timestamp:
+    :param sample_done:
+    :return:
+    """
+    name = _name(sample_done.sample_request.table_reference)
+    gcs.write_object(
+        bucket_name, _path(run_timestamp, _DONE, name), json.dumps(sample_done.as_dict())
+    )
+    gcs.delete_object(bucket_name, _path(run_timestamp, _PENDING, name))
+
+
+def fail(
+    *, bucket_name: str, run_timestamp: int, table_reference: table.TableReference, error: str
+) -> None:
+    """
+    Registers that the source table could not be sampled.
+
+    :param bucket_name:
+    :param run_timestamp:
+    :param table_reference:
+    :param error:
+    :return:
+    """
+    name = _name(table_reference)
+    gcs.write_object(bucket_name, _path(run_timestamp, _FAILED, name), error)
+    gcs.delete_object(bucket_name, _path(run_timestamp, _PENDING, name))
+
+
+def complete(*, bucket_name: str, run_timestamp: int) -> Optional[command.CommandRunComplete]:
+    """
+    Checks if all policy project prefixes, and their policy prefixes, were planned
+        and all planned tables are done, failed, or dropped, see :py:func:`shed`.
+    The completion is claimed exclusively, therefore, even if checked concurrently,
+        only one caller gets the summary.
+    While any started table is pending it is not checked any further,
+        i.e., the whole ledger is only listed once the run could be complete.
+
+    :param bucket_name:
+    :param run_timestamp:
+    :return: the run summary if the caller claimed the completion, :py:obj:`None` otherwise.
+    """
+    result = None
+    if _any_name(bucket_name, run_timestamp, _PENDING):
+        return result
+    project_amount = _read_int(bucket_name, _path(run_timestamp, _PROJECTS))
+    if project_amount is None or (
+        len(_list_names(bucket_name, run_timestamp, _PROJECTS_PLANNED)) < project_amount
+    ):
+        return result
+    prefixes_planned = _list_names(bucket_name, run_timestamp, _PREFIXES_PLANNED)
+    if not _list_names(bucket_name, run_timestamp, _PREFIXES).issubset(prefixes_planned):
+        return result
+    planned = _planned_names(bucket_name, run_timestamp, prefixes_planned)
+    done_names = _list_names(bucket_name, run_timestamp, _DONE)
+    # a table can fail and still be done later, e.g., redelivered
+    failed = _list_names(bucket_name, run_timestamp, _FAILED) - done_names
+    # a dropped sample could have been sampled anyway, e.g., delivered twice
+    shed_names = _list_names(bucket_name, run_timestamp, _SHED) - done_names - failed
+    pending = planned - done_names - failed - shed_names
+    _LOGGER.debug(
+        'Run <%s> has <%s> out of <%s> planned tables pending',
+        run_timestamp,
+        len(pending),
+        len(planned),
+    )
+    if not pending and gcs.write_object(
+        bucket_name, _path(run_timestamp, _COMPLETE), if_absent=True
+    ):
+        result = _summary(
+            bucket_name,
+            run_timestamp,
+            planned=len(planned),
+            started=len(_list_names(bucket_name, run_timestamp, _STARTED)),
+            done_names=done_names,
+            failed=len(failed),
+            shed_amount=len(shed_names),
+        )
+        gcs.write_object(bucket_name, _path(run_timestamp, _COMPLETE), json.dumps(result.as_dict()))
+        _LOGGER.info('Run <%s> is complete. Summary: %s', run_timestamp, result)
+    return result
+
+
+def set_current_run(*, bucket_name: str, run_timestamp: int) -> bool:
+    """
+    Makes the run the current one, unless there is a more recent one already,
+        e.g., a duplicate delivery of an older :py:class:`command.CommandStart`.
+
+    It only overwrites the run it read, i.e., if it changed concurrently,
+        it is read and compared again.
+
+    :param bucket_name:
+    :param run_timestamp:
+    :return: if it is now the current run.
+    """
+    while True:
+        content, generation = gcs.read_object_and_generation(bucket_name, _current_run_path())
+        current_run_timestamp = int(content) if content else None
+        if current_run_timestamp is not None and current_run_timestamp >= run_timestamp:
+            return current_run_timestamp == run_timestamp
+        # a concurrent writer only ever moves the current run forward, therefore it settles
+        if gcs.write_object(
+            bucket_name, _current_run_path(), str(run_timestamp), if_generation_match=generation
+        ):
+            return True
+        _LOGGER.debug('Current run changed concurrently, comparing run <%s> again', run_timestamp)
+
+
+def current_run(*, bucket_name: str) -> Optional[int]:
+    """
+    The current run, see :py:func:`set_current_run`.
+
+    :param bucket_name:
+    :return: :py:obj:`None` if there is none.
+    """
+    return _read_int(bucket_name, _current_run_path())
+
+
+def shed(*, bucket_name: str, run_timestamp: int, value: command.CommandBase) -> None:
+    """
+    Registers that the command was dropped because its run was superseded.
+    The same command, e.g., delivered twice, is only registered once.
+    A dropped sample command accounts for its table, i.e., the run can still complete,
+        see :py:func:`complete`.
+
+    :param bucket_name:
+    :param run_timestamp:
+    :param value:
+    :return:
+    """
+    if value.type == command.CommandType.SAMPLE_START.value:
+        name = _name(value.sample_request.table_reference)
+    else:
+        content = value.as_dict()
+        # the timestamp changes every time the command is sent
+        del content[command.CommandBase.timestamp.__name__]
+        digest = hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+        name = f'{value.type}_{digest}'
+    gcs.write_object(bucket_name, _path(run_timestamp, _SHED, name))
+
+
+def _summary(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    run_timestamp: int,
+    *,
+    planned: int,
+    started: int,
+    done_names: Set[str],
+    failed: int,
+    shed_amount: int,
+) -> command.CommandRunComplete:
+    samples_done = [
+        command.CommandSampleDone.from_dict(
+            json.loads(gcs.read_object(bucket_name, _path(run_timestamp, _DONE, name)))
+        )
+        for name in done_names
+    ]
+    durations = [
+        sample_done.end_timestamp - sample_done.start_timestamp for sample_done in samples_done
+    ]
+    end_timestamp = max(
+        (sample_done.end_timestamp for sample_done in samples_done), default=run_timestamp
+    )
+    kwargs = {
+        command.CommandRunComplete.type.__name__: command.CommandType.RUN_COMPLETE.value,
+        command.CommandRunComplete.timestamp.__name__: run_timestamp,
+        command.CommandRunComplete.run_timestamp.__name__: run_timestamp,
+        command.CommandRunComplete.planned.__name__: planned,
+        command.CommandRunComplete.started.__name__: started,
+        command.CommandRunComplete.done.__name__: len(samples_done),
+        command.CommandRunComplete.failed.__name__: failed,
+        command.CommandRunComplete.shed.__name__: shed_amount,
+        command.CommandRunComplete.total_bytes_billed.__name__: sum(
+            sample_done.total_bytes_billed or 0 for sample_done in samples_done
+        ),
+        command.CommandRunComplete.slot_ms.__name__: sum(
+            sample_done.slot_ms or 0 for sample_done in samples_done
+        ),
+        command.CommandRunComplete.total_sample_duration.__name__: sum(durations),
+        command.CommandRunComplete.max_sample_duration.__name__: max(durations, default=0),
+        command.CommandRunComplete.duration.__name__: max(0, end_timestamp - run_timestamp),
+    }
+    return command.CommandRunComplete(**kwargs)
+
+
+def remove_before(*, bucket_name: str, timestamp: int) -> int:
+    """
+    Removes the ledgers of all runs before `timestamp`.
+
+    :param bucket_name:
+    :param timestamp: UTC epoch in seconds.
+    :return: how many objects were removed.
+    """
+    result = gcs.delete_objects_before(bucket_name, const.RUN_LEDGER_PREFIX, timestamp)
+    _LOGGER.debug(
+        'Removed <%s> run ledger objects before <%s> in bucket <%s>', result, timestamp, bucket_name
+    )
+    return result
+
+
+def _read_int(bucket_name: str, path: str) -> Optional[int]:
+    content = gcs.read_object(bucket_name, path, warn_read_failure=False)
+    return int(content) if content else None
+
+
+def _list_names(bucket_name: str, run_timestamp: int, kind: str) -> Set[str]:
+    prefix = _path(run_timestamp, kind) + const.GS_PREFIX_DELIM
+    return {path[len(prefix) :] for path in gcs.list_objects(bucket_name, prefix=prefix)}
+
+
+def _any_name(bucket_name: str, run_timestamp: int, kind: str) -> bool:
+    prefix = _path(run_timestamp, kind) + const.GS_PREFIX_DELIM
+    return next(iter(gcs.list_objects(bucket_name, prefix=prefix)), None) is not None
+
+
+def _planned_names(bucket_name: str, run_timestamp: int, prefixes: Iterable[str]) -> Set[str]:
+    result = set()
+    for prefix in prefixes:
+        content = gcs.read_object(
+            bucket_name, _path(run_timestamp, _PREFIXES_PLANNED, prefix), warn_read_failure=False
+        )
+        # a sharded prefix has no tables of its own, see plan_shards
+        result.update(json.loads(content) if content else [])
+    return result
+
+
+def _name(table_reference: table.TableReference) -> str:
+    # the location is not known yet if the policy could not be read
+    return table_reference.table_fqn_id(include_location=False)
+
+
+def _current_run_path() -> str:
+    return const.GS_PREFIX_DELIM.join([const.RUN_LEDGER_PREFIX, _CURRENT_RUN])
+
+
+def _path(run_timestamp: int, *names: str) -> str:
+    return const.GS_PREFIX_DELIM.join([const.RUN_LEDGER_PREFIX, str(run_timestamp), *names])
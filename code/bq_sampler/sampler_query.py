@@ -1,4 +1,5 @@
 # vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=too-many-lines
 # pylint: disable=line-too-long
 """
 Reads an object from `Cloud Big Query`_ using `Python client`_.
@@ -7,13 +8,18 @@ Reads an object from `Cloud Big Query`_ using `Python client`_.
 .. _Python client: https://googleapis.dev/python/bigquery/latest/index.html
 """
 # pylint: enable=line-too-long
+from datetime import datetime
+import hashlib
 import math
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from typing import Any, Dict, Generator, List, Optional, Sequence, Tuple
 import uuid
 
-from bq_sampler import const, logger
-from bq_sampler.entity import table
-from bq_sampler.gcp import bq
+from google.cloud import bigquery_datatransfer
+
+from bq_sampler import const, logger, sampler_transfer
+from bq_sampler.entity import table, transfer
+from bq_sampler.gcp import bq, gcs
 
 _LOGGER = logger.get(__name__)
 
@@ -25,6 +31,7 @@ _BQ_SOURCE_TABLE_PARAM: str = 'source_table'
 _BQ_ORDER_BY_COLUMN: str = 'column_name'
 _BQ_ORDER_BY_DIRECTION: str = 'direction'
 _BQ_TARGET_TABLE_PARAM: str = 'target_table'
+_BQ_CLONEABLE_TABLE_TYPE: str = 'TABLE'
 
 _BQ_RANDOM_SAMPLE_QUERY_RAND_TMPL: str = f"""
     SELECT * FROM `%({_BQ_SOURCE_TABLE_PARAM})s`
@@ -68,41 +75,12 @@ Uses `SELECT`_ statement `ORDER BY`_ clause.
 """
 # pylint: enable=line-too-long
 
-_BQ_INSERT_RANDOM_SAMPLE_QUERY_RAND_TMPL: str = (
-    f'INSERT INTO `%({_BQ_TARGET_TABLE_PARAM})s`' + _BQ_RANDOM_SAMPLE_QUERY_RAND_TMPL
-)
+_BQ_TRUNCATE_TABLE_QUERY_TMPL: str = f'TRUNCATE TABLE `%({_BQ_TARGET_TABLE_PARAM})s`'
 # pylint: disable=line-too-long
 """
-Uses `INSERT`_ statements combined with `SELECT`_ statement using `TABLESAMPLE`_ operator.
+Uses `TRUNCATE TABLE`_ statement to empty a table without dropping it.
 
-.. _INSERT: https://cloud.google.com/bigquery/docs/reference/standard-sql/dml-syntax#insert_statement
-.. _SELECT: https://cloud.google.com/bigquery/docs/reference/standard-sql/query-syntax#select_list
-.. _RAND: https://cloud.google.com/bigquery/docs/reference/standard-sql/functions-and-operators#rand
-"""
-# pylint: enable=line-too-long
-_BQ_INSERT_RANDOM_SAMPLE_QUERY_TMPL: str = (
-    f'INSERT INTO `%({_BQ_TARGET_TABLE_PARAM})s`' + _BQ_RANDOM_SAMPLE_QUERY_TMPL
-)
-# pylint: disable=line-too-long
-"""
-Uses `INSERT`_ statements combined with `SELECT`_ statement using `TABLESAMPLE`_ operator.
-
-.. _INSERT: https://cloud.google.com/bigquery/docs/reference/standard-sql/dml-syntax#insert_statement
-.. _SELECT: https://cloud.google.com/bigquery/docs/reference/standard-sql/query-syntax#select_list
-.. _TABLESAMPLE: https://cloud.google.com/bigquery/docs/reference/standard-sql/query-syntax#tablesample_operator
-"""
-# pylint: enable=line-too-long
-
-_BQ_INSERT_SORTED_SAMPLE_QUERY_TMPL: str = (
-    f'INSERT INTO `%({_BQ_TARGET_TABLE_PARAM})s`' + _BQ_SORTED_SAMPLE_QUERY_TMPL
-)
-# pylint: disable=line-too-long
-"""
-Uses `INSERT`_ statements combined with `SELECT`_ statement using `ORDER BY`_ clause.
-
-.. _INSERT: https://cloud.google.com/bigquery/docs/reference/standard-sql/dml-syntax#insert_statement
-.. _SELECT: https://cloud.google.com/bigquery/docs/reference/standard-sql/query-syntax#select_list
-.. _ORDER BY: https://cloud.google.com/bigquery/docs/reference/standard-sql/query-syntax#order_by_clause
+.. _TRUNCATE TABLE: https://cloud.google.com/bigquery/docs/reference/standard-sql/dml-syntax#truncate_table_statement
 """
 # pylint: enable=line-too-long
 
@@ -117,52 +95,86 @@ def row_count(table_ref: table.TableReference) -> int:
     return bq.row_count(table_fqn_id=table_ref.table_fqn_id())
 
 
-def drop_all_sample_tables(
-    *,
-    project_id: str,
-    labels: Optional[Dict[str, str]] = None,
-) -> None:
+def estimated_sample_cost(table_sample: table.TableSample) -> float:
     """
-    Just a wrapper for :py:func:`bq.drop_all_tables_by_labels`.
+    Estimates how expensive it is to sample `table_sample`, in bytes read.
+    It is meant to rank samples among each other, not to predict the billed bytes:
+    * a random sample reads about its `TABLESAMPLE` percentage of the source table;
+    * a sorted sample reads, and sorts, the whole source table,
+        see :py:data:`const.BQ_SORTED_SAMPLE_COST_FACTOR`.
+    A view has no size, therefore its rows are used instead.
+
+    :param table_sample: a compliant sample, i.e., with a row count.
+    :return:
+    """
+    table_fqn_id = table_sample.table_reference.table_fqn_id()
+    result = float(
+        bq.num_bytes(table_fqn_id=table_fqn_id) or bq.row_count(table_fqn_id=table_fqn_id)
+    )
+    if table.SortType.from_str(table_sample.sample.spec.type) == table.SortType.SORTED:
+        result *= const.BQ_SORTED_SAMPLE_COST_FACTOR
+    else:
+        amount = table_sample.sample.size.count or 0
+        result *= _int_percent_for_tablesample_stmt(table_fqn_id, amount) / 100.0
+    return result
+
+
+def list_all_sample_datasets(*, project_id: str) -> Generator[str, None, None]:
+    """
+    Lists the IDs of all datasets labelled with :py:data:`const.DEFAULT_CREATE_TABLE_LABELS`,
+        i.e., all datasets created by the sampler.
 
     :param project_id:
-    :param labels:
     :return:
     """
-    bq.drop_all_tables_by_labels(project_id=project_id, labels=labels)
+    for dataset_item in bq.list_all_datasets(
+        project_id=project_id, labels=const.DEFAULT_CREATE_TABLE_LABELS
+    ):
+        yield dataset_item.dataset_id
 
 
-def remove_all_empty_sample_datasets(
+def clean_up_sample_dataset(
     *,
     project_id: str,
-    labels: Optional[Dict[str, str]] = None,
+    dataset_id: str,
+    created_before: Optional[datetime] = None,
+    keep_table_ids: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
 ) -> None:
     """
-    Just a wrapper for :py:func:`bq.remove_all_empty_datasets_by_labels`.
+    Just a wrapper for :py:func:`bq.clean_up_dataset_by_labels`.
 
     :param project_id:
-    :param labels:
+    :param dataset_id:
+    :param created_before:
+    :param keep_table_ids:
+    :param max_workers:
     :return:
     """
-    bq.remove_all_empty_datasets_by_labels(project_id=project_id, labels=labels)
+    bq.clean_up_dataset_by_labels(
+        project_id=project_id,
+        dataset_id=dataset_id,
+        created_before=created_before,
+        keep_table_ids=keep_table_ids,
+        max_workers=max_workers,
+    )
 
 
-def remove_all_transfer_config(
-    *,
-    project_id: str,
-    location: str,
-) -> None:
+def list_all_transfer_config_names(*, project_id: str, location: str) -> Generator[str, None, None]:
     """
-    Just a wrapper for :py:func:`bq.remove_all_transfer_config_by_display_name_prefix`.
+    Lists the names of all transfer configs created by the sampler.
 
     :param project_id:
     :param location:
     :return:
     """
-    bq.remove_all_transfer_config_by_display_name_prefix(project_id=project_id, location=location)
+    for transfer_config in bq.list_transfer_config_by_display_name_prefix(
+        project_id=project_id, location=location
+    ):
+        yield transfer_config.name
 
 
-def create_table_with_random_sample(
+def create_table_with_random_sample(  # pylint: disable=too-many-arguments
     *,
     source_table_ref: table.TableReference,
     target_table_ref: table.TableReference,
@@ -170,6 +182,14 @@ def create_table_with_random_sample(
     labels: Optional[Dict[str, str]] = None,
     notification_pubsub_topic: Optional[str] = None,
     recreate_table: Optional[bool] = True,
+    clone_full_table: Optional[bool] = True,
+    table_expiration_ms: Optional[int] = None,
+    staging_table_expiration_ms: Optional[
+        int
+    ] = const.TRANSFER_TEMP_DATASET_DEFAULT_TABLE_EXPIRATION_MS,
+    staging_dataset_id: Optional[str] = None,
+    extract_bucket_name: Optional[str] = None,
+    transfer_tracker_bucket_name: Optional[str] = None,
 ) -> int:
     """
     Will create the target table and put the source table sample directly into it.
@@ -182,6 +202,24 @@ def create_table_with_random_sample(
     :param notification_pubsub_topic:
     :param recreate_table: if :py:obj:`True` (default) will drop the table prior to create it.
         If the table does not exist, it will ignore the drop.
+        Otherwise, an existing table is kept and its content overwritten by the sample.
+    :param clone_full_table: if :py:obj:`True` (default) and the sample covers the whole table,
+        in the same location, the target is created as a table clone instead of a copy.
+    :param table_expiration_ms: if given, the target table expires this amount of milliseconds
+        after being sampled. Default is to never expire.
+    :param staging_table_expiration_ms: default table expiration, in milliseconds,
+        of the staging dataset used for cross-location sampling.
+        BigQuery removes orphan staging tables after it.
+    :param staging_dataset_id: if given, and the locations differ,
+        the sample is staged in this (shared) dataset and not transferred.
+        The transfer is then left to :py:func:`transfer_staging_dataset`.
+    :param extract_bucket_name: if given, and the locations differ,
+        a small staging table (up to :py:data:`const.BQ_EXTRACT_LOAD_MAX_BYTES`)
+        is extracted into this bucket and loaded into the target,
+        instead of using a (much slower) transfer run.
+        The bucket must be readable and writable from both locations, e.g., multi-region.
+    :param transfer_tracker_bucket_name: if given, a transfer run, if triggered,
+        is tracked in this bucket, see :py:mod:`sampler_transfer`.
     :return: amount of rows inserted
     """
     # validate input
@@ -189,14 +227,83 @@ def create_table_with_random_sample(
     _validate_amount(amount)
     labels = _add_standard_labels(source_table_ref, labels)
     # logic
-    return _create_table_with_random_sample(
+    if clone_full_table and _clone_table_if_full_sample(
         source_table_ref=source_table_ref,
         target_table_ref=target_table_ref,
         amount=amount,
         labels=labels,
-        notification_pubsub_topic=notification_pubsub_topic,
-        recreate_table=recreate_table,
-    )
+        table_expiration_ms=table_expiration_ms,
+    ):
+        result = row_count(target_table_ref)
+    else:
+        result = _create_table_with_random_sample(
+            source_table_ref=source_table_ref,
+            target_table_ref=target_table_ref,
+            amount=amount,
+            labels=labels,
+            notification_pubsub_topic=notification_pubsub_topic,
+            recreate_table=recreate_table,
+            table_expiration_ms=table_expiration_ms,
+            staging_table_expiration_ms=staging_table_expiration_ms,
+            staging_dataset_id=staging_dataset_id,
+            extract_bucket_name=extract_bucket_name,
+            transfer_tracker_bucket_name=transfer_tracker_bucket_name,
+        )
+    return result
+
+
+def _clone_table_if_full_sample(
+    *,
+    source_table_ref: table.TableReference,
+    target_table_ref: table.TableReference,
+    amount: int,
+    labels: Optional[Dict[str, str]] = None,
+    table_expiration_ms: Optional[int] = None,
+) -> bool:
+    """
+    If the sample covers all rows of the source table and both tables are in the same location,
+        the target is created using :py:func:`bq.clone_table`.
+
+    :return: :py:obj:`True` if the target table was created as a clone.
+    """
+    result = _is_full_sample_clone_eligible(source_table_ref, target_table_ref, amount)
+    if result:
+        _LOGGER.info(
+            'Sample of <%s> rows covers the whole table <%s>. Cloning it into <%s>',
+            amount,
+            source_table_ref.table_fqn_id(),
+            target_table_ref.table_fqn_id(),
+        )
+        try:
+            # the existing sample table is replaced, never missing, see bq.clone_table
+            bq.clone_table(
+                source_table_fqn_id=source_table_ref.table_fqn_id(),
+                target_table_fqn_id=target_table_ref.table_fqn_id(),
+                labels=labels,
+                replace=True,
+                expiration_ms=table_expiration_ms,
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            raise RuntimeError(
+                f'Could not clone table {source_table_ref.table_fqn_id()} '
+                f'into {target_table_ref.table_fqn_id()}. Error: {err}'
+            ) from err
+    return result
+
+
+def _is_full_sample_clone_eligible(
+    source_table_ref: table.TableReference,
+    target_table_ref: table.TableReference,
+    amount: int,
+) -> bool:
+    result = False
+    if source_table_ref.location == target_table_ref.location:
+        src_table = bq.table(table_fqn_id=source_table_ref.table_fqn_id())
+        # views, external tables, etc. cannot be cloned
+        if src_table.table_type == _BQ_CLONEABLE_TABLE_TYPE:
+            size = bq.row_count(table_fqn_id=source_table_ref.table_fqn_id())
+            result = isinstance(size, int) and 0 < size <= amount
+    return result
 
 
 def _validate_amount(amount: int) -> None:
@@ -244,7 +351,7 @@ def _validate_table_reference(arg_name: str, table_ref: table.TableReference) ->
         )
 
 
-def _create_table_with_random_sample(
+def _create_table_with_random_sample(  # pylint: disable=too-many-arguments
     *,
     source_table_ref: table.TableReference,
     target_table_ref: table.TableReference,
@@ -252,6 +359,11 @@ def _create_table_with_random_sample(
     labels: Optional[Dict[str, str]] = None,
     notification_pubsub_topic: Optional[str] = None,
     recreate_table: Optional[bool] = True,
+    table_expiration_ms: Optional[int] = None,
+    staging_table_expiration_ms: Optional[int] = None,
+    staging_dataset_id: Optional[str] = None,
+    extract_bucket_name: Optional[str] = None,
+    transfer_tracker_bucket_name: Optional[str] = None,
 ) -> int:
     # setup
     staging_target_table_ref = _pre_sample_setup(
@@ -259,6 +371,9 @@ def _create_table_with_random_sample(
         target_table_ref=target_table_ref,
         labels=labels,
         recreate_table=recreate_table,
+        table_expiration_ms=table_expiration_ms,
+        staging_table_expiration_ms=staging_table_expiration_ms,
+        staging_dataset_id=staging_dataset_id,
     )
     # insert data
     percent_int = _int_percent_for_tablesample_stmt(source_table_ref.table_fqn_id(), amount)
@@ -270,6 +385,7 @@ def _create_table_with_random_sample(
             amount,
             percent_int,
         )
+        _truncate_table_if_not_recreated(target_table_ref, recreate_table)
     else:
         query_placeholders = _named_placeholders(  # pylint: disable=missing-kwoa
             source_table_fqn_id=source_table_ref.table_fqn_id(False),
@@ -278,21 +394,44 @@ def _create_table_with_random_sample(
             percent_int=percent_int,
         )
         _sample_query_execution(
-            query=_BQ_INSERT_RANDOM_SAMPLE_QUERY_TMPL % query_placeholders,
-            fallback_query=_BQ_INSERT_RANDOM_SAMPLE_QUERY_RAND_TMPL % query_placeholders,
+            query=_BQ_RANDOM_SAMPLE_QUERY_TMPL % query_placeholders,
+            fallback_query=_BQ_RANDOM_SAMPLE_QUERY_RAND_TMPL % query_placeholders,
             staging_target_table_ref=staging_target_table_ref,
             target_table_ref=target_table_ref,
             notification_pubsub_topic=notification_pubsub_topic,
+            transfer_staging=staging_dataset_id is None,
+            extract_bucket_name=extract_bucket_name,
+            transfer_tracker_bucket_name=transfer_tracker_bucket_name,
         )
     return row_count(target_table_ref)
 
 
-def _pre_sample_setup(
+def _truncate_table_if_not_recreated(
+    target_table_ref: table.TableReference, recreate_table: Optional[bool] = True
+) -> None:
+    """
+    An empty sample still needs to remove the content of a target table that was kept.
+    """
+    if not recreate_table:
+        query_placeholders = _named_placeholders(  # pylint: disable=missing-kwoa
+            target_table_fqn_id=target_table_ref.table_fqn_id(False),
+        )
+        bq.query_job_result(
+            query=_BQ_TRUNCATE_TABLE_QUERY_TMPL % query_placeholders,
+            project_id=target_table_ref.project_id,
+            location=target_table_ref.location,
+        )
+
+
+def _pre_sample_setup(  # pylint: disable=too-many-arguments
     *,
     source_table_ref: table.TableReference,
     target_table_ref: table.TableReference,
     labels: Optional[Dict[str, str]] = None,
     recreate_table: Optional[bool] = True,
+    table_expiration_ms: Optional[int] = None,
+    staging_table_expiration_ms: Optional[int] = None,
+    staging_dataset_id: Optional[str] = None,
 ) -> table.TableReference:
     # create target table
     _create_table(
@@ -300,6 +439,7 @@ def _pre_sample_setup(
         target_table_fqn_id=target_table_ref.table_fqn_id(),
         labels=labels,
         recreate_table=recreate_table,
+        expiration_ms=table_expiration_ms,
     )
     # return target staging table
     return _staging_target_table_ref(
@@ -307,15 +447,19 @@ def _pre_sample_setup(
         target_table_ref=target_table_ref,
         labels=labels,
         recreate_table=recreate_table,
+        staging_table_expiration_ms=staging_table_expiration_ms,
+        staging_dataset_id=staging_dataset_id,
     )
 
 
-def _create_table(
+def _create_table(  # pylint: disable=too-many-arguments
     *,
     source_table_fqn_id: str,
     target_table_fqn_id: str,
     labels: Optional[Dict[str, str]] = None,
     recreate_table: Optional[bool] = True,
+    expiration_ms: Optional[int] = None,
+    dataset_default_table_expiration_ms: Optional[int] = None,
 ) -> None:
     src_table = bq.table(table_fqn_id=source_table_fqn_id)
     try:
@@ -324,30 +468,36 @@ def _create_table(
             schema=src_table.schema,
             labels=labels,
             drop_table_before=recreate_table,
+            expiration_ms=expiration_ms,
+            dataset_default_table_expiration_ms=dataset_default_table_expiration_ms,
         )
     except Exception as err:  # pylint: disable=broad-except
         raise RuntimeError(f'Could not create table {target_table_fqn_id}. Error: {err}') from err
 
 
-def _staging_target_table_ref(
+def _staging_target_table_ref(  # pylint: disable=too-many-arguments
     *,
     source_table_ref: table.TableReference,
     target_table_ref: table.TableReference,
     labels: Optional[Dict[str, str]] = None,
     recreate_table: Optional[bool] = True,
+    staging_table_expiration_ms: Optional[int] = None,
+    staging_dataset_id: Optional[str] = None,
 ) -> table.TableReference:
     result = target_table_ref
     # for different locations we need to have a stage table for sampling
     # and then transfer to the correct region
     if source_table_ref.location != target_table_ref.location:
-        dataset_id = _staging_dataset_id(source_table_ref, target_table_ref)
+        if staging_dataset_id is None:
+            staging_dataset_id = _staging_dataset_id(source_table_ref, target_table_ref)
         # create temp table on different temp dataset in the same location
-        result = target_table_ref.clone(dataset_id=dataset_id, location=source_table_ref.location)
+        result = _staging_table_ref(source_table_ref, target_table_ref, staging_dataset_id)
         _create_table(
             source_table_fqn_id=source_table_ref.table_fqn_id(),
             target_table_fqn_id=result.table_fqn_id(),
-            labels=labels,
+            labels=_add_expires_at_label(labels, staging_table_expiration_ms),
             recreate_table=recreate_table,
+            dataset_default_table_expiration_ms=staging_table_expiration_ms,
         )
         _LOGGER.info(
             "Defined staging target for x-location sampling. Staging: %s. Actual Target: %s",
@@ -357,6 +507,154 @@ def _staging_target_table_ref(
     return result
 
 
+def _add_expires_at_label(
+    value: Optional[Dict[str, str]] = None, expiration_ms: Optional[int] = None
+) -> Optional[Dict[str, str]]:
+    result = value
+    if expiration_ms is not None:
+        expires_at = int(time.time() + expiration_ms / 1000)
+        result = {
+            **(value or {}),
+            const.TRANSFER_TEMP_DATASET_EXPIRES_AT_LABEL: str(expires_at),
+        }
+    return result
+
+
+def _staging_table_ref(
+    source_table_ref: table.TableReference,
+    target_table_ref: table.TableReference,
+    staging_dataset_id: str,
+) -> table.TableReference:
+    return target_table_ref.clone(dataset_id=staging_dataset_id, location=source_table_ref.location)
+
+
+def shared_staging_dataset_id(
+    *,
+    source_location: str,
+    target_dataset_id: str,
+    run_timestamp: int,
+    source_table_fqn_ids: List[str],
+) -> str:
+    """
+    The staging dataset ID to be shared by all cross-location samples
+        from `source_location` into `target_dataset_id`.
+    The ID is the same for the same run and group of source tables,
+        i.e., a retry shares the staging dataset of the attempt it retries.
+    See `staging_dataset_id` argument in :py:func:`create_table_with_random_sample`.
+
+    :param source_location:
+    :param target_dataset_id:
+    :param run_timestamp:
+    :param source_table_fqn_ids: the tables sharing the staging dataset.
+    :return:
+    """
+    group_digest = hashlib.sha256(
+        '\n'.join(sorted(source_table_fqn_ids)).encode('utf-8')
+    ).hexdigest()
+    return bq.bigquery_valid_string(
+        f'{const.TRANSFER_TEMP_DATASET_NAME_PREFIX}{target_dataset_id[0:200]}'
+        f'_{source_location[0:200]}'
+        f'_{run_timestamp}'
+        f'_{group_digest[0:16]}'
+    )
+
+
+def transfer_staging_dataset(  # pylint: disable=too-many-arguments
+    *,
+    source_table_ref: table.TableReference,
+    target_table_ref: table.TableReference,
+    staging_dataset_id: str,
+    notification_pubsub_topic: Optional[str] = None,
+    transfer_tracker_bucket_name: Optional[str] = None,
+    extract_bucket_name: Optional[str] = None,
+    persistent_transfer_config: Optional[bool] = False,
+) -> None:
+    """
+    Transfers all samples staged in `staging_dataset_id` into the target table dataset,
+        with a single transfer.
+
+    :param source_table_ref: any of the source tables staged.
+    :param target_table_ref: any of the target tables staged.
+    :param staging_dataset_id:
+    :param notification_pubsub_topic:
+    :param transfer_tracker_bucket_name: see :py:func:`create_table_with_random_sample`.
+    :param extract_bucket_name: see :py:func:`create_table_with_random_sample`.
+        Only to be given if the staging dataset holds a single table.
+    :param persistent_transfer_config: if :py:obj:`True` the transfer config is kept,
+        to be reused by the next transfer from the same staging dataset,
+        see :py:func:`persistent_staging_dataset_id`.
+    :return:
+    """
+    _validate_table_reference('source_table_ref', source_table_ref)
+    _validate_table_reference('target_table_ref', target_table_ref)
+    _LOGGER.info(
+        'Transferring all samples staged in <%s> into dataset <%s.%s>@<%s>',
+        staging_dataset_id,
+        target_table_ref.project_id,
+        target_table_ref.dataset_id,
+        target_table_ref.location,
+    )
+    _transfer_content_x_location(
+        source_table_ref=_staging_table_ref(source_table_ref, target_table_ref, staging_dataset_id),
+        target_table_ref=target_table_ref,
+        notification_pubsub_topic=notification_pubsub_topic,
+        extract_bucket_name=extract_bucket_name,
+        transfer_tracker_bucket_name=transfer_tracker_bucket_name,
+        persistent_transfer_config=persistent_transfer_config,
+    )
+
+
+def persistent_staging_dataset_id(
+    *, source_table_ref: table.TableReference, target_table_ref: table.TableReference
+) -> str:
+    """
+    Unlike :py:func:`shared_staging_dataset_id`, the ID is the same in every run,
+        i.e., there is one staging dataset per target table and source location,
+        so its transfer config can be reused across runs.
+
+    :param source_table_ref:
+    :param target_table_ref:
+    :return:
+    """
+    return bq.bigquery_valid_string(
+        f'{const.TRANSFER_PERSISTENT_DATASET_NAME_PREFIX}{target_table_ref.dataset_id[0:200]}'
+        f'_{target_table_ref.table_id[0:200]}'
+        f'_{source_table_ref.location[0:200]}'
+    )
+
+
+def is_persistent_staging_dataset(dataset_id: str) -> bool:
+    """
+    If the dataset ID was created by :py:func:`persistent_staging_dataset_id`.
+
+    :param dataset_id:
+    :return:
+    """
+    return isinstance(dataset_id, str) and dataset_id.startswith(
+        const.TRANSFER_PERSISTENT_DATASET_NAME_PREFIX
+    )
+
+
+def drop_staged_table(
+    *,
+    source_table_ref: table.TableReference,
+    target_table_ref: table.TableReference,
+    staging_dataset_id: str,
+) -> None:
+    """
+    Removes the staging table, if existent, for a sample that could not be completed.
+    This prevents the transfer of the staging dataset
+        from overwriting the target table with an incomplete sample.
+
+    :param source_table_ref:
+    :param target_table_ref:
+    :param staging_dataset_id:
+    :return:
+    """
+    staging_table_ref = _staging_table_ref(source_table_ref, target_table_ref, staging_dataset_id)
+    bq.drop_table(table_fqn_id=staging_table_ref.table_fqn_id(), not_found_ok=True)
+
+
 def _staging_dataset_id(
     source_table_ref: table.TableReference,
     target_table_ref: table.TableReference,
@@ -408,19 +706,30 @@ def _named_placeholders(  # pylint: disable=too-many-arguments
     return result
 
 
-def _sample_query_execution(
+def _sample_query_execution(  # pylint: disable=too-many-arguments
     *,
     query: str,
     staging_target_table_ref: table.TableReference,
     target_table_ref: table.TableReference,
     fallback_query: Optional[str] = None,
     notification_pubsub_topic: Optional[str] = None,
+    transfer_staging: Optional[bool] = True,
+    extract_bucket_name: Optional[str] = None,
+    transfer_tracker_bucket_name: Optional[str] = None,
 ) -> None:
+    """
+    The query results overwrite the (staging) target table content (`WRITE_TRUNCATE`),
+        therefore an existing target does not need to be dropped before sampling.
+    A shared staging table is not transferred here (`transfer_staging`),
+        see :py:func:`transfer_staging_dataset`.
+    """
+    destination_table_fqn_id = staging_target_table_ref.table_fqn_id()
     try:
         bq.query_job_result(
             query=query,
             project_id=staging_target_table_ref.project_id,
             location=staging_target_table_ref.location,
+            destination_table_fqn_id=destination_table_fqn_id,
         )
     except Exception as err_query:  # pylint: disable=broad-except
         if fallback_query:
@@ -435,6 +744,7 @@ def _sample_query_execution(
                     query=fallback_query,
                     project_id=staging_target_table_ref.project_id,
                     location=staging_target_table_ref.location,
+                    destination_table_fqn_id=destination_table_fqn_id,
                 )
             except Exception as err_fallback_query:  # pylint: disable=broad-except
                 raise RuntimeError(
@@ -446,31 +756,140 @@ def _sample_query_execution(
                 f'Could not execute query and no fallback provided. Query: {query}. '
                 f'Error: {err_query}'
             ) from err_query
-    if staging_target_table_ref != target_table_ref:
+    if transfer_staging and staging_target_table_ref != target_table_ref:
         # since there was a staging table, we need to transfer to the target table
         _transfer_content_x_location(
             source_table_ref=staging_target_table_ref,
             target_table_ref=target_table_ref,
             notification_pubsub_topic=notification_pubsub_topic,
+            extract_bucket_name=extract_bucket_name,
+            transfer_tracker_bucket_name=transfer_tracker_bucket_name,
         )
 
 
-def _transfer_content_x_location(
+def _transfer_content_x_location(  # pylint: disable=too-many-arguments
     *,
     source_table_ref: table.TableReference,
     target_table_ref: table.TableReference,
     notification_pubsub_topic: Optional[str] = None,
+    extract_bucket_name: Optional[str] = None,
+    transfer_tracker_bucket_name: Optional[str] = None,
+    persistent_transfer_config: Optional[bool] = False,
 ) -> None:
+    """
+    Only a dedicated staging dataset, i.e., with a single table,
+        can be moved using `extract_bucket_name`.
+    """
     if source_table_ref.location != target_table_ref.location:
         # A transfer needs to happen
-        bq.cross_location_copy(
-            source_table_fqn_id=source_table_ref.table_fqn_id(),
-            target_table_fqn_id=target_table_ref.table_fqn_id(),
-            notification_pubsub_topic=notification_pubsub_topic,
+        if not extract_bucket_name or not _extract_and_load_if_small(
+            source_table_ref, target_table_ref, extract_bucket_name
+        ):
+            runs = bq.cross_location_copy(
+                source_table_fqn_id=source_table_ref.table_fqn_id(),
+                target_table_fqn_id=target_table_ref.table_fqn_id(),
+                notification_pubsub_topic=notification_pubsub_topic,
+                reuse_transfer_config=persistent_transfer_config,
+            )
+            if transfer_tracker_bucket_name:
+                _track_transfer_runs(transfer_tracker_bucket_name, source_table_ref, runs)
+
+
+def _track_transfer_runs(
+    bucket_name: str,
+    staging_table_ref: table.TableReference,
+    runs: Sequence[bigquery_datatransfer.TransferRun],
+) -> None:
+    """
+    A tracking failure must not fail the sample, whose transfer is already running.
+    The worst case is the same as without tracking: relying on the done notification alone.
+    """
+    for run in runs:
+        try:
+            sampler_transfer.track(
+                bucket_name=bucket_name,
+                value=transfer.TrackedTransfer(
+                    transfer_config_name=const.TRANSFER_CONFIG_FROM_RUN_NAME_RE.match(
+                        run.name
+                    ).group(1),
+                    run_name=run.name,
+                    source_project_id=staging_table_ref.project_id,
+                    source_dataset_id=staging_table_ref.dataset_id,
+                    triggered_timestamp=int(time.time()),
+                ),
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error('Could not track transfer run <%s>. Error: %s', run.name, err)
+
+
+def _extract_and_load_if_small(
+    staging_table_ref: table.TableReference,
+    target_table_ref: table.TableReference,
+    bucket_name: str,
+) -> bool:
+    """
+    A small staging table is extracted into Cloud Storage and loaded into the target table,
+        which takes seconds, instead of the minutes of a transfer run.
+    Since there is no transfer run, its dedicated staging dataset is removed right away,
+        unless it is a persistent one, see :py:func:`persistent_staging_dataset_id`,
+        in which case only the staging table is dropped.
+
+    :return: :py:obj:`False` if the table is too big or it failed,
+        i.e., it still needs to be transferred.
+    """
+    result = False
+    try:
+        size = bq.table(table_fqn_id=staging_table_ref.table_fqn_id()).num_bytes
+    except Exception as err:  # pylint: disable=broad-except
+        _LOGGER.warning(
+            'Could not get the size of <%s>. Falling back to a transfer. Error: %s',
+            staging_table_ref.table_fqn_id(),
+            err,
+        )
+        size = None
+    if isinstance(size, int) and size <= const.BQ_EXTRACT_LOAD_MAX_BYTES:
+        prefix = const.GS_PREFIX_DELIM.join(
+            [const.EXTRACT_LOAD_PREFIX, staging_table_ref.dataset_id, staging_table_ref.table_id]
+        )
+        uri = f'gs://{bucket_name}/{prefix}/{const.EXTRACT_LOAD_OBJECT_WILDCARD}'
+        try:
+            bq.extract_table(table_fqn_id=staging_table_ref.table_fqn_id(), destination_uri=uri)
+            bq.load_table(source_uri=uri, table_fqn_id=target_table_ref.table_fqn_id())
+            result = True
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning(
+                'Could not extract and load <%s> into <%s> using <%s>. '
+                'Falling back to a transfer. Error: %s',
+                staging_table_ref.table_fqn_id(),
+                target_table_ref.table_fqn_id(),
+                uri,
+                err,
+            )
+        _remove_extracted_objects(bucket_name, prefix)
+    if result and is_persistent_staging_dataset(staging_table_ref.dataset_id):
+        bq.drop_table(table_fqn_id=staging_table_ref.table_fqn_id())
+    elif result:
+        bq.remove_dataset(
+            project_id=staging_table_ref.project_id,
+            dataset_id=staging_table_ref.dataset_id,
+            delete_contents=True,
+        )
+    return result
+
+
+def _remove_extracted_objects(bucket_name: str, prefix: str) -> None:
+    try:
+        gcs.delete_objects(bucket_name, prefix)
+    except Exception as err:  # pylint: disable=broad-except
+        _LOGGER.warning(
+            'Could not remove extracted objects in <gs://%s/%s>. Error: %s',
+            bucket_name,
+            prefix,
+            err,
         )
 
 
-def create_table_with_sorted_sample(
+def create_table_with_sorted_sample(  # pylint: disable=too-many-arguments
     *,
     source_table_ref: table.TableReference,
     target_table_ref: table.TableReference,
@@ -480,6 +899,14 @@ def create_table_with_sorted_sample(
     labels: Optional[Dict[str, str]] = None,
     notification_pubsub_topic: Optional[str] = None,
     recreate_table: Optional[bool] = True,
+    clone_full_table: Optional[bool] = True,
+    table_expiration_ms: Optional[int] = None,
+    staging_table_expiration_ms: Optional[
+        int
+    ] = const.TRANSFER_TEMP_DATASET_DEFAULT_TABLE_EXPIRATION_MS,
+    staging_dataset_id: Optional[str] = None,
+    extract_bucket_name: Optional[str] = None,
+    transfer_tracker_bucket_name: Optional[str] = None,
 ) -> int:
     """
     Will create the target table and put the source table sample directly into it.
@@ -493,6 +920,12 @@ def create_table_with_sorted_sample(
     :param labels:
     :param notification_pubsub_topic:
     :param recreate_table:
+    :param clone_full_table: see :py:func:`create_table_with_random_sample`.
+    :param table_expiration_ms: see :py:func:`create_table_with_random_sample`.
+    :param staging_table_expiration_ms: see :py:func:`create_table_with_random_sample`.
+    :param staging_dataset_id: see :py:func:`create_table_with_random_sample`.
+    :param extract_bucket_name: see :py:func:`create_table_with_random_sample`.
+    :param transfer_tracker_bucket_name: see :py:func:`create_table_with_random_sample`.
     :return: amount of rows inserted
     """
     # validate input
@@ -502,16 +935,31 @@ def create_table_with_sorted_sample(
     (column,) = _validate_str_args(column)
     order = _validate_order(order)
     # logic
-    return _create_table_with_sorted_sample(
+    if clone_full_table and _clone_table_if_full_sample(
         source_table_ref=source_table_ref,
         target_table_ref=target_table_ref,
         amount=amount,
-        column=column,
-        order=order,
         labels=labels,
-        notification_pubsub_topic=notification_pubsub_topic,
-        recreate_table=recreate_table,
-    )
+        table_expiration_ms=table_expiration_ms,
+    ):
+        result = row_count(target_table_ref)
+    else:
+        result = _create_table_with_sorted_sample(
+            source_table_ref=source_table_ref,
+            target_table_ref=target_table_ref,
+            amount=amount,
+            column=column,
+            order=order,
+            labels=labels,
+            notification_pubsub_topic=notification_pubsub_topic,
+            recreate_table=recreate_table,
+            table_expiration_ms=table_expiration_ms,
+            staging_table_expiration_ms=staging_table_expiration_ms,
+            staging_dataset_id=staging_dataset_id,
+            extract_bucket_name=extract_bucket_name,
+            transfer_tracker_bucket_name=transfer_tracker_bucket_name,
+        )
+    return result
 
 
 def _validate_str_args(*args) -> Tuple[str]:
@@ -545,6 +993,11 @@ def _create_table_with_sorted_sample(  # pylint: disable=too-many-arguments
     labels: Optional[Dict[str, str]] = None,
     notification_pubsub_topic: Optional[str] = None,
     recreate_table: Optional[bool] = True,
+    table_expiration_ms: Optional[int] = None,
+    staging_table_expiration_ms: Optional[int] = None,
+    staging_dataset_id: Optional[str] = None,
+    extract_bucket_name: Optional[str] = None,
+    transfer_tracker_bucket_name: Optional[str] = None,
 ) -> int:
     # setup
     staging_target_table_ref = _pre_sample_setup(
@@ -552,6 +1005,9 @@ def _create_table_with_sorted_sample(  # pylint: disable=too-many-arguments
         target_table_ref=target_table_ref,
         labels=labels,
         recreate_table=recreate_table,
+        table_expiration_ms=table_expiration_ms,
+        staging_table_expiration_ms=staging_table_expiration_ms,
+        staging_dataset_id=staging_dataset_id,
     )
     # insert data
     if amount <= 0:
@@ -560,6 +1016,7 @@ def _create_table_with_sorted_sample(  # pylint: disable=too-many-arguments
             source_table_ref.table_fqn_id(False),
             amount,
         )
+        _truncate_table_if_not_recreated(target_table_ref, recreate_table)
     else:
         query_placeholders = _named_placeholders(  # pylint: disable=missing-kwoa
             source_table_fqn_id=source_table_ref.table_fqn_id(False),
@@ -569,9 +1026,12 @@ def _create_table_with_sorted_sample(  # pylint: disable=too-many-arguments
             order=order,
         )
         _sample_query_execution(
-            query=_BQ_INSERT_SORTED_SAMPLE_QUERY_TMPL % query_placeholders,
+            query=_BQ_SORTED_SAMPLE_QUERY_TMPL % query_placeholders,
             staging_target_table_ref=staging_target_table_ref,
             target_table_ref=target_table_ref,
             notification_pubsub_topic=notification_pubsub_topic,
+            transfer_staging=staging_dataset_id is None,
+            extract_bucket_name=extract_bucket_name,
+            transfer_tracker_bucket_name=transfer_tracker_bucket_name,
         )
     return row_count(target_table_ref)
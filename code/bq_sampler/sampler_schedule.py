@@ -0,0 +1,163 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+"""
+Shapes the sample commands fan-out, so the BigQuery jobs,
+    per project and location, stay within the job quotas.
+The budget is given by:
+* jobs per second: each command gets a start time, see :py:func:`schedule`,
+    a command delivered before it is due is rejected, see :py:func:`check_due`;
+  Pub/Sub only keeps a command for the subscription message retention,
+    therefore commands are not scheduled too far ahead, see :py:func:`split_at_horizon`;
+* maximum jobs in flight: each command gets a Pub/Sub ordering key (a lane),
+    see :py:func:`ordering_key`.
+  Pub/Sub delivers one message at a time per ordering key,
+    if the subscription has `message ordering`_ enabled.
+
+.. _message ordering: https://cloud.google.com/pubsub/docs/ordering
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+import zlib
+
+from bq_sampler import const, logger
+from bq_sampler.entity import command
+
+_LOGGER = logger.get(__name__)
+
+
+class SampleNotDueError(Exception):
+    """To code a sample command whose scheduled start time has not come yet"""
+
+
+def quota_key(value: command.CommandSampleStart) -> str:
+    """
+    The sampling query runs in the target project, but in the source location.
+
+    :param value:
+    :return: the project and location the sampling job is accounted for.
+    """
+    return const.GS_PREFIX_DELIM.join(
+        [value.target_table.project_id, str(value.sample_request.table_reference.location)]
+    )
+
+
+def schedule(
+    values: List[List[command.CommandSampleStart]],
+    *,
+    start_timestamp: int,
+    jobs_per_sec: Optional[float] = None,
+) -> List[List[command.CommandSampleStart]]:
+    """
+    Sets the `not_before_timestamp` of each command,
+        so the jobs for each :py:func:`quota_key` start at `jobs_per_sec`.
+    Each group, e.g., a :py:class:`command.CommandBatch`, starts at once,
+        and is accounted for by the quota key of its first command.
+
+    :param values: the commands, grouped as they are published.
+    :param start_timestamp: UTC epoch in seconds for the first job.
+    :param jobs_per_sec: if not given, the commands are left untouched.
+    :return:
+    """
+    if not jobs_per_sec:
+        return values
+    result = []
+    jobs_by_key: Dict[str, int] = {}
+    for group in values:
+        key = quota_key(group[0])
+        jobs = jobs_by_key.get(key, 0)
+        not_before_timestamp = start_timestamp + int(jobs / jobs_per_sec)
+        jobs_by_key[key] = jobs + len(group)
+        result.append([cmd.clone(not_before_timestamp=not_before_timestamp) for cmd in group])
+    _LOGGER.debug(
+        'Scheduled <%s> jobs per quota key at <%s> jobs per second', jobs_by_key, jobs_per_sec
+    )
+    return result
+
+
+def split_at_horizon(
+    values: List[List[command.CommandSampleStart]],
+    *,
+    start_timestamp: int,
+    max_delay_sec: Optional[int] = None,
+) -> Tuple[List[List[command.CommandSampleStart]], List[List[command.CommandSampleStart]]]:
+    """
+    Splits the commands scheduled by :py:func:`schedule`
+        into the ones starting up to `max_delay_sec` after `start_timestamp`
+        and the ones starting later, which must only be published later on.
+    The first group of each quota key starts at `start_timestamp`,
+        i.e., there is always at least one group within the horizon.
+
+    :param values: the commands, grouped as they are published.
+    :param start_timestamp: UTC epoch in seconds for the first job.
+    :param max_delay_sec: if not given, all commands are within the horizon.
+    :return: the groups within the horizon and the ones after it.
+    """
+    if not max_delay_sec:
+        return values, []
+    within = []
+    after = []
+    for group in values:
+        not_before_timestamp = group[0].not_before_timestamp
+        if not_before_timestamp is not None and not_before_timestamp > (
+            start_timestamp + max_delay_sec
+        ):
+            after.append(group)
+        else:
+            within.append(group)
+    if after:
+        _LOGGER.debug(
+            'Scheduled <%s> groups after the <%s> seconds horizon', len(after), max_delay_sec
+        )
+    return within, after
+
+
+def ordering_key(
+    value: command.CommandSampleStart, *, max_in_flight: Optional[int] = None
+) -> Optional[str]:
+    """
+    Spreads the commands over `max_in_flight` lanes per :py:func:`quota_key`.
+    The lane only depends on the source table,
+        i.e., it is the same across fan-outs and when a command is published again.
+
+    :param value:
+    :param max_in_flight: if not given, there is no ordering key.
+    :return:
+    """
+    result = None
+    if max_in_flight:
+        table_fqn_id = value.sample_request.table_reference.table_fqn_id()
+        lane = zlib.crc32(table_fqn_id.encode('utf-8')) % max_in_flight
+        result = const.GS_PREFIX_DELIM.join([quota_key(value), str(lane)])
+    return result
+
+
+def seconds_until_due(value: command.CommandBase) -> float:
+    """
+    A command batch is due with its first command, see :py:func:`schedule`.
+    Besides the sample commands, a policy prefix command can be delayed too,
+        see :py:func:`split_at_horizon`.
+
+    :param value:
+    :return: how long until the `not_before_timestamp` in `value`, zero if it is due.
+    """
+    first = value.commands[0] if isinstance(value, command.CommandBatch) else value
+    result = 0.0
+    if (
+        isinstance(first, (command.CommandSampleStart, command.CommandSamplePolicyPrefix))
+        and first.not_before_timestamp is not None
+    ):
+        result = max(0.0, first.not_before_timestamp - time.time())
+    return result
+
+
+def check_due(value: command.CommandBase) -> None:
+    """
+    There is no waiting here, the command must be delivered again later,
+        e.g., by failing the Pub/Sub delivery so it is retried with the subscription backoff.
+
+    :param value:
+    :return:
+    :raises SampleNotDueError: if `value` is scheduled to start later.
+    """
+    wait_sec = seconds_until_due(value)
+    if wait_sec > 0:
+        raise SampleNotDueError(f'Command <{value}> is due in <{wait_sec}> seconds')
@@ -0,0 +1,111 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+"""
+Keeps track of the cross-location samples staged in a shared staging dataset,
+    so a single transfer moves all of them, instead of one transfer per table.
+It assumes the following structure in the GCS state bucket::
+  /
+    <STAGED_SAMPLES_PREFIX>/
+      <STAGING_DATASET_ID>/
+        <TABLE_ID> - one (empty) object per sample that has landed in the staging dataset
+      <STAGING_DATASET_ID>.transfer - exists once the transfer has been claimed
+
+"""
+from bq_sampler import const, logger
+from bq_sampler.gcp import gcs
+
+_LOGGER = logger.get(__name__)
+
+
+def land_sample_and_claim_transfer(
+    *, bucket_name: str, staging_dataset_id: str, table_id: str, expected_amount: int
+) -> bool:
+    """
+    Registers that the sample for `table_id` has landed in the staging dataset.
+    If all `expected_amount` samples have landed, it tries to claim the transfer.
+    The claim is exclusive, therefore, even if the last samples land concurrently,
+        only one of them gets :py:obj:`True`.
+
+    :param bucket_name:
+    :param staging_dataset_id:
+    :param table_id:
+    :param expected_amount: how many samples share the staging dataset.
+    :return: :py:obj:`True` if the caller must trigger the transfer.
+    """
+    _validate_expected_amount(expected_amount)
+    gcs.write_object(bucket_name, _landed_sample_path(staging_dataset_id, table_id))
+    landed_amount = sum(
+        1 for _ in gcs.list_objects(bucket_name, prefix=_landed_samples_prefix(staging_dataset_id))
+    )
+    _LOGGER.info(
+        'Sample for table <%s> landed in staging dataset <%s>. Landed <%s> out of <%s>',
+        table_id,
+        staging_dataset_id,
+        landed_amount,
+        expected_amount,
+    )
+    result = False
+    if landed_amount >= expected_amount:
+        result = gcs.write_object(
+            bucket_name, _transfer_claim_path(staging_dataset_id), if_absent=True
+        )
+        _LOGGER.info(
+            'Transfer for staging dataset <%s> claimed by table <%s>: <%s>',
+            staging_dataset_id,
+            table_id,
+            result,
+        )
+    return result
+
+
+def _validate_expected_amount(value: int) -> None:
+    if not isinstance(value, int) or value <= 0:
+        raise ValueError(
+            f'Expected amount of samples must be an int greater than 0. '
+            f'Got: <{value}>({type(value)})'
+        )
+
+
+def release_transfer(*, bucket_name: str, staging_dataset_id: str) -> None:
+    """
+    Gives back a transfer claimed with :py:func:`land_sample_and_claim_transfer`,
+        e.g., because it could not be triggered, so a retry can claim it again.
+
+    :param bucket_name:
+    :param staging_dataset_id:
+    :return:
+    """
+    gcs.delete_objects(bucket_name, _transfer_claim_path(staging_dataset_id))
+
+
+def remove_staging_dataset_state(*, bucket_name: str, staging_dataset_id: str) -> None:
+    """
+    Removes all the bookkeeping objects for the staging dataset.
+    Only to be called once the transfer is done.
+
+    :param bucket_name:
+    :param staging_dataset_id:
+    :return:
+    """
+    amount = gcs.delete_objects(bucket_name, _staging_dataset_prefix(staging_dataset_id))
+    _LOGGER.debug(
+        'Removed <%s> state objects for staging dataset <%s> in bucket <%s>',
+        amount,
+        staging_dataset_id,
+        bucket_name,
+    )
+
+
+def _staging_dataset_prefix(staging_dataset_id: str) -> str:
+    return const.GS_PREFIX_DELIM.join([const.STAGED_SAMPLES_PREFIX, staging_dataset_id])
+
+
+def _landed_samples_prefix(staging_dataset_id: str) -> str:
+    return _staging_dataset_prefix(staging_dataset_id) + const.GS_PREFIX_DELIM
+
+
+def _landed_sample_path(staging_dataset_id: str, table_id: str) -> str:
+    return _landed_samples_prefix(staging_dataset_id) + table_id
+
+
+def _transfer_claim_path(staging_dataset_id: str) -> str:
+    return _staging_dataset_prefix(staging_dataset_id) + const.STAGED_SAMPLES_TRANSFER_CLAIM_EXT
@@ -0,0 +1,108 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+"""
+Keeps track of the transfer configs, and their latest run, triggered to move samples
+    across locations, so the ones whose done notification never arrives are still handled.
+It assumes the following structure in the GCS state bucket::
+  /
+    <TRACKED_TRANSFERS_PREFIX>/
+      projects/<PROJECT_ID>/locations/<LOCATION>/transferConfigs/<CONFIG_ID>.json
+
+"""
+
+from typing import Generator, Optional
+
+from bq_sampler import const, logger
+from bq_sampler.entity import transfer
+from bq_sampler.gcp import gcs
+
+_LOGGER = logger.get(__name__)
+
+
+def track(*, bucket_name: str, value: transfer.TrackedTransfer) -> None:
+    """
+    Records (or overwrites) the tracking for the transfer config in `value`.
+
+    :param bucket_name:
+    :param value:
+    :return:
+    """
+    if not isinstance(value, transfer.TrackedTransfer):
+        raise ValueError(
+            f'Expecting a {transfer.TrackedTransfer.__name__} instance. '
+            f'Got: <{value}>({type(value)})'
+        )
+    gcs.write_object(
+        bucket_name, _tracked_transfer_path(value.transfer_config_name), value.as_json()
+    )
+    _LOGGER.info('Tracking transfer <%s> in bucket <%s>', value, bucket_name)
+
+
+def untrack(*, bucket_name: str, transfer_config_name: str) -> None:
+    """
+    Stops tracking the transfer config, e.g., because it is done and removed.
+
+    :param bucket_name:
+    :param transfer_config_name:
+    :return:
+    """
+    amount = gcs.delete_objects(bucket_name, _tracked_transfer_path(transfer_config_name))
+    _LOGGER.debug(
+        'Removed <%s> tracking objects for transfer config <%s> in bucket <%s>',
+        amount,
+        transfer_config_name,
+        bucket_name,
+    )
+
+
+def tracked(*, bucket_name: str, transfer_config_name: str) -> Optional[transfer.TrackedTransfer]:
+    """
+    Retrieves the tracking for the transfer config, if tracked.
+
+    :param bucket_name:
+    :param transfer_config_name:
+    :return: :py:obj:`None` if not tracked.
+    """
+    return _read_tracked_transfer(bucket_name, _tracked_transfer_path(transfer_config_name))
+
+
+def overdue(
+    *, bucket_name: str, timeout_sec: int, now_timestamp: int
+) -> Generator[transfer.TrackedTransfer, None, None]:
+    """
+    Lists all tracked transfers triggered more than `timeout_sec` before `now_timestamp`.
+    An unreadable tracking object is skipped.
+
+    :param bucket_name:
+    :param timeout_sec:
+    :param now_timestamp: UTC epoch in seconds.
+    :return:
+    """
+    prefix = const.TRACKED_TRANSFERS_PREFIX + const.GS_PREFIX_DELIM
+    for path in gcs.list_objects(bucket_name, prefix=prefix):
+        if path.endswith(const.JSON_EXT):
+            value = _read_tracked_transfer(bucket_name, path)
+            if value is not None and value.triggered_timestamp + timeout_sec < now_timestamp:
+                yield value
+
+
+def _read_tracked_transfer(bucket_name: str, path: str) -> Optional[transfer.TrackedTransfer]:
+    result = None
+    content = gcs.read_object(bucket_name, path, warn_read_failure=False)
+    if content:
+        try:
+            result = transfer.TrackedTransfer.from_json(content, path)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning(
+                'Could not parse tracked transfer in <gs://%s/%s>. Error: %s',
+                bucket_name,
+                path,
+                err,
+            )
+    return result
+
+
+def _tracked_transfer_path(transfer_config_name: str) -> str:
+    return (
+        const.GS_PREFIX_DELIM.join([const.TRACKED_TRANSFERS_PREFIX, transfer_config_name])
+        + const.JSON_EXT
+    )
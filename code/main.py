@@ -8,8 +8,9 @@ GCP CloudFunction mandatory entry point:
 """
 # pylint: enable=line-too-long
 import base64
+import http
 import os
-from typing import Any, Callable, Dict, Optional, Union
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 # From: https://cloud.google.com/logging/docs/setup/python
 import google.cloud.logging
@@ -26,7 +27,7 @@ import click
 import flask
 import functions_framework
 
-from bq_sampler import entry, logger
+from bq_sampler import entry, logger, sampler_schedule
 from bq_sampler.notification import email, sendgrid, smtp
 
 # pylint: enable=wrong-import-position
@@ -35,7 +36,7 @@ _LOGGER = logger.get(__name__)
 
 
 @functions_framework.http
-def handler_http(event: Optional[flask.Request] = None) -> str:
+def handler_http(event: Optional[flask.Request] = None) -> Union[str, Tuple[str, int]]:
     # pylint: disable=line-too-long
     """
     Entry-point for GCP CloudFunction V2.
@@ -48,12 +49,18 @@ def handler_http(event: Optional[flask.Request] = None) -> str:
         event. The `@type` field maps to `type.googleapis.com/google.pubsub.v1.PubsubMessage`.
         The `data` field maps to the PubsubMessage data in a base64-encoded string.
         The `attributes` field maps to the PubsubMessage attributes if any is present.
-    :return:
+    :return: a command not due yet, see :py:func:`sampler_schedule.check_due`,
+        is answered with `429 Too Many Requests`, so Pub/Sub delivers it again later,
+        with the subscription backoff, without it being reported as an error.
 
     .. _cloud-foundation-fabric/cloud-function:https://github.com/GoogleCloudPlatform/cloud-foundation-fabric/blob/master/modules/cloud-function/main.tf#L139
     """
     # pylint: enable=line-too-long
-    return handler(event)
+    try:
+        result = handler(event)
+    except sampler_schedule.SampleNotDueError as err:
+        result = str(err), http.HTTPStatus.TOO_MANY_REQUESTS.value
+    return result
 
 
 def handler(
@@ -97,6 +104,9 @@ def _handler(
             context,
             str(os.environ),
         )
+    except sampler_schedule.SampleNotDueError:
+        # not an error, the command is only delivered again later
+        raise
     except Exception as err:  # pylint: disable=broad-except
         msg = (
             f'Could not process event: <{event}>({type(event)}),'
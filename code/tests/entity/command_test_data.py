@@ -53,6 +53,14 @@ TEST_COMMAND_SAMPLE_START: command.CommandSampleStart = command.CommandSampleSta
     sample_request=_TEST_SAMPLE_REQUEST,
     target_table=_TEST_TARGET_TABLE_REF,
 )
+TEST_COMMAND_SAMPLE_POLICY_PROJECT: command.CommandSamplePolicyProject = (
+    command.CommandSamplePolicyProject(
+        type=command.CommandType.SAMPLE_POLICY_PROJECT.value,
+        timestamp=31,
+        run_timestamp=17,
+        prefix='project_id_a/',
+    )
+)
 TEST_COMMAND_SAMPLE_POLICY_PREFIX: command.CommandSamplePolicyPrefix = (
     command.CommandSamplePolicyPrefix(
         type=command.CommandType.SAMPLE_POLICY_PREFIX.value,
@@ -81,3 +89,32 @@ TEST_COMMAND_SAMPLE_DONE: command.CommandSampleDone = command.CommandSampleDone(
     end_timestamp=79,
     error_message='NO_ERROR',
 )
+TEST_COMMAND_CLEANUP_DATASET: command.CommandCleanupDataset = command.CommandCleanupDataset(
+    type=command.CommandType.CLEANUP_DATASET.value,
+    timestamp=17,
+    project_id='TEST_PROJECT_ID',
+    dataset_id='TEST_DATASET_ID',
+    keep_table_ids=['TEST_TABLE_ID'],
+)
+TEST_COMMAND_TRANSFER_WATCHDOG: command.CommandTransferWatchdog = command.CommandTransferWatchdog(
+    type=command.CommandType.TRANSFER_WATCHDOG.value, timestamp=17
+)
+TEST_COMMAND_COMMAND_BATCH: command.CommandBatch = command.CommandBatch(
+    type=command.CommandType.COMMAND_BATCH.value,
+    timestamp=17,
+    commands=[TEST_COMMAND_SAMPLE_START_RANDOM, TEST_COMMAND_SAMPLE_START_SORTED],
+)
+TEST_COMMAND_RUN_COMPLETE: command.CommandRunComplete = command.CommandRunComplete(
+    type=command.CommandType.RUN_COMPLETE.value,
+    timestamp=17,
+    run_timestamp=17,
+    planned=3,
+    started=3,
+    done=2,
+    failed=1,
+    total_bytes_billed=1_000,
+    slot_ms=100,
+    total_sample_duration=96,
+    max_sample_duration=48,
+    duration=62,
+)
@@ -1,10 +1,12 @@
 # vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=too-many-lines
 # pylint: disable=missing-module-docstring,missing-class-docstring,missing-function-docstring
 # pylint: disable=missing-function-docstring,assignment-from-no-return,c-extension-no-member
 # pylint: disable=protected-access,redefined-outer-name,no-self-use,using-constant-test
 # pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
 # type: ignore
-from typing import Any, Dict, Iterator, Optional, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 
 from google.cloud import bigquery, bigquery_datatransfer
 from google.cloud.bigquery_datatransfer_v1.services.data_transfer_service import pagers
@@ -134,6 +136,8 @@ class _StubClient:  # pylint: disable=too-many-instance-attributes,too-many-loca
         list_tables: Optional[page_iterator.Iterator] = None,
         list_tables_exception: Optional[Exception] = None,
         get_dataset_location: Optional[str] = None,
+        list_models: Optional[Sequence[str]] = None,
+        list_routines: Optional[Sequence[str]] = None,
     ):
         self.project = project_id
         self.dataset_id = dataset_id
@@ -153,8 +157,11 @@ class _StubClient:  # pylint: disable=too-many-instance-attributes,too-many-loca
         self._list_tables = list_tables
         self._list_tables_exception = list_tables_exception
         self._get_dataset_location = get_dataset_location
+        self._list_models = list_models or []
+        self._list_routines = list_routines or []
         self.called_delete_dataset = []
         self.called_delete_table = []
+        self.called_list_datasets_filter = []
 
     def get_table(self, *args) -> bigquery.Table:
         if self._get_table_exception is not None:
@@ -210,6 +217,7 @@ class _StubClient:  # pylint: disable=too-many-instance-attributes,too-many-loca
         if self._list_datasets_exception is not None:
             raise self._list_datasets_exception
         assert kwargs.get('include_all')
+        self.called_list_datasets_filter.append(kwargs.get('filter'))
         for ds in self._list_datasets:
             yield _StubDataset(dataset_id=ds, project=self.project)
 
@@ -223,6 +231,16 @@ class _StubClient:  # pylint: disable=too-many-instance-attributes,too-many-loca
                 project=dataset_ref.project, dataset_id=dataset_ref.dataset_id, table_id=t
             )
 
+    def list_models(  # pylint: disable=unused-argument
+        self, dataset_ref: bigquery.DatasetReference, **kwargs
+    ) -> Iterator[str]:
+        return iter(self._list_models)
+
+    def list_routines(  # pylint: disable=unused-argument
+        self, dataset_ref: bigquery.DatasetReference, **kwargs
+    ) -> Iterator[str]:
+        return iter(self._list_routines)
+
     def get_dataset(self, dataset_ref: bigquery.DatasetReference) -> bigquery.Dataset:
         return _StubDataset(
             project=dataset_ref.project,
@@ -340,6 +358,26 @@ def test_query_job_ok(monkeypatch):
     assert result == expected
 
 
+def test_query_job_ok_destination_table(monkeypatch):
+    # Given
+    job_config = bigquery.QueryJobConfig()
+    client = _StubClient(query_job=_TEST_QUERY_JOB, query=_TEST_QUERY, job_config=job_config)
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    # When
+    result = _bq_base.query_job(
+        query=_TEST_QUERY,
+        job_config=job_config,
+        project_id=_TEST_PROJECT_ID,
+        location=_TEST_LOCATION,
+        destination_table_fqn_id=_TEST_TABLE_FQN_ID,
+    )
+    # Then
+    assert result == _TEST_QUERY_JOB
+    assert job_config.destination.table_id == _TEST_TABLE_ID
+    assert job_config.destination.dataset_id == _TEST_DATASET_ID
+    assert job_config.write_disposition == bigquery.WriteDisposition.WRITE_TRUNCATE
+
+
 def test_query_job_nok(monkeypatch):
     # Given
     query = _TEST_QUERY
@@ -402,6 +440,59 @@ def test_create_table_nok_client_fails(monkeypatch, client_kwargs: Dict[str, Any
         )
 
 
+class _StubExpirationClient(_StubClient):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.called_update_dataset = []
+        self.called_update_table = []
+
+    def update_dataset(self, *args, **kwargs) -> bigquery.Dataset:
+        self.called_update_dataset.append(args)
+        return super().update_dataset(*args, **kwargs)
+
+    def update_table(self, *args, **kwargs) -> bigquery.Table:
+        self.called_update_table.append(args)
+        return super().update_table(*args, **kwargs)
+
+
+def test_create_table_ok_expiration(monkeypatch):
+    # Given
+    expiration_ms = 60_000
+    dataset_default_table_expiration_ms = 120_000
+    client = _StubExpirationClient()
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    before = datetime.now(timezone.utc)
+    # When
+    _bq_base.create_table(
+        table_fqn_id=_TEST_TABLE_FQN_ID,
+        schema=_TEST_SCHEMA,
+        labels=_TEST_LABELS,
+        expiration_ms=expiration_ms,
+        dataset_default_table_expiration_ms=dataset_default_table_expiration_ms,
+    )
+    # Then
+    ((dataset, dataset_fields),) = client.called_update_dataset
+    assert 'default_table_expiration_ms' in dataset_fields
+    assert dataset.default_table_expiration_ms == dataset_default_table_expiration_ms
+    ((bq_table, table_fields),) = client.called_update_table
+    assert 'expires' in table_fields
+    assert bq_table.expires >= before + timedelta(milliseconds=expiration_ms)
+
+
+@pytest.mark.parametrize('expiration_ms', [0, -1, 'ten', 1.5])
+def test_create_table_nok_expiration(monkeypatch, expiration_ms: Any):
+    # Given
+    client = _StubClient()
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    # When/Then
+    with pytest.raises(ValueError):
+        _bq_base.create_table(
+            table_fqn_id=_TEST_TABLE_FQN_ID,
+            schema=_TEST_SCHEMA,
+            expiration_ms=expiration_ms,
+        )
+
+
 @pytest.mark.parametrize('not_found_ok', [True, False])
 def test_drop_table_ok(monkeypatch, not_found_ok: bool):
     # Given
@@ -413,6 +504,187 @@ def test_drop_table_ok(monkeypatch, not_found_ok: bool):
     assert len(client.called_delete_table) == 1
 
 
+class _StubCopyJob:
+    def __init__(self, result_exception: Optional[Exception] = None):
+        self._result_exception = result_exception
+
+    def result(self) -> None:
+        if self._result_exception is not None:
+            raise self._result_exception
+
+
+class _StubCloneClient(_StubClient):
+    def __init__(self, *, copy_job_exception: Optional[Exception] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._copy_job_exception = copy_job_exception
+        self.called_copy_table = []
+        self.called_update_table = []
+
+    def copy_table(self, *args, **kwargs) -> _StubCopyJob:
+        self.called_copy_table.append((args, kwargs))
+        return _StubCopyJob(self._copy_job_exception)
+
+    def update_table(self, *args, **kwargs) -> bigquery.Table:  # pylint: disable=unused-argument
+        self.called_update_table.append(args)
+        assert args[1] == ['labels']
+        return args[0]
+
+
+_TEST_CLONE_TARGET_TABLE_FQN_ID: str = _table_fqn_id(
+    _TEST_PROJECT_ID, _TEST_TARGET_DATASET_ID, _TEST_TARGET_TABLE_ID, _TEST_LOCATION
+)
+
+
+def test_clone_table_ok(monkeypatch):
+    # Given
+    bq_table = _StubTable(full_table_id=_TEST_CLONE_TARGET_TABLE_FQN_ID)
+    query = _bq_base._REPLACE_WITH_CLONE_QUERY_TMPL.format(
+        target=_TEST_CLONE_TARGET_TABLE_FQN_ID.split(const.BQ_TABLE_FQN_LOCATION_SEP)[0],
+        source=_TEST_TABLE_FQN_ID.split(const.BQ_TABLE_FQN_LOCATION_SEP)[0],
+    )
+    client = _StubCloneClient(bq_table=bq_table, query_job=_StubCopyJob(), query=query)
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    # When
+    _bq_base.clone_table(
+        source_table_fqn_id=_TEST_TABLE_FQN_ID,
+        target_table_fqn_id=_TEST_CLONE_TARGET_TABLE_FQN_ID,
+        labels=_TEST_LABELS,
+    )
+    # Then
+    assert not client.called_delete_table
+    assert not client.called_copy_table
+    assert len(client.called_update_table) == 1
+    for key, val in const.DEFAULT_CREATE_TABLE_LABELS.items():
+        assert bq_table.labels.get(key) == val
+
+
+@pytest.mark.parametrize(
+    'replace,query_exception,expected_delete',
+    [
+        (True, ConnectionError(), 1),
+        (False, None, 0),
+    ],
+)
+def test_clone_table_ok_copy(monkeypatch, replace, query_exception, expected_delete):
+    # Given
+    bq_table = _StubTable(full_table_id=_TEST_CLONE_TARGET_TABLE_FQN_ID)
+    client = _StubCloneClient(bq_table=bq_table, query_exception=query_exception)
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    # When
+    _bq_base.clone_table(
+        source_table_fqn_id=_TEST_TABLE_FQN_ID,
+        target_table_fqn_id=_TEST_CLONE_TARGET_TABLE_FQN_ID,
+        labels=_TEST_LABELS,
+        replace=replace,
+    )
+    # Then
+    assert len(client.called_delete_table) == expected_delete
+    assert len(client.called_copy_table) == 1
+    args, kwargs = client.called_copy_table[0]
+    assert args[0] == _TEST_TABLE_FQN_ID.split(const.BQ_TABLE_FQN_LOCATION_SEP)[0]
+    assert args[1] == _TEST_CLONE_TARGET_TABLE_FQN_ID.split(const.BQ_TABLE_FQN_LOCATION_SEP)[0]
+    assert kwargs.get('job_config').operation_type == bigquery.job.OperationType.CLONE
+    assert len(client.called_update_table) == 1
+    for key, val in const.DEFAULT_CREATE_TABLE_LABELS.items():
+        assert bq_table.labels.get(key) == val
+
+
+def test_clone_table_nok_different_location(monkeypatch):
+    # Given
+    client = _StubCloneClient()
+    _mock_client(monkeypatch, client=client)
+    # When/Then
+    with pytest.raises(ValueError):
+        _bq_base.clone_table(
+            source_table_fqn_id=_TEST_SOURCE_TABLE_FQN_ID,
+            target_table_fqn_id=_TEST_TARGET_TABLE_FQN_ID,
+        )
+    assert not client.called_copy_table
+
+
+def test_clone_table_nok_copy_fails(monkeypatch):
+    # Given
+    client = _StubCloneClient(
+        copy_job_exception=ConnectionError(), query_exception=ConnectionError()
+    )
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    # When/Then
+    with pytest.raises(RuntimeError):
+        _bq_base.clone_table(
+            source_table_fqn_id=_TEST_TABLE_FQN_ID,
+            target_table_fqn_id=_TEST_CLONE_TARGET_TABLE_FQN_ID,
+        )
+
+
+class _StubExtractLoadClient(_StubClient):
+    def __init__(self, *, job_exception: Optional[Exception] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._job_exception = job_exception
+        self.called_extract_table = []
+        self.called_load_table_from_uri = []
+
+    def extract_table(self, *args, **kwargs) -> _StubCopyJob:
+        self.called_extract_table.append((args, kwargs))
+        return _StubCopyJob(self._job_exception)
+
+    def load_table_from_uri(self, *args, **kwargs) -> _StubCopyJob:
+        self.called_load_table_from_uri.append((args, kwargs))
+        return _StubCopyJob(self._job_exception)
+
+
+_TEST_EXTRACT_LOAD_URI: str = 'gs://TEST_BUCKET/TEST_PREFIX/*.avro'
+
+
+def test_extract_table_ok(monkeypatch):
+    # Given
+    client = _StubExtractLoadClient()
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    # When
+    _bq_base.extract_table(table_fqn_id=_TEST_TABLE_FQN_ID, destination_uri=_TEST_EXTRACT_LOAD_URI)
+    # Then
+    assert len(client.called_extract_table) == 1
+    args, kwargs = client.called_extract_table[0]
+    assert args[0] == _TEST_TABLE_FQN_ID.split(const.BQ_TABLE_FQN_LOCATION_SEP)[0]
+    assert args[1] == _TEST_EXTRACT_LOAD_URI
+    assert kwargs.get('job_config').destination_format == bigquery.DestinationFormat.AVRO
+
+
+def test_extract_table_nok_job_fails(monkeypatch):
+    # Given
+    client = _StubExtractLoadClient(job_exception=ConnectionError())
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    # When/Then
+    with pytest.raises(RuntimeError):
+        _bq_base.extract_table(
+            table_fqn_id=_TEST_TABLE_FQN_ID, destination_uri=_TEST_EXTRACT_LOAD_URI
+        )
+
+
+def test_load_table_ok(monkeypatch):
+    # Given
+    client = _StubExtractLoadClient()
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    # When
+    _bq_base.load_table(source_uri=_TEST_EXTRACT_LOAD_URI, table_fqn_id=_TEST_TABLE_FQN_ID)
+    # Then
+    assert len(client.called_load_table_from_uri) == 1
+    args, kwargs = client.called_load_table_from_uri[0]
+    assert args[0] == _TEST_EXTRACT_LOAD_URI
+    assert args[1] == _TEST_TABLE_FQN_ID.split(const.BQ_TABLE_FQN_LOCATION_SEP)[0]
+    job_config = kwargs.get('job_config')
+    assert job_config.source_format == bigquery.SourceFormat.AVRO
+    assert job_config.write_disposition == bigquery.WriteDisposition.WRITE_TRUNCATE
+
+
+def test_load_table_nok_job_fails(monkeypatch):
+    # Given
+    client = _StubExtractLoadClient(job_exception=ConnectionError())
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    # When/Then
+    with pytest.raises(RuntimeError):
+        _bq_base.load_table(source_uri=_TEST_EXTRACT_LOAD_URI, table_fqn_id=_TEST_TABLE_FQN_ID)
+
+
 def test_list_all_tables_with_filter_ok_default_filter(monkeypatch):
     # Given
     datasets = ['dataset_a', 'dataset_b']
@@ -453,6 +725,38 @@ def test_list_all_tables_with_filter_ok_exclude_all_filter(monkeypatch):
     assert s_result == expected
 
 
+def test_list_all_datasets_ok_labels(monkeypatch):
+    # Given
+    datasets = ['dataset_a']
+    client = _StubClient(list_datasets=datasets)
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID, location=_TEST_LOCATION)
+    # When
+    result = list(
+        _bq_base.list_all_datasets(
+            project_id=_TEST_PROJECT_ID, labels=const.DEFAULT_CREATE_TABLE_LABELS
+        )
+    )
+    # Then
+    assert len(result) == 1
+    assert client.called_list_datasets_filter == ['labels.sample_table:true']
+
+
+@pytest.mark.parametrize(
+    'labels,expected',
+    [
+        (None, None),
+        ({}, None),
+        ({'sample_table': 'true'}, 'labels.sample_table:true'),
+        ({'key_a': 'value_a', 'key_b': None}, 'labels.key_a:value_a labels.key_b'),
+    ],
+)
+def test__dataset_labels_filter_ok(labels: Optional[Dict[str, str]], expected: Optional[str]):
+    # Given/When
+    result = _bq_base._dataset_labels_filter(labels)
+    # Then
+    assert result == expected
+
+
 @pytest.mark.parametrize(
     'client_kwargs',
     [
@@ -487,6 +791,26 @@ def test_get_dataset_ok(monkeypatch):
     assert result.project == project_id
 
 
+@pytest.mark.parametrize(
+    'list_models,list_routines,expected',
+    [
+        ([], [], False),
+        (['model_a'], [], True),
+        ([], ['routine_a'], True),
+    ],
+)
+def test_has_models_or_routines_ok(
+    monkeypatch, list_models: Sequence[str], list_routines: Sequence[str], expected: bool
+):
+    # Given
+    client = _StubClient(list_models=list_models, list_routines=list_routines)
+    _mock_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID)
+    # When
+    result = _bq_base.has_models_or_routines(_TEST_PROJECT_ID, _TEST_DATASET_ID)
+    # Then
+    assert result == expected
+
+
 def test_remove_dataset_ok(monkeypatch):
     # Given
     project_id = _TEST_PROJECT_ID
@@ -504,52 +828,6 @@ def test_remove_dataset_ok(monkeypatch):
     assert len(client.called_delete_dataset) == 1
 
 
-def test_remove_empty_datasets_ok_empty(monkeypatch):
-    # Given
-    project_id = _TEST_PROJECT_ID
-    dataset_id = _TEST_DATASET_ID
-    client = _StubClient(list_datasets=[dataset_id], list_tables=[])
-    _mock_client(monkeypatch, client=client, project_id=project_id)
-    to_remove_ds = []
-
-    def filter_fn(dataset_item: bigquery.dataset.DatasetListItem) -> bool:
-        nonlocal to_remove_ds
-        to_remove_ds.append(dataset_item)
-        return True
-
-    # When
-    _bq_base.remove_empty_datasets(
-        project_id=project_id,
-        filter_fn=filter_fn,
-    )
-    # Then
-    assert len(client.called_delete_dataset) == 1
-    assert len(to_remove_ds) == 1
-
-
-def test_remove_empty_datasets_ok_non_empty(monkeypatch):
-    # Given
-    project_id = _TEST_PROJECT_ID
-    dataset_id = _TEST_DATASET_ID
-    client = _StubClient(list_datasets=[dataset_id], list_tables=['table_a'])
-    _mock_client(monkeypatch, client=client, project_id=project_id)
-    to_remove_ds = []
-
-    def filter_fn(dataset_item: bigquery.dataset.DatasetListItem) -> bool:
-        nonlocal to_remove_ds
-        to_remove_ds.append(dataset_item)
-        return True
-
-    # When
-    _bq_base.remove_empty_datasets(
-        project_id=project_id,
-        filter_fn=filter_fn,
-    )
-    # Then
-    assert len(client.called_delete_dataset) == 0
-    assert len(to_remove_ds) == 1
-
-
 class _StubTransferRun:
     def __init__(self, name: Optional[str] = _TEST_TRANSFER_RUN_NAME):
         self.name = name
@@ -637,6 +915,12 @@ class _StubDataTransferClient:
     ) -> None:
         assert self.transfer_config_full_name == request.name
 
+    def get_transfer_run(
+        self, *, request: bigquery_datatransfer.GetTransferRunRequest
+    ) -> bigquery_datatransfer.TransferRun:
+        assert request.name.startswith(self.transfer_config_full_name)
+        return _StubTransferRun(request.name)
+
 
 def test_dataset_transfer_config_run_ok(monkeypatch):
     # Given
@@ -658,6 +942,102 @@ def test_dataset_transfer_config_run_ok(monkeypatch):
     assert result is not None
 
 
+class _StubCountingDataTransferClient(_StubDataTransferClient):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.created = 0
+        self.started = 0
+        self.created_configs = []
+
+    def create_transfer_config(
+        self, *, request: bigquery_datatransfer.CreateTransferConfigRequest
+    ) -> bigquery_datatransfer.TransferConfig:
+        self.created += 1
+        result = super().create_transfer_config(request=request)
+        self.created_configs.append(result)
+        return result
+
+    def start_manual_transfer_runs(
+        self, *, request: bigquery_datatransfer.StartManualTransferRunsRequest
+    ) -> bigquery_datatransfer.StartManualTransferRunsResponse:
+        self.started += 1
+        return super().start_manual_transfer_runs(request=request)
+
+
+def _mock_reusable_transfer_configs(
+    monkeypatch, listed: List[bigquery_datatransfer.TransferConfig]
+) -> None:
+    def mocked_list_transfer_config_by_display_name_prefix(
+        *, project_id: str, location: str, prefix: str
+    ) -> Iterator[bigquery_datatransfer.TransferConfig]:
+        assert project_id == _TEST_PROJECT_ID
+        assert location == _TEST_TARGET_LOCATION
+        assert prefix == const.TRANSFER_CONFIG_PERSISTENT_DISPLAY_NAME_PREFIX
+        return iter(list(listed))
+
+    monkeypatch.setattr(
+        _bq_base,
+        'list_transfer_config_by_display_name_prefix',
+        mocked_list_transfer_config_by_display_name_prefix,
+    )
+    _bq_base._REUSABLE_TRANSFER_CONFIG_NAMES_CACHE.clear()
+
+
+def test_dataset_transfer_config_run_ok_reuse(monkeypatch):
+    # Given
+    client = _StubCountingDataTransferClient()
+    _mock_data_transfer_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID)
+    _mock_reusable_transfer_configs(monkeypatch, client.created_configs)
+    # When
+    for _ in range(2):
+        result = _bq_base.dataset_transfer_config_run(
+            source_table_fqn_id=_TEST_SOURCE_TABLE_FQN_ID,
+            target_table_fqn_id=_TEST_TARGET_TABLE_FQN_ID,
+            notification_pubsub_topic=_TEST_NOTIFICATION_PUBSUB_TOPIC,
+            reuse_transfer_config=True,
+        )
+        # Then
+        assert result
+    assert client.created == 1
+    assert client.started == 2
+
+
+def test_dataset_transfer_config_run_ok_reuse_created_concurrently(monkeypatch):
+    # Given
+    client = _StubCountingDataTransferClient(transfer_config_name='TEST_TRANSFER_CONFIG_B')
+    _mock_data_transfer_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID)
+    listed = []
+    _mock_reusable_transfer_configs(monkeypatch, listed)
+    removed = []
+    monkeypatch.setattr(_bq_base, 'remove_transfer_config', removed.append)
+    started = []
+    monkeypatch.setattr(
+        _bq_base, '_start_manual_transfer_runs', lambda _, name: started.append(name) or [name]
+    )
+
+    def mocked_create_transfer_config(*args, **kwargs) -> str:
+        created_name = f'{_TEST_TRANSFER_CONFIG_FULL_NAME}_B'
+        # another instance created one with the same display name in the meantime
+        for name in [f'{_TEST_TRANSFER_CONFIG_FULL_NAME}_A', created_name]:
+            listed.append(
+                bigquery_datatransfer.TransferConfig(
+                    name=name, display_name=kwargs.get('transfer_config_display_name')
+                )
+            )
+        return created_name
+
+    monkeypatch.setattr(_bq_base, '_create_transfer_config', mocked_create_transfer_config)
+    # When
+    _bq_base.dataset_transfer_config_run(
+        source_table_fqn_id=_TEST_SOURCE_TABLE_FQN_ID,
+        target_table_fqn_id=_TEST_TARGET_TABLE_FQN_ID,
+        reuse_transfer_config=True,
+    )
+    # Then
+    assert removed == [f'{_TEST_TRANSFER_CONFIG_FULL_NAME}_B']
+    assert started == [f'{_TEST_TRANSFER_CONFIG_FULL_NAME}_A']
+
+
 def _mock_data_transfer_client(
     monkeypatch,
     *,
@@ -700,3 +1080,31 @@ def test_remove_transfer_config_ok(monkeypatch):
     _mock_data_transfer_client(monkeypatch, client=client, project_id=project_id)
     # When/Then
     _bq_base.remove_transfer_config(name)
+
+
+def test_start_transfer_config_run_ok(monkeypatch):
+    # Given
+    name = _TEST_TRANSFER_CONFIG_FULL_NAME
+    client = _StubDataTransferClient(transfer_config_full_name=name)
+    _mock_data_transfer_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID)
+    # When
+    result = _bq_base.start_transfer_config_run(name)
+    # Then
+    assert [run.name for run in result] == [f'{name}/runs/{_TEST_TRANSFER_RUN_NAME}']
+
+
+def test_transfer_run_ok(monkeypatch):
+    # Given
+    name = f'{_TEST_TRANSFER_CONFIG_FULL_NAME}/runs/{_TEST_TRANSFER_RUN_NAME}'
+    client = _StubDataTransferClient()
+    _mock_data_transfer_client(monkeypatch, client=client, project_id=_TEST_PROJECT_ID)
+    # When
+    result = _bq_base.transfer_run(name)
+    # Then
+    assert result.name == name
+
+
+def test_transfer_run_nok_not_a_run_name():
+    # Given/When/Then
+    with pytest.raises(ValueError):
+        _bq_base.transfer_run(_TEST_TRANSFER_CONFIG_FULL_NAME)
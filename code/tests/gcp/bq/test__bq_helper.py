@@ -4,7 +4,9 @@
 # pylint: disable=protected-access,redefined-outer-name,no-self-use,using-constant-test
 # pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
 # type: ignore
-from typing import Any, Dict, Generator, List, Optional
+from datetime import datetime, timezone
+import types
+from typing import Any, Dict, List, Optional, Tuple
 
 from google.cloud import bigquery
 
@@ -19,8 +21,9 @@ _TEST_SOURCE_TABLE_FQN_ID: str = (
 
 
 class _StubTable:
-    def __init__(self, *, num_rows: Optional[int] = None):
+    def __init__(self, *, num_rows: Optional[int] = None, num_bytes: Optional[int] = None):
         self.num_rows = num_rows
+        self.num_bytes = num_bytes
 
 
 def test_row_count_ok(monkeypatch):
@@ -34,13 +37,28 @@ def test_row_count_ok(monkeypatch):
     assert result == expected
 
 
+@pytest.mark.parametrize(
+    'table_id,num_bytes,expected',
+    [
+        ('test_table_id_bytes', 17, 17),
+        ('test_view_id_bytes', None, 0),
+    ],
+)
+def test_num_bytes_ok(monkeypatch, table_id: str, num_bytes: Optional[int], expected: int):
+    # Given
+    bq_table = _StubTable(num_bytes=num_bytes)
+    _mock_calls__big_query(monkeypatch, bq_table=bq_table)
+    # When
+    result = _bq_helper.num_bytes(table_fqn_id=f'test_project_id_a.test_dataset_id_a.{table_id}')
+    # Then
+    assert result == expected
+
+
 def _mock_calls__big_query(
     monkeypatch,
     *,
     bq_table: Optional[bigquery.Table] = None,
     query_job: Optional[bigquery.job.query.QueryJob] = None,
-    table_fqn_id_lst: Optional[Generator[str, None, None]] = None,
-    drop_table_exception: Optional[Exception] = None,
 ) -> None:
     def mocked_table(*args, **kwargs) -> bigquery.Table:  # pylint: disable=unused-argument
         return bq_table
@@ -54,27 +72,6 @@ def _mock_calls__big_query(
 
     monkeypatch.setattr(_bq_helper._bq_base, 'query_job', mocked_query_job)
 
-    if not table_fqn_id_lst:
-        table_fqn_id_lst = []
-
-    def mocked_list_all_tables_with_filter(  # pylint: disable=unused-argument
-        *args, **kwargs
-    ) -> Generator[str, None, None]:
-        assert kwargs.get('filter_fn') is not None
-        for id in table_fqn_id_lst:
-            yield id
-
-    monkeypatch.setattr(
-        _bq_helper._bq_base, 'list_all_tables_with_filter', mocked_list_all_tables_with_filter
-    )
-
-    def mocked_drop_table(*args, **kwargs) -> None:  # pylint: disable=unused-argument
-        assert kwargs.get('table_fqn_id') is not None
-        if drop_table_exception is not None:
-            raise drop_table_exception
-
-    monkeypatch.setattr(_bq_helper._bq_base, 'drop_table', mocked_drop_table)
-
 
 class _StubQueryJob:
     def __init__(
@@ -122,25 +119,202 @@ def test_query_job_result_nok(monkeypatch):
         _bq_helper.query_job_result(query='TEST_QUERY')
 
 
+def test_job_stats_ok(monkeypatch):
+    # Given
+    query_job = _StubQueryJob(result='TEST_RESULT', total_bytes_billed=100, slot_millis=10)
+    _mock_calls__big_query(monkeypatch, query_job=query_job)
+    _bq_helper.query_job_result(query='TEST_QUERY_NOT_ACCOUNTED')
+    # When
+    with _bq_helper.job_stats() as outer:
+        _bq_helper.query_job_result(query='TEST_QUERY')
+        with _bq_helper.job_stats() as inner:
+            _bq_helper.query_job_result(query='TEST_QUERY')
+            _bq_helper.query_job_result(query='TEST_QUERY')
+    # Then
+    assert (inner.total_bytes_billed, inner.slot_ms) == (200, 20)
+    assert (outer.total_bytes_billed, outer.slot_ms) == (300, 30)
+    assert getattr(_bq_helper._JOB_STATS, 'value', None) is None
+
+
 _TEST_PROJECT_ID: str = 'TEST_PROJECT_ID'
 _TEST_LOCATION: str = 'TEST_LOCATION'
+_TEST_DATASET_ID: str = 'TEST_DATASET_ID'
 _TEST_LABELS: Dict[str, str] = {'TEST_LABEL_KEY': 'TEST_LABEL_VALUE'}
 
 
-def test_drop_all_tables_by_labels_ok(monkeypatch):
+def test_clean_up_dataset_by_labels_nok_drops_all_before_raising(monkeypatch):
     # Given
-    _mock_calls__big_query(monkeypatch, table_fqn_id_lst=[_TEST_SOURCE_TABLE_FQN_ID])
-    # When/Then
-    _bq_helper.drop_all_tables_by_labels(project_id=_TEST_PROJECT_ID, labels=_TEST_LABELS)
+    table_fqn_id_lst = [f'{_TEST_SOURCE_TABLE_FQN_ID}_{ndx}' for ndx in range(5)]
+    dropped = []
 
+    def mocked_drop_table(*, table_fqn_id: str) -> None:
+        dropped.append(table_fqn_id)
+        if table_fqn_id.endswith('_0'):
+            raise ConnectionError(table_fqn_id)
 
-def test_drop_all_tables_by_labels_nok(monkeypatch):
+    monkeypatch.setattr(
+        _bq_helper._bq_base,
+        'list_all_tables_in_dataset_with_filter',
+        lambda **kwargs: (table_fqn_id_lst, len(table_fqn_id_lst) + 1),
+    )
+    monkeypatch.setattr(_bq_helper._bq_base, 'drop_table', mocked_drop_table)
+    # When
+    with pytest.raises(RuntimeError) as err:
+        _bq_helper.clean_up_dataset_by_labels(
+            project_id=_TEST_PROJECT_ID,
+            dataset_id=_TEST_DATASET_ID,
+            labels=_TEST_LABELS,
+            max_workers=2,
+        )
+    # Then
+    assert sorted(dropped) == sorted(table_fqn_id_lst)
+    assert table_fqn_id_lst[0] in str(err.value)
+
+
+class _StubCleanupDataset:
+    def __init__(self, created: Optional[datetime] = None):
+        self.created = created
+
+
+@pytest.mark.parametrize(
+    'table_fqn_id_lst,total_tables,dataset_created,has_models_or_routines,'
+    'expected_removed,expected_dropped',
+    [
+        ([], 0, datetime(2000, 1, 1, tzinfo=timezone.utc), False, [False], []),
+        ([], 0, datetime(2100, 1, 1, tzinfo=timezone.utc), False, [], []),
+        (['table_a', 'table_b'], 2, None, False, [True], []),
+        (['table_a', 'table_b'], 2, None, True, [], ['table_a', 'table_b']),
+        (['table_a'], 2, None, False, [], ['table_a']),
+    ],
+)
+def test_clean_up_dataset_by_labels_ok(  # pylint: disable=too-many-arguments
+    monkeypatch,
+    *,
+    table_fqn_id_lst: List[str],
+    total_tables: int,
+    dataset_created: Optional[datetime],
+    has_models_or_routines: bool,
+    expected_removed: List[bool],
+    expected_dropped: List[str],
+):
     # Given
-    _mock_calls__big_query(
-        monkeypatch,
-        table_fqn_id_lst=[_TEST_SOURCE_TABLE_FQN_ID],
-        drop_table_exception=ConnectionError(),
+    created_before = datetime(2050, 1, 1, tzinfo=timezone.utc)
+    removed = []
+    dropped = []
+
+    def mocked_list_all_tables_in_dataset_with_filter(**kwargs) -> Tuple[List[str], int]:
+        assert kwargs.get('dataset_id') == _TEST_DATASET_ID
+        assert callable(kwargs.get('filter_fn'))
+        return table_fqn_id_lst, total_tables
+
+    def mocked_get_dataset(project_id: str, dataset_id: str) -> Any:
+        assert project_id == _TEST_PROJECT_ID
+        assert dataset_id == _TEST_DATASET_ID
+        return _StubCleanupDataset(dataset_created)
+
+    def mocked_remove_dataset(**kwargs) -> None:
+        removed.append(kwargs.get('delete_contents'))
+
+    def mocked_drop_table(*, table_fqn_id: str) -> None:
+        dropped.append(table_fqn_id)
+
+    monkeypatch.setattr(
+        _bq_helper._bq_base,
+        'list_all_tables_in_dataset_with_filter',
+        mocked_list_all_tables_in_dataset_with_filter,
     )
-    # When/Then
-    with pytest.raises(RuntimeError):
-        _bq_helper.drop_all_tables_by_labels(project_id=_TEST_PROJECT_ID, labels=_TEST_LABELS)
+    monkeypatch.setattr(_bq_helper._bq_base, 'get_dataset', mocked_get_dataset)
+    monkeypatch.setattr(
+        _bq_helper._bq_base,
+        'has_models_or_routines',
+        lambda project_id, dataset_id: has_models_or_routines,
+    )
+    monkeypatch.setattr(_bq_helper._bq_base, 'remove_dataset', mocked_remove_dataset)
+    monkeypatch.setattr(_bq_helper._bq_base, 'drop_table', mocked_drop_table)
+    # When
+    _bq_helper.clean_up_dataset_by_labels(
+        project_id=_TEST_PROJECT_ID,
+        dataset_id=_TEST_DATASET_ID,
+        created_before=created_before,
+        max_workers=1,
+    )
+    # Then
+    assert removed == expected_removed
+    assert sorted(dropped) == expected_dropped
+
+
+def test_clean_up_dataset_by_labels_ok_keep_table_ids(monkeypatch):
+    # Given
+    keep_table_ids = ['table_keep']
+    removed = []
+    dropped = []
+    filter_fn_results = {}
+
+    def mocked_list_all_tables_in_dataset_with_filter(**kwargs) -> Tuple[List[str], int]:
+        filter_fn = kwargs.get('filter_fn')
+        for table_id in ['table_keep', 'table_stale']:
+            table_list_item = types.SimpleNamespace(
+                table_id=table_id, labels=_TEST_LABELS, created=None
+            )
+            filter_fn_results[table_id] = filter_fn(table_list_item)
+        return ['table_stale'], 2
+
+    monkeypatch.setattr(
+        _bq_helper._bq_base,
+        'list_all_tables_in_dataset_with_filter',
+        mocked_list_all_tables_in_dataset_with_filter,
+    )
+    monkeypatch.setattr(
+        _bq_helper._bq_base, 'remove_dataset', lambda **kwargs: removed.append(kwargs)
+    )
+    monkeypatch.setattr(
+        _bq_helper._bq_base, 'drop_table', lambda *, table_fqn_id: dropped.append(table_fqn_id)
+    )
+    # When
+    _bq_helper.clean_up_dataset_by_labels(
+        project_id=_TEST_PROJECT_ID,
+        dataset_id=_TEST_DATASET_ID,
+        labels=_TEST_LABELS,
+        keep_table_ids=keep_table_ids,
+    )
+    # Then
+    assert filter_fn_results == {'table_keep': False, 'table_stale': True}
+    assert not removed
+    assert dropped == ['table_stale']
+
+
+@pytest.mark.parametrize(
+    'table_fqn_id_lst,total_tables',
+    [
+        ([], 0),
+        (['table_stale_a', 'table_stale_b'], 2),
+    ],
+)
+def test_clean_up_dataset_by_labels_ok_keep_table_ids_never_removes_dataset(
+    monkeypatch, table_fqn_id_lst: List[str], total_tables: int
+):
+    # Given
+    removed = []
+    dropped = []
+    monkeypatch.setattr(
+        _bq_helper._bq_base,
+        'list_all_tables_in_dataset_with_filter',
+        lambda **kwargs: (table_fqn_id_lst, total_tables),
+    )
+    monkeypatch.setattr(
+        _bq_helper._bq_base, 'remove_dataset', lambda **kwargs: removed.append(kwargs)
+    )
+    monkeypatch.setattr(
+        _bq_helper._bq_base, 'drop_table', lambda *, table_fqn_id: dropped.append(table_fqn_id)
+    )
+    # When
+    _bq_helper.clean_up_dataset_by_labels(
+        project_id=_TEST_PROJECT_ID,
+        dataset_id=_TEST_DATASET_ID,
+        labels=_TEST_LABELS,
+        keep_table_ids=['table_keep'],
+        max_workers=1,
+    )
+    # Then
+    assert not removed
+    assert sorted(dropped) == table_fqn_id_lst
@@ -47,13 +47,28 @@ def get_gcs_prefixes_http_iterator(bucket_name: str, prefix: str) -> Generator[s
             yield f'{item.relative_to(root_path)}/'
 
 
-def list_blob_names(bucket_name: str, prefix: str) -> Generator[str, None, None]:
+def list_blob_names(
+    bucket_name: str,
+    prefix: str,
+    start_offset: Optional[str] = None,
+    end_offset: Optional[str] = None,
+) -> Generator[str, None, None]:
     """
     To mimic `gcp_storage._list_blob_names(bucket_name)`.
     :param prefix:
     :param bucket_name:
+    :param start_offset:
+    :param end_offset:
     :return:
     """
+    for name in _walk_blob_names(bucket_name, prefix):
+        if (start_offset is None or name >= start_offset) and (
+            end_offset is None or name < end_offset
+        ):
+            yield name
+
+
+def _walk_blob_names(bucket_name: str, prefix: str) -> Generator[str, None, None]:
     path = _TEST_DATA_DIR.joinpath(bucket_name)
     root_path_len = len(str(path))
     if isinstance(prefix, str):
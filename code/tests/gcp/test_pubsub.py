@@ -0,0 +1,188 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=missing-module-docstring,missing-class-docstring,missing-function-docstring
+# pylint: disable=missing-function-docstring,assignment-from-no-return,c-extension-no-member
+# pylint: disable=protected-access,redefined-outer-name,no-self-use,using-constant-test
+# pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
+# type: ignore
+import base64
+from concurrent import futures
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from bq_sampler.gcp import pubsub
+
+_TEST_TOPIC_PATH: str = 'projects/TEST_PROJECT/topics/TEST_TOPIC'
+
+
+class _StubPublisherClient:
+    def __init__(self, failed: Optional[List[Dict[str, Any]]] = None):
+        self.failed = failed if failed is not None else []
+        self.published = []
+        self.attributes = []
+        self.ordering_keys = []
+        self.resumed = []
+
+    def publish(
+        self, topic: str, data: bytes, ordering_key: str = '', **attributes
+    ) -> futures.Future:
+        assert topic == _TEST_TOPIC_PATH
+        value = pubsub.decode_data(data)
+        self.published.append(value)
+        self.attributes.append(attributes)
+        self.ordering_keys.append(ordering_key)
+        result = futures.Future()
+        if value in self.failed:
+            result.set_exception(RuntimeError('TEST'))
+        else:
+            result.set_result('TEST_MESSAGE_ID')
+        return result
+
+    def resume_publish(self, topic: str, ordering_key: str) -> None:
+        assert topic == _TEST_TOPIC_PATH
+        self.resumed.append(ordering_key)
+
+
+def _mock_client(
+    monkeypatch, client: _StubPublisherClient, enable_message_ordering: bool = False
+) -> None:
+    def mocked_client(
+        batch_settings: Optional[Any] = None, enable_message_ordering_arg: bool = False
+    ) -> _StubPublisherClient:
+        assert batch_settings.max_messages == 10
+        assert enable_message_ordering_arg == enable_message_ordering
+        return client
+
+    monkeypatch.setattr(pubsub, '_client', mocked_client)
+
+
+def test_batch_publisher_ok(monkeypatch):
+    # Given
+    client = _StubPublisherClient()
+    _mock_client(monkeypatch, client)
+    values = [{'value': ndx} for ndx in range(3)]
+    attributes = {'type': 'TEST_TYPE'}
+    # When
+    with pubsub.BatchPublisher(max_messages=10) as publisher:
+        for value in values:
+            publisher.publish(value, _TEST_TOPIC_PATH, attributes)
+        result = publisher.wait()
+    # Then
+    assert result == len(values)
+    assert client.published == values
+    assert client.attributes == [attributes] * len(values)
+
+
+def test_batch_publisher_ok_compact(monkeypatch):
+    # Given
+    client = _StubPublisherClient()
+    _mock_client(monkeypatch, client)
+    encoded = []
+    monkeypatch.setattr(
+        client, 'publish', lambda topic, data, **kwargs: encoded.append(data) or futures.Future()
+    )
+    value = {'value': 'TEST_VALUE'}
+    publisher = pubsub.BatchPublisher(max_messages=10, compact=True)
+    # When
+    publisher.publish(value, _TEST_TOPIC_PATH)
+    # Then
+    assert encoded[0].startswith(pubsub.COMPACT_ENCODING_MAGIC)
+    assert pubsub.parse_json_data(base64.b64encode(encoded[0])) == value
+
+
+def test_batch_publisher_nok_aggregates_failures(monkeypatch):
+    # Given
+    values = [{'value': ndx} for ndx in range(4)]
+    client = _StubPublisherClient(failed=values[1:3])
+    _mock_client(monkeypatch, client)
+    publisher = pubsub.BatchPublisher(max_messages=10)
+    for value in values:
+        publisher.publish(value, _TEST_TOPIC_PATH)
+    # When/Then
+    with pytest.raises(pubsub.PubSubBatchPublishError) as err:
+        publisher.wait()
+    assert [value for value, _ in err.value.failed] == values[1:3]
+    assert client.published == values
+    # nothing left to wait for
+    assert publisher.wait() == 0
+
+
+def test__batch_settings_ok():
+    # Given/When
+    result = pubsub._batch_settings(max_messages=10)
+    # Then
+    assert result.max_messages == 10
+    assert result.max_bytes == pubsub.types.BatchSettings().max_bytes
+
+
+@pytest.mark.parametrize(
+    'attributes',
+    [
+        {'type': 17},
+        {17: 'type'},
+        ['type'],
+    ],
+)
+def test_batch_publisher_nok_attributes(monkeypatch, attributes: Any):
+    # Given
+    client = _StubPublisherClient()
+    _mock_client(monkeypatch, client)
+    publisher = pubsub.BatchPublisher(max_messages=10)
+    # When/Then
+    with pytest.raises(TypeError):
+        publisher.publish({'value': 1}, _TEST_TOPIC_PATH, attributes)
+    assert not client.published
+
+
+def test_batch_publisher_ok_ordering_key(monkeypatch):
+    # Given
+    values = [{'value': ndx} for ndx in range(3)]
+    client = _StubPublisherClient(failed=values[1:2])
+    _mock_client(monkeypatch, client, enable_message_ordering=True)
+    publisher = pubsub.BatchPublisher(max_messages=10, enable_message_ordering=True)
+    for ndx, value in enumerate(values):
+        publisher.publish(value, _TEST_TOPIC_PATH, ordering_key=f'KEY_{ndx}')
+    # When/Then
+    with pytest.raises(pubsub.PubSubBatchPublishError):
+        publisher.wait()
+    assert client.ordering_keys == ['KEY_0', 'KEY_1', 'KEY_2']
+    # the failed ordering key can be published again
+    assert client.resumed == ['KEY_1']
+
+
+def test_batch_publisher_ok_nothing_published(monkeypatch):
+    # Given
+    def mocked_client(*args, **kwargs) -> _StubPublisherClient:
+        raise RuntimeError('TEST')
+
+    monkeypatch.setattr(pubsub, '_client', mocked_client)
+    # When
+    with pubsub.BatchPublisher(max_messages=10) as publisher:
+        result = publisher.wait()
+    # Then
+    assert result == 0
+
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_parse_json_data_ok(compact: bool):
+    # Given
+    value = {'type': 'TEST_TYPE', 'nested': {'list': [1, 'two', None], 'flag': True}}
+    data = base64.b64encode(pubsub._encode_data(value, _TEST_TOPIC_PATH, compact))
+    # When
+    result = pubsub.parse_json_data(data)
+    # Then
+    assert result == value
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        # unsupported compact encoding version
+        pubsub.COMPACT_ENCODING_MAGIC + bytes([pubsub.COMPACT_ENCODING_VERSION + 1]) + b'{}',
+        b'not JSON',
+    ],
+)
+def test_parse_json_data_nok(data: bytes):
+    # Given/When/Then
+    with pytest.raises(RuntimeError):
+        pubsub.parse_json_data(base64.b64encode(data))
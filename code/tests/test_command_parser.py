@@ -16,9 +16,13 @@ from tests.entity import command_test_data
     'value',
     [
         command_test_data.TEST_COMMAND_START,
+        command_test_data.TEST_COMMAND_SAMPLE_POLICY_PROJECT,
         command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX,
         command_test_data.TEST_COMMAND_SAMPLE_START,
         command_test_data.TEST_COMMAND_SAMPLE_DONE,
+        command_test_data.TEST_COMMAND_CLEANUP_DATASET,
+        command_test_data.TEST_COMMAND_TRANSFER_WATCHDOG,
+        command_test_data.TEST_COMMAND_RUN_COMPLETE,
     ],
 )
 def test_to_command_ok(value: command.CommandBase):
@@ -32,3 +36,24 @@ def test_to_command_ok(value: command.CommandBase):
             assert result.timestamp == timestamp
         else:
             assert getattr(value, key) == getattr(result, key)
+
+
+def test_to_command_ok_command_batch():
+    # Given
+    value = command_test_data.TEST_COMMAND_COMMAND_BATCH
+    timestamp = 31
+    # When
+    result = command_parser.to_command(value.as_dict(), timestamp)
+    # Then
+    assert isinstance(result, command.CommandBatch)
+    assert result.timestamp == timestamp
+    assert result.commands == [cmd.clone(timestamp=timestamp) for cmd in value.commands]
+
+
+def test_to_command_nok_nested_command_batch():
+    # Given
+    value = command_test_data.TEST_COMMAND_COMMAND_BATCH.as_dict()
+    value['commands'].append(command_test_data.TEST_COMMAND_COMMAND_BATCH.as_dict())
+    # When/Then
+    with pytest.raises(ValueError):
+        command_parser.to_command(value, 31)
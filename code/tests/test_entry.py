@@ -73,3 +73,16 @@ def test_handler_nok_empty_args():
     response = entry.handler(event, context)
     # Then
     assert 'Could not process event:' in response
+
+
+def test_handler_nok_not_due(monkeypatch):
+    # Given
+    error = entry.sampler_schedule.SampleNotDueError('TEST')
+
+    def mocked_handler(*args) -> str:
+        raise error
+
+    monkeypatch.setattr(entry, '_handler', mocked_handler)
+    # When/Then
+    with pytest.raises(entry.sampler_schedule.SampleNotDueError):
+        entry.handler({}, None)
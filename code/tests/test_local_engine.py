@@ -0,0 +1,103 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=missing-module-docstring,missing-class-docstring,missing-function-docstring
+# pylint: disable=missing-function-docstring,assignment-from-no-return,c-extension-no-member
+# pylint: disable=protected-access,redefined-outer-name,no-self-use,using-constant-test
+# pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
+# type: ignore
+import threading
+from typing import List, Optional
+
+import pytest
+
+from bq_sampler import local_engine
+from bq_sampler.entity import command
+
+from tests.entity import command_test_data
+
+_TEST_PREFIXES: List[str] = ['project_a/dataset_a', 'project_b/dataset_b']
+
+
+def _mock_process(monkeypatch, failed_prefix: Optional[str] = None) -> List[command.CommandBase]:
+    result = []
+    lock = threading.Lock()
+
+    def mocked_process(value: command.CommandBase, *, with_retry: bool) -> str:
+        assert not with_retry
+        with lock:
+            result.append(value)
+        if value.type == command.CommandType.START.value:
+            for prefix in _TEST_PREFIXES:
+                local_engine.process_request._publish_cmd_to_pubsub(
+                    command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX.clone(prefix=prefix)
+                )
+        elif value.type == command.CommandType.SAMPLE_POLICY_PREFIX.value:
+            if value.prefix == failed_prefix:
+                raise RuntimeError('TEST')
+            local_engine.process_request._publish_cmd_to_pubsub(
+                command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+            )
+        return 'OK'
+
+    monkeypatch.setattr(local_engine.process_request, 'process', mocked_process)
+    return result
+
+
+def test_run_ok(monkeypatch):
+    # Given
+    processed = _mock_process(monkeypatch)
+    engine = local_engine.LocalEngine(max_workers=2, with_retry=False)
+    # When
+    result = engine.run(command_test_data.TEST_COMMAND_START)
+    # Then
+    assert result == 5
+    assert sorted(cmd.type for cmd in processed) == sorted(
+        [command.CommandType.START.value]
+        + [command.CommandType.SAMPLE_POLICY_PREFIX.value] * 2
+        + [command.CommandType.SAMPLE_START.value] * 2
+    )
+    assert local_engine.process_request._DISPATCHER is None
+
+
+def test_run_nok(monkeypatch):
+    # Given
+    processed = _mock_process(monkeypatch, failed_prefix=_TEST_PREFIXES[0])
+    engine = local_engine.LocalEngine(max_workers=2, with_retry=False)
+    # When/Then
+    with pytest.raises(RuntimeError):
+        engine.run(command_test_data.TEST_COMMAND_START)
+    # the other prefix is still processed
+    assert len(processed) == 4
+    assert local_engine.process_request._DISPATCHER is None
+
+
+def test_run_ok_not_due(monkeypatch):
+    # Given
+    processed = []
+    not_due = [command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM]
+
+    def mocked_process(value: command.CommandBase, *, with_retry: bool) -> str:
+        assert not with_retry
+        processed.append(value)
+        if value.type == command.CommandType.START.value:
+            local_engine.process_request._publish_cmd_to_pubsub(not_due[0])
+        elif not_due:
+            not_due.pop()
+            raise local_engine.sampler_schedule.SampleNotDueError('TEST')
+        return 'OK'
+
+    slept = []
+    monkeypatch.setattr(local_engine.process_request, 'process', mocked_process)
+    monkeypatch.setattr(local_engine.sampler_schedule, 'seconds_until_due', lambda _: 10)
+    monkeypatch.setattr(local_engine.time, 'time', lambda: 100 + sum(slept))
+    monkeypatch.setattr(local_engine.time, 'sleep', slept.append)
+    engine = local_engine.LocalEngine(max_workers=2, with_retry=False)
+    # When
+    result = engine.run(command_test_data.TEST_COMMAND_START)
+    # Then
+    assert result == 2
+    assert [cmd.type for cmd in processed] == [
+        command.CommandType.START.value,
+        command.CommandType.SAMPLE_START.value,
+        command.CommandType.SAMPLE_START.value,
+    ]
+    assert slept == [10]
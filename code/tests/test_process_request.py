@@ -1,16 +1,19 @@
 # vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=too-many-lines
 # pylint: disable=missing-module-docstring,missing-class-docstring,missing-function-docstring
 # pylint: disable=missing-function-docstring,assignment-from-no-return,c-extension-no-member
 # pylint: disable=protected-access,redefined-outer-name,no-self-use,using-constant-test
 # pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
+# pylint: disable=unused-argument
 # type: ignore
 import types
 from typing import Any, Dict, List, Optional
 
+import attrs
 import pytest
 
-from bq_sampler import const, process_request
-from bq_sampler.entity import command, table
+from bq_sampler import command_parser, const, process_request
+from bq_sampler.entity import command, table, transfer
 
 from tests.entity import sample_policy_data, command_test_data
 from tests.gcp import gcs_on_disk
@@ -26,17 +29,69 @@ class _StubGeneralConfig:  # pylint: disable=too-many-instance-attributes
         self.policy_bucket = None
         self.default_policy_path = None
         self.request_bucket = None
+        self.state_bucket = None
+        self.extract_bucket = None
         self.pubsub_request = None
         self.pubsub_error = None
         self.sampling_lock_path = None
         self.pubsub_bq_notification = None
         self.bq_transfer_sa = None
+        self.cleanup_max_workers = None
+        self.sample_expiration_ms = None
+        self.staging_expiration_ms = None
+        self.transfer_run_timeout_sec = None
+        self.transfer_run_max_attempts = None
+        self.persistent_transfer_configs = False
+        self.pubsub_batch_max_messages = None
+        self.pubsub_batch_max_bytes = None
+        self.pubsub_batch_max_latency_sec = None
+        self.pubsub_compact_encoding = False
+        self.command_batch_max_size = const.COMMAND_BATCH_DEFAULT_MAX_SIZE
+        self.command_batch_max_rows = const.COMMAND_BATCH_DEFAULT_MAX_ROWS
+        self.command_batch_max_workers = const.COMMAND_BATCH_DEFAULT_MAX_WORKERS
+        self.sample_start_claim_timeout_sec = const.SAMPLE_START_CLAIM_DEFAULT_TIMEOUT_SEC
+        self.sample_start_jobs_per_sec = None
+        self.sample_start_max_in_flight = None
+        self.sample_start_max_delay_sec = const.SAMPLE_START_DEFAULT_MAX_DELAY_SEC
+        self.sample_policy_prefix_shard_size = None
+        self.sample_policy_prefix_deadline_sec = None
+
+
+@pytest.mark.parametrize(
+    'value,expected',
+    [
+        (None, const.BQ_CLEANUP_DEFAULT_MAX_WORKERS),
+        ('', const.BQ_CLEANUP_DEFAULT_MAX_WORKERS),
+        ('3', 3),
+    ],
+)
+def test__cleanup_max_workers_from_env_ok(monkeypatch, value: Optional[str], expected: int):
+    # Given
+    if value is None:
+        monkeypatch.delenv(process_request._CLEANUP_MAX_WORKERS_ENV_VAR, raising=False)
+    else:
+        monkeypatch.setenv(process_request._CLEANUP_MAX_WORKERS_ENV_VAR, value)
+    # When
+    result = process_request._cleanup_max_workers_from_env()
+    # Then
+    assert result == expected
+
+
+@pytest.mark.parametrize('value', ['ten', '0', '-1'])
+def test__cleanup_max_workers_from_env_nok(monkeypatch, value: str):
+    # Given
+    monkeypatch.setenv(process_request._CLEANUP_MAX_WORKERS_ENV_VAR, value)
+    # When/Then
+    with pytest.raises(ValueError) as err:
+        process_request._cleanup_max_workers_from_env()
+    assert process_request._CLEANUP_MAX_WORKERS_ENV_VAR in str(err.value)
 
 
 @pytest.mark.parametrize(
     'cmd,process_fn',
     [
         (command_test_data.TEST_COMMAND_START, '_process_start'),
+        (command_test_data.TEST_COMMAND_SAMPLE_POLICY_PROJECT, '_process_sample_policy_project'),
         (command_test_data.TEST_COMMAND_SAMPLE_START, '_process_sample_start'),
         (command_test_data.TEST_COMMAND_SAMPLE_DONE, '_process_sample_done'),
     ],
@@ -57,6 +112,106 @@ def test_process_ok(monkeypatch, cmd: command.CommandBase, process_fn: str):
     assert called
 
 
+@pytest.mark.parametrize(
+    'cmd,current_run_timestamp,expected_shed',
+    [
+        (command_test_data.TEST_COMMAND_SAMPLE_POLICY_PROJECT, 18, True),
+        (command_test_data.TEST_COMMAND_SAMPLE_POLICY_PROJECT, 17, False),
+        (command_test_data.TEST_COMMAND_SAMPLE_POLICY_PROJECT, None, False),
+        (
+            attrs.evolve(command_test_data.TEST_COMMAND_SAMPLE_START, run_timestamp=11),
+            18,
+            True,
+        ),
+        # no run timestamp
+        (command_test_data.TEST_COMMAND_SAMPLE_START, 18, False),
+        # accounts for sampling already done
+        (
+            attrs.evolve(command_test_data.TEST_COMMAND_SAMPLE_DONE, run_timestamp=11),
+            18,
+            False,
+        ),
+        # dropped instead of delivered again until due
+        (
+            attrs.evolve(
+                command_test_data.TEST_COMMAND_SAMPLE_START,
+                run_timestamp=11,
+                not_before_timestamp=1000,
+            ),
+            18,
+            True,
+        ),
+        (
+            command.CommandBatch(
+                type=command.CommandType.COMMAND_BATCH.value,
+                timestamp=17,
+                commands=[
+                    attrs.evolve(
+                        command_test_data.TEST_COMMAND_SAMPLE_START,
+                        run_timestamp=11,
+                        not_before_timestamp=1000,
+                    )
+                ]
+                * 2,
+            ),
+            18,
+            True,
+        ),
+    ],
+)
+def test_process_ok_superseded_run(
+    monkeypatch,
+    cmd: command.CommandBase,
+    current_run_timestamp: Optional[int],
+    expected_shed: bool,
+):
+    # Given
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    _mock_general_config(monkeypatch, config)
+    monkeypatch.setattr(
+        process_request, '_current_run_timestamp', lambda bucket_name: current_run_timestamp
+    )
+    shed = []
+    monkeypatch.setattr(
+        process_request.sampler_ledger, 'shed', lambda **kwargs: shed.append(kwargs)
+    )
+    monkeypatch.setattr(process_request.sampler_ledger, 'complete', lambda **kwargs: None)
+    monkeypatch.setattr(process_request.sampler_schedule.time, 'time', lambda: 900)
+    processed = []
+    monkeypatch.setattr(process_request, '_process_with_retry', processed.append)
+    # When
+    result = process_request.process(cmd)
+    # Then
+    assert result == 'OK'
+    assert processed == ([] if expected_shed else [cmd])
+    values = cmd.commands if isinstance(cmd, command.CommandBatch) else [cmd]
+    assert shed == (
+        [
+            dict(bucket_name=config.state_bucket, run_timestamp=value.run_timestamp, value=value)
+            for value in values
+        ]
+        if expected_shed
+        else []
+    )
+
+
+def test__set_current_run_ok(monkeypatch):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_START
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    _mock_general_config(monkeypatch, config)
+    called = []
+    monkeypatch.setattr(
+        process_request.sampler_ledger, 'set_current_run', lambda **kwargs: called.append(kwargs)
+    )
+    # When
+    process_request._set_current_run(cmd)
+    # Then
+    assert called == [dict(bucket_name=config.state_bucket, run_timestamp=cmd.timestamp)]
+
+
 def test_process_nok(monkeypatch):
     # Given
     cmd = command_test_data.TEST_COMMAND_START
@@ -68,7 +223,9 @@ def test_process_nok(monkeypatch):
     def mocked_process(_) -> None:
         raise error
 
-    def mocked_publish(value: Dict[str, Any], topic_path: str) -> str:
+    def mocked_publish(
+        value: Dict[str, Any], topic_path: str, attributes: Optional[Dict[str, str]] = None
+    ) -> str:
         nonlocal called
         called = True
         value_event = cmd.__class__.from_dict(value.get(process_request._PUBSUB_ERROR_CMD_ENTRY))
@@ -86,6 +243,47 @@ def test_process_nok(monkeypatch):
         assert called
 
 
+def test_process_nok_sample_policy_prefix_not_retried(monkeypatch):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX
+    called = []
+
+    def mocked_process(value: command.CommandSamplePolicyPrefix) -> None:
+        called.append(value)
+        raise process_request.SamplePolicyPrefixError('TEST')
+
+    _mock_general_config(monkeypatch, _StubGeneralConfig())
+    monkeypatch.setattr(process_request, '_process_sample_policy_prefix', mocked_process)
+    monkeypatch.setattr(process_request, '_DISPATCHER', lambda _: None)
+    # When/Then
+    with pytest.raises(RuntimeError):
+        process_request.process(cmd, with_retry=True)
+    assert called == [cmd]
+
+
+def test_process_nok_dispatcher(monkeypatch):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_START
+    dispatched = []
+
+    def mocked_process(_) -> None:
+        process_request._publish_cmd_to_pubsub(command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX)
+        raise TypeError('TEST_MESSAGE')
+
+    def mocked_publish(*args, **kwargs) -> None:
+        raise RuntimeError('Should not publish with a dispatcher')
+
+    _mock_general_config(monkeypatch, _StubGeneralConfig())
+    monkeypatch.setattr(process_request, '_process_start', mocked_process)
+    monkeypatch.setattr(process_request.pubsub, 'publish', mocked_publish)
+    monkeypatch.setattr(process_request, '_DISPATCHER', dispatched.append)
+    # When/Then
+    with pytest.raises(RuntimeError) as err:
+        process_request.process(cmd, with_retry=False)
+    assert 'TEST_MESSAGE' in str(err.value)
+    assert dispatched == [command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX]
+
+
 def _mock_general_config(monkeypatch, config: _StubGeneralConfig) -> None:
     def mocked_config() -> Any:
         return config
@@ -93,6 +291,64 @@ def _mock_general_config(monkeypatch, config: _StubGeneralConfig) -> None:
     monkeypatch.setattr(process_request, '_general_config', mocked_config)
 
 
+class _StubBatchPublisher:
+    """
+    Publishes right away with :py:func:`pubsub.publish`, i.e., tests mock it alone.
+    """
+
+    def __init__(self, failed: Optional[List[Dict[str, Any]]] = None):
+        self.failed = failed if failed is not None else []
+        self.published = []
+        self.ordering_keys = []
+
+    def __enter__(self) -> '_StubBatchPublisher':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        self.wait()
+        return False
+
+    def publish(
+        self,
+        value: Dict[str, Any],
+        topic_path: str,
+        attributes: Optional[Dict[str, str]] = None,
+        ordering_key: Optional[str] = None,
+    ) -> None:
+        process_request.pubsub.publish(value, topic_path, attributes)
+        self.published.append(value)
+        self.ordering_keys.append(ordering_key)
+
+    def wait(self) -> int:
+        failed = [(value, RuntimeError('TEST')) for value in self.published if value in self.failed]
+        if failed:
+            raise process_request.pubsub.PubSubBatchPublishError('TEST', failed)
+        return len(self.published)
+
+
+def _mock_batch_publisher(monkeypatch, publisher: Optional[_StubBatchPublisher] = None) -> None:
+    publisher = publisher if publisher is not None else _StubBatchPublisher()
+    monkeypatch.setattr(process_request, '_batch_publisher', lambda: publisher)
+
+
+@pytest.mark.parametrize('compact', [True, False])
+def test__publish_cmd_to_pubsub_ok_compact(monkeypatch, compact: bool):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_START
+    config = _StubGeneralConfig()
+    config.pubsub_request = 'PUBSUB_REQUEST'
+    config.pubsub_compact_encoding = compact
+    _mock_general_config(monkeypatch, config)
+    called = []
+    monkeypatch.setattr(
+        process_request.pubsub, 'publish', lambda *args, **kwargs: called.append(kwargs)
+    )
+    # When
+    process_request._publish_cmd_to_pubsub(cmd)
+    # Then
+    assert called == [dict(compact=compact)]
+
+
 def test__create_sample_start_request_ok(monkeypatch):
     # Given
     cmd = command_test_data.TEST_COMMAND_START
@@ -104,7 +360,7 @@ def test__create_sample_start_request_ok(monkeypatch):
     _mock_general_config(monkeypatch, config)
     # When
     result = process_request._create_sample_start_cmd(
-        cmd, table_policy, table_sample, target_location
+        cmd, table_policy, table_sample, target_location=target_location
     )
     # Then
     assert isinstance(result, command.CommandSampleStart)
@@ -125,47 +381,39 @@ def test__process_start_ok(monkeypatch):
     cmd = command_test_data.TEST_COMMAND_START
     config = _StubGeneralConfig()
     config.target_location = 'TEST_LOCATION'
+    config.target_project_id = 'TEST_PROJECT_ID'
     config.default_policy_path = _GENERAL_POLICY_PATH
     config.policy_bucket = gcs_on_disk.POLICY_BUCKET
     config.request_bucket = 'REQUEST_BUCKET'
     config.pubsub_request = 'PUBSUB_REQUEST'
     config.sampling_lock_path = _SAMPLING_LOCK_PATH
-    sample_policy_prefix_req_lst: List[command.CommandSampleStart] = []
-    called_drop = False
-    called_remove = False
-    called_removed_transfer_config = False
-    called_publish = False
+    sample_policy_project_req_lst: List[command.CommandSamplePolicyProject] = []
+    cleanup_req_lst: List[command.CommandCleanupDataset] = []
+    datasets = ['dataset_id_b', 'TEST_DATASET_STALE']
+    transfer_configs = ['TEST_TRANSFER_CONFIG_A']
 
-    def mocked_drop_all_sample_tables(  # pylint: disable=unused-argument
-        *,
-        project_id: str,
-        labels: Optional[Dict[str, str]] = None,
-    ) -> None:
-        nonlocal called_drop
-        assert project_id == config.target_project_id
-        called_drop = True
-
-    def mocked_publish(value: Dict[str, Any], topic_path: str) -> str:
-        assert topic_path == config.pubsub_request
-        nonlocal sample_policy_prefix_req_lst
-        nonlocal called_publish
-        sample_policy_prefix_req_lst.append(command.CommandSamplePolicyPrefix.from_dict(value))
-        called_publish = True
-
-    def mock_remove_all_empty_sample_datasets(  # pylint: disable=unused-argument
-        *,
-        project_id: str,
-        labels: Optional[Dict[str, str]] = None,
-    ) -> None:
-        nonlocal called_remove
+    def mocked_list_all_sample_datasets(*, project_id: str) -> Any:
         assert project_id == config.target_project_id
-        called_remove = True
+        yield from datasets
 
-    def mock_remove_all_transfer_config(*, project_id: str, location: str) -> None:
-        nonlocal called_removed_transfer_config
+    def mocked_list_all_transfer_config_names(*, project_id: str, location: str) -> Any:
         assert project_id == config.target_project_id
         assert location == config.target_location
-        called_removed_transfer_config = True
+        yield from transfer_configs
+
+    def mocked_publish(
+        value: Dict[str, Any],
+        topic_path: str,
+        attributes: Optional[Dict[str, str]] = None,
+        compact: Optional[bool] = False,
+    ) -> str:
+        assert topic_path == config.pubsub_request
+        if value.get('type') == command.CommandType.CLEANUP_DATASET.value:
+            cleanup_req_lst.append(command.CommandCleanupDataset.from_dict(value))
+        else:
+            sample_policy_project_req_lst.append(
+                command.CommandSamplePolicyProject.from_dict(value)
+            )
 
     _mock_general_config(monkeypatch, config)
     monkeypatch.setattr(process_request.sampler_bucket.gcs, 'read_object', gcs_on_disk.read_object)
@@ -174,35 +422,81 @@ def test__process_start_ok(monkeypatch):
         '_get_gcs_prefixes_http_iterator',
         gcs_on_disk.get_gcs_prefixes_http_iterator,
     )
+    listed_objects = []
+
+    def mocked_list_blob_names(*args, **kwargs) -> Any:
+        listed_objects.append(args)
+        return gcs_on_disk.list_blob_names(*args, **kwargs)
+
     monkeypatch.setattr(
-        process_request.sampler_bucket.gcs, '_list_blob_names', gcs_on_disk.list_blob_names
-    )
-    monkeypatch.setattr(
-        process_request.sampler_query, 'drop_all_sample_tables', mocked_drop_all_sample_tables
+        process_request.sampler_bucket.gcs, '_list_blob_names', mocked_list_blob_names
     )
     monkeypatch.setattr(
-        process_request.sampler_query,
-        'remove_all_empty_sample_datasets',
-        mock_remove_all_empty_sample_datasets,
+        process_request.sampler_query, 'list_all_sample_datasets', mocked_list_all_sample_datasets
     )
     monkeypatch.setattr(
         process_request.sampler_query,
-        'remove_all_transfer_config',
-        mock_remove_all_transfer_config,
+        'list_all_transfer_config_names',
+        mocked_list_all_transfer_config_names,
     )
     monkeypatch.setattr(process_request.pubsub, 'publish', mocked_publish)
+    _mock_batch_publisher(monkeypatch)
     # When
     process_request._process_start(cmd)
     # Then
-    assert called_drop
-    assert called_remove
-    assert called_removed_transfer_config
-    assert called_publish
-    assert len(sample_policy_prefix_req_lst) == 3
-    for start_prefix_req in sample_policy_prefix_req_lst:
-        assert isinstance(start_prefix_req.prefix, str) and start_prefix_req.prefix.endswith(
-            const.GS_PREFIX_DELIM
-        )
+    assert [req.dataset_id for req in cleanup_req_lst if req.dataset_id] == datasets
+    assert [
+        req.transfer_config_name for req in cleanup_req_lst if req.transfer_config_name
+    ] == transfer_configs
+    for cleanup_req in cleanup_req_lst:
+        assert cleanup_req.project_id == config.target_project_id
+        assert cleanup_req.timestamp == cmd.timestamp
+    # planned tables are only listed by each clean up, see _process_cleanup_dataset
+    assert not listed_objects
+    assert all(req.keep_table_ids is None for req in cleanup_req_lst)
+    assert sorted(req.prefix for req in sample_policy_project_req_lst) == [
+        'project_id_a/',
+        'project_id_b/',
+    ]
+    for start_project_req in sample_policy_project_req_lst:
+        assert start_project_req.type == command.CommandType.SAMPLE_POLICY_PROJECT.value
+        assert start_project_req.run_timestamp == cmd.timestamp
+
+
+def test__process_sample_policy_project_ok(monkeypatch):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_POLICY_PROJECT
+    config = _StubGeneralConfig()
+    config.policy_bucket = gcs_on_disk.POLICY_BUCKET
+    config.pubsub_request = 'PUBSUB_REQUEST'
+    config.state_bucket = 'STATE_BUCKET'
+    _mock_general_config(monkeypatch, config)
+    monkeypatch.setattr(
+        process_request.gcs,
+        '_get_gcs_prefixes_http_iterator',
+        gcs_on_disk.get_gcs_prefixes_http_iterator,
+    )
+    monkeypatch.setattr(process_request.pubsub, 'publish', lambda *args, **kwargs: None)
+    publisher = _StubBatchPublisher()
+    _mock_batch_publisher(monkeypatch, publisher)
+    planned = []
+    monkeypatch.setattr(
+        process_request,
+        '_update_run_ledger',
+        lambda run_timestamp, update_fn, **kwargs: planned.append((update_fn, kwargs)),
+    )
+    # When
+    process_request._process_sample_policy_project(cmd)
+    # Then
+    expected = ['project_id_a/dataset_id_a/', 'project_id_a/dataset_id_b/']
+    result = [command.CommandSamplePolicyPrefix.from_dict(data) for data in publisher.published]
+    assert sorted(req.prefix for req in result) == expected
+    for req in result:
+        assert req.type == command.CommandType.SAMPLE_POLICY_PREFIX.value
+        assert req.run_timestamp == cmd.run_timestamp
+    update_fn, kwargs = planned[0]
+    assert update_fn == process_request.sampler_ledger.plan_project
+    assert sorted(kwargs.get('prefixes')) == expected
 
 
 def test__process_start_nok_sampling_lock_exists(monkeypatch):
@@ -232,15 +526,54 @@ def test__process_start_nok_sampling_lock_exists(monkeypatch):
     assert called
 
 
+def test_process_ok_command_batch(monkeypatch):
+    # Given
+    config = _StubGeneralConfig()
+    config.pubsub_error = 'PUBSUB_ERROR'
+    _mock_general_config(monkeypatch, config)
+    ok_cmd = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    failed_cmd = command_test_data.TEST_COMMAND_SAMPLE_START_SORTED
+    cmd = command.CommandBatch(
+        type=command.CommandType.COMMAND_BATCH.value, timestamp=17, commands=[ok_cmd, failed_cmd]
+    )
+    processed = []
+    published_errors = []
+
+    def mocked_process(value: command.CommandBase) -> None:
+        processed.append(value)
+        if value == failed_cmd:
+            raise ValueError('TEST')
+
+    monkeypatch.setattr(process_request, '_process', mocked_process)
+    monkeypatch.setattr(
+        process_request.pubsub,
+        'publish',
+        lambda value, topic_path, attributes=None: published_errors.append(value),
+    )
+    # When/Then
+    with pytest.raises(RuntimeError):
+        process_request.process(cmd, with_retry=False)
+    assert sorted(processed, key=str) == sorted([ok_cmd, failed_cmd], key=str)
+    # the failure is reported for the sub-command alone
+    assert [error.get('command') for error in published_errors] == [failed_cmd.as_dict()]
+
+
 def test__create_sample_done_request_ok():
     # Given
     cmd = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
     start_timestamp = 19
     end_timestamp = 37
     error_message = 'TEST_ERROR'
+    stats = process_request.bq.JobStats()
+    stats.total_bytes_billed = 100
+    stats.slot_ms = 10
     # When
     result = process_request._create_sample_done_cmd(
-        cmd, start_timestamp, end_timestamp, error_message
+        cmd,
+        start_timestamp=start_timestamp,
+        end_timestamp=end_timestamp,
+        error_message=error_message,
+        stats=stats,
     )
     # Then
     assert isinstance(result, command.CommandSampleDone)
@@ -251,6 +584,7 @@ def test__create_sample_done_request_ok():
     assert result.start_timestamp == start_timestamp
     assert result.end_timestamp == end_timestamp
     assert result.error_message == error_message
+    assert (result.total_bytes_billed, result.slot_ms) == (100, 10)
 
 
 def test__process_sample_policy_prefix_ok(monkeypatch):
@@ -272,125 +606,1442 @@ def test__process_sample_policy_prefix_ok(monkeypatch):
         process_request.sampler_bucket.gcs, '_list_blob_names', gcs_on_disk.list_blob_names
     )
     monkeypatch.setattr(process_request.sampler_query, 'row_count', lambda _: 100)
+    monkeypatch.setattr(process_request.sampler_query, 'estimated_sample_cost', lambda _: 1)
     _mock_bq_base_dataset(monkeypatch)
     _mock_publish_sample_start(monkeypatch, called, 'called_publish', config.pubsub_request)
+    _mock_batch_publisher(monkeypatch)
     # When
     process_request._process_sample_policy_prefix(cmd)
     # Then
     assert called.get('called_publish')
 
 
-def _mock_bq_base_dataset(monkeypatch) -> None:
+def _mock_policy_loaders(monkeypatch, errors_by_table: Dict[str, Exception]) -> None:
+    table_policy = sample_policy_data.TEST_TABLE_POLICY
 
-    dataset = types.SimpleNamespace()
-    setattr(dataset, 'location', sample_policy_data.TEST_SRC_LOCATION)
+    def mocked_all_policy_loaders(**kwargs) -> Any:
+        for table_id in kwargs.get('table_ids') or ['TABLE_OK', *errors_by_table]:
+            yield table_policy.table_reference.clone(table_id=table_id), table_id
 
-    # pylint: disable=unused-argument
-    def mocked_dataset(*args, **kwargs) -> object:
-        return dataset
+    def mocked_table_sample(table_id: str) -> Any:
+        if table_id in errors_by_table:
+            raise errors_by_table.get(table_id)
+        return table_policy, sample_policy_data.TEST_TABLE_SAMPLE
 
-    # pylint: enable=unused-argument
+    monkeypatch.setattr(
+        process_request.sampler_bucket, 'all_policy_loaders', mocked_all_policy_loaders
+    )
+    monkeypatch.setattr(process_request, '_table_sample_with_retry', mocked_table_sample)
+    monkeypatch.setattr(process_request.sampler_query, 'estimated_sample_cost', lambda _: 1)
 
-    monkeypatch.setattr(process_request.sampler_bucket.bq, 'get_dataset', mocked_dataset)
 
+@pytest.mark.parametrize(
+    'attempts,expected_retry',
+    [
+        (1, True),
+        (const.SAMPLE_POLICY_PREFIX_MAX_ATTEMPTS, False),
+    ],
+)
+def test__process_sample_policy_prefix_nok_retries_failed_tables(
+    monkeypatch, attempts: int, expected_retry: bool
+):
+    # Given
+    cmd = attrs.evolve(command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX, attempts=attempts)
+    _mock_general_config(monkeypatch, _StubGeneralConfig())
+    _mock_policy_loaders(
+        monkeypatch,
+        {'TABLE_TRANSIENT': ConnectionError('TEST'), 'TABLE_INVALID': ValueError('TEST')},
+    )
+    issued = []
+    monkeypatch.setattr(
+        process_request,
+        '_create_all_sample_start_cmds',
+        lambda value, table_samples: issued.extend(table_samples) or [],
+    )
+    monkeypatch.setattr(process_request, '_publish_sample_start_cmds', lambda *args: {})
+    published = []
+    monkeypatch.setattr(process_request, '_publish_cmd_to_pubsub', published.append)
+    # When/Then
+    with pytest.raises(process_request.SamplePolicyPrefixError) as err:
+        process_request._process_sample_policy_prefix(cmd)
+    assert len(issued) == 1
+    assert 'TABLE_INVALID' in str(err.value)
+    assert ('TABLE_TRANSIENT' in str(err.value)) != expected_retry
+    if expected_retry:
+        assert published == [cmd.clone(table_ids=['TABLE_TRANSIENT'], attempts=attempts + 1)]
+    else:
+        assert not published
 
-def _mock_publish_sample_start(
-    monkeypatch, called: Dict[str, bool], called_key: str, topic: str
-) -> None:
-    def mocked_publish(value: Dict[str, Any], topic_path: str) -> str:
-        nonlocal called
-        assert topic_path == topic
-        value_event = command.CommandSampleStart.from_dict(value)
-        assert value_event.type == command.CommandType.SAMPLE_START.value
-        called[called_key] = True
 
-    monkeypatch.setattr(process_request.pubsub, 'publish', mocked_publish)
+def test__process_sample_policy_prefix_ok_narrowed(monkeypatch):
+    # Given
+    cmd = attrs.evolve(
+        command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX, table_ids=['TABLE_TRANSIENT']
+    )
+    _mock_general_config(monkeypatch, _StubGeneralConfig())
+    _mock_policy_loaders(monkeypatch, {})
+    issued = []
+    monkeypatch.setattr(
+        process_request,
+        '_create_all_sample_start_cmds',
+        lambda value, table_samples: issued.extend(table_samples) or [],
+    )
+    monkeypatch.setattr(process_request, '_publish_sample_start_cmds', lambda *args: {})
+    # When
+    process_request._process_sample_policy_prefix(cmd)
+    # Then
+    assert len(issued) == 1
 
 
-def test__process_sample_start_ok_random(monkeypatch):
+def test__process_sample_policy_prefix_ok_sharded(monkeypatch):
     # Given
-    cmd = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX
     config = _StubGeneralConfig()
     config.pubsub_request = 'PUBSUB_REQUEST'
-    called = {}
+    config.sample_policy_prefix_shard_size = 2
     _mock_general_config(monkeypatch, config)
-    _mock_create_table_with_sample(
-        monkeypatch, 'create_table_with_random_sample', called, 'called_create', cmd
+    shards = [('TEST_OBJECT_A', 'TEST_OBJECT_C'), ('TEST_OBJECT_C', None)]
+    monkeypatch.setattr(
+        process_request.sampler_bucket,
+        'policy_shards',
+        lambda bucket_name, prefix, max_shard_size: shards,
+    )
+    _mock_policy_loaders(monkeypatch, {})
+    monkeypatch.setattr(process_request.pubsub, 'publish', lambda *args, **kwargs: None)
+    publisher = _StubBatchPublisher()
+    _mock_batch_publisher(monkeypatch, publisher)
+    planned = []
+    monkeypatch.setattr(
+        process_request,
+        '_update_run_ledger',
+        lambda run_timestamp, update_fn, **kwargs: planned.append((update_fn, kwargs)),
     )
-    _mock_publish_done(monkeypatch, called, 'called_publish', config.pubsub_request)
     # When
-    process_request._process_sample_start(cmd)
+    process_request._process_sample_policy_prefix(cmd)
     # Then
-    assert called.get('called_create')
-    assert called.get('called_publish')
-
+    result = [command.CommandSamplePolicyPrefix.from_dict(data) for data in publisher.published]
+    assert result == [
+        cmd.clone(start_offset=start_offset, end_offset=end_offset)
+        for start_offset, end_offset in shards
+    ]
+    assert planned == [
+        (
+            process_request.sampler_ledger.plan_shards,
+            dict(prefix=cmd.prefix, shards=['TEST_OBJECT_A', 'TEST_OBJECT_C']),
+        )
+    ]
 
-def _mock_create_table_with_sample(  # pylint: disable=too-many-arguments
-    monkeypatch,
-    to_mock_function_name: str,
-    called: Dict[str, bool],
-    called_key: str,
-    cmd: command.CommandSampleStart,
-    kwargs_check: Optional[Dict[str, Any]] = None,
-) -> None:
-    def mocked_create_table_with_sample(
-        *,
-        source_table_ref: table.TableReference,
-        target_table_ref: table.TableReference,
-        amount: int,
-        recreate_table: bool,
-        **kwargs: Dict[str, Any],
-    ) -> None:
-        nonlocal called
-        assert source_table_ref == cmd.sample_request.table_reference
-        assert target_table_ref == cmd.target_table
-        assert amount == cmd.sample_request.sample.size.count
-        assert recreate_table
-        if kwargs_check:
-            for key, val in kwargs_check.items():
-                assert kwargs.get(key) == val
-        called[called_key] = True
 
+def test__process_sample_policy_prefix_ok_shard(monkeypatch):
+    # Given
+    cmd = attrs.evolve(
+        command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX, start_offset='TEST_OBJECT_A'
+    )
+    config = _StubGeneralConfig()
+    config.sample_policy_prefix_shard_size = 2
+    _mock_general_config(monkeypatch, config)
+    _mock_policy_loaders(monkeypatch, {})
     monkeypatch.setattr(
-        process_request.sampler_query,
-        to_mock_function_name,
-        mocked_create_table_with_sample,
+        process_request,
+        '_create_all_sample_start_cmds',
+        lambda value, table_samples: [],
     )
+    monkeypatch.setattr(process_request, '_publish_sample_start_cmds', lambda *args: {})
+    planned = []
+    monkeypatch.setattr(
+        process_request,
+        '_update_run_ledger',
+        lambda run_timestamp, update_fn, **kwargs: planned.append((update_fn, kwargs)),
+    )
+    # When
+    process_request._process_sample_policy_prefix(cmd)
+    # Then
+    update_fn, kwargs = planned[0]
+    assert update_fn == process_request.sampler_ledger.plan_prefix
+    assert kwargs.get('prefix') == cmd.start_offset
 
 
-def _mock_publish_done(monkeypatch, called: Dict[str, bool], called_key: str, topic: str) -> None:
-    def mocked_publish(value: Dict[str, Any], topic_path: str) -> str:
-        nonlocal called
-        assert topic_path == topic
-        value_event = command.CommandSampleDone.from_dict(value)
-        assert value_event.type == command.CommandType.SAMPLE_DONE.value
-        called[called_key] = True
-
-    monkeypatch.setattr(process_request.pubsub, 'publish', mocked_publish)
+def test__process_sample_policy_prefix_ok_continuation(monkeypatch):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX
+    _mock_general_config(monkeypatch, _StubGeneralConfig())
+    # it would fail, if not handed over to the continuation
+    _mock_policy_loaders(monkeypatch, {'TABLE_NEXT': ValueError('TEST')})
+    monkeypatch.setattr(process_request, '_sample_policy_prefix_deadline_timestamp', lambda: 0)
+    issued = []
+    monkeypatch.setattr(
+        process_request,
+        '_create_all_sample_start_cmds',
+        lambda value, table_samples: issued.extend(table_samples) or [],
+    )
+    monkeypatch.setattr(process_request, '_publish_sample_start_cmds', lambda *args: {})
+    published = []
+    monkeypatch.setattr(process_request, '_publish_cmd_to_pubsub', published.append)
+    planned = []
+    monkeypatch.setattr(
+        process_request,
+        '_update_run_ledger',
+        lambda run_timestamp, update_fn, **kwargs: planned.append((update_fn, kwargs)),
+    )
+    # When
+    process_request._process_sample_policy_prefix(cmd)
+    # Then
+    assert len(issued) == 1
+    table_ref = sample_policy_data.TEST_TABLE_REFERENCE
+    expected = f'{table_ref.project_id}/{table_ref.dataset_id}/TABLE_NEXT.json'
+    assert published == [cmd.clone(start_offset=expected)]
+    update_fn, kwargs = planned[0]
+    assert update_fn == process_request.sampler_ledger.plan_prefix
+    assert kwargs.get('prefix') == cmd.prefix
+    assert kwargs.get('continuation') == expected
 
 
-def test__process_sample_start_ok_sorted(monkeypatch):
+def test__sample_policy_prefix_deadline_timestamp_ok(monkeypatch):
     # Given
-    cmd = command_test_data.TEST_COMMAND_SAMPLE_START_SORTED
     config = _StubGeneralConfig()
-    config.pubsub_request = 'PUBSUB_REQUEST'
-    create_kwargs_check = {
-        'column': cmd.sample_request.sample.spec.properties.by,
-        'order': cmd.sample_request.sample.spec.properties.direction,
-    }
-    called = {}
+    config.sample_policy_prefix_deadline_sec = 100
     _mock_general_config(monkeypatch, config)
-    _mock_create_table_with_sample(
-        monkeypatch,
-        'create_table_with_sorted_sample',
-        called,
-        'called_create',
-        cmd,
-        create_kwargs_check,
-    )
-    _mock_publish_done(monkeypatch, called, 'called_publish', config.pubsub_request)
+    monkeypatch.setattr(process_request.time, 'time', lambda: 1000)
     # When
-    process_request._process_sample_start(cmd)
+    result = process_request._sample_policy_prefix_deadline_timestamp()
     # Then
-    assert called.get('called_create')
-    assert called.get('called_publish')
+    assert result == 1000 + 100 * (
+        1 - process_request.const.SAMPLE_POLICY_PREFIX_DEADLINE_RESERVE_RATIO
+    )
+
+
+def test__process_sample_policy_prefix_ok_deadline_covers_cost_estimate(monkeypatch):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX
+    _mock_general_config(monkeypatch, _StubGeneralConfig())
+    _mock_policy_loaders(monkeypatch, {'TABLE_NEXT': ValueError('TEST')})
+    now = [0]
+    monkeypatch.setattr(process_request, '_sample_policy_prefix_deadline_timestamp', lambda: 10)
+    monkeypatch.setattr(process_request.time, 'time', lambda: now[0])
+
+    def mocked_estimated_sample_cost(table_sample: table.TableSample) -> float:
+        # the estimate takes past the deadline
+        now[0] = 20
+        return 1
+
+    monkeypatch.setattr(
+        process_request.sampler_query, 'estimated_sample_cost', mocked_estimated_sample_cost
+    )
+    issued = []
+    monkeypatch.setattr(
+        process_request,
+        '_create_all_sample_start_cmds',
+        lambda value, table_samples: issued.extend(table_samples) or [],
+    )
+    monkeypatch.setattr(process_request, '_publish_sample_start_cmds', lambda *args: {})
+    published = []
+    monkeypatch.setattr(process_request, '_publish_cmd_to_pubsub', published.append)
+    monkeypatch.setattr(process_request, '_update_run_ledger', lambda *args, **kwargs: None)
+    # When
+    process_request._process_sample_policy_prefix(cmd)
+    # Then
+    assert len(issued) == 1
+    assert len(published) == 1
+
+
+def test__publish_sample_start_cmds_nok_lands_failed(monkeypatch):
+    # Given
+    config = _StubGeneralConfig()
+    config.pubsub_request = 'PUBSUB_REQUEST'
+    _mock_general_config(monkeypatch, config)
+    ok_cmd = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    failed_cmd = _TEST_COMMAND_SAMPLE_START_STAGED
+    _mock_batch_publisher(monkeypatch, _StubBatchPublisher(failed=[failed_cmd.as_dict()]))
+    monkeypatch.setattr(
+        process_request.pubsub,
+        'publish',
+        lambda value, topic_path, attributes=None, compact=False: None,
+    )
+    landed = []
+    monkeypatch.setattr(
+        process_request,
+        '_land_failed_staged_sample',
+        lambda value, error=None: landed.append(value),
+    )
+    # When
+    result = process_request._publish_sample_start_cmds(
+        command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX, [ok_cmd, failed_cmd]
+    )
+    # Then
+    assert len(result) == 1
+    assert landed == [failed_cmd]
+
+
+def test__longest_first_ok(monkeypatch):
+    # Given
+    table_policy = sample_policy_data.TEST_TABLE_POLICY
+    table_samples = [
+        (
+            table_policy,
+            attrs.evolve(
+                sample_policy_data.TEST_TABLE_SAMPLE,
+                table_reference=attrs.evolve(
+                    sample_policy_data.TEST_TABLE_REFERENCE, table_id=table_id
+                ),
+            ),
+        )
+        for table_id in ['SMALL', 'FAILED', 'BIG', 'MEDIUM', 'SMALL_TOO']
+    ]
+    cost_by_table_id = {'SMALL': 1, 'BIG': 100, 'MEDIUM': 10, 'SMALL_TOO': 1}
+
+    def mocked_estimated_sample_cost(table_sample: table.TableSample) -> float:
+        return cost_by_table_id[table_sample.table_reference.table_id]
+
+    monkeypatch.setattr(
+        process_request.sampler_query, 'estimated_sample_cost', mocked_estimated_sample_cost
+    )
+    # When
+    result = process_request._longest_first(
+        table_samples,
+        {
+            table_sample.table_reference.table_fqn_id(): process_request._estimated_sample_cost(
+                table_sample
+            )
+            for _, table_sample in table_samples
+        },
+    )
+    # Then
+    assert [table_sample.table_reference.table_id for _, table_sample in result] == [
+        'BIG',
+        'MEDIUM',
+        'SMALL',
+        'SMALL_TOO',
+        'FAILED',
+    ]
+
+
+def _sample_start_cmd_with_count(count: int) -> command.CommandSampleStart:
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    sample = attrs.evolve(cmd.sample_request.sample, size=table.SizeSpec(count=count))
+    return attrs.evolve(cmd, sample_request=attrs.evolve(cmd.sample_request, sample=sample))
+
+
+@pytest.mark.parametrize(
+    'max_size,counts,expected',
+    [
+        (1, [10, 20, 30], [[10], [20], [30]]),  # no batching
+        (3, [10, 20, 30], [[10, 20, 30]]),
+        (2, [10, 20, 30], [[10, 20], [30]]),
+        (3, [10, 100, 20, 30], [[10], [100], [20, 30]]),  # too big to share
+        (3, [60, 50, 10], [[60], [50, 10]]),
+    ],
+)
+def test__group_sample_start_cmds_ok(
+    monkeypatch, max_size: int, counts: List[int], expected: List[List[int]]
+):
+    # Given
+    config = _StubGeneralConfig()
+    config.command_batch_max_size = max_size
+    config.command_batch_max_rows = 100
+    _mock_general_config(monkeypatch, config)
+    values = [_sample_start_cmd_with_count(count) for count in counts]
+    # When
+    result = process_request._group_sample_start_cmds(values)
+    # Then
+    assert [[cmd.sample_request.sample.size.count for cmd in group] for group in result] == expected
+
+
+def test__publish_sample_start_cmds_ok_command_batch(monkeypatch):
+    # Given
+    config = _StubGeneralConfig()
+    config.pubsub_request = 'PUBSUB_REQUEST'
+    config.command_batch_max_size = 2
+    _mock_general_config(monkeypatch, config)
+    _mock_batch_publisher(monkeypatch)
+    values = [_sample_start_cmd_with_count(count) for count in [10, 20, 30]]
+    published = []
+    monkeypatch.setattr(
+        process_request.pubsub,
+        'publish',
+        lambda value, topic_path, attributes=None, compact=False: published.append(
+            command_parser.to_command(value, 19)
+        ),
+    )
+    # When
+    result = process_request._publish_sample_start_cmds(
+        command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX, values
+    )
+    # Then
+    assert not result
+    assert [cmd.type for cmd in published] == [
+        command.CommandType.COMMAND_BATCH.value,
+        command.CommandType.SAMPLE_START.value,
+    ]
+    assert published[0].commands == [cmd.clone(timestamp=19) for cmd in values[:2]]
+
+
+def test__publish_sample_start_cmds_ok_scheduled(monkeypatch):
+    # Given
+    config = _StubGeneralConfig()
+    config.pubsub_request = 'PUBSUB_REQUEST'
+    config.sample_start_jobs_per_sec = 2
+    config.sample_start_max_in_flight = 3
+    _mock_general_config(monkeypatch, config)
+    publisher = _StubBatchPublisher()
+    _mock_batch_publisher(monkeypatch, publisher)
+    monkeypatch.setattr(process_request.time, 'time', lambda: 1000)
+    monkeypatch.setattr(
+        process_request.pubsub,
+        'publish',
+        lambda value, topic_path, attributes=None, compact=False: None,
+    )
+    values = [_sample_start_cmd_with_count(count) for count in [10, 20, 30]]
+    # When
+    result = process_request._publish_sample_start_cmds(
+        command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX, values
+    )
+    # Then
+    assert not result
+    assert [
+        command.CommandSampleStart.from_dict(value).not_before_timestamp
+        for value in publisher.published
+    ] == [1000, 1000, 1001]
+    assert publisher.ordering_keys == [
+        process_request.sampler_schedule.ordering_key(value, max_in_flight=3) for value in values
+    ]
+    assert all(publisher.ordering_keys)
+
+
+def test__publish_sample_start_cmds_ok_delayed(monkeypatch):
+    # Given
+    config = _StubGeneralConfig()
+    config.pubsub_request = 'PUBSUB_REQUEST'
+    config.command_batch_max_size = 1
+    config.sample_start_jobs_per_sec = 1
+    config.sample_start_max_delay_sec = 1
+    _mock_general_config(monkeypatch, config)
+    publisher = _StubBatchPublisher()
+    _mock_batch_publisher(monkeypatch, publisher)
+    monkeypatch.setattr(process_request.time, 'time', lambda: 1000)
+    published = []
+    monkeypatch.setattr(
+        process_request.pubsub,
+        'publish',
+        lambda value, topic_path, attributes=None, compact=False: published.append(
+            command_parser.to_command(value, 19)
+        ),
+    )
+    values = [
+        attrs.evolve(
+            cmd,
+            sample_request=attrs.evolve(
+                cmd.sample_request,
+                table_reference=attrs.evolve(
+                    cmd.sample_request.table_reference, table_id=f'TABLE_{ndx}'
+                ),
+            ),
+        )
+        for ndx, cmd in enumerate([_sample_start_cmd_with_count(10)] * 4)
+    ]
+    # When
+    result = process_request._publish_sample_start_cmds(
+        command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX, values
+    )
+    # Then
+    assert not result
+    assert [
+        command.CommandSampleStart.from_dict(value).not_before_timestamp
+        for value in publisher.published
+    ] == [1000, 1001]
+    assert [
+        cmd for cmd in published if cmd.type == command.CommandType.SAMPLE_POLICY_PREFIX.value
+    ] == [
+        command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX.clone(
+            timestamp=19, table_ids=['TABLE_2', 'TABLE_3'], not_before_timestamp=1001
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    'within_ids,after_ids,expected_within,expected_after',
+    [
+        ([None, 'A'], [None], [None, 'A'], [None]),  # not shared
+        ([None, 'A', 'B'], ['B'], [None, 'A'], ['B', 'B']),
+        (['A'], ['A'], ['A', 'A'], []),  # nothing left to issue right away
+    ],
+)
+def test__keep_shared_staging_together_ok(
+    within_ids: List[Optional[str]],
+    after_ids: List[Optional[str]],
+    expected_within: List[Optional[str]],
+    expected_after: List[Optional[str]],
+):
+    # Given
+    def to_groups(staging_ids: List[Optional[str]]) -> List[List[command.CommandSampleStart]]:
+        return [
+            [
+                attrs.evolve(
+                    _TEST_COMMAND_SAMPLE_START_STAGED,
+                    staging_dataset_id=staging_id,
+                    staging_table_count=2 if staging_id else None,
+                )
+            ]
+            for staging_id in staging_ids
+        ]
+
+    # When
+    within, after = process_request._keep_shared_staging_together(
+        to_groups(within_ids), to_groups(after_ids)
+    )
+    # Then
+    assert [group[0].staging_dataset_id for group in within] == expected_within
+    assert [group[0].staging_dataset_id for group in after] == expected_after
+
+
+@pytest.mark.parametrize('as_batch', [False, True])
+def test_process_nok_sample_start_not_due(monkeypatch, as_batch: bool):
+    # Given
+    cmd = attrs.evolve(
+        command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM, not_before_timestamp=1000
+    )
+    if as_batch:
+        cmd = command.CommandBatch(
+            type=command.CommandType.COMMAND_BATCH.value, timestamp=17, commands=[cmd, cmd]
+        )
+    _mock_general_config(monkeypatch, _StubGeneralConfig())
+    monkeypatch.setattr(process_request.sampler_schedule.time, 'time', lambda: 900)
+    called = []
+    monkeypatch.setattr(process_request, '_process_sample_start', called.append)
+    monkeypatch.setattr(
+        process_request, '_land_failed_staged_sample', lambda *args: called.append(args)
+    )
+    monkeypatch.setattr(process_request, '_fail_in_run_ledger', lambda *args: called.append(args))
+    monkeypatch.setattr(
+        process_request.pubsub, 'publish', lambda *args, **kwargs: called.append(args)
+    )
+    # When/Then
+    with pytest.raises(process_request.sampler_schedule.SampleNotDueError):
+        process_request.process(cmd, with_retry=False)
+    assert not called
+
+
+def _sample_start_cmd_with_location(location: Optional[str]) -> command.CommandSampleStart:
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    table_ref = attrs.evolve(cmd.sample_request.table_reference, location=location)
+    return attrs.evolve(
+        cmd, sample_request=attrs.evolve(cmd.sample_request, table_reference=table_ref)
+    )
+
+
+def _command_batch_with_locations(*locations: str) -> command.CommandBatch:
+    return command.CommandBatch(
+        type=command.CommandType.COMMAND_BATCH.value,
+        timestamp=17,
+        commands=[_sample_start_cmd_with_location(location) for location in locations],
+    )
+
+
+@pytest.mark.parametrize(
+    'value,expected_location',
+    [
+        (command_test_data.TEST_COMMAND_START, None),
+        (_sample_start_cmd_with_location(None), None),
+        (_sample_start_cmd_with_location('us'), 'us'),
+        (_command_batch_with_locations('us', 'us'), 'us'),
+        (_command_batch_with_locations('us', 'eu'), None),
+    ],
+)
+def test__pubsub_attributes_ok(value: command.CommandBase, expected_location: Optional[str]):
+    # Given/When
+    result = process_request._pubsub_attributes(value)
+    # Then
+    assert result.get(const.PUBSUB_ATTR_TYPE) == value.type
+    assert result.get(const.PUBSUB_ATTR_RUN_TIMESTAMP) == str(value.timestamp)
+    assert result.get(const.PUBSUB_ATTR_SOURCE_LOCATION) == expected_location
+
+
+def test__pubsub_attributes_ok_run_timestamp():
+    # Given
+    value = attrs.evolve(
+        command_test_data.TEST_COMMAND_SAMPLE_START, timestamp=31, run_timestamp=17
+    )
+    # When
+    result = process_request._pubsub_attributes(value)
+    # Then
+    assert result.get(const.PUBSUB_ATTR_RUN_TIMESTAMP) == str(value.run_timestamp)
+
+
+def _mock_run_ledger(monkeypatch, called: Dict[str, List[Any]], run_complete: Any = None) -> None:
+    monkeypatch.setattr(
+        process_request.sampler_ledger, 'done', lambda **kwargs: called['done'].append(kwargs)
+    )
+    monkeypatch.setattr(
+        process_request.sampler_ledger, 'fail', lambda **kwargs: called['fail'].append(kwargs)
+    )
+
+    def mocked_complete(**kwargs) -> Any:
+        called['complete'].append(kwargs)
+        if isinstance(run_complete, Exception):
+            raise run_complete
+        return run_complete
+
+    monkeypatch.setattr(process_request.sampler_ledger, 'complete', mocked_complete)
+    monkeypatch.setattr(process_request.sampler_ledger, 'current_run', lambda **kwargs: None)
+    monkeypatch.setattr(process_request, '_publish_cmd_to_pubsub', called['publish'].append)
+
+
+@pytest.mark.parametrize(
+    'state_bucket,run_timestamp,run_complete,expected_publish',
+    [
+        ('STATE_BUCKET', 17, command_test_data.TEST_COMMAND_RUN_COMPLETE, True),
+        ('STATE_BUCKET', 17, None, False),
+        ('STATE_BUCKET', 17, RuntimeError('TEST'), False),  # best effort
+        ('STATE_BUCKET', None, command_test_data.TEST_COMMAND_RUN_COMPLETE, False),
+        (None, 17, command_test_data.TEST_COMMAND_RUN_COMPLETE, False),
+    ],
+)
+def test__process_sample_done_ok_run_ledger(
+    monkeypatch,
+    state_bucket: Optional[str],
+    run_timestamp: Optional[int],
+    run_complete: Any,
+    expected_publish: bool,
+):
+    # Given
+    cmd = attrs.evolve(command_test_data.TEST_COMMAND_SAMPLE_DONE, run_timestamp=run_timestamp)
+    config = _StubGeneralConfig()
+    config.state_bucket = state_bucket
+    _mock_general_config(monkeypatch, config)
+    called = {'done': [], 'fail': [], 'complete': [], 'publish': []}
+    _mock_run_ledger(monkeypatch, called, run_complete)
+    # When
+    process_request._process_sample_done(cmd)
+    # Then
+    expected_update = bool(state_bucket and run_timestamp)
+    assert called['done'] == (
+        [dict(bucket_name=state_bucket, run_timestamp=run_timestamp, sample_done=cmd)]
+        if expected_update
+        else []
+    )
+    assert len(called['complete']) == (1 if expected_update else 0)
+    assert called['publish'] == ([run_complete] if expected_publish else [])
+
+
+def test_process_nok_sample_start_fails_in_run_ledger(monkeypatch):
+    # Given
+    cmd = attrs.evolve(command_test_data.TEST_COMMAND_SAMPLE_START, run_timestamp=17)
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    config.pubsub_error = 'PUBSUB_ERROR'
+    _mock_general_config(monkeypatch, config)
+    called = {'done': [], 'fail': [], 'complete': [], 'publish': []}
+    _mock_run_ledger(monkeypatch, called)
+
+    def mocked_process(_) -> None:
+        raise TypeError('TEST_MESSAGE')
+
+    monkeypatch.setattr(process_request, '_process_sample_start', mocked_process)
+    monkeypatch.setattr(process_request.pubsub, 'publish', lambda *args, **kwargs: None)
+    # When/Then
+    with pytest.raises(RuntimeError):
+        process_request.process(cmd, with_retry=False)
+    assert called['fail'] == [
+        dict(
+            bucket_name=config.state_bucket,
+            run_timestamp=cmd.run_timestamp,
+            table_reference=cmd.sample_request.table_reference,
+            error='TEST_MESSAGE',
+        )
+    ]
+    assert len(called['complete']) == 1
+
+
+def test__process_run_complete_ok():
+    # Given/When/Then
+    process_request.process(command_test_data.TEST_COMMAND_RUN_COMPLETE, with_retry=False)
+
+
+def _mock_bq_base_dataset(monkeypatch) -> None:
+
+    dataset = types.SimpleNamespace()
+    setattr(dataset, 'location', sample_policy_data.TEST_SRC_LOCATION)
+
+    # pylint: disable=unused-argument
+    def mocked_dataset(*args, **kwargs) -> object:
+        return dataset
+
+    # pylint: enable=unused-argument
+
+    monkeypatch.setattr(process_request.sampler_bucket.bq, 'get_dataset', mocked_dataset)
+
+
+def _mock_publish_sample_start(
+    monkeypatch, called: Dict[str, bool], called_key: str, topic: str
+) -> None:
+    def mocked_publish(
+        value: Dict[str, Any],
+        topic_path: str,
+        attributes: Optional[Dict[str, str]] = None,
+        compact: Optional[bool] = False,
+    ) -> str:
+        nonlocal called
+        assert topic_path == topic
+        value_event = command.CommandSampleStart.from_dict(value)
+        assert value_event.type == command.CommandType.SAMPLE_START.value
+        called[called_key] = True
+
+    monkeypatch.setattr(process_request.pubsub, 'publish', mocked_publish)
+
+
+def test__process_sample_start_ok_random(monkeypatch):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    config = _StubGeneralConfig()
+    config.pubsub_request = 'PUBSUB_REQUEST'
+    called = {}
+    _mock_general_config(monkeypatch, config)
+    _mock_create_table_with_sample(
+        monkeypatch, 'create_table_with_random_sample', called, 'called_create', cmd
+    )
+    _mock_publish_done(monkeypatch, called, 'called_publish', config.pubsub_request)
+    # When
+    process_request._process_sample_start(cmd)
+    # Then
+    assert called.get('called_create')
+    assert called.get('called_publish')
+
+
+@pytest.mark.parametrize(
+    'claim_result,expected_sample,expected_publish',
+    [
+        (None, True, True),  # first delivery
+        (command_test_data.TEST_COMMAND_SAMPLE_DONE, False, True),  # duplicate, already done
+        (process_request.sampler_idempotency.SampleInProgressError('TEST'), False, False),
+    ],
+)
+def test__process_sample_start_ok_idempotent(
+    monkeypatch, claim_result: Any, expected_sample: bool, expected_publish: bool
+):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    _mock_general_config(monkeypatch, config)
+    sample_done = attrs.evolve(command_test_data.TEST_COMMAND_SAMPLE_DONE, end_timestamp=100)
+    called = {'sample': [], 'done': [], 'publish': []}
+
+    def mocked_claim(**kwargs) -> Any:
+        assert kwargs.get('timeout_sec') == config.sample_start_claim_timeout_sec
+        if isinstance(claim_result, Exception):
+            raise claim_result
+        return claim_result
+
+    monkeypatch.setattr(process_request.sampler_idempotency, 'claim', mocked_claim)
+    monkeypatch.setattr(
+        process_request.sampler_idempotency,
+        'done',
+        lambda **kwargs: called['done'].append(kwargs.get('sample_done')),
+    )
+    monkeypatch.setattr(
+        process_request, '_sample', lambda value: called['sample'].append(value) or sample_done
+    )
+    monkeypatch.setattr(process_request, '_publish_cmd_to_pubsub', called['publish'].append)
+    # When
+    process_request._process_sample_start(cmd)
+    # Then
+    assert called['sample'] == ([cmd] if expected_sample else [])
+    assert called['done'] == ([sample_done] if expected_sample else [])
+    if expected_publish:
+        assert called['publish'] == [sample_done if expected_sample else claim_result]
+    else:
+        assert not called['publish']
+
+
+def test__process_sample_start_nok_idempotent_releases_claim(monkeypatch):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    _mock_general_config(monkeypatch, config)
+    called_release = []
+
+    def mocked_sample(value: command.CommandSampleStart) -> None:
+        raise ValueError('TEST')
+
+    monkeypatch.setattr(process_request.sampler_idempotency, 'claim', lambda **kwargs: None)
+    monkeypatch.setattr(
+        process_request.sampler_idempotency,
+        'release',
+        lambda **kwargs: called_release.append(kwargs.get('value')),
+    )
+    monkeypatch.setattr(process_request, '_sample', mocked_sample)
+    # When/Then
+    with pytest.raises(ValueError):
+        process_request._process_sample_start(cmd)
+    assert called_release == [cmd]
+
+
+def _mock_create_table_with_sample(  # pylint: disable=too-many-arguments
+    monkeypatch,
+    to_mock_function_name: str,
+    called: Dict[str, bool],
+    called_key: str,
+    cmd: command.CommandSampleStart,
+    *,
+    kwargs_check: Optional[Dict[str, Any]] = None,
+) -> None:
+    def mocked_create_table_with_sample(
+        *,
+        source_table_ref: table.TableReference,
+        target_table_ref: table.TableReference,
+        amount: int,
+        recreate_table: bool,
+        **kwargs: Dict[str, Any],
+    ) -> None:
+        nonlocal called
+        assert source_table_ref == cmd.sample_request.table_reference
+        assert target_table_ref == cmd.target_table
+        assert amount == cmd.sample_request.sample.size.count
+        assert not recreate_table
+        if kwargs_check:
+            for key, val in kwargs_check.items():
+                assert kwargs.get(key) == val
+        called[called_key] = True
+
+    monkeypatch.setattr(
+        process_request.sampler_query,
+        to_mock_function_name,
+        mocked_create_table_with_sample,
+    )
+
+
+def _mock_publish_done(monkeypatch, called: Dict[str, bool], called_key: str, topic: str) -> None:
+    def mocked_publish(
+        value: Dict[str, Any],
+        topic_path: str,
+        attributes: Optional[Dict[str, str]] = None,
+        compact: Optional[bool] = False,
+    ) -> str:
+        nonlocal called
+        assert topic_path == topic
+        value_event = command.CommandSampleDone.from_dict(value)
+        assert value_event.type == command.CommandType.SAMPLE_DONE.value
+        called[called_key] = True
+
+    monkeypatch.setattr(process_request.pubsub, 'publish', mocked_publish)
+
+
+def test__process_sample_start_ok_sorted(monkeypatch):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_START_SORTED
+    config = _StubGeneralConfig()
+    config.pubsub_request = 'PUBSUB_REQUEST'
+    create_kwargs_check = {
+        'column': cmd.sample_request.sample.spec.properties.by,
+        'order': cmd.sample_request.sample.spec.properties.direction,
+    }
+    called = {}
+    _mock_general_config(monkeypatch, config)
+    _mock_create_table_with_sample(
+        monkeypatch,
+        'create_table_with_sorted_sample',
+        called,
+        'called_create',
+        cmd,
+        kwargs_check=create_kwargs_check,
+    )
+    _mock_publish_done(monkeypatch, called, 'called_publish', config.pubsub_request)
+    # When
+    process_request._process_sample_start(cmd)
+    # Then
+    assert called.get('called_create')
+    assert called.get('called_publish')
+
+
+def test__publish_clean_up_cmds_nok_publishes_all_before_raising(monkeypatch):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_START
+    config = _StubGeneralConfig()
+    published = []
+    _mock_general_config(monkeypatch, config)
+
+    def mocked_list_all_sample_datasets(**kwargs) -> Any:  # pylint: disable=unused-argument
+        raise ConnectionError('TEST_LIST_ERROR')
+        yield  # pylint: disable=unreachable
+
+    def mocked_list_all_transfer_config_names(**kwargs) -> Any:  # pylint: disable=unused-argument
+        yield 'TEST_TRANSFER_CONFIG_A'
+
+    def mocked_publish(
+        value: Dict[str, Any],
+        _: str,
+        attributes: Optional[Dict[str, str]] = None,
+        compact: Optional[bool] = False,
+    ) -> str:
+        published.append(command.CommandCleanupDataset.from_dict(value))
+
+    monkeypatch.setattr(
+        process_request.sampler_query, 'list_all_sample_datasets', mocked_list_all_sample_datasets
+    )
+    monkeypatch.setattr(
+        process_request.sampler_query,
+        'list_all_transfer_config_names',
+        mocked_list_all_transfer_config_names,
+    )
+    monkeypatch.setattr(process_request.pubsub, 'publish', mocked_publish)
+    # When
+    with pytest.raises(RuntimeError) as err:
+        process_request._publish_clean_up_cmds(
+            cmd, project_id='TEST_PROJECT_ID', location='TEST_LOCATION'
+        )
+    # Then
+    assert [req.transfer_config_name for req in published] == ['TEST_TRANSFER_CONFIG_A']
+    assert 'TEST_LIST_ERROR' in str(err.value)
+
+
+@pytest.mark.parametrize('persistent_transfer_configs', [True, False])
+def test__publish_clean_up_cmds_ok_persistent_staging(
+    monkeypatch, persistent_transfer_configs: bool
+):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_START
+    config = _StubGeneralConfig()
+    config.persistent_transfer_configs = persistent_transfer_configs
+    _mock_general_config(monkeypatch, config)
+    persistent_dataset_id = process_request.sampler_query.persistent_staging_dataset_id(
+        source_table_ref=table.TableReference.from_str('project_a.dataset_a.table_a@SOURCE'),
+        target_table_ref=table.TableReference.from_str('project_b.dataset_a.table_a@TARGET'),
+    )
+    published = []
+    monkeypatch.setattr(
+        process_request.sampler_query,
+        'list_all_sample_datasets',
+        lambda **kwargs: iter(['dataset_a', persistent_dataset_id]),
+    )
+    monkeypatch.setattr(
+        process_request.sampler_query, 'list_all_transfer_config_names', lambda **kwargs: iter([])
+    )
+    monkeypatch.setattr(
+        process_request.pubsub,
+        'publish',
+        lambda value, *args, **kwargs: published.append(
+            command.CommandCleanupDataset.from_dict(value).dataset_id
+        ),
+    )
+    # When
+    process_request._publish_clean_up_cmds(
+        cmd, project_id='TEST_PROJECT_ID', location='TEST_LOCATION'
+    )
+    # Then
+    if persistent_transfer_configs:
+        assert published == ['dataset_a']
+    else:
+        assert published == ['dataset_a', persistent_dataset_id]
+
+
+@pytest.mark.parametrize(
+    'dataset_id,transfer_config_name',
+    [
+        ('TEST_DATASET_ID', None),
+        (None, 'TEST_TRANSFER_CONFIG_NAME'),
+        ('TEST_DATASET_ID', 'TEST_TRANSFER_CONFIG_NAME'),
+    ],
+)
+def test__process_cleanup_dataset_ok(
+    monkeypatch, dataset_id: Optional[str], transfer_config_name: Optional[str]
+):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_CLEANUP_DATASET.clone(
+        dataset_id=dataset_id, transfer_config_name=transfer_config_name
+    )
+    config = _StubGeneralConfig()
+    config.cleanup_max_workers = 3
+    _mock_general_config(monkeypatch, config)
+    called = {}
+
+    def mocked_clean_up_sample_dataset(**kwargs) -> None:
+        assert kwargs.get('project_id') == cmd.project_id
+        assert kwargs.get('created_before').timestamp() == cmd.timestamp
+        assert kwargs.get('max_workers') == config.cleanup_max_workers
+        called['dataset_id'] = kwargs.get('dataset_id')
+        called['keep_table_ids'] = kwargs.get('keep_table_ids')
+
+    def mocked_remove_transfer_config(name: str) -> None:
+        called['transfer_config_name'] = name
+
+    monkeypatch.setattr(
+        process_request.sampler_query, 'clean_up_sample_dataset', mocked_clean_up_sample_dataset
+    )
+    monkeypatch.setattr(process_request.bq, 'remove_transfer_config', mocked_remove_transfer_config)
+    # When
+    process_request._process_cleanup_dataset(cmd)
+    # Then
+    assert called.get('dataset_id') == dataset_id
+    if dataset_id:
+        assert called.get('keep_table_ids') == cmd.keep_table_ids
+    assert called.get('transfer_config_name') == transfer_config_name
+
+
+@pytest.mark.parametrize(
+    'dataset_id,expected',
+    [
+        ('dataset_id_b', ['policy_full', 'policy_full_again']),
+        ('TEST_DATASET_STALE', []),
+    ],
+)
+def test__process_cleanup_dataset_ok_planned_tables(
+    monkeypatch, dataset_id: str, expected: List[str]
+):
+    # Given
+    cmd = command_test_data.TEST_COMMAND_CLEANUP_DATASET.clone(
+        dataset_id=dataset_id, keep_table_ids=None
+    )
+    config = _StubGeneralConfig()
+    config.policy_bucket = gcs_on_disk.POLICY_BUCKET
+    _mock_general_config(monkeypatch, config)
+    monkeypatch.setattr(
+        process_request.sampler_bucket.gcs,
+        '_get_gcs_prefixes_http_iterator',
+        gcs_on_disk.get_gcs_prefixes_http_iterator,
+    )
+    monkeypatch.setattr(
+        process_request.sampler_bucket.gcs, '_list_blob_names', gcs_on_disk.list_blob_names
+    )
+    called = []
+    monkeypatch.setattr(
+        process_request.sampler_query,
+        'clean_up_sample_dataset',
+        lambda **kwargs: called.append(kwargs.get('keep_table_ids')),
+    )
+    # When
+    process_request._process_cleanup_dataset(cmd)
+    # Then
+    assert [sorted(keep_table_ids) for keep_table_ids in called] == [expected]
+
+
+def test__process_cleanup_dataset_ok_created_before_run(monkeypatch):
+    # Given
+    run_timestamp = command_test_data.TEST_COMMAND_CLEANUP_DATASET.timestamp
+    cmd = command_test_data.TEST_COMMAND_CLEANUP_DATASET.clone(
+        timestamp=run_timestamp + 60, run_timestamp=run_timestamp
+    )
+    _mock_general_config(monkeypatch, _StubGeneralConfig())
+    called = []
+    monkeypatch.setattr(
+        process_request.sampler_query,
+        'clean_up_sample_dataset',
+        lambda **kwargs: called.append(kwargs.get('created_before').timestamp()),
+    )
+    monkeypatch.setattr(process_request.bq, 'remove_transfer_config', lambda name: None)
+    # When
+    process_request._process_cleanup_dataset(cmd)
+    # Then
+    assert called == [run_timestamp]
+
+
+def test__shared_staging_kwargs_by_table_ok(monkeypatch):
+    # Given
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    _mock_general_config(monkeypatch, config)
+    target_location = 'TARGET_LOCATION'
+    shared = [
+        table.TableReference.from_str('project_a.dataset_a.table_a@SOURCE_LOCATION'),
+        table.TableReference.from_str('project_a.dataset_a.table_b@SOURCE_LOCATION'),
+    ]
+    not_shared = [
+        table.TableReference.from_str('project_a.dataset_b.table_a@SOURCE_LOCATION'),
+        table.TableReference.from_str(f'project_a.dataset_a.table_c@{target_location}'),
+    ]
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX
+    # When
+    result = process_request._shared_staging_kwargs_by_table(
+        cmd, shared + not_shared, target_location
+    )
+    retry_result = process_request._shared_staging_kwargs_by_table(
+        cmd.clone(timestamp=cmd.timestamp + 60, run_timestamp=cmd.timestamp),
+        shared,
+        target_location,
+    )
+    # Then
+    assert set(result) == {table_ref.table_fqn_id() for table_ref in shared}
+    staging_dataset_ids = {kwargs.get('staging_dataset_id') for kwargs in result.values()}
+    assert len(staging_dataset_ids) == 1
+    assert all(kwargs.get('staging_table_count') == len(shared) for kwargs in result.values())
+    # a retry shares the same staging dataset
+    assert retry_result == result
+
+
+def test__shared_staging_kwargs_by_table_ok_no_state_bucket(monkeypatch):
+    # Given
+    _mock_general_config(monkeypatch, _StubGeneralConfig())
+    source_tables = [
+        table.TableReference.from_str('project_a.dataset_a.table_a@SOURCE_LOCATION'),
+        table.TableReference.from_str('project_a.dataset_a.table_b@SOURCE_LOCATION'),
+    ]
+    # When
+    result = process_request._shared_staging_kwargs_by_table(
+        command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX, source_tables, 'TARGET_LOCATION'
+    )
+    # Then
+    assert not result
+
+
+@pytest.mark.parametrize('persistent_transfer_configs', [True, False])
+def test__persistent_staging_kwargs_by_table_ok(monkeypatch, persistent_transfer_configs: bool):
+    # Given
+    config = _StubGeneralConfig()
+    config.target_project_id = 'TARGET_PROJECT'
+    config.persistent_transfer_configs = persistent_transfer_configs
+    _mock_general_config(monkeypatch, config)
+    target_location = 'TARGET_LOCATION'
+    x_location = table.TableReference.from_str('project_a.dataset_a.table_a@SOURCE_LOCATION')
+    same_location = table.TableReference.from_str(f'project_a.dataset_a.table_b@{target_location}')
+    # When
+    result = process_request._persistent_staging_kwargs_by_table(
+        [x_location, same_location], target_location
+    )
+    # Then
+    if persistent_transfer_configs:
+        assert list(result) == [x_location.table_fqn_id()]
+        staging_dataset_id = result[x_location.table_fqn_id()].get('staging_dataset_id')
+        assert process_request.sampler_query.is_persistent_staging_dataset(staging_dataset_id)
+        assert result[x_location.table_fqn_id()].get('staging_table_count') is None
+    else:
+        assert not result
+
+
+_TEST_COMMAND_SAMPLE_START_STAGED: command.CommandSampleStart = attrs.evolve(
+    command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM,
+    staging_dataset_id='TEST_STAGING_DATASET_ID',
+    staging_table_count=2,
+)
+
+
+@pytest.mark.parametrize('is_claimed', [True, False])
+def test__land_staged_sample_ok(monkeypatch, is_claimed: bool):
+    # Given
+    cmd = _TEST_COMMAND_SAMPLE_START_STAGED
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    _mock_general_config(monkeypatch, config)
+    called_transfer = []
+
+    def mocked_land_sample_and_claim_transfer(**kwargs) -> bool:
+        assert kwargs.get('staging_dataset_id') == cmd.staging_dataset_id
+        assert kwargs.get('expected_amount') == cmd.staging_table_count
+        return is_claimed
+
+    monkeypatch.setattr(
+        process_request.sampler_staging,
+        'land_sample_and_claim_transfer',
+        mocked_land_sample_and_claim_transfer,
+    )
+    monkeypatch.setattr(
+        process_request.sampler_query,
+        'transfer_staging_dataset',
+        lambda **kwargs: called_transfer.append(kwargs),
+    )
+    # When
+    process_request._land_staged_sample(cmd)
+    # Then
+    assert len(called_transfer) == (1 if is_claimed else 0)
+
+
+def test__land_staged_sample_nok_releases_claim(monkeypatch):
+    # Given
+    cmd = _TEST_COMMAND_SAMPLE_START_STAGED
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    _mock_general_config(monkeypatch, config)
+    called_release = []
+
+    def mocked_transfer_staging_dataset(**kwargs) -> None:
+        raise RuntimeError('TEST')
+
+    monkeypatch.setattr(
+        process_request.sampler_staging, 'land_sample_and_claim_transfer', lambda **kwargs: True
+    )
+    monkeypatch.setattr(
+        process_request.sampler_query, 'transfer_staging_dataset', mocked_transfer_staging_dataset
+    )
+    monkeypatch.setattr(
+        process_request.sampler_staging,
+        'release_transfer',
+        lambda **kwargs: called_release.append(kwargs),
+    )
+    # When/Then
+    with pytest.raises(process_request.StagedSampleTransferError):
+        process_request._land_staged_sample(cmd)
+    assert called_release == [
+        dict(bucket_name=config.state_bucket, staging_dataset_id=cmd.staging_dataset_id)
+    ]
+
+
+def test__land_staged_sample_ok_persistent(monkeypatch):
+    # Given
+    cmd = attrs.evolve(_TEST_COMMAND_SAMPLE_START_STAGED, staging_table_count=None)
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    _mock_general_config(monkeypatch, config)
+    called_transfer = []
+
+    def mocked_land_sample_and_claim_transfer(**kwargs) -> bool:
+        raise RuntimeError('Should not be called')
+
+    monkeypatch.setattr(
+        process_request.sampler_staging,
+        'land_sample_and_claim_transfer',
+        mocked_land_sample_and_claim_transfer,
+    )
+    monkeypatch.setattr(
+        process_request.sampler_query,
+        'transfer_staging_dataset',
+        lambda **kwargs: called_transfer.append(kwargs),
+    )
+    # When
+    process_request._land_staged_sample(cmd)
+    # Then
+    assert len(called_transfer) == 1
+    assert called_transfer[0].get('staging_dataset_id') == cmd.staging_dataset_id
+    assert called_transfer[0].get('persistent_transfer_config')
+
+
+def test__land_failed_staged_sample_ok(monkeypatch):
+    # Given
+    cmd = _TEST_COMMAND_SAMPLE_START_STAGED
+    called = []
+    monkeypatch.setattr(
+        process_request.sampler_query,
+        'drop_staged_table',
+        lambda **kwargs: called.append('drop_staged_table'),
+    )
+    monkeypatch.setattr(
+        process_request, '_land_staged_sample', lambda value: called.append('land_staged_sample')
+    )
+    # When
+    process_request._land_failed_staged_sample(cmd)
+    process_request._land_failed_staged_sample(command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM)
+    process_request._land_failed_staged_sample(attrs.evolve(cmd, staging_table_count=None))
+    # Then
+    assert called == ['drop_staged_table', 'land_staged_sample', 'drop_staged_table']
+
+
+def test__land_failed_staged_sample_ok_transfer_failed(monkeypatch):
+    # Given
+    cmd = _TEST_COMMAND_SAMPLE_START_STAGED
+    called = []
+    monkeypatch.setattr(
+        process_request.sampler_query,
+        'drop_staged_table',
+        lambda **kwargs: called.append('drop_staged_table'),
+    )
+    monkeypatch.setattr(
+        process_request, '_land_staged_sample', lambda value: called.append('land_staged_sample')
+    )
+    # When
+    process_request._land_failed_staged_sample(
+        cmd, process_request.StagedSampleTransferError('TEST')
+    )
+    # Then
+    assert called == ['land_staged_sample']
+
+
+_TEST_TRANSFER_CONFIG_NAME: str = (
+    'projects/TEST_PROJECT/locations/TEST_LOCATION/transferConfigs/TEST'
+)
+_TEST_TRACKED_TRANSFER: transfer.TrackedTransfer = transfer.TrackedTransfer(
+    transfer_config_name=_TEST_TRANSFER_CONFIG_NAME,
+    run_name=f'{_TEST_TRANSFER_CONFIG_NAME}/runs/TEST_RUN',
+    source_project_id='TEST_PROJECT',
+    source_dataset_id='TEST_STAGING_DATASET_ID',
+    triggered_timestamp=17,
+)
+
+
+@pytest.mark.parametrize(
+    'is_persistent,remove_persistent,expected_removed',
+    [
+        (False, False, True),
+        (True, False, False),
+        (True, True, True),
+    ],
+)
+def test__finish_transfer_ok(
+    monkeypatch, is_persistent: bool, remove_persistent: bool, expected_removed: bool
+):
+    # Given
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    _mock_general_config(monkeypatch, config)
+    called = {'remove_transfer_config': [], 'untrack': [], 'publish': []}
+    monkeypatch.setattr(
+        process_request.sampler_query, 'is_persistent_staging_dataset', lambda _: is_persistent
+    )
+    monkeypatch.setattr(
+        process_request.bq, 'remove_transfer_config', called['remove_transfer_config'].append
+    )
+    monkeypatch.setattr(
+        process_request.sampler_staging, 'remove_staging_dataset_state', lambda **kwargs: None
+    )
+    monkeypatch.setattr(
+        process_request.sampler_transfer,
+        'untrack',
+        lambda **kwargs: called['untrack'].append(kwargs.get('transfer_config_name')),
+    )
+    monkeypatch.setattr(
+        process_request.pubsub,
+        'publish',
+        lambda data, topic, attributes=None, compact=False: called['publish'].append(data),
+    )
+    # When
+    process_request._finish_transfer(
+        _TEST_TRANSFER_CONFIG_NAME,
+        'TEST_PROJECT',
+        'TEST_STAGING_DATASET_ID',
+        17,
+        remove_persistent=remove_persistent,
+    )
+    # Then
+    assert called['untrack'] == [_TEST_TRANSFER_CONFIG_NAME]
+    assert len(called['remove_transfer_config']) == (1 if expected_removed else 0)
+    assert len(called['publish']) == (1 if expected_removed else 0)
+
+
+def _mock_transfer_watchdog(
+    monkeypatch,
+    *,
+    state: str,
+    error_code: Optional[int] = None,
+    attempts: Optional[int] = 1,
+) -> Dict[str, List[Any]]:
+    called = {'track': [], 'finish': [], 'start_run': []}
+    config = _StubGeneralConfig()
+    config.state_bucket = 'STATE_BUCKET'
+    config.transfer_run_timeout_sec = 60
+    config.transfer_run_max_attempts = 3
+    _mock_general_config(monkeypatch, config)
+    tracked_transfer = _TEST_TRACKED_TRANSFER.clone(attempts=attempts)
+
+    def mocked_overdue(**kwargs) -> List[transfer.TrackedTransfer]:
+        assert kwargs.get('bucket_name') == config.state_bucket
+        assert kwargs.get('timeout_sec') == config.transfer_run_timeout_sec
+        return [tracked_transfer]
+
+    def mocked_transfer_run(name: str) -> Any:
+        assert name == tracked_transfer.run_name
+        return types.SimpleNamespace(
+            name=name,
+            state=types.SimpleNamespace(name=state),
+            error_status=types.SimpleNamespace(code=error_code),
+        )
+
+    def mocked_start_transfer_config_run(name: str) -> List[Any]:
+        called['start_run'].append(name)
+        return [types.SimpleNamespace(name=f'{name}/runs/TEST_NEW_RUN')]
+
+    monkeypatch.setattr(process_request.sampler_transfer, 'overdue', mocked_overdue)
+    monkeypatch.setattr(
+        process_request.sampler_transfer,
+        'track',
+        lambda **kwargs: called['track'].append(kwargs.get('value')),
+    )
+    monkeypatch.setattr(process_request.bq, 'transfer_run', mocked_transfer_run)
+    monkeypatch.setattr(
+        process_request.bq, 'start_transfer_config_run', mocked_start_transfer_config_run
+    )
+    monkeypatch.setattr(
+        process_request,
+        '_finish_transfer',
+        lambda *args, **kwargs: called['finish'].append((args, kwargs)),
+    )
+    return called
+
+
+@pytest.mark.parametrize(
+    'state,error_code,attempts,expected_finish,expected_retrigger,expected_wait',
+    [
+        ('SUCCEEDED', None, 1, True, False, False),  # lost notification
+        ('FAILED', 14, 1, False, True, False),  # retryable
+        ('CANCELLED', None, 2, False, True, False),  # retryable
+        ('RUNNING', None, 1, False, False, True),  # still running
+        ('PENDING', None, 2, False, False, True),  # still pending
+    ],
+)
+def test__process_transfer_watchdog_ok(  # pylint: disable=too-many-arguments
+    monkeypatch,
+    *,
+    state: str,
+    error_code: int,
+    attempts: int,
+    expected_finish: bool,
+    expected_retrigger: bool,
+    expected_wait: bool,
+):
+    # Given
+    called = _mock_transfer_watchdog(
+        monkeypatch, state=state, error_code=error_code, attempts=attempts
+    )
+    cmd = command.CommandTransferWatchdog(
+        type=command.CommandType.TRANSFER_WATCHDOG.value, timestamp=17
+    )
+    # When
+    process_request._process_transfer_watchdog(cmd)
+    # Then
+    assert bool(called['finish']) == expected_finish
+    assert bool(called['start_run']) == expected_retrigger
+    assert len(called['track']) == (1 if expected_retrigger or expected_wait else 0)
+    if called['track']:
+        result = called['track'][0]
+        assert result.attempts == attempts + 1
+        assert result.triggered_timestamp > _TEST_TRACKED_TRANSFER.triggered_timestamp
+        if expected_retrigger:
+            assert result.run_name.endswith('TEST_NEW_RUN')
+        else:
+            assert result.run_name == _TEST_TRACKED_TRANSFER.run_name
+
+
+@pytest.mark.parametrize(
+    'state,error_code,attempts',
+    [
+        ('FAILED', 7, 1),  # not retryable
+        ('FAILED', 14, 3),  # too many attempts
+        ('RUNNING', None, 3),  # too many timeouts
+    ],
+)
+def test__process_transfer_watchdog_nok_gives_up(
+    monkeypatch, state: str, error_code: int, attempts: int
+):
+    # Given
+    called = _mock_transfer_watchdog(
+        monkeypatch, state=state, error_code=error_code, attempts=attempts
+    )
+    cmd = command.CommandTransferWatchdog(
+        type=command.CommandType.TRANSFER_WATCHDOG.value, timestamp=17
+    )
+    # When/Then
+    with pytest.raises(RuntimeError):
+        process_request._process_transfer_watchdog(cmd)
+    assert len(called['finish']) == 1
+    assert called['finish'][0][1].get('remove_persistent')
+    assert not called['start_run']
+    assert not called['track']
+
+
+def test__process_transfer_run_done_ok_retriggers_tracked(monkeypatch):
+    # Given
+    called = _mock_transfer_watchdog(monkeypatch, state='FAILED')
+    monkeypatch.setattr(
+        process_request.sampler_transfer, 'tracked', lambda **kwargs: _TEST_TRACKED_TRANSFER
+    )
+    cmd = command.CommandTransferRunDone(
+        type=command.CommandType.TRANSFER_RUN_DONE.value,
+        timestamp=17,
+        name=_TEST_TRANSFER_CONFIG_NAME,
+        payload={
+            const.TRANSFER_RUN_NAME_ATTR: _TEST_TRACKED_TRANSFER.run_name,
+            const.TRANSFER_RUN_STATE_ATTR: 'FAILED',
+            const.TRANSFER_RUN_ERROR_STATUS_ATTR: {const.TRANSFER_RUN_ERROR_STATUS_CODE_ATTR: 14},
+        },
+    )
+    # When
+    process_request._process_transfer_run_done(cmd)
+    # Then
+    assert called['start_run'] == [_TEST_TRANSFER_CONFIG_NAME]
+    assert len(called['track']) == 1
+    assert not called['finish']
@@ -5,7 +5,9 @@
 # pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
 # type: ignore
 import types
-from typing import Set
+from typing import List, Set
+
+import pytest
 
 from bq_sampler import const, sampler_bucket
 from bq_sampler.entity import policy
@@ -113,6 +115,122 @@ def test_all_policies_ok(monkeypatch):
     assert _MANDATORY_PRESENT_POLICIES.issubset(tables)
 
 
+def test_all_policy_table_ids_ok(monkeypatch):
+    # Given
+    _patch_gcs_storage(monkeypatch)
+    _mock_bq_base_dataset(monkeypatch)
+    expected = {
+        t_pol.table_reference.table_id
+        for t_pol in sampler_bucket.all_policies(gcs_on_disk.POLICY_BUCKET, _GENERAL_POLICY_PATH)
+    }
+    # When
+    result = list(sampler_bucket.all_policy_table_ids(gcs_on_disk.POLICY_BUCKET))
+    # Then
+    assert {table_id for _, _, table_id in result} == expected
+    for project_id, dataset_id, _ in result:
+        assert project_id and dataset_id
+
+
+def test_dataset_policy_table_ids_ok(monkeypatch):
+    # Given
+    _patch_gcs_storage(monkeypatch)
+    _mock_bq_base_dataset(monkeypatch)
+    expected = [
+        table_id
+        for _, dataset_id, table_id in sampler_bucket.all_policy_table_ids(
+            gcs_on_disk.POLICY_BUCKET
+        )
+        if dataset_id == 'dataset_id_b'
+    ]
+    # When
+    result = sampler_bucket.dataset_policy_table_ids(
+        bucket_name=gcs_on_disk.POLICY_BUCKET, dataset_id='dataset_id_b'
+    )
+    # Then
+    assert expected
+    assert sorted(result) == sorted(expected)
+
+
+def test_all_policy_loaders_ok(monkeypatch):
+    # Given
+    _patch_gcs_storage(monkeypatch)
+    _mock_bq_base_dataset(monkeypatch)
+    expected = {
+        t_pol.table_reference.table_id: t_pol
+        for t_pol in sampler_bucket.all_policies(gcs_on_disk.POLICY_BUCKET, _GENERAL_POLICY_PATH)
+        if t_pol.table_reference.table_id in ('policy_full', 'policy_only_limit')
+    }
+    # When
+    result = list(
+        sampler_bucket.all_policy_loaders(
+            gcs_on_disk.POLICY_BUCKET, _GENERAL_POLICY_PATH, table_ids=list(expected)
+        )
+    )
+    # Then
+    assert {table_ref.table_id for table_ref, _ in result} == set(expected)
+    for table_ref, load_fn in result:
+        assert table_ref.location is None
+        assert load_fn() == expected.get(table_ref.table_id)
+
+
+@pytest.mark.parametrize(
+    'max_shard_size,expected_shard_sizes',
+    [
+        (2, [2, 2, 1]),
+        (3, [3, 2]),
+        (5, []),
+    ],
+)
+def test_policy_shards_ok(monkeypatch, max_shard_size: int, expected_shard_sizes: List[int]):
+    # Given
+    _patch_gcs_storage(monkeypatch)
+    prefix = 'project_id_a/'
+    expected = {
+        table_ref.table_id
+        for table_ref, _ in sampler_bucket.all_policy_loaders(
+            gcs_on_disk.POLICY_BUCKET, _GENERAL_POLICY_PATH, prefix=prefix
+        )
+    }
+    # When
+    result = sampler_bucket.policy_shards(gcs_on_disk.POLICY_BUCKET, prefix, max_shard_size)
+    # Then
+    shard_table_ids = [
+        [
+            table_ref.table_id
+            for table_ref, _ in sampler_bucket.all_policy_loaders(
+                gcs_on_disk.POLICY_BUCKET,
+                _GENERAL_POLICY_PATH,
+                prefix=prefix,
+                start_offset=start_offset,
+                end_offset=end_offset,
+            )
+        ]
+        for start_offset, end_offset in result
+    ]
+    assert [len(table_ids) for table_ids in shard_table_ids] == expected_shard_sizes
+    if result:
+        assert result[-1][1] is None
+        assert sorted(sum(shard_table_ids, [])) == sorted(expected)
+
+
+def test_table_policy_object_path_ok(monkeypatch):
+    # Given
+    _patch_gcs_storage(monkeypatch)
+    expected = [
+        obj_path
+        for *_, obj_path in sampler_bucket._list_all_table_ids_obj_path(gcs_on_disk.POLICY_BUCKET)
+    ]
+    # When
+    result = [
+        sampler_bucket.table_policy_object_path(table_ref)
+        for table_ref, _ in sampler_bucket.all_policy_loaders(
+            gcs_on_disk.POLICY_BUCKET, _GENERAL_POLICY_PATH
+        )
+    ]
+    # Then
+    assert result == expected
+
+
 def _is_same_as_default(
     table_id: str,
     table_policy: policy.Policy,
@@ -0,0 +1,243 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=missing-module-docstring,missing-class-docstring,missing-function-docstring
+# pylint: disable=missing-function-docstring,assignment-from-no-return,c-extension-no-member
+# pylint: disable=protected-access,redefined-outer-name,no-self-use,using-constant-test
+# pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
+# type: ignore
+from typing import Callable, Dict, Generator, Optional, Tuple
+
+import pytest
+
+from bq_sampler import const, sampler_idempotency
+
+from tests.entity import command_test_data
+
+_TEST_BUCKET_NAME: str = 'TEST_STATE_BUCKET'
+_TEST_NOW_TIMESTAMP: int = 1000
+_TEST_TIMEOUT_SEC: int = 60
+_TEST_CLAIMANT: str = 'TEST_HOST:1:1'
+_TEST_OTHER_CLAIMANT: str = 'TEST_HOST:2:2'
+
+
+def _mock_gcs(monkeypatch, objects: Dict[str, str]) -> None:
+    generations = {}
+
+    def mocked_write_object(
+        bucket_name: str,
+        path: str,
+        content: Optional[str] = '',
+        if_absent: Optional[bool] = False,
+        if_generation_match: Optional[int] = None,
+    ) -> bool:
+        assert bucket_name == _TEST_BUCKET_NAME
+        if if_absent:
+            if_generation_match = 0
+        result = if_generation_match is None or if_generation_match == _generation(path)
+        if result:
+            objects[path] = content
+            generations[path] = (objects[path], _generation(path) + 1)
+        return result
+
+    def _generation(path: str) -> int:
+        # changed directly in objects by the test means a new generation
+        if path not in objects:
+            return 0
+        content, generation = generations.get(path, (None, 0))
+        if content != objects[path]:
+            generation += 1
+            generations[path] = (objects[path], generation)
+        return generation
+
+    def mocked_read_object_and_generation(
+        bucket_name: str, path: str
+    ) -> Tuple[Optional[bytes], int]:
+        assert bucket_name == _TEST_BUCKET_NAME
+        content = objects.get(path)
+        return (content.encode() if content is not None else None), _generation(path)
+
+    def mocked_read_object(
+        bucket_name: str, path: str, warn_read_failure: Optional[bool] = True
+    ) -> Optional[bytes]:
+        assert bucket_name == _TEST_BUCKET_NAME
+        assert not warn_read_failure
+        content = objects.get(path)
+        return content.encode() if content is not None else None
+
+    def mocked_list_prefixes(
+        bucket_name: str,
+        prefix: Optional[str] = None,
+        filter_fn: Optional[Callable[[str], bool]] = None,
+    ) -> Generator[str, None, None]:
+        assert bucket_name == _TEST_BUCKET_NAME
+        for item in sorted({path[: path.rindex('/') + 1] for path in objects}):
+            if item.startswith(prefix) and filter_fn(item):
+                yield item
+
+    def mocked_delete_objects(bucket_name: str, prefix: str) -> int:
+        assert bucket_name == _TEST_BUCKET_NAME
+        paths = [path for path in objects if path.startswith(prefix)]
+        for path in paths:
+            del objects[path]
+        return len(paths)
+
+    monkeypatch.setattr(sampler_idempotency.gcs, 'write_object', mocked_write_object)
+    monkeypatch.setattr(sampler_idempotency.gcs, 'read_object', mocked_read_object)
+    monkeypatch.setattr(
+        sampler_idempotency.gcs, 'read_object_and_generation', mocked_read_object_and_generation
+    )
+    monkeypatch.setattr(sampler_idempotency, '_claimant', lambda: _TEST_CLAIMANT)
+    monkeypatch.setattr(sampler_idempotency.gcs, 'list_prefixes', mocked_list_prefixes)
+    monkeypatch.setattr(sampler_idempotency.gcs, 'delete_objects', mocked_delete_objects)
+    monkeypatch.setattr(sampler_idempotency.time, 'time', lambda: _TEST_NOW_TIMESTAMP)
+
+
+def _claim(value=command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM) -> Optional[object]:
+    return sampler_idempotency.claim(
+        bucket_name=_TEST_BUCKET_NAME, value=value, timeout_sec=_TEST_TIMEOUT_SEC
+    )
+
+
+def test_claim_ok(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    run_timestamp = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM.timestamp
+    # When
+    result = _claim()
+    # Then
+    assert result is None
+    assert list(objects.values()) == [f'{_TEST_NOW_TIMESTAMP} {_TEST_CLAIMANT}']
+    assert all(
+        path.startswith(f'{const.SAMPLE_STARTS_PREFIX}/{run_timestamp}/') for path in objects
+    )
+
+
+def test_claim_ok_already_done(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    value = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    sample_done = command_test_data.TEST_COMMAND_SAMPLE_DONE
+    _claim(value)
+    sampler_idempotency.done(bucket_name=_TEST_BUCKET_NAME, value=value, sample_done=sample_done)
+    # When
+    result = _claim(value)
+    # Then
+    assert result == sample_done
+
+
+def test_claim_nok_in_progress(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _claim()
+    monkeypatch.setattr(sampler_idempotency, '_claimant', lambda: _TEST_OTHER_CLAIMANT)
+    # When/Then
+    with pytest.raises(sampler_idempotency.SampleInProgressError):
+        _claim()
+
+
+def test_claim_ok_own_claim(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _claim()
+    # When
+    result = _claim()
+    # Then
+    assert result is None
+
+
+@pytest.mark.parametrize(
+    'record',
+    [
+        f'{_TEST_NOW_TIMESTAMP - _TEST_TIMEOUT_SEC - 1} {_TEST_OTHER_CLAIMANT}',
+        # before the claimant was recorded
+        str(_TEST_NOW_TIMESTAMP - _TEST_TIMEOUT_SEC - 1),
+    ],
+)
+def test_claim_ok_abandoned(monkeypatch, record: str):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _claim()
+    path = list(objects)[0]
+    objects[path] = record
+    # When
+    result = _claim()
+    # Then
+    assert result is None
+    assert objects[path] == f'{_TEST_NOW_TIMESTAMP} {_TEST_CLAIMANT}'
+
+
+def test_claim_nok_taken_over_concurrently(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _claim()
+    path = list(objects)[0]
+    objects[path] = f'{_TEST_NOW_TIMESTAMP - _TEST_TIMEOUT_SEC - 1} {_TEST_OTHER_CLAIMANT}'
+    read_object_and_generation = sampler_idempotency.gcs.read_object_and_generation
+
+    def mocked_read_object_and_generation(bucket_name: str, path: str) -> Tuple[bytes, int]:
+        result = read_object_and_generation(bucket_name, path)
+        # someone else takes it over right after it was read
+        objects[path] = f'{_TEST_NOW_TIMESTAMP} {_TEST_OTHER_CLAIMANT}'
+        return result
+
+    monkeypatch.setattr(
+        sampler_idempotency.gcs, 'read_object_and_generation', mocked_read_object_and_generation
+    )
+    # When/Then
+    with pytest.raises(sampler_idempotency.SampleInProgressError):
+        _claim()
+    assert objects[path] == f'{_TEST_NOW_TIMESTAMP} {_TEST_OTHER_CLAIMANT}'
+
+
+def test__record_path_ok_run_timestamp():
+    # Given
+    value = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    run_timestamp = value.timestamp
+    # When
+    result = sampler_idempotency._record_path(value.clone(run_timestamp=run_timestamp))
+    republished_result = sampler_idempotency._record_path(
+        value.clone(timestamp=run_timestamp + 60, run_timestamp=run_timestamp)
+    )
+    # Then
+    assert result == republished_result
+    assert result.startswith(f'{const.SAMPLE_STARTS_PREFIX}/{run_timestamp}/')
+
+
+def test_release_ok(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _claim()
+    # When
+    sampler_idempotency.release(
+        bucket_name=_TEST_BUCKET_NAME, value=command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    )
+    # Then
+    assert not objects
+    assert _claim() is None
+
+
+def test_remove_before_ok(monkeypatch):
+    # Given
+    objects = {
+        f'{const.SAMPLE_STARTS_PREFIX}/10/TABLE_A': '',
+        f'{const.SAMPLE_STARTS_PREFIX}/10/TABLE_B': '',
+        f'{const.SAMPLE_STARTS_PREFIX}/20/TABLE_A': '',
+        f'{const.SAMPLE_STARTS_PREFIX}/NOT_A_RUN/TABLE_A': '',
+        f'{const.STAGED_SAMPLES_PREFIX}/10/TABLE_A': '',
+    }
+    _mock_gcs(monkeypatch, objects)
+    # When
+    result = sampler_idempotency.remove_before(bucket_name=_TEST_BUCKET_NAME, timestamp=20)
+    # Then
+    assert result == 2
+    assert sorted(objects) == [
+        f'{const.SAMPLE_STARTS_PREFIX}/20/TABLE_A',
+        f'{const.SAMPLE_STARTS_PREFIX}/NOT_A_RUN/TABLE_A',
+        f'{const.STAGED_SAMPLES_PREFIX}/10/TABLE_A',
+    ]
@@ -0,0 +1,479 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=missing-module-docstring,missing-class-docstring,missing-function-docstring
+# pylint: disable=missing-function-docstring,assignment-from-no-return,c-extension-no-member
+# pylint: disable=protected-access,redefined-outer-name,no-self-use,using-constant-test
+# pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
+# type: ignore
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
+
+import attrs
+
+from bq_sampler import const, sampler_ledger
+from bq_sampler.entity import command, table
+
+from tests.entity import command_test_data
+
+_TEST_BUCKET_NAME: str = 'TEST_STATE_BUCKET'
+_TEST_RUN_TIMESTAMP: int = 17
+_TEST_PROJECT_PREFIX: str = 'TEST_PROJECT/'
+_TEST_PREFIX: str = 'TEST_PROJECT/TEST_DATASET/'
+
+
+def _mock_gcs(monkeypatch, objects: Dict[str, str]) -> None:
+    generations = {}
+
+    def mocked_write_object(
+        bucket_name: str,
+        path: str,
+        content: Optional[str] = '',
+        if_absent: Optional[bool] = False,
+        if_generation_match: Optional[int] = None,
+    ) -> bool:
+        assert bucket_name == _TEST_BUCKET_NAME
+        result = not (if_absent and path in objects) and (
+            if_generation_match is None or if_generation_match == generations.get(path, 0)
+        )
+        if result:
+            objects[path] = content
+            generations[path] = generations.get(path, 0) + 1
+        return result
+
+    def mocked_read_object_and_generation(
+        bucket_name: str, path: str
+    ) -> Tuple[Optional[bytes], int]:
+        assert bucket_name == _TEST_BUCKET_NAME
+        content = objects.get(path)
+        return (content.encode() if content is not None else None), generations.get(path, 0)
+
+    def mocked_read_object(
+        bucket_name: str, path: str, warn_read_failure: Optional[bool] = True
+    ) -> Optional[bytes]:
+        assert bucket_name == _TEST_BUCKET_NAME
+        content = objects.get(path)
+        return content.encode() if content is not None else None
+
+    def mocked_list_objects(
+        bucket_name: str,
+        filter_fn: Optional[Callable[[str], bool]] = None,
+        prefix: Optional[str] = None,
+    ) -> Generator[str, None, None]:
+        assert bucket_name == _TEST_BUCKET_NAME
+        assert filter_fn is None
+        for path in sorted(objects):
+            if path.startswith(prefix):
+                yield path
+
+    def mocked_list_prefixes(
+        bucket_name: str,
+        prefix: Optional[str] = None,
+        filter_fn: Optional[Callable[[str], bool]] = None,
+    ) -> Generator[str, None, None]:
+        assert bucket_name == _TEST_BUCKET_NAME
+        for item in sorted({path[: path.index('/', len(prefix)) + 1] for path in objects}):
+            if item.startswith(prefix) and filter_fn(item):
+                yield item
+
+    def mocked_delete_objects(bucket_name: str, prefix: str) -> int:
+        assert bucket_name == _TEST_BUCKET_NAME
+        paths = [path for path in objects if path.startswith(prefix)]
+        for path in paths:
+            del objects[path]
+        return len(paths)
+
+    def mocked_delete_object(bucket_name: str, path: str) -> bool:
+        assert bucket_name == _TEST_BUCKET_NAME
+        return objects.pop(path, None) is not None
+
+    monkeypatch.setattr(sampler_ledger.gcs, 'write_object', mocked_write_object)
+    monkeypatch.setattr(sampler_ledger.gcs, 'delete_object', mocked_delete_object)
+    monkeypatch.setattr(sampler_ledger.gcs, 'read_object', mocked_read_object)
+    monkeypatch.setattr(
+        sampler_ledger.gcs, 'read_object_and_generation', mocked_read_object_and_generation
+    )
+    monkeypatch.setattr(sampler_ledger.gcs, 'list_objects', mocked_list_objects)
+    monkeypatch.setattr(sampler_ledger.gcs, 'list_prefixes', mocked_list_prefixes)
+    monkeypatch.setattr(sampler_ledger.gcs, 'delete_objects', mocked_delete_objects)
+
+
+def _sample_done(table_id: str, **kwargs) -> command.CommandSampleDone:
+    value = command_test_data.TEST_COMMAND_SAMPLE_DONE
+    return attrs.evolve(
+        value,
+        sample_request=attrs.evolve(
+            value.sample_request,
+            table_reference=value.sample_request.table_reference.clone(table_id=table_id),
+        ),
+        **kwargs,
+    )
+
+
+def _table_reference(table_id: str) -> table.TableReference:
+    return _sample_done(table_id).sample_request.table_reference
+
+
+def _sample_start(table_id: str) -> command.CommandSampleStart:
+    value = command_test_data.TEST_COMMAND_SAMPLE_START
+    return attrs.evolve(
+        value,
+        sample_request=attrs.evolve(
+            value.sample_request, table_reference=_table_reference(table_id)
+        ),
+    )
+
+
+def _plan(table_ids, prefixes: Optional[List[str]] = None) -> None:
+    sampler_ledger.plan_run(
+        bucket_name=_TEST_BUCKET_NAME, run_timestamp=_TEST_RUN_TIMESTAMP, project_amount=1
+    )
+    sampler_ledger.plan_project(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        project_prefix=_TEST_PROJECT_PREFIX,
+        prefixes=prefixes or [_TEST_PREFIX],
+    )
+    sampler_ledger.plan_prefix(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        prefix=_TEST_PREFIX,
+        # the location is not known while planning
+        table_references=[
+            _table_reference(table_id).clone(location=None) for table_id in table_ids
+        ],
+    )
+
+
+def _complete() -> Optional[command.CommandRunComplete]:
+    return sampler_ledger.complete(bucket_name=_TEST_BUCKET_NAME, run_timestamp=_TEST_RUN_TIMESTAMP)
+
+
+def test_complete_ok(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _plan(['TABLE_A', 'TABLE_B', 'TABLE_C'])
+    for table_id in ['TABLE_A', 'TABLE_B']:
+        sampler_ledger.start(
+            bucket_name=_TEST_BUCKET_NAME,
+            run_timestamp=_TEST_RUN_TIMESTAMP,
+            table_reference=_table_reference(table_id),
+        )
+    for table_id, end_timestamp in [('TABLE_A', 41), ('TABLE_B', 79)]:
+        sampler_ledger.done(
+            bucket_name=_TEST_BUCKET_NAME,
+            run_timestamp=_TEST_RUN_TIMESTAMP,
+            sample_done=_sample_done(
+                table_id,
+                start_timestamp=31,
+                end_timestamp=end_timestamp,
+                total_bytes_billed=100,
+                slot_ms=10,
+            ),
+        )
+    assert _complete() is None
+    sampler_ledger.fail(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        table_reference=_table_reference('TABLE_C'),
+        error='TEST_ERROR',
+    )
+    # When
+    result = _complete()
+    # Then
+    assert result.type == command.CommandType.RUN_COMPLETE.value
+    assert result.run_timestamp == _TEST_RUN_TIMESTAMP
+    assert (result.planned, result.started, result.done, result.failed) == (3, 2, 2, 1)
+    assert (result.total_bytes_billed, result.slot_ms) == (200, 20)
+    assert (result.total_sample_duration, result.max_sample_duration) == (58, 48)
+    assert result.duration == 79 - _TEST_RUN_TIMESTAMP
+    assert _complete() is None
+
+
+def test_plan_prefix_ok_single_manifest(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    # When
+    _plan(['TABLE_A', 'TABLE_B', 'TABLE_C'])
+    # Then
+    assert sorted(path for path in objects if _TEST_PREFIX.strip('/') in path) == [
+        f'{const.RUN_LEDGER_PREFIX}/{_TEST_RUN_TIMESTAMP}/prefixes/{_TEST_PREFIX.strip("/")}',
+        f'{const.RUN_LEDGER_PREFIX}/{_TEST_RUN_TIMESTAMP}/prefixes_planned/'
+        f'{_TEST_PREFIX.strip("/")}',
+    ]
+
+
+def test_complete_ok_pending_not_listed(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _plan(['TABLE_A', 'TABLE_B'])
+    for table_id in ['TABLE_A', 'TABLE_B']:
+        sampler_ledger.start(
+            bucket_name=_TEST_BUCKET_NAME,
+            run_timestamp=_TEST_RUN_TIMESTAMP,
+            table_reference=_table_reference(table_id),
+        )
+    sampler_ledger.done(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        sample_done=_sample_done('TABLE_A'),
+    )
+    list_objects = sampler_ledger.gcs.list_objects
+    listed = []
+
+    def mocked_list_objects(bucket_name: str, prefix: Optional[str] = None, **kwargs) -> Any:
+        listed.append(prefix)
+        return list_objects(bucket_name, prefix=prefix, **kwargs)
+
+    monkeypatch.setattr(sampler_ledger.gcs, 'list_objects', mocked_list_objects)
+    # When
+    result = _complete()
+    # Then
+    assert result is None
+    assert listed == [f'{const.RUN_LEDGER_PREFIX}/{_TEST_RUN_TIMESTAMP}/pending/']
+
+
+def test_start_ok_after_done(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _plan(['TABLE_A'])
+    sampler_ledger.done(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        sample_done=_sample_done('TABLE_A'),
+    )
+    # When
+    sampler_ledger.start(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        table_reference=_table_reference('TABLE_A'),
+    )
+    # Then
+    assert not [path for path in objects if '/pending/' in path]
+    assert _complete().done == 1
+
+
+def test_complete_ok_done_after_failed(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _plan(['TABLE_A'])
+    sampler_ledger.fail(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        table_reference=_table_reference('TABLE_A'),
+        error='TEST_ERROR',
+    )
+    sampler_ledger.done(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        sample_done=_sample_done('TABLE_A'),
+    )
+    # When
+    result = _complete()
+    # Then
+    assert (result.planned, result.done, result.failed) == (1, 1, 0)
+
+
+def test_complete_ok_prefix_not_planned(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _plan(['TABLE_A'], prefixes=[_TEST_PREFIX, f'{_TEST_PROJECT_PREFIX}OTHER_DATASET/'])
+    sampler_ledger.done(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        sample_done=_sample_done('TABLE_A'),
+    )
+    # When
+    result = _complete()
+    # Then
+    assert result is None
+
+
+def test_complete_ok_sharded(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    shards = [f'{_TEST_PREFIX}TABLE_A.json', f'{_TEST_PREFIX}TABLE_B.json']
+    _plan([], prefixes=[_TEST_PREFIX])
+    sampler_ledger.plan_shards(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        prefix=_TEST_PREFIX,
+        shards=shards,
+    )
+    for shard, table_id in zip(shards, ['TABLE_A', 'TABLE_B']):
+        assert _complete() is None
+        sampler_ledger.plan_prefix(
+            bucket_name=_TEST_BUCKET_NAME,
+            run_timestamp=_TEST_RUN_TIMESTAMP,
+            prefix=shard,
+            table_references=[_table_reference(table_id)],
+        )
+        sampler_ledger.done(
+            bucket_name=_TEST_BUCKET_NAME,
+            run_timestamp=_TEST_RUN_TIMESTAMP,
+            sample_done=_sample_done(table_id),
+        )
+    # When
+    result = _complete()
+    # Then
+    assert (result.planned, result.done, result.failed) == (2, 2, 0)
+
+
+def test_complete_ok_continuation(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    continuation = f'{_TEST_PREFIX}TABLE_B.json'
+    _plan([], prefixes=[_TEST_PREFIX])
+    sampler_ledger.plan_prefix(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        prefix=_TEST_PREFIX,
+        table_references=[_table_reference('TABLE_A')],
+        continuation=continuation,
+    )
+    for table_id in ['TABLE_A', 'TABLE_B']:
+        sampler_ledger.done(
+            bucket_name=_TEST_BUCKET_NAME,
+            run_timestamp=_TEST_RUN_TIMESTAMP,
+            sample_done=_sample_done(table_id),
+        )
+    assert _complete() is None
+    sampler_ledger.plan_prefix(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        prefix=continuation,
+        table_references=[_table_reference('TABLE_B')],
+    )
+    # When
+    result = _complete()
+    # Then
+    assert (result.planned, result.done, result.failed) == (2, 2, 0)
+
+
+def test_complete_ok_run_not_planned(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    # When
+    result = _complete()
+    # Then
+    assert result is None
+    assert not objects
+
+
+def test_set_current_run_ok(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    assert sampler_ledger.current_run(bucket_name=_TEST_BUCKET_NAME) is None
+    # When
+    result = [
+        sampler_ledger.set_current_run(bucket_name=_TEST_BUCKET_NAME, run_timestamp=run_timestamp)
+        for run_timestamp in [17, 31, 23]
+    ]
+    # Then
+    assert result == [True, True, False]
+    assert sampler_ledger.current_run(bucket_name=_TEST_BUCKET_NAME) == 31
+
+
+def test_set_current_run_ok_changed_concurrently(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    read_object_and_generation = sampler_ledger.gcs.read_object_and_generation
+    concurrent_run_timestamps = [31]
+
+    def mocked_read_object_and_generation(bucket_name: str, path: str) -> Any:
+        result = read_object_and_generation(bucket_name, path)
+        # a more recent run is set right after it was read
+        if concurrent_run_timestamps:
+            sampler_ledger.gcs.write_object(bucket_name, path, str(concurrent_run_timestamps.pop()))
+        return result
+
+    monkeypatch.setattr(
+        sampler_ledger.gcs, 'read_object_and_generation', mocked_read_object_and_generation
+    )
+    # When
+    result = sampler_ledger.set_current_run(bucket_name=_TEST_BUCKET_NAME, run_timestamp=23)
+    # Then
+    assert not result
+    assert sampler_ledger.current_run(bucket_name=_TEST_BUCKET_NAME) == 31
+
+
+def test_shed_ok(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    value = command_test_data.TEST_COMMAND_SAMPLE_START
+    # When
+    for cmd in [
+        value,
+        # sent again
+        attrs.evolve(value, timestamp=value.timestamp + 1),
+        _sample_done('TABLE_A'),
+    ]:
+        sampler_ledger.shed(
+            bucket_name=_TEST_BUCKET_NAME, run_timestamp=_TEST_RUN_TIMESTAMP, value=cmd
+        )
+    # Then
+    assert len([path for path in objects if '/shed/' in path]) == 2
+
+
+def test_complete_ok_shed(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    _plan(['TABLE_A', 'TABLE_B', 'TABLE_C'])
+    sampler_ledger.start(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        table_reference=_table_reference('TABLE_A'),
+    )
+    sampler_ledger.done(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        sample_done=_sample_done('TABLE_A'),
+    )
+    for table_id in ['TABLE_A', 'TABLE_B']:
+        sampler_ledger.shed(
+            bucket_name=_TEST_BUCKET_NAME,
+            run_timestamp=_TEST_RUN_TIMESTAMP,
+            value=_sample_start(table_id),
+        )
+    assert _complete() is None
+    sampler_ledger.shed(
+        bucket_name=_TEST_BUCKET_NAME,
+        run_timestamp=_TEST_RUN_TIMESTAMP,
+        value=_sample_start('TABLE_C'),
+    )
+    # When
+    result = _complete()
+    # Then
+    assert (result.planned, result.started, result.done, result.failed) == (3, 1, 1, 0)
+    assert result.shed == 2
+
+
+def test_remove_before_ok(monkeypatch):
+    # Given
+    objects = {
+        f'{const.RUN_LEDGER_PREFIX}/10/prefixes': '1',
+        f'{const.RUN_LEDGER_PREFIX}/10/planned/TABLE_A': '',
+        f'{const.RUN_LEDGER_PREFIX}/20/prefixes': '1',
+        f'{const.RUN_LEDGER_PREFIX}/NOT_A_RUN/prefixes': '1',
+        f'{const.SAMPLE_STARTS_PREFIX}/10/TABLE_A': '',
+    }
+    _mock_gcs(monkeypatch, objects)
+    # When
+    result = sampler_ledger.remove_before(bucket_name=_TEST_BUCKET_NAME, timestamp=20)
+    # Then
+    assert result == 2
+    assert sorted(objects) == [
+        f'{const.RUN_LEDGER_PREFIX}/20/prefixes',
+        f'{const.RUN_LEDGER_PREFIX}/NOT_A_RUN/prefixes',
+        f'{const.SAMPLE_STARTS_PREFIX}/10/TABLE_A',
+    ]
@@ -45,7 +45,6 @@ _DEFAULT_MOCKED_QUERY_JOB_RESULT: StubbedRowIterator = StubbedRowIterator(0)
 _DEFAULT_MOCKED_ROW_COUNT: int = 1000
 
 _COMMON_QUERY_SUB_STRINGS: List[str] = ['SELECT * FROM `', 'LIMIT ']
-_INSERT_QUERY_SUB_STRINGS: List[str] = ['INSERT INTO `']
 _RANDOM_QUERY_SUB_STRINGS: List[str] = [
     'TABLESAMPLE SYSTEM (',
     'PERCENT)',
@@ -62,7 +61,6 @@ def _query_validation_fn(
     *,
     extra_query_sub_strings: Optional[List[str]] = None,
     is_random_query: Optional[bool] = True,
-    has_insert: Optional[bool] = False,
     uses_rand: Optional[bool] = False,
 ) -> Callable[[str], None]:
     query_sub_strings = []
@@ -74,8 +72,6 @@ def _query_validation_fn(
             query_sub_strings.extend(_RANDOM_QUERY_SUB_STRINGS)
     else:
         query_sub_strings.extend(_SORTED_QUERY_SUB_STRINGS)
-    if has_insert:
-        query_sub_strings.extend(_INSERT_QUERY_SUB_STRINGS)
     if extra_query_sub_strings:
         query_sub_strings.extend(extra_query_sub_strings)
 
@@ -96,6 +92,9 @@ def _mock_calls_bq(
 ) -> None:
     def mocked_bq_query_job_result(*args, **kwargs) -> Any:  # pylint: disable=unused-argument
         query = kwargs.get('query')
+        if not query.startswith('TRUNCATE'):
+            # sample results overwrite the target content
+            assert kwargs.get('destination_table_fqn_id')
         if fail_tablesample_stmt and 'TABLESAMPLE' in query:
             raise RuntimeError(f'Failing tablesample in query {query}')
         if query_validation_fn is not None:
@@ -192,10 +191,32 @@ def test__int_percent_for_tablesample_stmt_ok_empty_table(monkeypatch):
     assert result == 0
 
 
+@pytest.mark.parametrize(
+    'sample_type,num_bytes,expected',
+    [
+        (const.SAMPLE_TYPE_RANDOM, 10_000, 10_000 * 0.02),  # 20 out of 1000 rows, i.e., 2%
+        (const.SAMPLE_TYPE_SORTED, 10_000, 10_000 * const.BQ_SORTED_SAMPLE_COST_FACTOR),
+        (const.SAMPLE_TYPE_RANDOM, 0, _DEFAULT_MOCKED_ROW_COUNT * 0.02),  # view
+    ],
+)
+def test_estimated_sample_cost_ok(monkeypatch, sample_type: str, num_bytes: int, expected: float):
+    # Given
+    _mock_calls_bq(monkeypatch)
+    monkeypatch.setattr(sampler_query.bq, 'num_bytes', lambda **kwargs: num_bytes)
+    table_sample = table.TableSample(
+        table_reference=_TEST_SOURCE_TABLE_REF,
+        sample=table.Sample(size=table.SizeSpec(count=20), spec=table.SampleSpec(type=sample_type)),
+    )
+    # When
+    result = sampler_query.estimated_sample_cost(table_sample)
+    # Then
+    assert result == pytest.approx(expected)
+
+
 def test_create_table_with_random_sample_ok(monkeypatch):
     # Given
     amount = _TEST_SAMPLE_AMOUNT
-    query_validation_fn = _query_validation_fn(is_random_query=True, has_insert=True)
+    query_validation_fn = _query_validation_fn(is_random_query=True)
     _mock_calls_bq(
         monkeypatch,
         query_validation_fn=query_validation_fn,
@@ -214,9 +235,7 @@ def test_create_table_with_random_sample_ok(monkeypatch):
 def test_create_table_with_random_sample_ok_view(monkeypatch):
     # Given
     amount = _TEST_SAMPLE_AMOUNT
-    query_validation_fn = _query_validation_fn(
-        is_random_query=True, has_insert=True, uses_rand=True
-    )
+    query_validation_fn = _query_validation_fn(is_random_query=True, uses_rand=True)
     _mock_calls_bq(
         monkeypatch,
         query_validation_fn=query_validation_fn,
@@ -236,7 +255,7 @@ def test_create_table_with_random_sample_ok_view(monkeypatch):
 def test_create_table_with_random_sample_ok_different_locations(monkeypatch):
     # Given
     amount = _TEST_SAMPLE_AMOUNT
-    query_validation_fn = _query_validation_fn(is_random_query=True, has_insert=True)
+    query_validation_fn = _query_validation_fn(is_random_query=True)
     _mock_calls_bq(
         monkeypatch,
         query_validation_fn=query_validation_fn,
@@ -255,7 +274,7 @@ def test_create_table_with_random_sample_ok_different_locations(monkeypatch):
 def test_create_table_with_random_sample_ok_0_amount(monkeypatch):
     # Given
     amount = 0
-    query_validation_fn = _query_validation_fn(is_random_query=True, has_insert=True)
+    query_validation_fn = _query_validation_fn(is_random_query=True)
     _mock_calls_bq(
         monkeypatch,
         query_validation_fn=query_validation_fn,
@@ -298,7 +317,7 @@ def test_create_table_with_random_sample_nok(
 def test_create_table_with_sorted_sample_ok(monkeypatch):
     # Given
     amount = _TEST_SAMPLE_AMOUNT
-    query_validation_fn = _query_validation_fn(is_random_query=False, has_insert=True)
+    query_validation_fn = _query_validation_fn(is_random_query=False)
     _mock_calls_bq(
         monkeypatch,
         query_validation_fn=query_validation_fn,
@@ -418,7 +437,7 @@ def test_create_table_with_sorted_sample_nok(  # pylint: disable=too-many-argume
 def test_create_table_with_sorted_sample_ok_different_locations(monkeypatch):
     # Given
     amount = _TEST_SAMPLE_AMOUNT
-    query_validation_fn = _query_validation_fn(is_random_query=False, has_insert=True)
+    query_validation_fn = _query_validation_fn(is_random_query=False)
     _mock_calls_bq(
         monkeypatch,
         query_validation_fn=query_validation_fn,
@@ -434,3 +453,293 @@ def test_create_table_with_sorted_sample_ok_different_locations(monkeypatch):
     )
     # Then
     assert isinstance(result, int)
+
+
+def _mock_clone_table(monkeypatch, called: List[Any], table_type: Optional[str] = 'TABLE') -> None:
+    def mocked_bq_table(*, table_fqn_id: str) -> bigquery.Table:
+        result = bigquery.Table(table_fqn_id.split(const.BQ_TABLE_FQN_LOCATION_SEP)[0])
+        result._properties['type'] = table_type
+        return result
+
+    monkeypatch.setattr(sampler_query.bq, 'table', mocked_bq_table)
+
+    def mocked_clone_table(**kwargs) -> None:
+        called.append(kwargs)
+
+    monkeypatch.setattr(sampler_query.bq, 'clone_table', mocked_clone_table)
+
+
+@pytest.mark.parametrize(
+    'amount,table_type,target_table_ref,expected',
+    [
+        (_DEFAULT_MOCKED_ROW_COUNT, 'TABLE', _TEST_TARGET_TABLE_REF, True),
+        (_DEFAULT_MOCKED_ROW_COUNT + 1, 'TABLE', _TEST_TARGET_TABLE_REF, True),
+        (_DEFAULT_MOCKED_ROW_COUNT - 1, 'TABLE', _TEST_TARGET_TABLE_REF, False),
+        (_DEFAULT_MOCKED_ROW_COUNT, 'VIEW', _TEST_TARGET_TABLE_REF, False),
+        (_DEFAULT_MOCKED_ROW_COUNT, 'TABLE', _TEST_TARGET_DIFF_LOC_TABLE_REF, False),
+    ],
+)
+def test_create_table_with_random_sample_ok_clone(
+    monkeypatch,
+    amount: int,
+    table_type: str,
+    target_table_ref: table.TableReference,
+    expected: bool,
+):
+    # Given
+    called_clone = []
+    called_query = []
+    _mock_calls_bq(
+        monkeypatch,
+        query_validation_fn=called_query.append,
+        query_job_result=StubbedRowIterator(amount),
+    )
+    _mock_clone_table(monkeypatch, called_clone, table_type)
+    # When
+    result = sampler_query.create_table_with_random_sample(
+        source_table_ref=_TEST_SOURCE_TABLE_REF,
+        target_table_ref=target_table_ref,
+        amount=amount,
+    )
+    # Then
+    assert isinstance(result, int)
+    assert bool(called_clone) == expected
+    assert bool(called_query) != expected
+    if expected:
+        assert called_clone[0].get('source_table_fqn_id') == _TEST_SOURCE_TABLE_FQN_ID
+        assert called_clone[0].get('target_table_fqn_id') == target_table_ref.table_fqn_id()
+        assert called_clone[0].get('replace')
+
+
+def test_create_table_with_sorted_sample_ok_clone_disabled(monkeypatch):
+    # Given
+    called_clone = []
+    amount = _DEFAULT_MOCKED_ROW_COUNT
+    _mock_calls_bq(monkeypatch, query_job_result=StubbedRowIterator(amount))
+    _mock_clone_table(monkeypatch, called_clone)
+    # When
+    result = sampler_query.create_table_with_sorted_sample(
+        source_table_ref=_TEST_SOURCE_TABLE_REF,
+        target_table_ref=_TEST_TARGET_TABLE_REF,
+        amount=amount,
+        column=_TEST_SORT_COLUMN_NAME,
+        order=_TEST_SORT_ORDER,
+        clone_full_table=False,
+    )
+    # Then
+    assert isinstance(result, int)
+    assert not called_clone
+
+
+def test_create_table_with_random_sample_ok_0_amount_keeps_table(monkeypatch):
+    # Given
+    called_query = []
+    called_drop = []
+    _mock_calls_bq(
+        monkeypatch, query_validation_fn=called_query.append, query_job_result=StubbedRowIterator(0)
+    )
+
+    def mocked_bq_create_table(**kwargs) -> None:
+        called_drop.append(kwargs.get('drop_table_before'))
+
+    monkeypatch.setattr(sampler_query.bq, 'create_table', mocked_bq_create_table)
+    # When
+    sampler_query.create_table_with_random_sample(
+        source_table_ref=_TEST_SOURCE_TABLE_REF,
+        target_table_ref=_TEST_TARGET_TABLE_REF,
+        amount=0,
+        recreate_table=False,
+    )
+    # Then
+    assert called_drop == [False]
+    assert len(called_query) == 1
+    assert called_query[0].startswith('TRUNCATE TABLE')
+
+
+def test_create_table_with_random_sample_ok_expiration(monkeypatch):
+    # Given
+    amount = _TEST_SAMPLE_AMOUNT
+    table_expiration_ms = 1_000
+    staging_table_expiration_ms = 2_000
+    called_create = {}
+    _mock_calls_bq(monkeypatch, query_job_result=StubbedRowIterator(amount))
+
+    def mocked_bq_create_table(**kwargs) -> None:
+        called_create[kwargs.get('table_fqn_id')] = kwargs
+
+    monkeypatch.setattr(sampler_query.bq, 'create_table', mocked_bq_create_table)
+    # When
+    sampler_query.create_table_with_random_sample(
+        source_table_ref=_TEST_SOURCE_TABLE_REF,
+        target_table_ref=_TEST_TARGET_DIFF_LOC_TABLE_REF,
+        amount=amount,
+        table_expiration_ms=table_expiration_ms,
+        staging_table_expiration_ms=staging_table_expiration_ms,
+    )
+    # Then
+    assert len(called_create) == 2
+    target_kwargs = called_create.pop(_TEST_TARGET_DIFF_LOC_TABLE_FQN_ID)
+    assert target_kwargs.get('expiration_ms') == table_expiration_ms
+    assert target_kwargs.get('dataset_default_table_expiration_ms') is None
+    assert const.TRANSFER_TEMP_DATASET_EXPIRES_AT_LABEL not in target_kwargs.get('labels')
+    (staging_kwargs,) = called_create.values()
+    assert staging_kwargs.get('expiration_ms') is None
+    assert staging_kwargs.get('dataset_default_table_expiration_ms') == staging_table_expiration_ms
+    assert staging_kwargs.get('labels').get(const.TRANSFER_TEMP_DATASET_EXPIRES_AT_LABEL)
+
+
+def test_create_table_with_random_sample_ok_shared_staging_dataset(monkeypatch):
+    # Given
+    amount = _TEST_SAMPLE_AMOUNT
+    staging_dataset_id = sampler_query.shared_staging_dataset_id(
+        source_location=_TEST_SOURCE_TABLE_REF.location,
+        target_dataset_id=_TEST_TARGET_DIFF_LOC_TABLE_REF.dataset_id,
+        run_timestamp=17,
+        source_table_fqn_ids=[_TEST_SOURCE_TABLE_REF.table_fqn_id()],
+    )
+    called_create = []
+    called_transfer = []
+    _mock_calls_bq(monkeypatch, query_job_result=StubbedRowIterator(amount))
+    monkeypatch.setattr(
+        sampler_query.bq,
+        'create_table',
+        lambda **kwargs: called_create.append(kwargs.get('table_fqn_id')),
+    )
+    monkeypatch.setattr(
+        sampler_query.bq,
+        'cross_location_copy',
+        lambda **kwargs: called_transfer.append(kwargs),
+    )
+    # When
+    sampler_query.create_table_with_random_sample(
+        source_table_ref=_TEST_SOURCE_TABLE_REF,
+        target_table_ref=_TEST_TARGET_DIFF_LOC_TABLE_REF,
+        amount=amount,
+        staging_dataset_id=staging_dataset_id,
+    )
+    # Then
+    assert len(called_create) == 2
+    assert f'.{staging_dataset_id}.' in called_create[1]
+    assert not called_transfer
+    # When
+    sampler_query.transfer_staging_dataset(
+        source_table_ref=_TEST_SOURCE_TABLE_REF,
+        target_table_ref=_TEST_TARGET_DIFF_LOC_TABLE_REF,
+        staging_dataset_id=staging_dataset_id,
+    )
+    # Then
+    assert len(called_transfer) == 1
+    assert called_transfer[0].get('source_table_fqn_id') == called_create[1]
+
+
+@pytest.mark.parametrize(
+    'num_bytes,load_fails,expected_transfer',
+    [
+        (const.BQ_EXTRACT_LOAD_MAX_BYTES, False, False),
+        (const.BQ_EXTRACT_LOAD_MAX_BYTES + 1, False, True),  # too big
+        (1, True, True),  # fallback
+    ],
+)
+def test_create_table_with_random_sample_ok_extract_and_load(
+    monkeypatch, num_bytes: int, load_fails: bool, expected_transfer: bool
+):
+    # Given
+    amount = _TEST_SAMPLE_AMOUNT
+    bucket_name = 'TEST_EXTRACT_BUCKET'
+    called = {}
+    _mock_calls_bq(monkeypatch, query_job_result=StubbedRowIterator(amount))
+
+    def mocked_bq_table(*, table_fqn_id: str) -> bigquery.Table:
+        result = bigquery.Table(table_fqn_id.split(const.BQ_TABLE_FQN_LOCATION_SEP)[0])
+        result._properties['numBytes'] = str(num_bytes)
+        return result
+
+    def mocked_load_table(*, source_uri: str, table_fqn_id: str) -> None:
+        called['load_table'] = (source_uri, table_fqn_id)
+        if load_fails:
+            raise RuntimeError('TEST')
+
+    def mocked_delete_objects(bucket: str, prefix: str) -> int:
+        assert bucket == bucket_name
+        called['delete_objects'] = prefix
+        return 1
+
+    monkeypatch.setattr(sampler_query.bq, 'table', mocked_bq_table)
+    monkeypatch.setattr(
+        sampler_query.bq,
+        'extract_table',
+        lambda **kwargs: called.setdefault('extract_table', kwargs.get('destination_uri')),
+    )
+    monkeypatch.setattr(sampler_query.bq, 'load_table', mocked_load_table)
+    monkeypatch.setattr(
+        sampler_query.bq, 'remove_dataset', lambda **kwargs: called.setdefault('remove_dataset', 1)
+    )
+    monkeypatch.setattr(
+        sampler_query.bq, 'cross_location_copy', lambda **kwargs: called.setdefault('transfer', 1)
+    )
+    monkeypatch.setattr(sampler_query.gcs, 'delete_objects', mocked_delete_objects)
+    # When
+    sampler_query.create_table_with_random_sample(
+        source_table_ref=_TEST_SOURCE_TABLE_REF,
+        target_table_ref=_TEST_TARGET_DIFF_LOC_TABLE_REF,
+        amount=amount,
+        extract_bucket_name=bucket_name,
+    )
+    # Then
+    assert bool(called.get('transfer')) == expected_transfer
+    assert bool(called.get('remove_dataset')) != expected_transfer
+    if called.get('load_table'):
+        source_uri, table_fqn_id = called.get('load_table')
+        assert source_uri == called.get('extract_table')
+        assert source_uri.startswith(f'gs://{bucket_name}/{called.get("delete_objects")}/')
+        assert table_fqn_id == _TEST_TARGET_DIFF_LOC_TABLE_FQN_ID
+
+
+def test__extract_and_load_if_small_ok_table_lookup_fails(monkeypatch):
+    # Given
+    def mocked_bq_table(*, table_fqn_id: str) -> bigquery.Table:
+        raise RuntimeError('TEST')
+
+    monkeypatch.setattr(sampler_query.bq, 'table', mocked_bq_table)
+    # When
+    result = sampler_query._extract_and_load_if_small(
+        _TEST_SOURCE_TABLE_REF, _TEST_TARGET_DIFF_LOC_TABLE_REF, 'TEST_EXTRACT_BUCKET'
+    )
+    # Then
+    assert not result
+
+
+def test__extract_and_load_if_small_ok_persistent_staging(monkeypatch):
+    # Given
+    staging_table_ref = _TEST_SOURCE_TABLE_REF.clone(
+        dataset_id=sampler_query.persistent_staging_dataset_id(
+            source_table_ref=_TEST_SOURCE_TABLE_REF,
+            target_table_ref=_TEST_TARGET_DIFF_LOC_TABLE_REF,
+        )
+    )
+    called = {}
+
+    def mocked_bq_table(*, table_fqn_id: str) -> bigquery.Table:
+        result = bigquery.Table(table_fqn_id.split(const.BQ_TABLE_FQN_LOCATION_SEP)[0])
+        result._properties['numBytes'] = '1'
+        return result
+
+    monkeypatch.setattr(sampler_query.bq, 'table', mocked_bq_table)
+    monkeypatch.setattr(sampler_query.bq, 'extract_table', lambda **kwargs: None)
+    monkeypatch.setattr(sampler_query.bq, 'load_table', lambda **kwargs: None)
+    monkeypatch.setattr(sampler_query.gcs, 'delete_objects', lambda bucket, prefix: 1)
+    monkeypatch.setattr(
+        sampler_query.bq,
+        'drop_table',
+        lambda **kwargs: called.setdefault('drop_table', kwargs.get('table_fqn_id')),
+    )
+    monkeypatch.setattr(
+        sampler_query.bq, 'remove_dataset', lambda **kwargs: called.setdefault('remove_dataset', 1)
+    )
+    # When
+    result = sampler_query._extract_and_load_if_small(
+        staging_table_ref, _TEST_TARGET_DIFF_LOC_TABLE_REF, 'TEST_EXTRACT_BUCKET'
+    )
+    # Then
+    assert result
+    assert called == {'drop_table': staging_table_ref.table_fqn_id()}
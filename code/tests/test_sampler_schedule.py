@@ -0,0 +1,186 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=missing-module-docstring,missing-class-docstring,missing-function-docstring
+# pylint: disable=missing-function-docstring,assignment-from-no-return,c-extension-no-member
+# pylint: disable=protected-access,redefined-outer-name,no-self-use,using-constant-test
+# pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
+# type: ignore
+from typing import List, Optional
+
+import attrs
+import pytest
+
+from bq_sampler import sampler_schedule
+from bq_sampler.entity import command
+
+from tests.entity import command_test_data
+
+_TEST_NOW_TIMESTAMP: int = 1000
+
+
+def _sample_start_cmd(
+    location: Optional[str] = 'us', table_id: Optional[str] = 'TEST_TABLE_ID'
+) -> command.CommandSampleStart:
+    cmd = command_test_data.TEST_COMMAND_SAMPLE_START_RANDOM
+    table_ref = attrs.evolve(
+        cmd.sample_request.table_reference, location=location, table_id=table_id
+    )
+    return attrs.evolve(
+        cmd, sample_request=attrs.evolve(cmd.sample_request, table_reference=table_ref)
+    )
+
+
+def test_schedule_ok_no_rate():
+    # Given
+    values = [[_sample_start_cmd()], [_sample_start_cmd()]]
+    # When
+    result = sampler_schedule.schedule(values, start_timestamp=_TEST_NOW_TIMESTAMP)
+    # Then
+    assert result == values
+
+
+@pytest.mark.parametrize(
+    'locations,expected',
+    [
+        ([['us'], ['us'], ['us']], [0, 0, 1]),
+        ([['us'], ['eu'], ['us'], ['eu']], [0, 0, 0, 0]),
+        ([['us', 'us', 'us'], ['us']], [0, 1]),  # a group starts at once
+    ],
+)
+def test_schedule_ok(locations: List[List[str]], expected: List[int]):
+    # Given
+    values = [[_sample_start_cmd(location) for location in group] for group in locations]
+    # When
+    result = sampler_schedule.schedule(values, start_timestamp=_TEST_NOW_TIMESTAMP, jobs_per_sec=2)
+    # Then
+    assert [len(group) for group in result] == [len(group) for group in values]
+    assert [
+        {cmd.not_before_timestamp - _TEST_NOW_TIMESTAMP for cmd in group} for group in result
+    ] == [{offset} for offset in expected]
+
+
+def _offsets(groups: List[List[command.CommandSampleStart]]) -> List[Optional[int]]:
+    return [
+        (
+            group[0].not_before_timestamp - _TEST_NOW_TIMESTAMP
+            if group[0].not_before_timestamp is not None
+            else None
+        )
+        for group in groups
+    ]
+
+
+@pytest.mark.parametrize(
+    'offsets,max_delay_sec,expected_within,expected_after',
+    [
+        ([0, 1, 2, 3], None, [0, 1, 2, 3], []),
+        ([0, 1, 2, 3], 1, [0, 1], [2, 3]),
+        ([0, 2, 0, 3], 2, [0, 2, 0], [3]),  # not in start order
+        ([None, 5], 1, [None], [5]),
+    ],
+)
+def test_split_at_horizon_ok(
+    offsets: List[Optional[int]],
+    max_delay_sec: Optional[int],
+    expected_within: List[Optional[int]],
+    expected_after: List[int],
+):
+    # Given
+    values = [
+        [
+            attrs.evolve(
+                _sample_start_cmd(),
+                not_before_timestamp=(_TEST_NOW_TIMESTAMP + offset if offset is not None else None),
+            )
+        ]
+        for offset in offsets
+    ]
+    # When
+    within, after = sampler_schedule.split_at_horizon(
+        values, start_timestamp=_TEST_NOW_TIMESTAMP, max_delay_sec=max_delay_sec
+    )
+    # Then
+    assert _offsets(within) == expected_within
+    assert _offsets(after) == expected_after
+
+
+def test_ordering_key_ok():
+    # Given
+    values = [_sample_start_cmd(table_id=f'TABLE_{ndx}') for ndx in range(20)]
+    # When
+    result = [sampler_schedule.ordering_key(value, max_in_flight=3) for value in values]
+    # Then
+    quota_key = sampler_schedule.quota_key(values[0])
+    assert {key.rsplit('/', 1)[0] for key in result} == {quota_key}
+    assert {key.rsplit('/', 1)[1] for key in result} == {'0', '1', '2'}
+    # same table, same lane
+    assert result == [sampler_schedule.ordering_key(value, max_in_flight=3) for value in values]
+
+
+def test_ordering_key_ok_no_limit():
+    # Given/When/Then
+    assert sampler_schedule.ordering_key(_sample_start_cmd()) is None
+
+
+@pytest.mark.parametrize(
+    'not_before_timestamp,expected',
+    [
+        (None, 0),
+        (_TEST_NOW_TIMESTAMP - 10, 0),
+        (_TEST_NOW_TIMESTAMP + 10, 10),
+    ],
+)
+def test_seconds_until_due_ok(monkeypatch, not_before_timestamp: Optional[int], expected: int):
+    # Given
+    value = attrs.evolve(_sample_start_cmd(), not_before_timestamp=not_before_timestamp)
+    monkeypatch.setattr(sampler_schedule.time, 'time', lambda: _TEST_NOW_TIMESTAMP)
+    # When
+    result = sampler_schedule.seconds_until_due(value)
+    batch_result = sampler_schedule.seconds_until_due(
+        command.CommandBatch(
+            type=command.CommandType.COMMAND_BATCH.value,
+            timestamp=_TEST_NOW_TIMESTAMP,
+            commands=[value, _sample_start_cmd()],
+        )
+    )
+    # Then
+    assert result == expected
+    assert batch_result == expected
+
+
+def test_seconds_until_due_ok_sample_policy_prefix(monkeypatch):
+    # Given
+    value = command_test_data.TEST_COMMAND_SAMPLE_POLICY_PREFIX.clone(
+        not_before_timestamp=_TEST_NOW_TIMESTAMP + 10
+    )
+    monkeypatch.setattr(sampler_schedule.time, 'time', lambda: _TEST_NOW_TIMESTAMP)
+    # When/Then
+    assert sampler_schedule.seconds_until_due(value) == 10
+
+
+def test_seconds_until_due_ok_not_sample_start():
+    # Given/When/Then
+    assert sampler_schedule.seconds_until_due(command_test_data.TEST_COMMAND_START) == 0
+
+
+def test_check_due_ok(monkeypatch):
+    # Given
+    value = attrs.evolve(_sample_start_cmd(), not_before_timestamp=_TEST_NOW_TIMESTAMP)
+    monkeypatch.setattr(sampler_schedule.time, 'time', lambda: _TEST_NOW_TIMESTAMP)
+    slept = []
+    monkeypatch.setattr(sampler_schedule.time, 'sleep', slept.append)
+    # When
+    sampler_schedule.check_due(value)
+    # Then
+    assert not slept
+
+
+def test_check_due_nok_not_due(monkeypatch):
+    # Given
+    value = attrs.evolve(_sample_start_cmd(), not_before_timestamp=_TEST_NOW_TIMESTAMP + 100)
+    monkeypatch.setattr(sampler_schedule.time, 'time', lambda: _TEST_NOW_TIMESTAMP)
+    slept = []
+    monkeypatch.setattr(sampler_schedule.time, 'sleep', slept.append)
+    # When/Then
+    with pytest.raises(sampler_schedule.SampleNotDueError):
+        sampler_schedule.check_due(value)
+    assert not slept
@@ -0,0 +1,110 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=missing-module-docstring,missing-class-docstring,missing-function-docstring
+# pylint: disable=missing-function-docstring,assignment-from-no-return,c-extension-no-member
+# pylint: disable=protected-access,redefined-outer-name,no-self-use,using-constant-test
+# pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
+# type: ignore
+from typing import Any, Dict, Generator, List, Optional
+
+import pytest
+
+from bq_sampler import const, sampler_staging
+
+_TEST_BUCKET_NAME: str = 'TEST_STATE_BUCKET'
+_TEST_STAGING_DATASET_ID: str = 'TEST_STAGING_DATASET_ID'
+
+
+def _mock_gcs(
+    monkeypatch,
+    *,
+    landed_table_ids: List[str],
+    claimed: Optional[bool] = False,
+) -> Dict[str, List[Any]]:
+    called = {'write_object': []}
+    staging_prefix = f'{const.STAGED_SAMPLES_PREFIX}/{_TEST_STAGING_DATASET_ID}'
+
+    def mocked_write_object(
+        bucket_name: str, path: str, content: Optional[str] = '', if_absent: Optional[bool] = False
+    ) -> bool:
+        assert bucket_name == _TEST_BUCKET_NAME
+        assert not content
+        called['write_object'].append((path, if_absent))
+        result = True
+        if path.startswith(f'{staging_prefix}/'):
+            landed_table_ids.append(path.split('/')[-1])
+        elif if_absent:
+            assert path == f'{staging_prefix}{const.STAGED_SAMPLES_TRANSFER_CLAIM_EXT}'
+            result = not claimed
+        return result
+
+    def mocked_list_objects(
+        bucket_name: str, prefix: Optional[str] = None
+    ) -> Generator[str, None, None]:
+        assert bucket_name == _TEST_BUCKET_NAME
+        assert prefix == f'{staging_prefix}/'
+        for table_id in set(landed_table_ids):
+            yield f'{prefix}{table_id}'
+
+    monkeypatch.setattr(sampler_staging.gcs, 'write_object', mocked_write_object)
+    monkeypatch.setattr(sampler_staging.gcs, 'list_objects', mocked_list_objects)
+    return called
+
+
+@pytest.mark.parametrize(
+    'landed_table_ids,claimed,expected',
+    [
+        ([], False, False),  # first to land
+        (['TABLE_A'], False, True),  # last to land
+        (['TABLE_A'], True, False),  # last to land but someone else claimed it
+        (['TABLE_A', 'TABLE_B'], False, True),  # landing again, e.g. retry
+    ],
+)
+def test_land_sample_and_claim_transfer_ok(
+    monkeypatch, landed_table_ids: List[str], claimed: bool, expected: bool
+):
+    # Given
+    called = _mock_gcs(monkeypatch, landed_table_ids=list(landed_table_ids), claimed=claimed)
+    # When
+    result = sampler_staging.land_sample_and_claim_transfer(
+        bucket_name=_TEST_BUCKET_NAME,
+        staging_dataset_id=_TEST_STAGING_DATASET_ID,
+        table_id='TABLE_B',
+        expected_amount=2,
+    )
+    # Then
+    assert result == expected
+    assert not called['write_object'][0][1]
+    assert len(called['write_object']) == (1 if not landed_table_ids else 2)
+
+
+@pytest.mark.parametrize('expected_amount', [None, 0, -1, '2'])
+def test_land_sample_and_claim_transfer_nok(monkeypatch, expected_amount: Any):
+    # Given
+    _mock_gcs(monkeypatch, landed_table_ids=[])
+    # When/Then
+    with pytest.raises(ValueError):
+        sampler_staging.land_sample_and_claim_transfer(
+            bucket_name=_TEST_BUCKET_NAME,
+            staging_dataset_id=_TEST_STAGING_DATASET_ID,
+            table_id='TABLE_A',
+            expected_amount=expected_amount,
+        )
+
+
+def test_remove_staging_dataset_state_ok(monkeypatch):
+    # Given
+    called = []
+
+    def mocked_delete_objects(bucket_name: str, prefix: str) -> int:
+        called.append((bucket_name, prefix))
+        return 1
+
+    monkeypatch.setattr(sampler_staging.gcs, 'delete_objects', mocked_delete_objects)
+    # When
+    sampler_staging.remove_staging_dataset_state(
+        bucket_name=_TEST_BUCKET_NAME, staging_dataset_id=_TEST_STAGING_DATASET_ID
+    )
+    # Then
+    assert called == [
+        (_TEST_BUCKET_NAME, f'{const.STAGED_SAMPLES_PREFIX}/{_TEST_STAGING_DATASET_ID}')
+    ]
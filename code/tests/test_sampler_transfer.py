@@ -0,0 +1,134 @@
+# vim: ai:sw=4:ts=4:sta:et:fo=croql
+# pylint: disable=missing-module-docstring,missing-class-docstring,missing-function-docstring
+# pylint: disable=missing-function-docstring,assignment-from-no-return,c-extension-no-member
+# pylint: disable=protected-access,redefined-outer-name,no-self-use,using-constant-test
+# pylint: disable=invalid-name,attribute-defined-outside-init,too-few-public-methods, redefined-builtin
+# type: ignore
+from typing import Dict, Generator, Optional
+
+import pytest
+
+from bq_sampler import const, sampler_transfer
+from bq_sampler.entity import transfer
+
+_TEST_BUCKET_NAME: str = 'TEST_STATE_BUCKET'
+_TEST_TRANSFER_CONFIG_NAME: str = (
+    'projects/TEST_PROJECT/locations/TEST_LOCATION/transferConfigs/TEST'
+)
+_TEST_TRACKED_TRANSFER: transfer.TrackedTransfer = transfer.TrackedTransfer(
+    transfer_config_name=_TEST_TRANSFER_CONFIG_NAME,
+    run_name=f'{_TEST_TRANSFER_CONFIG_NAME}/runs/TEST_RUN',
+    source_project_id='TEST_PROJECT',
+    source_dataset_id='TEST_STAGING_DATASET_ID',
+    triggered_timestamp=100,
+)
+_TEST_TRACKED_TRANSFER_PATH: str = (
+    f'{const.TRACKED_TRANSFERS_PREFIX}/{_TEST_TRANSFER_CONFIG_NAME}{const.JSON_EXT}'
+)
+
+
+def _mock_gcs(monkeypatch, objects: Dict[str, str]) -> None:
+    def mocked_write_object(
+        bucket_name: str, path: str, content: Optional[str] = '', if_absent: Optional[bool] = False
+    ) -> bool:
+        assert bucket_name == _TEST_BUCKET_NAME
+        assert not if_absent
+        objects[path] = content
+        return True
+
+    def mocked_read_object(
+        bucket_name: str, path: str, warn_read_failure: Optional[bool] = True
+    ) -> Optional[bytes]:
+        assert bucket_name == _TEST_BUCKET_NAME
+        assert not warn_read_failure
+        content = objects.get(path)
+        return content.encode() if content is not None else None
+
+    def mocked_list_objects(
+        bucket_name: str, prefix: Optional[str] = None
+    ) -> Generator[str, None, None]:
+        assert bucket_name == _TEST_BUCKET_NAME
+        for path in list(objects):
+            if path.startswith(prefix):
+                yield path
+
+    def mocked_delete_objects(bucket_name: str, prefix: str) -> int:
+        assert bucket_name == _TEST_BUCKET_NAME
+        paths = [path for path in objects if path.startswith(prefix)]
+        for path in paths:
+            del objects[path]
+        return len(paths)
+
+    monkeypatch.setattr(sampler_transfer.gcs, 'write_object', mocked_write_object)
+    monkeypatch.setattr(sampler_transfer.gcs, 'read_object', mocked_read_object)
+    monkeypatch.setattr(sampler_transfer.gcs, 'list_objects', mocked_list_objects)
+    monkeypatch.setattr(sampler_transfer.gcs, 'delete_objects', mocked_delete_objects)
+
+
+def test_track_ok(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    # When
+    sampler_transfer.track(bucket_name=_TEST_BUCKET_NAME, value=_TEST_TRACKED_TRANSFER)
+    # Then
+    assert list(objects) == [_TEST_TRACKED_TRANSFER_PATH]
+    assert (
+        sampler_transfer.tracked(
+            bucket_name=_TEST_BUCKET_NAME, transfer_config_name=_TEST_TRANSFER_CONFIG_NAME
+        )
+        == _TEST_TRACKED_TRANSFER
+    )
+
+
+def test_track_nok_not_tracked_transfer(monkeypatch):
+    # Given
+    objects = {}
+    _mock_gcs(monkeypatch, objects)
+    # When/Then
+    with pytest.raises(ValueError):
+        sampler_transfer.track(bucket_name=_TEST_BUCKET_NAME, value=_TEST_TRANSFER_CONFIG_NAME)
+    assert not objects
+
+
+def test_untrack_ok(monkeypatch):
+    # Given
+    objects = {_TEST_TRACKED_TRANSFER_PATH: _TEST_TRACKED_TRANSFER.as_json()}
+    _mock_gcs(monkeypatch, objects)
+    # When
+    sampler_transfer.untrack(
+        bucket_name=_TEST_BUCKET_NAME, transfer_config_name=_TEST_TRANSFER_CONFIG_NAME
+    )
+    # Then
+    assert not objects
+    assert (
+        sampler_transfer.tracked(
+            bucket_name=_TEST_BUCKET_NAME, transfer_config_name=_TEST_TRANSFER_CONFIG_NAME
+        )
+        is None
+    )
+
+
+@pytest.mark.parametrize(
+    'now_timestamp,expected',
+    [
+        (100 + 60, False),  # exactly at the deadline
+        (100 + 61, True),
+    ],
+)
+def test_overdue_ok(monkeypatch, now_timestamp: int, expected: bool):
+    # Given
+    objects = {
+        _TEST_TRACKED_TRANSFER_PATH: _TEST_TRACKED_TRANSFER.as_json(),
+        f'{const.TRACKED_TRANSFERS_PREFIX}/INVALID{const.JSON_EXT}': 'NOT_JSON',
+        f'{const.TRACKED_TRANSFERS_PREFIX}/NOT_TRACKING': '',
+    }
+    _mock_gcs(monkeypatch, objects)
+    # When
+    result = list(
+        sampler_transfer.overdue(
+            bucket_name=_TEST_BUCKET_NAME, timeout_sec=60, now_timestamp=now_timestamp
+        )
+    )
+    # Then
+    assert result == ([_TEST_TRACKED_TRANSFER] if expected else [])
@@ -57,7 +57,9 @@ resource "google_pubsub_subscription" "pubsub_cmd_sampler" {
     }
   }
   ack_deadline_seconds       = var.sampler_function_timeout
-  message_retention_duration = "1200s" # 20 minutes
+  message_retention_duration = "${var.pubsub_cmd_message_retention_sec}s"
+  // one sampling command at a time per ordering key, see SAMPLE_START_MAX_IN_FLIGHT
+  enable_message_ordering = true
   retry_policy {
     minimum_backoff = "10s"
   }
@@ -111,6 +113,9 @@ module "sampler" {
     CMD_TOPIC_NAME                 = var.pubsub_cmd_topic_id
     ERROR_TOPIC_NAME               = var.pubsub_err_topic_id
     LOG_LEVEL                      = var.sampler_function_log_level
+    SAMPLE_START_JOBS_PER_SEC      = var.sampler_start_jobs_per_sec
+    SAMPLE_START_MAX_IN_FLIGHT     = var.sampler_start_max_in_flight
+    SAMPLE_START_MAX_DELAY_SEC     = var.sampler_start_max_delay_sec
   }
   trigger_config = {
     v1 = null // forces HTTP
@@ -56,6 +56,10 @@ module "source_3" {
   sampler_function_name                       = var.sampler_function_name
   sampler_function_handler                    = var.sampler_function_handler
   sampler_function_log_level                  = var.sampler_function_log_level
+  sampler_start_jobs_per_sec                  = var.sampler_start_jobs_per_sec
+  sampler_start_max_in_flight                 = var.sampler_start_max_in_flight
+  sampler_start_max_delay_sec                 = var.sampler_start_max_delay_sec
+  pubsub_cmd_message_retention_sec            = var.pubsub_cmd_message_retention_sec
   notification_function_max_instances         = var.notification_function_max_instances
   notification_function_type                  = var.notification_function_type
   notification_function_name_prefix           = var.notification_function_name_prefix
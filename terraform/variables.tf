@@ -161,6 +161,30 @@ variable "sampler_function_log_level" {
   default     = "INFO"
 }
 
+variable "sampler_start_jobs_per_sec" {
+  description = "Sampling jobs started per second, per target project and source location. Commands scheduled later are delivered again until due."
+  type        = number
+  default     = 10
+}
+
+variable "sampler_start_max_in_flight" {
+  description = "Sampling commands in flight, per target project and source location. It relies on the command subscription message ordering."
+  type        = number
+  default     = 50
+}
+
+variable "sampler_start_max_delay_sec" {
+  description = "How far ahead, in seconds, a sampling command is scheduled. It must be well within the command subscription message retention."
+  type        = number
+  default     = 600
+}
+
+variable "pubsub_cmd_message_retention_sec" {
+  description = "How long, in seconds, the command subscription keeps a message not yet acknowledged, e.g., a sampling command not due yet."
+  type        = number
+  default     = 3600
+}
+
 ///////////////////////////
 // Notification Function //
 ///////////////////////////